@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Load test for the HTTP transport.
+
+Runs N concurrent clients, each sending MCP tools/call requests back to back
+for a fixed duration, and reports requests per second and latency percentiles.
+
+    # Against a running server
+    glasstape-policy-builder-mcp --transport http --workers 4 &
+    python benchmarks/http_load.py --clients 100 --duration 30
+
+    # Start (and stop) a server with 4 workers for the run
+    python benchmarks/http_load.py --serve 4 --clients 100
+
+By default every request is a generate_policy call with the payment template's
+ICP; use --tool and --arguments to load another tool. If $GLASSTAPE_HTTP_TOKEN
+is set, requests send it as a bearer token.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from glasstape_policy_builder.http_server import TOKEN_ENV
+from glasstape_policy_builder.llm_pool import percentile
+from glasstape_policy_builder.templates import template_library
+
+
+HEADERS = {"Accept": "application/json, text/event-stream"}
+
+
+def auth_headers() -> Dict[str, str]:
+    """The server's bearer token, when it requires one."""
+    token = os.getenv(TOKEN_ENV)
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def default_arguments() -> Dict[str, Any]:
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    return {"icp": icp}
+
+
+async def client(
+    http: httpx.AsyncClient,
+    url: str,
+    tool: str,
+    arguments: Dict[str, Any],
+    deadline: float,
+    latencies: List[float],
+    errors: List[str],
+) -> None:
+    request_id = 0
+    while time.perf_counter() < deadline:
+        request_id += 1
+        payload = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": "tools/call",
+            "params": {"name": tool, "arguments": arguments},
+        }
+        start = time.perf_counter()
+        try:
+            response = await http.post(url, json=payload, headers=HEADERS)
+            if response.status_code != 200 or '"error"' in response.text[:200]:
+                errors.append(f"{response.status_code}: {response.text[:120]}")
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_load(url: str, clients: int, duration: float, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: List[str] = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(timeout=60, limits=limits, headers=auth_headers()) as http:
+        # Warm up every worker's imports and pools before measuring
+        await asyncio.gather(*(http.post(url, json={
+            "jsonrpc": "2.0", "id": 0, "method": "tools/call", "params": {"name": tool, "arguments": arguments},
+        }, headers=HEADERS) for _ in range(min(clients, 16))))
+        
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            client(http, url, tool, arguments, deadline, latencies, errors) for _ in range(clients)
+        ))
+        elapsed = time.perf_counter() - start
+    
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "glasstape_policy_builder.server", "--transport", "http",
+         "--port", str(port), "--workers", str(workers)],
+        env=dict(os.environ),
+    )
+    for _ in range(100):
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy within 20s")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000/mcp")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of measured load")
+    parser.add_argument("--tool", default="generate_policy")
+    parser.add_argument("--arguments", help="Tool arguments as JSON (default: the payment template ICP)")
+    parser.add_argument("--serve", type=int, metavar="WORKERS", help="Start a server with this many workers")
+    args = parser.parse_args(argv)
+    
+    arguments = json.loads(args.arguments) if args.arguments else (
+        default_arguments() if args.tool == "generate_policy" else {}
+    )
+    server = None
+    if args.serve:
+        port = httpx.URL(args.url).port or 8000
+        server = start_server(port, args.serve)
+    try:
+        report = asyncio.run(run_load(args.url, args.clients, args.duration, args.tool, arguments))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Response-time benchmarks for the in-process pipeline.
+
+Each benchmark times one hot path over repeated calls and reports latency
+percentiles in milliseconds. The test suite checks the behaviour behind
+these numbers (caching, indexing, time budgets) deterministically; this
+script is where the numbers themselves are tracked.
+
+    python benchmarks/response_times.py
+    python benchmarks/response_times.py --only guidance --repeat 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from glasstape_policy_builder.llm_pool import percentile
+
+
+BENCHMARKS: Dict[str, Callable[[int], List[float]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark that returns per-call timings in seconds."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def timed(call: Callable[[], Any], repeat: int) -> List[float]:
+    call()  # Warm caches and imports outside the measurement
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+@benchmark("guidance")
+def guidance_responses(repeat: int) -> List[float]:
+    """generate_policy guidance plus list_templates, served from cached renderings."""
+    from glasstape_policy_builder.tools.generate_policy import generate_policy_tool
+    from glasstape_policy_builder.tools.list_templates import list_templates_tool
+    
+    os.environ.pop("LLM_PROVIDER", None)
+    
+    async def call() -> None:
+        await generate_policy_tool({"nl_requirements": "Summarize quarterly reports for finance"})
+        await list_templates_tool({})
+    
+    loop = asyncio.new_event_loop()
+    try:
+        return timed(lambda: loop.run_until_complete(call()), repeat)
+    finally:
+        loop.close()
+
+
+@benchmark("template_search")
+def template_search(repeat: int) -> List[float]:
+    """Ranked search over the built-in templates plus 2000 synthetic ones."""
+    from glasstape_policy_builder.templates import POLICY_TEMPLATES, PolicyTemplate, TemplateLibrary
+    
+    synthetic = [
+        PolicyTemplate(
+            id=f"internal_{i}",
+            name=f"Internal Policy {i}",
+            category=["finance", "healthcare", "system"][i % 3],
+            description=f"Internal control {i} for service {i % 50} with audit logging",
+            example=f"Allow service {i % 50} agents to read records in region {i % 7}.",
+            tags=[f"team{i % 20}", "internal"],
+        )
+        for i in range(2000)
+    ]
+    library = TemplateLibrary(POLICY_TEMPLATES + synthetic)
+    return timed(lambda: library.search("rate limit payments", limit=10), repeat)
+
+
+@benchmark("redteam")
+def redteam_analysis(repeat: int) -> List[float]:
+    """All registered red-team checks on the payment template's policy."""
+    from glasstape_policy_builder.redteam_analyzer import SimpleRedTeamAnalyzer
+    from glasstape_policy_builder.services import get_services
+    from glasstape_policy_builder.templates import template_library
+    
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    policy_yaml, _ = get_services().pipeline.generate_policy_artifacts(icp)
+    analyzer = SimpleRedTeamAnalyzer()
+    return timed(lambda: analyzer.analyze(policy_yaml, icp), repeat)
+
+
+@benchmark("rule_analysis")
+def rule_analysis(repeat: int) -> List[float]:
+    """Shadowed/unreachable rule detection over a 3000-rule policy."""
+    from glasstape_policy_builder.policy_model import PolicyModel
+    from glasstape_policy_builder.rule_analysis import analyze_rules
+    
+    rules = "".join(
+        f"    - actions: [\"op{i % 500}\"]\n      effect: EFFECT_ALLOW\n      roles: [\"role{i % 7}\"]\n"
+        f"      condition:\n        match:\n          expr: \"R.attr.amount > {i} && R.attr.amount <= {i + 1}\"\n"
+        for i in range(3000)
+    )
+    policy = PolicyModel.parse(f"resourcePolicy:\n  resource: doc\n  version: default\n  rules:\n{rules}")
+    return timed(lambda: analyze_rules(policy), max(1, repeat // 20))
+
+
+@benchmark("coverage")
+def coverage_analysis(repeat: int) -> List[float]:
+    """In-process coverage of the payment template's tests repeated 100 times."""
+    from glasstape_policy_builder.coverage import analyze_coverage
+    from glasstape_policy_builder.templates import template_library
+    
+    icp = template_library.instantiate("payment_execution")
+    tests = icp["tests"] * 100
+    return timed(lambda: analyze_coverage(icp, tests), max(1, repeat // 20))
+
+
+@benchmark("test_minimization")
+def test_minimization(repeat: int) -> List[float]:
+    """Minimal covering suite for the payment template's tests repeated 100 times."""
+    from glasstape_policy_builder.templates import template_library
+    from glasstape_policy_builder.test_minimizer import minimize_tests
+    
+    icp = template_library.instantiate("payment_execution")
+    tests = icp["tests"] * 100
+    return timed(lambda: minimize_tests(icp, tests), max(1, repeat // 20))
+
+
+@benchmark("loop_lag")
+def loop_lag(repeat: int) -> List[float]:
+    """Event-loop lag past a 10 ms sleep while policies generate and blocking calls run."""
+    from glasstape_policy_builder.scheduler import Scheduler
+    from glasstape_policy_builder.templates import template_library
+    from glasstape_policy_builder.tools.generate_policy import build_policy_artifacts
+    
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    scheduler = Scheduler()
+    
+    async def scenario() -> List[float]:
+        await scheduler.run_cpu(os.getpid)  # Start the worker processes first
+        lags: List[float] = []
+        
+        async def heartbeat() -> None:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - start - 0.01)
+        
+        work = [scheduler.run_cpu(build_policy_artifacts, icp, True) for _ in range(8)]
+        work += [scheduler.run_io(time.sleep, 0.1) for _ in range(8)]
+        await asyncio.gather(heartbeat(), *work)
+        return lags
+    
+    try:
+        return asyncio.run(scenario())
+    finally:
+        scheduler.shutdown()
+
+
+def summarize(timings: List[float]) -> Dict[str, Any]:
+    return {
+        "calls": len(timings),
+        "p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed calls per benchmark")
+    args = parser.parse_args(argv)
+    
+    report = {name: summarize(BENCHMARKS[name](args.repeat)) for name in (args.only or BENCHMARKS)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
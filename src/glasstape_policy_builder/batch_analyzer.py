@@ -0,0 +1,393 @@
+"""
+Batch Analyzer - Red-team analysis of a whole policy repository.
+
+Policy files are streamed from disk and analyzed across worker processes.
+Each file's findings are emitted as one JSONL record as soon as it
+completes, followed by an aggregate summary record. As files arrive their
+rules are added to a PolicyIndex, so cross-policy conflicts are reported
+without comparing every pair of files.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import multiprocessing
+import os
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, List, Optional, Union
+
+import yaml
+
+from .policy_index import PolicyConflict, PolicyIndex, rule_entries
+from .policy_model import YAML_LOADER, PolicyModel
+from .private_dirs import ensure_private_dir, user_work_dir
+from .redteam_analyzer import SimpleRedTeamAnalyzer
+
+
+POLICY_FILE_SUFFIXES = ('.yaml', '.yml', '.json')
+
+REPORT_DIR_ENV = 'GLASSTAPE_REPORT_DIR'
+REPORT_SUFFIX = '.jsonl'
+_REPORT_RECORD_TYPES = ('file', 'skipped', 'error', 'conflict', 'summary')
+
+# Below this many files per worker, process start-up costs more than it saves
+MIN_FILES_PER_WORKER = 16
+
+# Conflicts kept in the summary record; the JSONL report has all of them
+CONFLICTS_IN_SUMMARY = 100
+
+# Cerbos documents that are not resource policies; reported as skipped
+_OTHER_DOCUMENT_KINDS = ('principalPolicy', 'derivedRoles', 'exportVariables', 'exportConstants', 'rolePolicy')
+
+
+def iter_policy_files(root: Path) -> Iterator[Path]:
+    """Yield candidate policy files under root, skipping hidden directories and test suites."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != 'testdata')
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            if path.suffix.lower() not in POLICY_FILE_SUFFIXES:
+                continue
+            if path.stem.endswith('_test'):
+                continue
+            yield path
+
+
+_worker_analyzer: Optional[SimpleRedTeamAnalyzer] = None
+
+
+def analyze_file(path: str, root: str = '') -> Dict[str, Any]:
+    """
+    Analyze one policy file.
+    
+    Returns a JSON-serialisable record with ``type`` of ``file``,
+    ``skipped`` or ``error``. Runs in worker processes.
+    """
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = SimpleRedTeamAnalyzer()
+    
+    started = time.perf_counter()
+    relative = os.path.relpath(path, root) if root else path
+    try:
+        text = Path(path).read_text()
+        document = json.loads(text) if path.endswith('.json') else yaml.load(text, Loader=YAML_LOADER)
+    except (OSError, UnicodeDecodeError, ValueError, yaml.YAMLError) as e:
+        return {'type': 'error', 'path': relative, 'error': str(e)}
+    
+    if not isinstance(document, dict) or 'resourcePolicy' not in document:
+        kind = next((k for k in _OTHER_DOCUMENT_KINDS if isinstance(document, dict) and k in document), None)
+        if kind or (isinstance(document, dict) and 'tests' in document):
+            return {'type': 'skipped', 'path': relative, 'reason': kind or 'test suite'}
+        return {'type': 'error', 'path': relative, 'error': 'Not a Cerbos policy document'}
+    
+    policy = PolicyModel.from_document(document)
+    findings = _worker_analyzer.analyze(text, policy=policy)
+    return {
+        'type': 'file',
+        'path': relative,
+        'resource': policy.resource,
+        'version': policy.version,
+        'findings': [asdict(f) for f in findings],
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        'digest': hashlib.sha256(text.encode()).hexdigest(),
+        'rules': rule_entries(policy),
+    }
+
+
+def _analyze_file_args(args: tuple[str, str]) -> Dict[str, Any]:
+    return analyze_file(*args)
+
+
+@dataclass
+class RepositorySummary:
+    """Aggregate results of a repository analysis."""
+    root: str
+    files: int = 0
+    analyzed: int = 0
+    skipped: int = 0
+    errors: List[Dict[str, str]] = field(default_factory=list)
+    status_counts: Dict[str, int] = field(default_factory=lambda: {'pass': 0, 'warn': 0, 'fail': 0})
+    failing_checks: Dict[str, int] = field(default_factory=dict)
+    failing_by_resource: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    worst_offenders: List[Dict[str, Any]] = field(default_factory=list)
+    conflict_counts: Dict[str, int] = field(default_factory=dict)
+    conflicts: List[Dict[str, Any]] = field(default_factory=list)
+    duration_ms: float = 0.0
+    report_path: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'type': 'summary', **asdict(self)}
+    
+    def format(self) -> str:
+        """Format the summary as readable text."""
+        output = "# 🔒 Repository Security Analysis\n\n"
+        output += f"**Path**: `{self.root}`\n"
+        output += (
+            f"**Files**: {self.analyzed} analyzed, {self.skipped} skipped, "
+            f"{len(self.errors)} errors in {self.duration_ms / 1000:.1f}s\n"
+        )
+        output += (
+            f"**Findings**: ✅ {self.status_counts['pass']} passed, "
+            f"⚠️ {self.status_counts['warn']} warnings, ❌ {self.status_counts['fail']} failed\n\n"
+        )
+        
+        if self.failing_by_resource:
+            output += "## Failing Checks by Resource\n\n"
+            for resource, checks in sorted(self.failing_by_resource.items(), key=lambda i: -sum(i[1].values())):
+                listed = ", ".join(f"{check} ({count})" for check, count in sorted(checks.items(), key=lambda i: -i[1]))
+                output += f"- `{resource}`: {listed}\n"
+            output += "\n"
+        
+        if self.worst_offenders:
+            output += "## Worst Offenders\n\n"
+            for rank, offender in enumerate(self.worst_offenders, 1):
+                output += (
+                    f"{rank}. `{offender['path']}` ({offender['resource']}) — "
+                    f"{offender['failed']} failed, {offender['warned']} warnings\n"
+                )
+            output += "\n"
+        
+        if self.conflicts:
+            counts = ", ".join(f"{kind.replace('_', ' ')}: {count}" for kind, count in self.conflict_counts.items())
+            output += f"## Cross-Policy Conflicts ({counts})\n\n"
+            for conflict in self.conflicts[:10]:
+                output += f"- {conflict['message']}\n"
+            total = sum(self.conflict_counts.values())
+            if total > 10:
+                output += f"- ...and {total - 10} more\n"
+            output += "\n"
+        
+        if self.errors:
+            output += "## Unreadable Files\n\n"
+            for error in self.errors[:10]:
+                output += f"- `{error['path']}`: {error['error']}\n"
+            if len(self.errors) > 10:
+                output += f"- ...and {len(self.errors) - 10} more\n"
+            output += "\n"
+        
+        if self.report_path:
+            output += f"**Full report (JSONL)**: `{self.report_path}`\n"
+        
+        return output
+
+
+class _SummaryBuilder:
+    """Fold file records into a RepositorySummary as they arrive."""
+    
+    def __init__(self, root: str, top: int):
+        self.summary = RepositorySummary(root=root)
+        self.top = top
+        self._failing_checks: Counter = Counter()
+        self._by_resource: Dict[str, Counter] = {}
+        self._offenders: List[tuple] = []  # Min-heap of the `top` worst files
+        self.index = PolicyIndex()
+        self._conflict_counts: Counter = Counter()
+    
+    def add(self, record: Dict[str, Any]) -> List[PolicyConflict]:
+        """Fold in one file record; returns cross-policy conflicts it introduced."""
+        summary = self.summary
+        summary.files += 1
+        if record['type'] == 'skipped':
+            summary.skipped += 1
+            return []
+        if record['type'] == 'error':
+            summary.errors.append({'path': record['path'], 'error': record['error']})
+            return []
+        
+        summary.analyzed += 1
+        failed = warned = 0
+        resource = record['resource'] or 'unknown'
+        for finding in record['findings']:
+            summary.status_counts[finding['status']] = summary.status_counts.get(finding['status'], 0) + 1
+            if finding['status'] == 'fail':
+                failed += 1
+                self._failing_checks[finding['check']] += 1
+                self._by_resource.setdefault(resource, Counter())[finding['check']] += 1
+            elif finding['status'] == 'warn':
+                warned += 1
+        
+        if failed or warned:
+            entry = (failed, warned, record['path'], resource)
+            if len(self._offenders) < self.top:
+                heapq.heappush(self._offenders, entry)
+            elif entry > self._offenders[0]:
+                heapq.heapreplace(self._offenders, entry)
+        
+        conflicts = self.index.add(
+            record['path'], resource, record['version'] or 'default', record['rules'], record['digest']
+        )
+        for conflict in conflicts:
+            self._conflict_counts[conflict.kind] += 1
+            if len(summary.conflicts) < CONFLICTS_IN_SUMMARY:
+                summary.conflicts.append(asdict(conflict))
+        return conflicts
+    
+    def finish(self, duration_ms: float) -> RepositorySummary:
+        summary = self.summary
+        summary.failing_checks = dict(self._failing_checks.most_common())
+        summary.failing_by_resource = {r: dict(c) for r, c in self._by_resource.items()}
+        summary.conflict_counts = dict(self._conflict_counts.most_common())
+        summary.worst_offenders = [
+            {'path': path, 'resource': resource, 'failed': failed, 'warned': warned}
+            for failed, warned, path, resource in sorted(self._offenders, reverse=True)
+        ]
+        summary.duration_ms = round(duration_ms, 3)
+        return summary
+
+
+def iter_repository_findings(root: Union[str, Path], workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one analysis record per policy file, in completion order.
+    
+    Small repositories are analyzed in-process; larger ones are spread
+    over a spawn-based process pool (safe to start from a threaded server).
+    """
+    root = Path(root).expanduser()
+    if not root.is_dir():
+        raise ValueError(f"Not a directory: {root}")
+    
+    jobs = [(str(path), str(root)) for path in iter_policy_files(root)]
+    cpus = os.cpu_count() or 1
+    # Never more processes than CPUs, whatever the caller asks for
+    workers = min(workers or cpus, cpus, math.ceil(len(jobs) / MIN_FILES_PER_WORKER))
+    
+    if workers <= 1:
+        for job in jobs:
+            yield analyze_file(*job)
+        return
+    
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        chunksize = max(1, min(32, len(jobs) // (workers * 4)))
+        yield from pool.imap_unordered(_analyze_file_args, jobs, chunksize=chunksize)
+
+
+def analyze_repository(
+    path: Union[str, Path],
+    output: Union[str, Path, IO[str], None] = None,
+    workers: Optional[int] = None,
+    top: int = 10,
+) -> RepositorySummary:
+    """
+    Analyze every Cerbos policy under a directory.
+    
+    Args:
+        path: Repository root
+        output: JSONL destination (path or text stream). Each file record is
+            written and flushed as soon as it completes; the summary is last.
+            A path must be new or an existing report, and not a symlink.
+        workers: Worker processes (default and maximum: CPU count)
+        top: Number of worst offenders to report
+    
+    Returns:
+        Aggregate summary
+    
+    Raises:
+        FileExistsError: If `output` exists and is not a report, or is a symlink
+    """
+    started = time.perf_counter()
+    builder = _SummaryBuilder(str(path), top)
+    
+    stream = None
+    if isinstance(output, (str, Path)):
+        stream = _create_report(Path(output))
+        builder.summary.report_path = str(output)
+    elif output is not None:
+        stream = output
+    
+    try:
+        for record in iter_repository_findings(path, workers):
+            conflicts = builder.add(record)
+            if stream:
+                record.pop('rules', None)
+                stream.write(json.dumps(record) + '\n')
+                for conflict in conflicts:
+                    stream.write(json.dumps({'type': 'conflict', **asdict(conflict)}) + '\n')
+                stream.flush()
+        
+        summary = builder.finish((time.perf_counter() - started) * 1000)
+        if stream:
+            stream.write(json.dumps(summary.to_dict()) + '\n')
+        return summary
+    finally:
+        if stream and stream is not output:
+            stream.close()
+
+
+def report_dir() -> Path:
+    """Directory reports are written to: $GLASSTAPE_REPORT_DIR or a per-user work directory."""
+    configured = os.getenv(REPORT_DIR_ENV)
+    if configured:
+        return Path(configured).expanduser()
+    return user_work_dir("reports")
+
+
+def default_report_path() -> Path:
+    """
+    Timestamped JSONL report location in the report directory.
+    
+    Raises:
+        ValueError: If the report directory is not private to this user
+    """
+    return _private_report_dir() / f"analysis-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{REPORT_SUFFIX}"
+
+
+def resolve_report_path(output_path: str) -> Path:
+    """
+    Resolve a requested report location, confined to report_dir().
+    
+    Relative paths are taken from the report directory. Symlinks are followed
+    before the check, so they cannot point a report outside it.
+    
+    Raises:
+        ValueError: If the report directory is not private to this user, or the
+            path leaves it, is not a .jsonl file, or would overwrite a file that
+            is not an analysis report
+    """
+    base = _private_report_dir().resolve()
+    path = (base / Path(output_path).expanduser()).resolve()
+    if base not in path.parents:
+        raise ValueError(f"Report path must be inside the report directory {base}")
+    if path.suffix != REPORT_SUFFIX:
+        raise ValueError(f"Report path must end in {REPORT_SUFFIX}")
+    if path.exists() and not _is_report(path):
+        raise ValueError(f"Refusing to overwrite {path}: not an analysis report")
+    return path
+
+
+def _private_report_dir() -> Path:
+    try:
+        return ensure_private_dir(report_dir())
+    except OSError as e:
+        raise ValueError(f"Unusable report directory: {e}") from e
+
+
+def _create_report(path: Path) -> IO[str]:
+    """Open a new report file without following symlinks; replaces only an earlier report."""
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW
+    try:
+        fd = os.open(path, flags, 0o600)
+    except FileExistsError:
+        if path.is_symlink() or not _is_report(path):
+            raise FileExistsError(f"Refusing to overwrite {path}: not an analysis report")
+        path.unlink()
+        fd = os.open(path, flags, 0o600)
+    return os.fdopen(fd, 'w')
+
+
+def _is_report(path: Path) -> bool:
+    """Whether an existing file is empty or starts with a report record."""
+    try:
+        with open(path) as fh:
+            first_line = fh.readline()
+        if not first_line:
+            return True
+        record = json.loads(first_line)
+    except (OSError, UnicodeDecodeError, ValueError):
+        return False
+    return isinstance(record, dict) and record.get('type') in _REPORT_RECORD_TYPES
@@ -0,0 +1,712 @@
+"""
+CEL - Parser for the Common Expression Language subset used in Cerbos conditions.
+
+Produces a small immutable AST that analysis passes can pattern-match on.
+``to_cel`` renders a node back to canonical source, which doubles as a
+stable key for structurally equal sub-expressions. ``compile_expression``
+turns a node into a Python closure so the same expression can be evaluated
+against many requests without re-walking the tree.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+
+
+class CELSyntaxError(ValueError):
+    """Raised when a CEL expression cannot be parsed."""
+
+
+class CELEvaluationError(ValueError):
+    """Raised when an expression cannot be evaluated (missing field, wrong type, ...)."""
+
+
+@dataclass(frozen=True)
+class Literal:
+    value: Any
+
+
+@dataclass(frozen=True)
+class Ident:
+    name: str
+
+
+@dataclass(frozen=True)
+class Select:
+    operand: 'Node'
+    field: str
+
+
+@dataclass(frozen=True)
+class Index:
+    operand: 'Node'
+    index: 'Node'
+
+
+@dataclass(frozen=True)
+class Call:
+    function: str
+    args: Tuple['Node', ...]
+    target: Optional['Node'] = None
+
+
+@dataclass(frozen=True)
+class ListExpr:
+    items: Tuple['Node', ...]
+
+
+@dataclass(frozen=True)
+class MapExpr:
+    entries: Tuple[Tuple['Node', 'Node'], ...]
+
+
+@dataclass(frozen=True)
+class Unary:
+    op: str
+    operand: 'Node'
+
+
+@dataclass(frozen=True)
+class Binary:
+    op: str
+    left: 'Node'
+    right: 'Node'
+
+
+@dataclass(frozen=True)
+class Conditional:
+    condition: 'Node'
+    then: 'Node'
+    otherwise: 'Node'
+
+
+Node = Union[Literal, Ident, Select, Index, Call, ListExpr, MapExpr, Unary, Binary, Conditional]
+
+COMPARISONS = ('==', '!=', '<', '<=', '>', '>=')
+
+# Cerbos shorthand for the request objects
+ALIASES = {'R': ('request', 'resource'), 'P': ('request', 'principal')}
+
+_TOKEN = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?[uU]?|0[xX][0-9a-fA-F]+)
+  | (?P<string>[rR]?(?:"""(?:.|\n)*?"""|\'\'\'(?:.|\n)*?\'\'\'|"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*'))
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>&&|\|\||==|!=|<=|>=|[-+*/%!<>?:.,\[\](){}])
+''', re.VERBOSE)
+
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', '"': '"', "'": "'", '`': '`', '?': '?'}
+
+_BINARY_PRECEDENCE = {
+    '||': 1,
+    '&&': 2,
+    '==': 3, '!=': 3, '<': 3, '<=': 3, '>': 3, '>=': 3, 'in': 3,
+    '+': 4, '-': 4,
+    '*': 5, '/': 5, '%': 5,
+}
+
+
+def _tokenize(source: str) -> list[tuple[str, str]]:
+    tokens = []
+    position = 0
+    while position < len(source):
+        match = _TOKEN.match(source, position)
+        if not match:
+            raise CELSyntaxError(f"Unexpected character {source[position]!r} at {position}")
+        kind = match.lastgroup
+        if kind != 'ws':
+            tokens.append((kind, match.group()))
+        position = match.end()
+    tokens.append(('end', ''))
+    return tokens
+
+
+def _string_value(token: str) -> str:
+    raw = token[0] in 'rR'
+    if raw:
+        token = token[1:]
+    quote = token[:3] if token[:3] in ('"""', "'''") else token[0]
+    body = token[len(quote):-len(quote)]
+    if raw:
+        return body
+    return re.sub(r'\\(.)', lambda m: _ESCAPES.get(m.group(1), m.group(1)), body)
+
+
+def _number_value(token: str) -> Union[int, float]:
+    token = token.rstrip('uU')
+    if token.lower().startswith('0x'):
+        return int(token, 16)
+    if any(c in token for c in '.eE'):
+        return float(token)
+    return int(token)
+
+
+class _Parser:
+    """Precedence-climbing parser over the token list."""
+    
+    def __init__(self, source: str):
+        self.tokens = _tokenize(source)
+        self.position = 0
+    
+    def peek(self) -> tuple[str, str]:
+        return self.tokens[self.position]
+    
+    def advance(self) -> tuple[str, str]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+    
+    def expect(self, value: str) -> None:
+        kind, text = self.advance()
+        if text != value or kind == 'string':
+            raise CELSyntaxError(f"Expected {value!r}, found {text or 'end of expression'!r}")
+    
+    def accept(self, value: str) -> bool:
+        kind, text = self.peek()
+        if text == value and kind in ('op', 'ident'):
+            self.position += 1
+            return True
+        return False
+    
+    def parse(self) -> 'Node':
+        node = self.expression()
+        if self.peek()[0] != 'end':
+            raise CELSyntaxError(f"Unexpected {self.peek()[1]!r}")
+        return node
+    
+    def expression(self) -> 'Node':
+        condition = self.binary(1)
+        if self.accept('?'):
+            then = self.binary(1)
+            self.expect(':')
+            return Conditional(condition, then, self.expression())
+        return condition
+    
+    def binary(self, min_precedence: int) -> 'Node':
+        left = self.unary()
+        while True:
+            kind, text = self.peek()
+            precedence = _BINARY_PRECEDENCE.get(text) if kind in ('op', 'ident') else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.advance()
+            left = Binary(text, left, self.binary(precedence + 1))
+    
+    def unary(self) -> 'Node':
+        if self.accept('!'):
+            return Unary('!', self.unary())
+        if self.accept('-'):
+            operand = self.unary()
+            if isinstance(operand, Literal) and isinstance(operand.value, (int, float)):
+                return Literal(-operand.value)
+            return Unary('-', operand)
+        return self.member()
+    
+    def member(self) -> 'Node':
+        node = self.primary()
+        while True:
+            if self.accept('.'):
+                kind, name = self.advance()
+                if kind != 'ident':
+                    raise CELSyntaxError(f"Expected field name after '.', found {name!r}")
+                if self.accept('('):
+                    node = Call(name, self.arguments(')'), target=node)
+                else:
+                    node = Select(node, name)
+            elif self.accept('['):
+                index = self.expression()
+                self.expect(']')
+                node = Index(node, index)
+            else:
+                return node
+    
+    def arguments(self, closing: str) -> Tuple['Node', ...]:
+        args = []
+        if not self.accept(closing):
+            args.append(self.expression())
+            while self.accept(','):
+                if self.peek()[1] == closing:
+                    break
+                args.append(self.expression())
+            self.expect(closing)
+        return tuple(args)
+    
+    def primary(self) -> 'Node':
+        kind, text = self.advance()
+        if kind == 'number':
+            return Literal(_number_value(text))
+        if kind == 'string':
+            return Literal(_string_value(text))
+        if kind == 'ident':
+            if text in ('true', 'false'):
+                return Literal(text == 'true')
+            if text == 'null':
+                return Literal(None)
+            if self.accept('('):
+                return Call(text, self.arguments(')'))
+            return Ident(text)
+        if text == '(':
+            node = self.expression()
+            self.expect(')')
+            return node
+        if text == '[':
+            return ListExpr(self.arguments(']'))
+        if text == '{':
+            entries = []
+            if not self.accept('}'):
+                while True:
+                    key = self.expression()
+                    self.expect(':')
+                    entries.append((key, self.expression()))
+                    if not self.accept(',') or self.peek()[1] == '}':
+                        break
+                self.expect('}')
+            return MapExpr(tuple(entries))
+        raise CELSyntaxError(f"Unexpected {text or 'end of expression'!r}")
+
+
+def parse(source: str) -> 'Node':
+    """
+    Parse a CEL expression.
+    
+    Raises:
+        CELSyntaxError: If the expression is not valid CEL
+    """
+    return _Parser(source).parse()
+
+
+def attribute_path(node: 'Node') -> Optional[Tuple[str, ...]]:
+    """Return the dotted path of a plain field access (with R/P expanded), else None."""
+    parts = []
+    while isinstance(node, Select):
+        parts.append(node.field)
+        node = node.operand
+    if not isinstance(node, Ident):
+        return None
+    parts.append(node.name)
+    parts.reverse()
+    if parts[0] in ALIASES:
+        return ALIASES[parts[0]] + tuple(parts[1:])
+    return tuple(parts)
+
+
+def is_constant(node: 'Node') -> bool:
+    """True if the node contains no identifiers."""
+    if isinstance(node, Literal):
+        return True
+    if isinstance(node, ListExpr):
+        return all(is_constant(item) for item in node.items)
+    if isinstance(node, Unary):
+        return is_constant(node.operand)
+    if isinstance(node, Binary):
+        return is_constant(node.left) and is_constant(node.right)
+    return False
+
+
+_BINARY_FOLD = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '%': lambda a, b: a % b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    'in': lambda a, b: a in b,
+    '&&': lambda a, b: a and b,
+    '||': lambda a, b: a or b,
+}
+
+
+def constant_value(node: 'Node') -> Any:
+    """
+    Evaluate a constant node.
+    
+    Raises:
+        ValueError: If the node is not constant or the operation is invalid
+    """
+    if isinstance(node, Literal):
+        return node.value
+    if isinstance(node, ListExpr):
+        return [constant_value(item) for item in node.items]
+    try:
+        if isinstance(node, Unary):
+            value = constant_value(node.operand)
+            return (not value) if node.op == '!' else -value
+        if isinstance(node, Binary):
+            return _BINARY_FOLD[node.op](constant_value(node.left), constant_value(node.right))
+    except (TypeError, ZeroDivisionError, KeyError) as e:
+        raise ValueError(f"Cannot fold {to_cel(node)}: {e}")
+    raise ValueError(f"Not a constant expression: {to_cel(node)}")
+
+
+def _literal_cel(value: Any) -> str:
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, str):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return repr(value)
+
+
+def to_cel(node: 'Node') -> str:
+    """Render a node as canonical CEL (fully parenthesised binary operations)."""
+    if isinstance(node, Literal):
+        return _literal_cel(node.value)
+    if isinstance(node, Ident):
+        return node.name
+    if isinstance(node, Select):
+        path = attribute_path(node)
+        if path:
+            return '.'.join(path)
+        return f"{to_cel(node.operand)}.{node.field}"
+    if isinstance(node, Index):
+        return f"{to_cel(node.operand)}[{to_cel(node.index)}]"
+    if isinstance(node, Call):
+        args = ', '.join(to_cel(arg) for arg in node.args)
+        if node.target is not None:
+            return f"{to_cel(node.target)}.{node.function}({args})"
+        return f"{node.function}({args})"
+    if isinstance(node, ListExpr):
+        return '[' + ', '.join(to_cel(item) for item in node.items) + ']'
+    if isinstance(node, MapExpr):
+        return '{' + ', '.join(f"{to_cel(k)}: {to_cel(v)}" for k, v in node.entries) + '}'
+    if isinstance(node, Unary):
+        return f"{node.op}{to_cel(node.operand)}"
+    if isinstance(node, Binary):
+        return f"({to_cel(node.left)} {node.op} {to_cel(node.right)})"
+    if isinstance(node, Conditional):
+        return f"({to_cel(node.condition)} ? {to_cel(node.then)} : {to_cel(node.otherwise)})"
+    raise TypeError(f"Unknown CEL node: {node!r}")
+
+
+# Evaluation
+
+Activation = Mapping[str, Any]
+Evaluator = Callable[[Activation], Any]
+
+# Python errors that correspond to CEL runtime errors
+EVALUATION_ERRORS = (
+    CELEvaluationError, TypeError, ValueError, KeyError, IndexError,
+    AttributeError, ZeroDivisionError, OverflowError, re.error,
+)
+
+
+def request_activation(principal: Mapping[str, Any], resource: Mapping[str, Any]) -> Dict[str, Any]:
+    """Variables visible to a Cerbos condition for one request."""
+    principal = {'attr': {}, 'roles': [], **principal}
+    resource = {'attr': {}, **resource}
+    return {'request': {'principal': principal, 'resource': resource}, 'P': principal, 'R': resource}
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _equals(a: Any, b: Any) -> bool:
+    # Heterogeneous equality is false in CEL; Python would equate True and 1
+    if isinstance(a, bool) != isinstance(b, bool):
+        return False
+    return a == b
+
+
+def _ordered(op: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def compare(a: Any, b: Any) -> bool:
+        if not ((_is_number(a) and _is_number(b)) or (type(a) is type(b) and isinstance(a, (str, bool)))):
+            raise CELEvaluationError(f"no such overload: {type(a).__name__} vs {type(b).__name__}")
+        return op(a, b)
+    return compare
+
+
+def _divide(a: Any, b: Any) -> Any:
+    if isinstance(a, int) and isinstance(b, int):
+        if b == 0:
+            raise CELEvaluationError("division by zero")
+        # Integer division truncates toward zero
+        quotient = abs(a) // abs(b)
+        return quotient if (a < 0) == (b < 0) else -quotient
+    return a / b
+
+
+def _modulo(a: Any, b: Any) -> Any:
+    if isinstance(a, int) and isinstance(b, int):
+        if b == 0:
+            raise CELEvaluationError("modulus by zero")
+        return a - b * _divide(a, b)
+    return math.fmod(a, b)
+
+
+def _contained(item: Any, container: Any) -> bool:
+    if isinstance(container, dict):
+        return item in container
+    if isinstance(container, list):
+        return any(_equals(item, element) for element in container)
+    raise CELEvaluationError(f"no such overload: in {type(container).__name__}")
+
+
+_BINARY_EVAL = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': _divide,
+    '%': _modulo,
+    '==': _equals,
+    '!=': lambda a, b: not _equals(a, b),
+    '<': _ordered(lambda a, b: a < b),
+    '<=': _ordered(lambda a, b: a <= b),
+    '>': _ordered(lambda a, b: a > b),
+    '>=': _ordered(lambda a, b: a >= b),
+    'in': _contained,
+}
+
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, float) and not math.isfinite(value):
+        raise CELEvaluationError("int() of non-finite double")
+    return int(value)
+
+
+def _to_string(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _size(value: Any) -> int:
+    if not isinstance(value, (str, bytes, list, dict)):
+        raise CELEvaluationError(f"no such overload: size({type(value).__name__})")
+    return len(value)
+
+
+def _matches(text: str, pattern: str) -> bool:
+    if not isinstance(text, str):
+        raise CELEvaluationError("matches() requires a string")
+    return re.search(pattern, text) is not None
+
+
+# Global functions and receiver methods (the receiver is the first argument)
+_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    'size': _size,
+    'contains': str.__contains__,
+    'startsWith': str.startswith,
+    'endsWith': str.endswith,
+    'matches': _matches,
+    'lowerAscii': str.lower,
+    'upperAscii': str.upper,
+    'trim': str.strip,
+    'int': _to_int,
+    'uint': _to_int,
+    'double': float,
+    'string': _to_string,
+    'hasIntersection': lambda a, b: any(_contained(x, b) for x in a),
+    'intersect': lambda a, b: [x for x in a if _contained(x, b)],
+    'except': lambda a, b: [x for x in a if not _contained(x, b)],
+    'isSubset': lambda a, b: all(_contained(x, b) for x in a),
+}
+
+_MACROS = ('all', 'exists', 'exists_one', 'map', 'filter')
+
+
+def _require_bool(value: Any) -> bool:
+    if type(value) is not bool:
+        raise CELEvaluationError(f"expected bool, got {type(value).__name__}")
+    return value
+
+
+def _logical(op: str, left: Evaluator, right: Evaluator) -> Evaluator:
+    # CEL's && and || are commutative over errors: false && error is false,
+    # true || error is true, whichever side the error is on.
+    decisive = op == '||'
+    
+    def evaluate(activation: Activation) -> bool:
+        error = None
+        try:
+            if _require_bool(left(activation)) is decisive:
+                return decisive
+        except EVALUATION_ERRORS as e:
+            error = e
+        try:
+            if _require_bool(right(activation)) is decisive:
+                return decisive
+        except EVALUATION_ERRORS:
+            if error is None:
+                raise
+        if error is not None:
+            raise error
+        return not decisive
+    return evaluate
+
+
+def _macro(node: Call) -> Evaluator:
+    if not node.args or not isinstance(node.args[0], Ident) or len(node.args) not in (2, 3):
+        raise CELSyntaxError(f"Invalid {node.function}() macro")
+    function = node.function
+    variable = node.args[0].name
+    target = _compile(node.target)
+    if function == 'map' and len(node.args) == 2:
+        predicate, transform = None, _compile(node.args[1])
+    else:
+        predicate = _compile(node.args[1])
+        transform = _compile(node.args[2]) if len(node.args) == 3 else None
+    
+    def evaluate(activation: Activation) -> Any:
+        collection = target(activation)
+        if not isinstance(collection, (list, dict)):
+            raise CELEvaluationError(f"{function}() requires a list or map")
+        scope = dict(activation)
+        matched = []
+        error = None
+        for item in collection:
+            scope[variable] = item
+            if predicate is not None:
+                try:
+                    if not _require_bool(predicate(scope)):
+                        if function == 'all':
+                            return False
+                        continue
+                except EVALUATION_ERRORS as e:
+                    if function in ('map', 'filter'):
+                        raise
+                    error = error or e
+                    continue
+                if function == 'exists':
+                    return True
+            matched.append(transform(scope) if transform else item)
+        if function in ('all', 'exists', 'exists_one'):
+            if error is not None:
+                raise error
+            if function == 'exists_one':
+                return len(matched) == 1
+            return function == 'all'
+        return matched
+    return evaluate
+
+
+def _compile(node: 'Node') -> Evaluator:
+    if isinstance(node, Literal):
+        value = node.value
+        return lambda activation: value
+    
+    if isinstance(node, Ident):
+        name = node.name
+        
+        def identifier(activation: Activation) -> Any:
+            try:
+                return activation[name]
+            except KeyError:
+                raise CELEvaluationError(f"undeclared reference to '{name}'") from None
+        return identifier
+    
+    if isinstance(node, Select):
+        # Plain field paths are walked in one loop rather than a closure per step
+        fields = []
+        operand = node
+        while isinstance(operand, Select):
+            fields.append(operand.field)
+            operand = operand.operand
+        fields.reverse()
+        base = _compile(operand)
+        dotted = to_cel(node)
+        
+        def select(activation: Activation) -> Any:
+            value = base(activation)
+            for name in fields:
+                if not isinstance(value, dict) or name not in value:
+                    raise CELEvaluationError(f"no such key: {dotted}")
+                value = value[name]
+            return value
+        return select
+    
+    if isinstance(node, Index):
+        operand, index = _compile(node.operand), _compile(node.index)
+        
+        def lookup(activation: Activation) -> Any:
+            container, key = operand(activation), index(activation)
+            if isinstance(container, list) and not _is_number(key):
+                raise CELEvaluationError("list index must be an int")
+            return container[key]
+        return lookup
+    
+    if isinstance(node, Call):
+        if node.function == 'has' and node.target is None:
+            if len(node.args) != 1 or not isinstance(node.args[0], Select):
+                raise CELSyntaxError("has() requires a field selection")
+            operand, field_name = _compile(node.args[0].operand), node.args[0].field
+            
+            def has(activation: Activation) -> bool:
+                value = operand(activation)
+                if not isinstance(value, dict):
+                    raise CELEvaluationError("has() requires a map or message")
+                return field_name in value
+            return has
+        if node.function in _MACROS and node.target is not None:
+            return _macro(node)
+        args = tuple(_compile(arg) for arg in ((node.target,) + node.args if node.target is not None else node.args))
+        function = _FUNCTIONS.get(node.function)
+        if function is None:
+            name = node.function
+            
+            def unsupported(activation: Activation) -> Any:
+                raise CELEvaluationError(f"unsupported function '{name}'")
+            return unsupported
+        return lambda activation: function(*(arg(activation) for arg in args))
+    
+    if isinstance(node, ListExpr):
+        items = tuple(_compile(item) for item in node.items)
+        return lambda activation: [item(activation) for item in items]
+    
+    if isinstance(node, MapExpr):
+        entries = tuple((_compile(k), _compile(v)) for k, v in node.entries)
+        return lambda activation: {k(activation): v(activation) for k, v in entries}
+    
+    if isinstance(node, Unary):
+        operand = _compile(node.operand)
+        if node.op == '!':
+            return lambda activation: not _require_bool(operand(activation))
+        
+        def negate(activation: Activation) -> Any:
+            value = operand(activation)
+            if not _is_number(value):
+                raise CELEvaluationError(f"no such overload: -{type(value).__name__}")
+            return -value
+        return negate
+    
+    if isinstance(node, Binary):
+        left, right = _compile(node.left), _compile(node.right)
+        if node.op in ('&&', '||'):
+            return _logical(node.op, left, right)
+        op = _BINARY_EVAL[node.op]
+        return lambda activation: op(left(activation), right(activation))
+    
+    if isinstance(node, Conditional):
+        condition, then, otherwise = _compile(node.condition), _compile(node.then), _compile(node.otherwise)
+        return lambda activation: then(activation) if _require_bool(condition(activation)) else otherwise(activation)
+    
+    raise TypeError(f"Unknown CEL node: {node!r}")
+
+
+def compile_expression(node: 'Node') -> Evaluator:
+    """
+    Compile a node into a function of an activation (variable name -> value).
+    
+    The returned function raises CELEvaluationError for runtime errors such
+    as missing fields or mismatched types.
+    
+    Raises:
+        CELSyntaxError: If a macro is malformed
+    """
+    evaluate = _compile(node)
+    
+    def run(activation: Activation) -> Any:
+        try:
+            return evaluate(activation)
+        except CELEvaluationError:
+            raise
+        except EVALUATION_ERRORS as e:
+            raise CELEvaluationError(str(e)) from e
+    return run
@@ -1,17 +1,30 @@
 """Cerbos CLI Interface - Wrapper for executing Cerbos CLI commands."""
 
+import contextlib
+import shutil
 import subprocess
 import tempfile
+import threading
+import time
 import re
 import yaml
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 from .types import ValidationResult, TestResult
 
 
+# Seconds a Cerbos installation probe result is reused
+INSTALL_PROBE_TTL = 60.0
+
+
 class CerbosCLI:
-    """Interface to Cerbos CLI for validation and testing"""
+    """
+    Interface to Cerbos CLI for validation and testing
+    
+    Safe to share between threads: every call works in its own temporary
+    directory, and the installation probe is cached.
+    """
     
     def __init__(self, work_dir: Optional[str] = None):
         # Sanitize work directory to prevent path traversal
@@ -22,10 +35,16 @@ class CerbosCLI:
                 raise ValueError("Work directory must be within /tmp or system temp directory")
         
         self.work_dir = Path(work_dir or tempfile.gettempdir()) / "glasstape-policies"
-        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self._scratch: Optional[Path] = None
+        self._installed: Optional[bool] = None
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
     
-    def check_installation(self) -> bool:
-        """Check if Cerbos CLI is installed"""
+    def check_installation(self, refresh: bool = False) -> bool:
+        """Check if Cerbos CLI is installed (cached for INSTALL_PROBE_TTL seconds)"""
+        with self._lock:
+            if not refresh and self._installed is not None and time.monotonic() - self._probed_at < INSTALL_PROBE_TTL:
+                return self._installed
         try:
             result = subprocess.run(
                 ['cerbos', '--version'],
@@ -34,9 +53,12 @@ class CerbosCLI:
                 timeout=5,
                 shell=False  # Prevent shell injection
             )
-            return result.returncode == 0
+            installed = result.returncode == 0
         except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-            return False
+            installed = False
+        with self._lock:
+            self._installed, self._probed_at = installed, time.monotonic()
+        return installed
     
     def compile(self, policy_yaml: str) -> ValidationResult:
         """
@@ -44,23 +66,22 @@ class CerbosCLI:
         
         Args:
             policy_yaml: Cerbos policy YAML string
-            
+        
         Returns:
             ValidationResult with success status and any errors/warnings
         """
         try:
-            # Create temporary policy file
-            policy_file = self.work_dir / "policy.yaml"
-            policy_file.write_text(policy_yaml)
-            
-            # Run cerbos compile
-            result = subprocess.run(
-                ['cerbos', 'compile', str(self.work_dir)],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                shell=False  # Prevent shell injection
-            )
+            with self._call_dir() as call_dir:
+                (call_dir / "policy.yaml").write_text(policy_yaml)
+                
+                # Run cerbos compile
+                result = subprocess.run(
+                    ['cerbos', 'compile', str(call_dir)],
+                    capture_output=True,
+                    text=True,
+                    timeout=30,
+                    shell=False  # Prevent shell injection
+                )
             
             output = result.stdout + result.stderr
             
@@ -77,7 +98,7 @@ class CerbosCLI:
                 errors=[],
                 warnings=self._extract_warnings(output)
             )
-            
+        
         except subprocess.TimeoutExpired:
             return ValidationResult(
                 success=False,
@@ -90,9 +111,6 @@ class CerbosCLI:
                 errors=[f"Validation error: {str(e)}"],
                 warnings=[]
             )
-        finally:
-            # Clean up
-            policy_file.unlink(missing_ok=True)
     
     def test(self, policy_yaml: str, test_yaml: str) -> TestResult:
         """
@@ -101,7 +119,7 @@ class CerbosCLI:
         Args:
             policy_yaml: Cerbos policy YAML string
             test_yaml: Cerbos test suite YAML string
-            
+        
         Returns:
             TestResult with pass/fail counts and details
         """
@@ -116,33 +134,44 @@ class CerbosCLI:
             except (yaml.YAMLError, KeyError, AttributeError):
                 pass  # Use default if parsing fails
             
-            # Setup files
-            policy_file = self.work_dir / "policy.yaml"
-            test_file = self.work_dir / f"{resource_name}_test.yaml"  # Correct naming convention
-            
-            policy_file.write_text(policy_yaml)
-            test_file.write_text(test_yaml)
-            
-            # Run cerbos compile (which includes tests)
-            result = subprocess.run(
-                ['cerbos', 'compile', str(self.work_dir)],
-                capture_output=True,
-                text=True,
-                timeout=60,
-                shell=False  # Prevent shell injection
-            )
+            with self._call_dir() as call_dir:
+                (call_dir / "policy.yaml").write_text(policy_yaml)
+                (call_dir / f"{Path(str(resource_name)).name}_test.yaml").write_text(test_yaml)  # Correct naming convention
+                
+                # Run cerbos compile (which includes tests)
+                result = subprocess.run(
+                    ['cerbos', 'compile', str(call_dir)],
+                    capture_output=True,
+                    text=True,
+                    timeout=60,
+                    shell=False  # Prevent shell injection
+                )
             
             output = result.stdout + result.stderr
             return self._parse_test_output(output)
-            
+        
         except subprocess.TimeoutExpired:
             raise RuntimeError("Test execution timeout")
         except Exception as e:
             raise RuntimeError(f"Test execution failed: {str(e)}")
-        finally:
-            # Clean up
-            policy_file.unlink(missing_ok=True)
-            test_file.unlink(missing_ok=True)
+    
+    def close(self) -> None:
+        """Remove this instance's scratch directory."""
+        with self._lock:
+            scratch, self._scratch = self._scratch, None
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+    
+    @contextlib.contextmanager
+    def _call_dir(self) -> Iterator[Path]:
+        """A fresh directory for one call, removed afterwards."""
+        with self._lock:
+            if self._scratch is None or not self._scratch.exists():
+                self.work_dir.mkdir(parents=True, exist_ok=True)
+                self._scratch = Path(tempfile.mkdtemp(prefix="cerbos-", dir=self.work_dir))
+            scratch = self._scratch
+        with tempfile.TemporaryDirectory(prefix="call-", dir=scratch) as call_dir:
+            yield Path(call_dir)
     
     def _extract_errors(self, output: str) -> list[str]:
         """Extract error messages from Cerbos output"""
@@ -69,22 +69,7 @@ class CerbosGenerator:
             if rule.get('roles'):
                 cerbos_rule['roles'] = rule['roles']
             
-            # Build conditions including topic-based rules
-            conditions = list(rule.get('conditions', []))
-            
-            # Add topic conditions from metadata
-            if icp and 'metadata' in icp:
-                metadata = icp['metadata']
-                
-                # Add allowed topics condition
-                if metadata.get('topics'):
-                    topics_condition = self._build_topics_condition(metadata['topics'], 'allow')
-                    conditions.append(topics_condition)
-                
-                # Add blocked topics condition
-                if metadata.get('blocked_topics'):
-                    blocked_condition = self._build_topics_condition(metadata['blocked_topics'], 'block')
-                    conditions.append(blocked_condition)
+            conditions = self.rule_conditions(rule, icp)
             
             # Add conditions if any exist
             if conditions:
@@ -98,6 +83,26 @@ class CerbosGenerator:
         except KeyError as e:
             raise ValueError(f"Missing required field in rule: {e}")
     
+    def rule_conditions(self, rule: Dict[str, Any], icp: Dict[str, Any] = None) -> list[str]:
+        """CEL conditions of a rule as generated, including topic conditions from metadata"""
+        conditions = list(rule.get('conditions', []))
+        
+        # Add topic conditions from metadata
+        if icp and 'metadata' in icp:
+            metadata = icp['metadata']
+            
+            # Add allowed topics condition
+            if metadata.get('topics'):
+                topics_condition = self._build_topics_condition(metadata['topics'], 'allow')
+                conditions.append(topics_condition)
+            
+            # Add blocked topics condition
+            if metadata.get('blocked_topics'):
+                blocked_condition = self._build_topics_condition(metadata['blocked_topics'], 'block')
+                conditions.append(blocked_condition)
+        
+        return conditions
+    
     def _transform_test(self, test: Dict[str, Any], icp: Dict[str, Any]) -> Dict[str, Any]:
         """Transform ICP test to Cerbos test"""
         try:
@@ -0,0 +1,352 @@
+"""
+Coverage - Which rules and condition branches the ICP tests exercise.
+
+Every ICP test is evaluated in-process against the ICP rules, using the
+same conditions the Cerbos generator emits (including the metadata topic
+checks). Rules are tried in order and the first match wins; a request that
+no rule matches is denied. Each rule's condition is split at ``&&`` and
+``||`` into branches, and every branch counts how often it evaluated true,
+false or to an error, following the same short-circuiting as evaluation
+itself.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from . import cel
+from .cerbos_generator import CerbosGenerator
+from .policy_model import CATCH_ALL
+
+
+DEFAULT_EFFECT = 'EFFECT_DENY'
+
+# Mismatched tests listed in the formatted report; the report object has all
+MISMATCHES_SHOWN = 20
+
+
+@dataclass
+class BranchCoverage:
+    """Outcomes of one sub-condition across the test suite."""
+    expression: str
+    true: int = 0
+    false: int = 0
+    errors: int = 0
+    
+    @property
+    def covered(self) -> bool:
+        """True once the branch has been seen both true and false."""
+        return bool(self.true and self.false)
+
+
+@dataclass
+class RuleCoverage:
+    """How often a rule was reached and how often it decided the request."""
+    index: int
+    actions: List[str]
+    effect: str
+    roles: Optional[List[str]] = None
+    description: str = ''
+    evaluated: int = 0
+    fired: int = 0
+    branches: List[BranchCoverage] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class TestMismatch:
+    """A test decision that differs from the expected effect."""
+    test: str
+    action: str
+    expected: str
+    actual: str
+    rule: Optional[int] = None  # Index of the deciding rule; None for the default deny
+
+
+@dataclass
+class CoverageReport:
+    """Per-rule and per-branch coverage of a test suite."""
+    rules: List[RuleCoverage]
+    tests: int = 0
+    decisions: int = 0
+    default_decisions: int = 0
+    mismatches: List[TestMismatch] = field(default_factory=list)
+    duration_ms: float = 0.0
+    
+    @property
+    def rules_fired(self) -> int:
+        return sum(1 for rule in self.rules if rule.fired)
+    
+    @property
+    def branch_outcomes(self) -> tuple[int, int]:
+        """(outcomes seen, outcomes possible): each branch can be true and false."""
+        branches = [branch for rule in self.rules for branch in rule.branches]
+        seen = sum(bool(branch.true) + bool(branch.false) for branch in branches)
+        return seen, 2 * len(branches)
+    
+    @property
+    def rule_coverage(self) -> float:
+        return self.rules_fired / len(self.rules) if self.rules else 1.0
+    
+    @property
+    def branch_coverage(self) -> float:
+        seen, possible = self.branch_outcomes
+        return seen / possible if possible else 1.0
+    
+    def format(self) -> str:
+        """Format the report as readable text."""
+        seen, possible = self.branch_outcomes
+        output = "# 📊 Policy Test Coverage\n\n"
+        output += f"**Tests**: {self.tests} ({self.decisions} decisions) evaluated in {self.duration_ms:.1f}ms\n"
+        output += f"**Rule Coverage**: {self.rules_fired}/{len(self.rules)} rules fired ({self.rule_coverage:.0%})\n"
+        output += f"**Branch Coverage**: {seen}/{possible} branch outcomes ({self.branch_coverage:.0%})\n"
+        output += f"**Default Deny**: {self.default_decisions} decisions matched no rule\n\n"
+        
+        output += "## Rules\n\n"
+        for rule in self.rules:
+            status = "✅" if rule.fired else "❌"
+            roles = f" for {', '.join(rule.roles)}" if rule.roles else ""
+            output += (
+                f"{status} **Rule {rule.index + 1}** ({rule.effect}: {', '.join(rule.actions)}{roles}) — "
+                f"reached {rule.evaluated}, fired {rule.fired}\n"
+            )
+            if rule.error:
+                output += f"   ⚠️ Condition not evaluated: {rule.error}\n"
+            for branch in rule.branches:
+                if branch.covered and not branch.errors:
+                    continue
+                if not (branch.true or branch.false):
+                    notes = ["never evaluated"]
+                else:
+                    notes = [f"never {label}" for label, count in (("true", branch.true), ("false", branch.false)) if not count]
+                if branch.errors:
+                    notes.append(f"{branch.errors} errors")
+                output += f"   - `{branch.expression}`: {', '.join(notes)}\n"
+        output += "\n"
+        
+        if self.mismatches:
+            output += f"## ❌ Tests With Unexpected Results ({len(self.mismatches)})\n\n"
+            for mismatch in self.mismatches[:MISMATCHES_SHOWN]:
+                decided = f"rule {mismatch.rule + 1}" if mismatch.rule is not None else "no matching rule"
+                output += (
+                    f"- `{mismatch.test}` ({mismatch.action}): expected {mismatch.expected}, "
+                    f"got {mismatch.actual} ({decided})\n"
+                )
+            if len(self.mismatches) > MISMATCHES_SHOWN:
+                output += f"- ...and {len(self.mismatches) - MISMATCHES_SHOWN} more\n"
+            output += "\n"
+        
+        return output
+
+
+Decision = Callable[[cel.Activation], bool]
+
+
+def _compile_branch(node: cel.Node, branches: List[BranchCoverage]) -> Decision:
+    """Compile a condition into a decision that records the outcome of each branch."""
+    if isinstance(node, cel.Binary) and node.op in ('&&', '||'):
+        # Flatten chains of the same operator so a && b && c has three branches
+        operands = []
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            if isinstance(current, cel.Binary) and current.op == node.op:
+                pending.extend((current.right, current.left))
+            else:
+                operands.append(current)
+        return _combine(node.op, [_compile_branch(operand, branches) for operand in operands])
+    
+    branch = BranchCoverage(cel.to_cel(node))
+    branches.append(branch)
+    evaluate = cel.compile_expression(node)
+    
+    def decide(activation: cel.Activation) -> bool:
+        try:
+            value = evaluate(activation)
+        except cel.CELEvaluationError:
+            branch.errors += 1
+            raise
+        if value is True:
+            branch.true += 1
+        elif value is False:
+            branch.false += 1
+        else:
+            branch.errors += 1
+            raise cel.CELEvaluationError(f"condition is not a boolean: {branch.expression}")
+        return value
+    return decide
+
+
+def _combine(op: str, operands: List[Decision]) -> Decision:
+    # Short-circuit left to right; an error only decides the result if no
+    # later operand does (CEL's && and || are commutative over errors)
+    decisive = op == '||'
+    
+    def decide(activation: cel.Activation) -> bool:
+        error = None
+        for operand in operands:
+            try:
+                if operand(activation) is decisive:
+                    return decisive
+            except cel.CELEvaluationError as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return not decisive
+    return decide
+
+
+class _CompiledRule:
+    """A rule's scope and instrumented condition."""
+    
+    def __init__(self, coverage: RuleCoverage, conditions: List[str]):
+        self.coverage = coverage
+        self.effect = coverage.effect
+        self.any_role = not coverage.roles or CATCH_ALL in coverage.roles
+        self.roles = frozenset(coverage.roles or ())
+        self.decide: Optional[Decision] = None
+        self.broken = False
+        if conditions:
+            try:
+                nodes = [cel.parse(condition) for condition in conditions]
+                tree = nodes[0]
+                for node in nodes[1:]:
+                    tree = cel.Binary('&&', tree, node)
+                self.decide = _compile_branch(tree, coverage.branches)
+            except cel.CELSyntaxError as e:
+                coverage.error = str(e)
+                self.broken = True
+    
+    def matches(self, roles: frozenset, activation: cel.Activation) -> bool:
+        if self.broken or not (self.any_role or self.roles & roles):
+            return False
+        self.coverage.evaluated += 1
+        if self.decide is not None:
+            try:
+                if not self.decide(activation):
+                    return False
+            except cel.CELEvaluationError:
+                return False  # Errors never match, as in Cerbos
+        self.coverage.fired += 1
+        return True
+
+
+def plain(value: Any) -> Any:
+    """ICP data as plain JSON-style dicts, whether given as pydantic models or dicts."""
+    return value.model_dump(mode='json') if hasattr(value, 'model_dump') else value
+
+
+def effect_value(value: Any) -> str:
+    """Effect name from an EffectType member or a plain string."""
+    return getattr(value, 'value', value)
+
+
+class PolicyEvaluator:
+    """ICP rules compiled once for evaluating many requests in-process."""
+    
+    def __init__(self, icp: Dict[str, Any]):
+        icp = plain(icp)
+        generator = CerbosGenerator()
+        self.resource_kind = icp['policy']['resource']
+        self.rules: List[_CompiledRule] = []
+        for index, rule in enumerate(icp['policy']['rules']):
+            coverage = RuleCoverage(
+                index=index,
+                actions=list(rule['actions']),
+                effect=effect_value(rule['effect']),
+                roles=rule.get('roles'),
+                description=rule.get('description', ''),
+            )
+            self.rules.append(_CompiledRule(coverage, generator.rule_conditions(rule, icp)))
+        # Rules that can apply to each action, in order; built on first use
+        self._by_action: Dict[str, List[_CompiledRule]] = {}
+    
+    @property
+    def coverage(self) -> List[RuleCoverage]:
+        """Per-rule counters accumulated by every decide() call so far."""
+        return [rule.coverage for rule in self.rules]
+    
+    def prepare(self, test_input: Dict[str, Any]) -> tuple[frozenset, cel.Activation]:
+        """Principal roles and CEL activation for a test input, as the generated test suite sends them."""
+        principal = test_input['principal']
+        resource = test_input['resource']
+        activation = cel.request_activation(
+            {'id': principal.get('id', 'test-principal'), 'roles': principal.get('roles', []), 'attr': principal.get('attr', {})},
+            {'kind': self.resource_kind, 'id': resource.get('id', 'test-resource'), 'attr': resource.get('attr', {})},
+        )
+        return frozenset(principal.get('roles', [])), activation
+    
+    def decide(self, roles: frozenset, activation: cel.Activation, action: str) -> tuple[str, Optional[int]]:
+        """Effect for one action and the index of the deciding rule (None for the default deny)."""
+        for rule in self._candidates(action):
+            if rule.matches(roles, activation):
+                return rule.effect, rule.coverage.index
+        return DEFAULT_EFFECT, None
+    
+    def _candidates(self, action: str) -> List[_CompiledRule]:
+        candidates = self._by_action.get(action)
+        if candidates is None:
+            candidates = self._by_action[action] = [
+                rule for rule in self.rules
+                if action in rule.coverage.actions or CATCH_ALL in rule.coverage.actions
+            ]
+        return candidates
+    
+    def trace(self, roles: frozenset, activation: cel.Activation, action: str) -> tuple[str, Optional[int], Set[tuple]]:
+        """
+        Like decide(), but also return what the decision exercised.
+        
+        Items are ``('rule', index)`` for the deciding rule (``('default',)``
+        if none), ``('branch', rule, branch, outcome)`` for every branch
+        outcome seen, and ``('decision', action, effect)``.
+        """
+        items: Set[tuple] = set()
+        decided = None
+        for rule in self._candidates(action):
+            before = [(branch.true, branch.false) for branch in rule.coverage.branches]
+            matched = rule.matches(roles, activation)
+            for position, (branch, (true, false)) in enumerate(zip(rule.coverage.branches, before)):
+                if branch.true != true:
+                    items.add(('branch', rule.coverage.index, position, True))
+                if branch.false != false:
+                    items.add(('branch', rule.coverage.index, position, False))
+            if matched:
+                decided = rule
+                break
+        effect = decided.effect if decided else DEFAULT_EFFECT
+        items.add(('rule', decided.coverage.index) if decided else ('default',))
+        items.add(('decision', action, effect))
+        return effect, decided.coverage.index if decided else None, items
+
+
+def analyze_coverage(icp: Dict[str, Any], tests: Optional[Iterable[Any]] = None) -> CoverageReport:
+    """
+    Evaluate tests against an ICP's rules and measure what they exercise.
+    
+    Args:
+        icp: Simple ICP dictionary
+        tests: Tests to run (ICPTest objects or dicts); defaults to the ICP's own
+    
+    Returns:
+        Coverage report including tests whose result differs from the expected effect
+    """
+    started = time.perf_counter()
+    icp = plain(icp)
+    evaluator = PolicyEvaluator(icp)
+    report = CoverageReport(rules=evaluator.coverage)
+    
+    for test in (icp.get('tests', []) if tests is None else tests):
+        test = plain(test)
+        report.tests += 1
+        expected = effect_value(test['expected'])
+        roles, activation = evaluator.prepare(test['input'])
+        for action in test['input']['actions']:
+            actual, rule = evaluator.decide(roles, activation, action)
+            report.decisions += 1
+            if rule is None:
+                report.default_decisions += 1
+            if actual != expected:
+                report.mismatches.append(TestMismatch(test['name'], action, expected, actual, rule))
+    
+    report.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    return report
@@ -0,0 +1,353 @@
+"""
+Daemon - One warm policy-builder per user, shared by every stdio session.
+
+`--transport daemon` serves MCP on a Unix domain socket: each connection is
+a full MCP session, and all sessions share one Server, one set of services
+and caches, and one scheduler. `--transport proxy` is what an IDE launches
+instead of the stdio server: it connects to the daemon (starting it if it
+is not running) and copies bytes between stdio and the socket, so it starts
+without importing the policy pipeline. The wire format is the stdio one,
+newline-delimited JSON-RPC.
+
+The socket lives in a per-user directory only its owner can open, and a
+lock file ensures only one daemon serves it. An autostarted daemon exits
+after a period with no connected sessions.
+
+A daemon runs with the environment of the proxy that started it, so the
+default socket name carries a hash of the settings that change its output
+(LLM provider, API keys, GLASSTAPE_* options): sessions configured alike
+share a daemon, others get their own. Each proxy first sends its working
+directory, and relative paths in tool arguments resolve against it rather
+than the daemon's.
+"""
+
+import contextlib
+import contextvars
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import IO, Iterator, Mapping, Optional
+
+
+logger = logging.getLogger(__name__)
+
+SOCKET_ENV = 'GLASSTAPE_DAEMON_SOCKET'
+IDLE_TIMEOUT_ENV = 'GLASSTAPE_DAEMON_IDLE_TIMEOUT'
+
+DEFAULT_IDLE_TIMEOUT = 1800.0
+STARTUP_TIMEOUT = 20.0
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+CHUNK_BYTES = 65536
+
+# Environment variables that configure the pipeline (LLM providers and credentials, server options)
+CONFIG_ENV_PREFIXES = ('GLASSTAPE_', 'LLM_', 'ANTHROPIC_', 'OPENAI_', 'AWS_', 'BEDROCK_')
+# Sent by the proxy before relaying, so the daemon knows the session's working directory
+CLIENT_INFO_METHOD = "glasstape/client"
+
+_client_cwd: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("glasstape_client_cwd", default=None)
+
+
+def config_fingerprint(environ: Optional[Mapping[str, str]] = None) -> str:
+    """Short hash of the configuration variables in `environ` (default: os.environ)."""
+    environ = os.environ if environ is None else environ
+    config = sorted(
+        (name, value) for name, value in environ.items()
+        if name.startswith(CONFIG_ENV_PREFIXES) and name != SOCKET_ENV
+    )
+    return hashlib.sha256(json.dumps(config).encode()).hexdigest()[:12]
+
+
+def default_socket_path() -> Path:
+    """
+    $GLASSTAPE_DAEMON_SOCKET, else a socket in the user's runtime (or temp) directory.
+    
+    The default name includes config_fingerprint(), so sessions with different
+    providers, keys or options never share a daemon.
+    """
+    configured = os.getenv(SOCKET_ENV)
+    if configured:
+        return Path(configured).expanduser()
+    fingerprint = config_fingerprint()
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return Path(runtime_dir) / f"glasstape-policy-builder-{fingerprint}.sock"
+    return Path(tempfile.gettempdir()) / f"glasstape-{os.getuid()}" / f"daemon-{fingerprint}.sock"
+
+
+def client_path(path: str) -> str:
+    """Resolve a path argument against the calling session's working directory."""
+    cwd = _client_cwd.get()
+    expanded = os.path.expanduser(path)
+    if cwd is None or os.path.isabs(expanded):
+        return expanded
+    return os.path.join(cwd, expanded)
+
+
+def _private_dir(socket_path: Path) -> None:
+    """Create the socket's directory, refusing one that another user owns."""
+    directory = socket_path.parent
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if directory.stat().st_uid != os.getuid():
+        raise PermissionError(f"Daemon directory {directory} is owned by another user")
+
+
+@contextlib.contextmanager
+def _daemon_lock(socket_path: Path) -> Iterator[bool]:
+    """Hold the daemon lock for a socket; yields False if another daemon holds it."""
+    _private_dir(socket_path)
+    with open(socket_path.with_name(socket_path.name + ".lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+async def serve_daemon(socket_path: Optional[Path] = None, idle_timeout: Optional[float] = None) -> None:
+    """
+    Serve MCP sessions on a Unix socket until cancelled or idle.
+    
+    Args:
+        socket_path: Socket to listen on (default: default_socket_path())
+        idle_timeout: Exit after this many seconds without sessions; defaults to
+            $GLASSTAPE_DAEMON_IDLE_TIMEOUT or 30 minutes, 0 never exits
+    """
+    import anyio
+    from mcp.server import Server
+    
+    from .http_server import SERVER_NAME
+    from .scheduler import scheduler
+    from .server import setup_server
+    from .services import close_services
+    
+    socket_path = Path(socket_path or default_socket_path())
+    if idle_timeout is None:
+        try:
+            idle_timeout = float(os.getenv(IDLE_TIMEOUT_ENV, DEFAULT_IDLE_TIMEOUT))
+        except ValueError:
+            logger.warning(f"Ignoring invalid {IDLE_TIMEOUT_ENV}; using {DEFAULT_IDLE_TIMEOUT}s")
+            idle_timeout = DEFAULT_IDLE_TIMEOUT
+    
+    with _daemon_lock(socket_path) as locked:
+        if not locked:
+            logger.info(f"Another daemon is already serving {socket_path}")
+            return
+        
+        server = Server(SERVER_NAME)
+        await setup_server(server)
+        
+        # We hold the lock, so any existing socket file is stale
+        socket_path.unlink(missing_ok=True)
+        listener = await anyio.create_unix_listener(socket_path, mode=0o600)
+        sessions = 0
+        last_active = time.monotonic()
+        
+        async def handle(connection) -> None:
+            nonlocal sessions, last_active
+            sessions += 1
+            try:
+                await _serve_connection(server, connection)
+            except Exception as e:
+                logger.warning(f"Session ended with an error: {e}")
+            finally:
+                sessions -= 1
+                last_active = time.monotonic()
+        
+        logger.info(f"🔗 MCP daemon listening on {socket_path}")
+        try:
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(listener.serve, handle, tg)
+                while not idle_timeout or sessions or time.monotonic() - last_active < idle_timeout:
+                    await anyio.sleep(min(idle_timeout or 60, 5))
+                logger.info("🛑 Daemon idle; shutting down")
+                tg.cancel_scope.cancel()
+        finally:
+            await listener.aclose()
+            socket_path.unlink(missing_ok=True)
+            scheduler.shutdown()
+            close_services()
+
+
+async def _serve_connection(server, connection) -> None:
+    """Run one MCP session over a socket connection."""
+    import anyio
+    import mcp.types as types
+    from anyio.streams.buffered import BufferedByteReceiveStream
+    from mcp.shared.message import SessionMessage
+    
+    read_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_reader = anyio.create_memory_object_stream(0)
+    buffered = BufferedByteReceiveStream(connection)
+    
+    async def receive_line() -> Optional[bytes]:
+        try:
+            return await buffered.receive_until(b"\n", MAX_MESSAGE_BYTES)
+        except (anyio.EndOfStream, anyio.IncompleteRead, anyio.ClosedResourceError):
+            return None
+    
+    # The proxy's client info comes first; tool calls inherit its working directory
+    first_line = await receive_line()
+    if first_line is None:
+        return
+    try:
+        info = json.loads(first_line)
+    except ValueError:
+        info = None
+    if isinstance(info, dict) and info.get("method") == CLIENT_INFO_METHOD:
+        cwd = (info.get("params") or {}).get("cwd")
+        _client_cwd.set(cwd if isinstance(cwd, str) and os.path.isabs(cwd) else None)
+        first_line = b""
+    
+    async def reader() -> None:
+        line = first_line
+        async with read_writer:
+            while line is not None:
+                if line.strip():
+                    try:
+                        message = types.JSONRPCMessage.model_validate_json(line)
+                    except Exception as e:
+                        await read_writer.send(e)
+                    else:
+                        await read_writer.send(SessionMessage(message))
+                line = await receive_line()
+    
+    async def writer() -> None:
+        async with write_reader:
+            async for session_message in write_reader:
+                data = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                await connection.send(data.encode() + b"\n")
+    
+    async with connection:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(reader)
+            tg.start_soon(writer)
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+            await write_stream.aclose()  # Lets the writer flush the last replies and stop
+
+
+def connect(socket_path: Optional[Path] = None, autostart: bool = True, timeout: float = STARTUP_TIMEOUT) -> socket.socket:
+    """
+    Connect to the daemon, starting it first if nothing is listening.
+    
+    Raises:
+        ConnectionError: If the daemon could not be reached within `timeout`
+    """
+    socket_path = Path(socket_path or default_socket_path())
+    try:
+        return _connect(socket_path)
+    except OSError:
+        if not autostart:
+            raise ConnectionError(f"No policy-builder daemon at {socket_path}")
+    
+    _spawn_daemon(socket_path)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        try:
+            return _connect(socket_path)
+        except OSError:
+            continue
+    raise ConnectionError(
+        f"Policy-builder daemon did not start within {timeout:.0f}s; see {socket_path.with_suffix('.log')}"
+    )
+
+
+def _connect(socket_path: Path) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _spawn_daemon(socket_path: Path) -> None:
+    """Start a detached daemon; if several proxies race, the lock keeps one."""
+    _private_dir(socket_path)
+    env = dict(os.environ, **{SOCKET_ENV: str(socket_path)})
+    with open(socket_path.with_suffix('.log'), "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "glasstape_policy_builder.server", "--transport", "daemon"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            env=env,
+            start_new_session=True,  # Outlive the proxy and the IDE that started it
+        )
+
+
+def run_proxy(
+    socket_path: Optional[Path] = None,
+    stdin: Optional[IO[bytes]] = None,
+    stdout: Optional[IO[bytes]] = None,
+    autostart: bool = True,
+) -> None:
+    """Relay stdio to the daemon until either side closes."""
+    stdin = stdin or sys.stdin.buffer
+    stdout = stdout or sys.stdout.buffer
+    sock = connect(socket_path, autostart)
+    info = {"jsonrpc": "2.0", "method": CLIENT_INFO_METHOD, "params": {"cwd": os.getcwd()}}
+    sock.sendall(json.dumps(info).encode() + b"\n")
+    
+    def upstream() -> None:
+        try:
+            while True:
+                chunk = stdin.read1(CHUNK_BYTES)
+                if not chunk:
+                    break
+                sock.sendall(chunk)
+        except OSError:
+            pass
+        finally:
+            with contextlib.suppress(OSError):
+                sock.shutdown(socket.SHUT_WR)  # Ends the session once pending replies are sent
+    
+    threading.Thread(target=upstream, daemon=True).start()
+    try:
+        while True:
+            chunk = sock.recv(CHUNK_BYTES)
+            if not chunk:
+                break
+            stdout.write(chunk)
+            stdout.flush()
+    finally:
+        sock.close()
+
+
+def proxy_main(argv: Optional[list] = None) -> None:
+    """Entry point for the stdio proxy; imports nothing from the pipeline."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        prog="glasstape-policy-builder-proxy",
+        description="Relay an MCP stdio session to the shared per-user policy-builder daemon",
+    )
+    parser.add_argument("--socket", type=Path, help=f"Daemon socket (default: ${SOCKET_ENV} or per-user)")
+    parser.add_argument("--no-autostart", action="store_true", help="Fail instead of starting the daemon")
+    args = parser.parse_args(argv)
+    
+    try:
+        run_proxy(args.socket, autostart=not args.no_autostart)
+    except ConnectionError as e:
+        print(f"glasstape-policy-builder-proxy: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    proxy_main()
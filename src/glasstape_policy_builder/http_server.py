@@ -0,0 +1,231 @@
+"""
+HTTP Server - Serve the policy builder to a whole team over streamable HTTP.
+
+The MCP endpoint runs in stateless mode: every POST carries a complete
+request and gets its own transport, so any worker process can answer any
+request. Uvicorn runs several workers behind one port; each keeps its own
+warm services (templates, taxonomy, Cerbos probe, process pool), and they
+share the on-disk LLM response cache. Sending SIGHUP to the main process
+restarts the workers one by one, picking up new code and templates.
+
+Requests must name an allowed Host (and Origin, if sent), which blocks DNS
+rebinding from browsers; loopback names are always allowed. With
+$GLASSTAPE_HTTP_TOKEN set, /mcp also requires `Authorization: Bearer <token>`,
+and binding to a non-loopback address refuses to start without one. Tools
+that read or write the server's filesystem are not offered over HTTP.
+"""
+
+import contextlib
+import hmac
+import ipaddress
+import logging
+import os
+from typing import AsyncIterator, Iterable, List, Optional
+
+from mcp.server import Server
+
+from .scheduler import CPU_WORKERS_ENV, scheduler
+from .services import close_services
+
+
+logger = logging.getLogger(__name__)
+
+SERVER_NAME = "glasstape-policy-builder"
+MCP_PATH = "/mcp"
+JSON_RESPONSE_ENV = 'GLASSTAPE_HTTP_JSON_RESPONSE'
+ALLOWED_HOSTS_ENV = 'GLASSTAPE_HTTP_ALLOWED_HOSTS'
+ALLOWED_ORIGINS_ENV = 'GLASSTAPE_HTTP_ALLOWED_ORIGINS'
+TOKEN_ENV = 'GLASSTAPE_HTTP_TOKEN'
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+
+def is_loopback(host: str) -> bool:
+    """Whether a bind address only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def _env_list(name: str) -> List[str]:
+    return [item.strip() for item in os.getenv(name, '').split(',') if item.strip()]
+
+
+def _host_patterns(hosts: Iterable[str]) -> List[str]:
+    """Host header values to accept: each host as given, plus any port when none is given."""
+    patterns = []
+    for host in hosts:
+        patterns.append(host)
+        has_port = "]:" in host if host.startswith("[") else ":" in host
+        if not has_port:
+            patterns.append(f"{host}:*")
+    return patterns
+
+
+def create_app(
+    json_response: Optional[bool] = None,
+    allowed_hosts: Optional[List[str]] = None,
+    allowed_origins: Optional[List[str]] = None,
+    token: Optional[str] = None,
+):
+    """
+    Build the ASGI app: the MCP endpoint at /mcp plus a /healthz probe.
+    
+    Args:
+        json_response: Answer with plain JSON instead of an SSE stream; defaults
+            to $GLASSTAPE_HTTP_JSON_RESPONSE
+        allowed_hosts: Host header values accepted besides the loopback names,
+            with `host:*` for any port; defaults to $GLASSTAPE_HTTP_ALLOWED_HOSTS
+        allowed_origins: Origin header values accepted besides loopback origins;
+            defaults to $GLASSTAPE_HTTP_ALLOWED_ORIGINS
+        token: Bearer token required on /mcp; defaults to $GLASSTAPE_HTTP_TOKEN
+    
+    Raises:
+        ImportError: If the installed MCP SDK has no streamable HTTP support
+    """
+    try:
+        from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+        from mcp.server.transport_security import TransportSecuritySettings
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse
+        from starlette.routing import Route
+    except ImportError as e:
+        raise ImportError(
+            "HTTP transport requires mcp>=1.19. Install with: pip install 'glasstape-policy-builder-mcp[http]'"
+        ) from e
+    from .server import setup_server
+    
+    if json_response is None:
+        json_response = os.getenv(JSON_RESPONSE_ENV, '0').lower() in ('1', 'true', 'yes')
+    if allowed_hosts is None:
+        allowed_hosts = _env_list(ALLOWED_HOSTS_ENV)
+    if allowed_origins is None:
+        allowed_origins = _env_list(ALLOWED_ORIGINS_ENV)
+    if token is None:
+        token = os.getenv(TOKEN_ENV) or None
+    
+    security = TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=_host_patterns([*LOOPBACK_HOSTS, *allowed_hosts]),
+        allowed_origins=[f"http://{origin}" for origin in _host_patterns(LOOPBACK_HOSTS)] + list(allowed_origins),
+    )
+    server = Server(SERVER_NAME)
+    session_manager = StreamableHTTPSessionManager(
+        app=server, stateless=True, json_response=json_response, security_settings=security,
+    )
+    expected_auth = f"Bearer {token}".encode() if token else None
+    
+    async def handle_mcp(scope, receive, send) -> None:
+        if expected_auth is not None:
+            headers = dict(scope.get("headers") or [])
+            if not hmac.compare_digest(headers.get(b"authorization", b""), expected_auth):
+                response = JSONResponse(
+                    {'error': 'Missing or invalid bearer token'},
+                    status_code=401,
+                    headers={'WWW-Authenticate': 'Bearer'},
+                )
+                await response(scope, receive, send)
+                return
+        await session_manager.handle_request(scope, receive, send)
+    
+    async def healthz(request):
+        return JSONResponse({'status': 'ok', 'pid': os.getpid()})
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(app) -> AsyncIterator[None]:
+        await setup_server(server, local_files=False)
+        try:
+            async with session_manager.run():
+                logger.info(f"🔗 MCP server listening on {MCP_PATH} (worker {os.getpid()})")
+                yield
+        finally:
+            scheduler.shutdown()
+            close_services()
+    
+    return Starlette(
+        routes=[
+            Route(MCP_PATH, endpoint=_ASGIEndpoint(handle_mcp), methods=['GET', 'POST', 'DELETE']),
+            Route('/healthz', endpoint=healthz, methods=['GET']),
+        ],
+        lifespan=lifespan,
+    )
+
+
+class _ASGIEndpoint:
+    """Wrap an ASGI callable so Starlette routes the raw request to it."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.app(scope, receive, send)
+
+
+def run_http(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    workers: int = 1,
+    json_response: bool = False,
+    allowed_hosts: Optional[List[str]] = None,
+    allowed_origins: Optional[List[str]] = None,
+) -> None:
+    """
+    Serve over HTTP with uvicorn.
+    
+    Args:
+        host: Interface to bind; the default only accepts local connections
+        port: TCP port
+        workers: Worker processes sharing the port
+        json_response: Answer with plain JSON instead of an SSE stream
+        allowed_hosts: Host names clients use to reach the server, added to
+            $GLASSTAPE_HTTP_ALLOWED_HOSTS; a specific non-loopback bind address
+            is allowed automatically
+        allowed_origins: Browser origins allowed to call the server, added to
+            $GLASSTAPE_HTTP_ALLOWED_ORIGINS
+    
+    Raises:
+        ValueError: If `host` is not loopback and $GLASSTAPE_HTTP_TOKEN is unset,
+            or `host` is a wildcard address and no allowed host is configured
+    """
+    import uvicorn
+    
+    hosts = _env_list(ALLOWED_HOSTS_ENV) + list(allowed_hosts or [])
+    if not is_loopback(host):
+        if not os.getenv(TOKEN_ENV):
+            raise ValueError(
+                f"Refusing to serve on {host} without authentication; set {TOKEN_ENV} "
+                f"to a bearer token clients must send, or bind to {DEFAULT_HOST}"
+            )
+        if host in ("0.0.0.0", "::", ""):
+            if not hosts:
+                raise ValueError(
+                    f"Binding to {host or 'all interfaces'} needs the host names clients use; "
+                    f"pass --allowed-host or set {ALLOWED_HOSTS_ENV}"
+                )
+        elif host not in hosts:
+            hosts.append(f"[{host}]" if ":" in host else host)
+    
+    workers = max(1, workers)
+    # Workers are separate processes, so settings reach them through the environment
+    os.environ[JSON_RESPONSE_ENV] = '1' if json_response else '0'
+    os.environ[ALLOWED_HOSTS_ENV] = ','.join(hosts)
+    os.environ[ALLOWED_ORIGINS_ENV] = ','.join(_env_list(ALLOWED_ORIGINS_ENV) + list(allowed_origins or []))
+    if workers > 1:
+        # Split the CPU between the workers' process pools unless configured
+        os.environ.setdefault(CPU_WORKERS_ENV, str(max(1, (os.cpu_count() or 1) // workers)))
+    
+    logger.info(f"🚀 Serving MCP over HTTP on http://{host}:{port}{MCP_PATH} with {workers} worker(s)")
+    uvicorn.run(
+        "glasstape_policy_builder.http_server:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        log_level="info",
+        timeout_graceful_shutdown=30,
+    )
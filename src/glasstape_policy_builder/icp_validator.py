@@ -41,6 +41,27 @@ class ICPValidator:
         # Validate tests
         self._validate_tests(icp['tests'])
     
+    def validate_section(self, name: str, value: Any) -> None:
+        """
+        Validate one top-level ICP section on its own.
+        
+        Lets a streamed response be rejected as soon as a bad section is
+        complete; validate() still checks the whole document afterwards.
+        
+        Raises:
+            ValueError: If the section is invalid
+        """
+        if name == 'version':
+            if value != '1.0.0':
+                raise ValueError("ICP version must be 1.0.0")
+        elif name in ('metadata', 'policy'):
+            if not isinstance(value, dict):
+                raise ValueError(f"ICP '{name}' section must be an object")
+            if name == 'metadata':
+                self._validate_metadata(value)
+            else:
+                self._validate_policy(value)
+    
     def _validate_metadata(self, metadata: Dict[str, Any]) -> None:
         """Validate metadata section"""
         required_fields = ['name', 'description', 'resource']
@@ -0,0 +1,119 @@
+"""Keyword Matcher - Single-pass multi-pattern search (Aho-Corasick)."""
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Union
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    """A pattern occurrence in the searched text."""
+    start: int
+    end: int
+    pattern: str
+    value: Any
+
+
+class KeywordMatcher:
+    """
+    Find every occurrence of a fixed set of keywords in one pass over the text.
+    
+    Patterns are matched case-insensitively. With ``whole_words`` a match must
+    not be embedded in a longer word (``api`` does not match ``rapid``).
+    """
+    
+    def __init__(
+        self,
+        patterns: Union[Mapping[str, Any], Iterable[str]],
+        whole_words: bool = True,
+    ):
+        """
+        Args:
+            patterns: Keywords, or a mapping of keyword to an associated value
+            whole_words: Only report matches on word boundaries
+        """
+        if not isinstance(patterns, Mapping):
+            patterns = {p: p for p in patterns}
+        
+        self.whole_words = whole_words
+        self._patterns: List[str] = []
+        self._values: List[Any] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        
+        for pattern, value in patterns.items():
+            self._add(pattern.lower(), value)
+        self._build_failure_links()
+    
+    def __len__(self) -> int:
+        return len(self._patterns)
+    
+    def _add(self, pattern: str, value: Any) -> None:
+        """Insert a pattern into the trie."""
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(len(self._patterns))
+        self._patterns.append(pattern)
+        self._values.append(value)
+    
+    def _build_failure_links(self) -> None:
+        """Breadth-first construction of failure links and merged outputs."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+    
+    def find(self, text: str) -> List[KeywordMatch]:
+        """Return all matches in order of their end position."""
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        state = 0
+        
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                pattern = self._patterns[pattern_id]
+                start = index - len(pattern) + 1
+                if self.whole_words and not _on_word_boundary(text, start, index + 1):
+                    continue
+                matches.append(KeywordMatch(start, index + 1, pattern, self._values[pattern_id]))
+        
+        return matches
+    
+    def contains_any(self, text: str) -> bool:
+        """Check whether any pattern occurs in the text."""
+        return bool(self.find(text))
+
+
+def _on_word_boundary(text: str, start: int, end: int) -> bool:
+    """Check that text[start:end] is not part of a longer word."""
+    if start > 0 and _is_word_char(text[start - 1]):
+        return False
+    if end < len(text) and _is_word_char(text[end]):
+        return False
+    return True
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
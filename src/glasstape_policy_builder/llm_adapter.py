@@ -10,46 +10,38 @@ WARNING: Client-LLM mode is STRONGLY RECOMMENDED for:
 This adapter should only be used when absolutely necessary.
 """
 
+import asyncio
+import contextlib
 import os
-import json
-import re
+import importlib.util
+import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Union
 
+from .icp_validator import ICPValidator
+from .streaming_json import parse_json_object, parse_json_stream
 
-class LLMAdapter(ABC):
-    """Abstract interface for LLM providers - use sparingly."""
-    
-    @abstractmethod
-    def nl_to_icp(self, nl_requirements: str) -> dict:
-        """Convert natural language to ICP JSON."""
-        pass
 
+logger = logging.getLogger(__name__)
 
-class AnthropicAdapter(LLMAdapter):
-    """
-    Minimal Anthropic adapter - ONLY for environments without LLM-capable clients.
-    
-    Prefer client-LLM mode in production for security and compliance.
-    """
-    
-    def __init__(self, api_key: str):
-        try:
-            from anthropic import Anthropic
-        except ImportError:
-            raise ImportError(
-                "anthropic package required. Install with: "
-                "pip install 'glasstape-policy-builder-mcp[anthropic]'"
-            )
-        self.client = Anthropic(api_key=api_key)
-    
-    def nl_to_icp(self, nl_requirements: str) -> dict:
-        """Convert NL to ICP - prefer client-side generation."""
-        try:
-            response = self.client.messages.create(
-                model="claude-3-haiku-20240307",  # Fastest, cheapest model
-                max_tokens=4096,
-                system="""You are a policy normalizer. Output ONLY valid ICP JSON:
+
+# Bump when the prompt changes so cached responses from the old prompt are not reused
+PROMPT_VERSION = "1"
+
+ANTHROPIC_MODEL = "claude-3-haiku-20240307"  # Fastest, cheapest model
+OPENAI_MODEL = "gpt-4o-mini"
+BEDROCK_MODEL = "anthropic.claude-3-haiku-20240307-v1:0"
+
+# Set to 0 to wait for whole completions (e.g. behind proxies that buffer SSE)
+STREAMING_ENV = 'LLM_STREAMING'
+# Requests in flight per provider
+MAX_CONCURRENCY_ENV = 'LLM_MAX_CONCURRENCY'
+DEFAULT_CONCURRENCY = 4
+# Set to 1 to send a second request when one runs past the provider's p95 latency
+HEDGE_ENV = 'LLM_HEDGE'
+
+ICP_SYSTEM_PROMPT = """You are a policy normalizer. Output ONLY valid ICP JSON:
 
 {
   "version": "1.0.0",
@@ -68,64 +60,365 @@ class AnthropicAdapter(LLMAdapter):
   ]
 }
 
-Always end with default deny rule. Include at least 2 tests.""",
-                messages=[{"role": "user", "content": nl_requirements}]
+Always end with default deny rule. Include at least 2 tests."""
+
+BATCH_INSTRUCTIONS = """You will receive several numbered requirements. Output ONLY one JSON object
+whose keys are the requirement numbers as strings ("1", "2", ...) and whose
+values are the ICP JSON for that requirement, e.g. {"1": {...}, "2": {...}}."""
+
+# Requirements packed into one request: each ICP is roughly 1k output tokens
+# and the response is capped at MAX_TOKENS
+MAX_TOKENS = 4096
+BATCH_SIZE = 3
+
+
+class LLMAdapter(ABC):
+    """Abstract interface for LLM providers - use sparingly."""
+    
+    model: str = ""
+    
+    # Requirements one model request may carry; adapters that pack several
+    # set this above 1 and implement nl_to_icp_batch()
+    batch_size: int = 1
+    
+    @abstractmethod
+    def nl_to_icp(self, nl_requirements: str) -> dict:
+        """Convert natural language to ICP JSON (may be a coroutine)."""
+        pass
+    
+    async def nl_to_icp_batch(self, requirements: List[str]) -> List[Union[dict, Exception]]:
+        """Convert several requirements in one request; one ICP or error per requirement."""
+        raise NotImplementedError(f"{type(self).__name__} does not pack requirements")
+
+
+class ChatAdapter(LLMAdapter):
+    """
+    NL→ICP conversion shared by chat-completion providers.
+    
+    Subclasses make the SDK calls: _create_text() returns a whole completion
+    and _stream_text() yields it in pieces. Each SDK is imported and its
+    client built on first use; the client (and its HTTP connection pool)
+    is then reused for every call.
+    """
+    
+    def __init__(self, model: str, stream: bool = True):
+        """
+        Args:
+            model: Model name
+            stream: Parse the response as it streams and stop at the first
+                invalid section instead of waiting for the whole completion
+        """
+        self.model = model
+        self.stream = stream
+        self._client = None
+        self._validator = ICPValidator()
+    
+    async def nl_to_icp(self, nl_requirements: str) -> dict:
+        """Convert NL to ICP - prefer client-side generation."""
+        try:
+            return await self._complete_json(
+                nl_requirements, [ICP_SYSTEM_PROMPT], self._validator.validate_section
             )
-            
-            text = response.content[0].text
-            json_str = self._extract_json(text)
-            return json.loads(json_str)
         except Exception as e:
             raise ValueError(f"Failed to convert natural language to ICP: {str(e)}")
     
-    def _extract_json(self, text: str) -> str:
-        """Extract JSON from response."""
+    async def nl_to_icp_batch(self, requirements: List[str]) -> List[Union[dict, Exception]]:
+        """
+        Convert several requirements with one model call.
+        
+        An invalid ICP only fails its own requirement; a failed request
+        raises ValueError for the whole batch.
+        """
+        content = "\n\n".join(f"Requirement {i}:\n{text}" for i, text in enumerate(requirements, 1))
+        errors: Dict[str, Exception] = {}
+        
+        def check(key: str, icp: Any) -> None:
+            try:
+                if not isinstance(icp, dict):
+                    raise ValueError("ICP must be an object")
+                for name, section in icp.items():
+                    self._validator.validate_section(name, section)
+            except ValueError as e:
+                errors[key] = e
+        
         try:
-            # Remove code blocks if present
-            text = re.sub(r'```[^\n]*\n', '', text)
-            text = re.sub(r'```', '', text)
-            
-            # Find JSON structure
-            json_match = re.search(r'\{.*\}', text, re.DOTALL)
-            if json_match:
-                return json_match.group(0)
-            
-            raise ValueError("No valid JSON found in LLM response")
+            packed = await self._complete_json(content, [ICP_SYSTEM_PROMPT, BATCH_INSTRUCTIONS], check)
         except Exception as e:
-            raise ValueError(f"Failed to extract JSON from response: {str(e)}")
+            raise ValueError(f"Failed to convert natural language batch to ICP: {str(e)}")
+        
+        results: List[Union[dict, Exception]] = []
+        for i in range(1, len(requirements) + 1):
+            key = str(i)
+            if key in errors:
+                results.append(ValueError(f"Invalid ICP for requirement {i}: {errors[key]}"))
+            elif key not in packed:
+                results.append(ValueError(f"No ICP returned for requirement {i}"))
+            else:
+                results.append(packed[key])
+        return results
+    
+    async def _complete_json(self, content: str, system: List[str], on_member) -> Dict[str, Any]:
+        """Request a completion and parse the JSON object in it."""
+        if self.stream:
+            # Leaving the block closes the response, so an early error
+            # stops reading the rest of the completion
+            async with self._stream_text(system, content) as chunks:
+                return await parse_json_stream(chunks, on_member)
+        return parse_json_object(await self._create_text(system, content), on_member)
+    
+    @abstractmethod
+    async def _create_text(self, system: List[str], content: str) -> str:
+        """Text of one whole completion."""
+    
+    @abstractmethod
+    def _stream_text(self, system: List[str], content: str) -> AsyncContextManager[AsyncIterator[str]]:
+        """Context manager yielding the completion's text deltas; exiting closes the response."""
+
+
+class AnthropicAdapter(ChatAdapter):
+    """
+    Minimal Anthropic adapter - ONLY for environments without LLM-capable clients.
+    
+    Prefer client-LLM mode in production for security and compliance.
+    """
+    
+    batch_size = BATCH_SIZE
+    
+    def __init__(self, api_key: str, model: str = ANTHROPIC_MODEL, stream: bool = True):
+        super().__init__(model, stream)
+        _require('anthropic', 'anthropic')
+        self._api_key = api_key
+    
+    @property
+    def client(self):
+        """Shared AsyncAnthropic client, created on first use."""
+        if self._client is None:
+            from anthropic import AsyncAnthropic
+            self._client = AsyncAnthropic(api_key=self._api_key)
+        return self._client
+    
+    async def _create_text(self, system: List[str], content: str) -> str:
+        response = await self.client.messages.create(**self._request(system, content))
+        return response.content[0].text
+    
+    @contextlib.asynccontextmanager
+    async def _stream_text(self, system: List[str], content: str):
+        async with self.client.messages.stream(**self._request(system, content)) as stream:
+            yield stream.text_stream
+    
+    def _request(self, system: List[str], content: str) -> Dict[str, Any]:
+        # The shared system prefix is marked for provider prompt caching
+        blocks: List[Dict[str, Any]] = [{"type": "text", "text": text} for text in system]
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        return dict(
+            model=self.model,
+            max_tokens=MAX_TOKENS,
+            system=blocks,
+            messages=[{"role": "user", "content": content}]
+        )
+
+
+class OpenAIAdapter(ChatAdapter):
+    """
+    OpenAI, or any OpenAI-compatible server via base_url (vLLM, llama.cpp,
+    Ollama, LM Studio), e.g. a local model on the same box.
+    
+    The system prompt is sent first and unchanged, so servers with prefix
+    caching reuse it.
+    """
+    
+    def __init__(self, api_key: str, model: str = OPENAI_MODEL, base_url: Optional[str] = None, stream: bool = True):
+        super().__init__(model, stream)
+        _require('openai', 'openai')
+        self._api_key = api_key
+        self.base_url = base_url
+    
+    @property
+    def client(self):
+        """Shared AsyncOpenAI client, created on first use."""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=self._api_key, base_url=self.base_url)
+        return self._client
+    
+    async def _create_text(self, system: List[str], content: str) -> str:
+        response = await self.client.chat.completions.create(**self._request(system, content))
+        return response.choices[0].message.content or ""
+    
+    @contextlib.asynccontextmanager
+    async def _stream_text(self, system: List[str], content: str):
+        stream = await self.client.chat.completions.create(**self._request(system, content), stream=True)
+        
+        async def text():
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        
+        try:
+            yield text()
+        finally:
+            await stream.close()
+    
+    def _request(self, system: List[str], content: str) -> Dict[str, Any]:
+        return dict(
+            model=self.model,
+            max_tokens=MAX_TOKENS,
+            messages=[
+                {"role": "system", "content": "\n\n".join(system)},
+                {"role": "user", "content": content},
+            ]
+        )
+
+
+class BedrockAdapter(ChatAdapter):
+    """
+    Amazon Bedrock through the Converse API.
+    
+    boto3 is blocking, so each call runs in a worker thread; the client's
+    connection pool is sized to the provider's concurrency limit.
+    """
+    
+    def __init__(self, model: str = BEDROCK_MODEL, region: Optional[str] = None, max_connections: int = 10):
+        super().__init__(model, stream=False)
+        _require('boto3', 'bedrock')
+        self.region = region
+        self.max_connections = max_connections
+    
+    @property
+    def client(self):
+        """Shared bedrock-runtime client, created on first use."""
+        if self._client is None:
+            import boto3
+            from botocore.config import Config
+            self._client = boto3.client(
+                'bedrock-runtime', region_name=self.region,
+                config=Config(max_pool_connections=self.max_connections),
+            )
+        return self._client
+    
+    async def _create_text(self, system: List[str], content: str) -> str:
+        response = await asyncio.to_thread(
+            self.client.converse,
+            modelId=self.model,
+            system=[{"text": text} for text in system],
+            messages=[{"role": "user", "content": [{"text": content}]}],
+            inferenceConfig={"maxTokens": MAX_TOKENS},
+        )
+        return response['output']['message']['content'][0]['text']
+    
+    def _stream_text(self, system: List[str], content: str):
+        raise NotImplementedError("BedrockAdapter does not stream")
+
+
+def _require(module: str, extra: str) -> None:
+    """Fail at configuration time, without paying for the import, if an SDK is missing."""
+    if importlib.util.find_spec(module) is None:
+        raise ImportError(
+            f"{module} package required. Install with: "
+            f"pip install 'glasstape-policy-builder-mcp[{extra}]'"
+        )
+
+
+# Provider name (as used in LLM_PROVIDER) -> factory building an adapter from the environment
+PROVIDERS: Dict[str, Callable[[], LLMAdapter]] = {}
+
+
+def register_provider(name: str, factory: Callable[[], LLMAdapter]) -> None:
+    """Make a provider available to LLM_PROVIDER."""
+    PROVIDERS[name] = factory
+
+
+def _streaming() -> bool:
+    return os.getenv(STREAMING_ENV, '1') != '0'
+
+
+def _anthropic_from_env() -> LLMAdapter:
+    api_key = os.getenv('ANTHROPIC_API_KEY')
+    if not api_key:
+        raise ValueError("LLM_PROVIDER=anthropic requires ANTHROPIC_API_KEY")
+    return AnthropicAdapter(api_key, os.getenv('ANTHROPIC_MODEL', ANTHROPIC_MODEL), stream=_streaming())
+
+
+def _openai_from_env() -> LLMAdapter:
+    base_url = os.getenv('OPENAI_BASE_URL')
+    # Local OpenAI-compatible servers usually ignore the key
+    api_key = os.getenv('OPENAI_API_KEY') or ('local' if base_url else None)
+    if not api_key:
+        raise ValueError("LLM_PROVIDER=openai requires OPENAI_API_KEY (or OPENAI_BASE_URL for a local server)")
+    return OpenAIAdapter(api_key, os.getenv('OPENAI_MODEL', OPENAI_MODEL), base_url, stream=_streaming())
+
+
+def _bedrock_from_env() -> LLMAdapter:
+    return BedrockAdapter(os.getenv('BEDROCK_MODEL_ID', BEDROCK_MODEL), os.getenv('AWS_REGION'))
+
+
+register_provider('anthropic', _anthropic_from_env)
+register_provider('openai', _openai_from_env)
+register_provider('bedrock', _bedrock_from_env)
+
+
+_adapter: Optional[LLMAdapter] = None
+_configured = False
+_adapter_lock = threading.Lock()
 
 
 def get_llm_adapter() -> Optional[LLMAdapter]:
     """
     Get optional LLM adapter - CLIENT-LLM MODE IS PREFERRED.
     
-    Returns None by default to encourage client-side generation.
+    Returns None by default to encourage client-side generation. The
+    environment is read once; the adapter is cached until reset_llm_adapter().
     """
+    global _adapter, _configured
+    if _configured:
+        return _adapter
+    with _adapter_lock:
+        if not _configured:
+            _adapter = _create_llm_adapter()
+            _configured = True
+    return _adapter
+
+
+def reset_llm_adapter() -> None:
+    """Forget the cached adapter so the next call re-reads the environment."""
+    global _adapter, _configured
+    with _adapter_lock:
+        _adapter = None
+        _configured = False
+
+
+def _create_llm_adapter() -> Optional[LLMAdapter]:
     provider = os.getenv('LLM_PROVIDER')
     
     if not provider:
         # This is the preferred state - no server-side LLM
         return None
     
-    # Warning for discouraged usage
-    print("⚠️  WARNING: Server-side LLM mode detected.")
-    print("   Client-LLM mode is strongly recommended for:")
-    print("   - Security compliance")
-    print("   - Air-gapped deployments") 
-    print("   - Deterministic behavior")
-    print("   Consider removing LLM_PROVIDER env var.\n")
-    
-    if provider == 'anthropic':
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("LLM_PROVIDER=anthropic requires ANTHROPIC_API_KEY")
+    # Warning for discouraged usage (stdout carries the MCP stream, so log it)
+    logger.warning(
+        "⚠️  Server-side LLM mode detected. Client-LLM mode is strongly recommended "
+        "for security compliance, air-gapped deployments and deterministic behavior. "
+        "Consider removing LLM_PROVIDER env var."
+    )
+    
+    adapters = []
+    for name in (p.strip() for p in provider.split(',')):
+        if name not in PROVIDERS:
+            raise ValueError(f"Unsupported LLM_PROVIDER: {name}")
         try:
-            return AnthropicAdapter(api_key)
+            adapters.append((name, PROVIDERS[name]()))
+        except ValueError:
+            raise
         except Exception as e:
-            raise ValueError(f"Failed to initialize Anthropic adapter: {str(e)}")
+            raise ValueError(f"Failed to initialize {name} adapter: {str(e)}")
     
-    else:
-        raise ValueError(f"Unsupported LLM_PROVIDER: {provider}")
+    try:
+        max_concurrency = int(os.getenv(MAX_CONCURRENCY_ENV, DEFAULT_CONCURRENCY))
+    except ValueError:
+        raise ValueError(f"{MAX_CONCURRENCY_ENV} must be an integer")
+    
+    from .llm_pool import AdapterPool  # The pool builds on LLMAdapter
+    return AdapterPool(adapters, max_concurrency=max_concurrency, hedge=os.getenv(HEDGE_ENV) == '1')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+"""
+LLM Batch - Convert many natural-language requirements to ICPs at once.
+
+Each requirement goes the cheapest way available: the deterministic local
+compiler, then the response cache, and only then the server-side LLM.
+Requirements that need the model are deduplicated, packed several to a
+request when the adapter supports it, and sent with bounded concurrency.
+A packed request that fails as a whole is retried one requirement at a time.
+"""
+
+import asyncio
+import copy
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .llm_adapter import LLMAdapter
+from .llm_cache import ICPCache, adapter_model, icp_cache
+from .nl_compiler import nl_compiler
+
+
+MAX_BATCH = 200
+BATCH_CONCURRENCY = 4
+PACK_CHARS = 6000  # Requirement text per packed request
+
+
+@dataclass
+class BatchResult:
+    """Outcome for one requirement of a batch."""
+    requirements: str
+    icp: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    source: str = ''  # 'local', 'cache' or 'llm'
+    
+    @property
+    def ok(self) -> bool:
+        return self.icp is not None
+
+
+def pack_requirements(texts: List[str], size: int, max_chars: int = PACK_CHARS) -> List[List[int]]:
+    """Group requirement indices into requests of at most `size` items and `max_chars` characters."""
+    groups: List[List[int]] = []
+    chars = 0
+    for i, text in enumerate(texts):
+        if groups and len(groups[-1]) < size and chars + len(text) <= max_chars:
+            groups[-1].append(i)
+            chars += len(text)
+        else:
+            groups.append([i])
+            chars = len(text)
+    return groups
+
+
+async def convert_batch(
+    requirements: List[str],
+    adapter: Optional[LLMAdapter] = None,
+    cache: ICPCache = icp_cache,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> List[BatchResult]:
+    """
+    Convert requirements to ICPs.
+    
+    Args:
+        requirements: Natural-language requirements
+        adapter: Server-side LLM adapter; without one only locally compiled
+            and cached requirements succeed
+        cache: Response cache consulted first and filled with new results
+        concurrency: Model requests in flight at once
+    
+    Returns:
+        One BatchResult per requirement, in input order
+    """
+    results = [BatchResult(text) for text in requirements]
+    model = adapter_model(adapter) if adapter else ''
+    pending: Dict[str, List[int]] = {}  # Cache key -> requirements sharing it
+    
+    for i, text in enumerate(requirements):
+        compiled = nl_compiler.compile(text)
+        if compiled.confident:
+            results[i].icp, results[i].source = compiled.icp, 'local'
+            continue
+        if adapter is None:
+            results[i].error = "Not compiled locally and no server-side LLM is configured"
+            continue
+        key = cache.key(text, model)
+        cached = cache.get(key)
+        if cached is not None:
+            results[i].icp, results[i].source = cached, 'cache'
+            continue
+        pending.setdefault(key, []).append(i)
+    
+    if not pending:
+        return results
+    
+    keys = list(pending)
+    texts = [requirements[pending[key][0]] for key in keys]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    def settle(position: int, outcome: Any) -> None:
+        for n, i in enumerate(pending[keys[position]]):
+            if isinstance(outcome, Exception):
+                results[i].error = str(outcome)
+            else:
+                results[i].icp = outcome if n == 0 else copy.deepcopy(outcome)
+                results[i].source = 'llm'
+    
+    async def convert_one(position: int) -> None:
+        async with semaphore:
+            try:
+                outcome = await cache.nl_to_icp(adapter, texts[position])
+            except Exception as e:
+                outcome = e
+        settle(position, outcome)
+    
+    async def convert_group(group: List[int]) -> None:
+        if len(group) == 1:
+            await convert_one(group[0])
+            return
+        async with semaphore:
+            try:
+                outcomes = await adapter.nl_to_icp_batch([texts[p] for p in group])
+            except Exception:
+                outcomes = None
+        if outcomes is None:
+            # The packed request failed as a whole; retry its requirements singly
+            await asyncio.gather(*(convert_one(p) for p in group))
+            return
+        for position, outcome in zip(group, outcomes):
+            if not isinstance(outcome, Exception):
+                try:
+                    cache.put(keys[position], outcome, model)
+                except ValueError as e:
+                    outcome = e  # Invalid ICPs are reported, not cached
+            settle(position, outcome)
+    
+    groups = pack_requirements(texts, max(1, getattr(adapter, 'batch_size', 1)))
+    await asyncio.gather(*(convert_group(group) for group in groups))
+    return results
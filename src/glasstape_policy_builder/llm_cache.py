@@ -0,0 +1,233 @@
+"""
+LLM Cache - Persistent NL→ICP response cache with single-flight calls.
+
+Server-side NL→ICP conversions are cached under a key built from the
+normalised requirement text, the model and the prompt version. Entries live
+in a small in-memory LRU backed by one JSON file per entry on disk, both
+subject to a TTL, so repeated requirements return without a model call
+even across restarts. Only ICPs that pass validation are stored, and disk
+entries are validated again when read: the default directory is private to
+the user, and files in a directory others can write, owned by another user,
+or no longer valid count as misses. Concurrent requests for the same key
+share a single in-flight call.
+"""
+
+import asyncio
+import copy
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .icp_validator import ICPValidator
+from .llm_adapter import PROMPT_VERSION, LLMAdapter
+from .private_dirs import ensure_private_dir, is_private_dir, user_work_dir
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = 'GLASSTAPE_LLM_CACHE_DIR'
+CACHE_TTL_ENV = 'GLASSTAPE_LLM_CACHE_TTL'
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+MEMORY_ENTRIES = 256
+DISK_ENTRIES = 2048
+
+
+def normalize_requirements(text: str) -> str:
+    """Canonical form of a requirement: Unicode-normalised, case-folded, single-spaced."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text)).strip().casefold()
+
+
+def adapter_model(adapter: LLMAdapter) -> str:
+    """Model name an adapter's responses are cached under."""
+    return getattr(adapter, 'model', '') or type(adapter).__name__
+
+
+class ICPCache:
+    """LRU + on-disk cache of NL→ICP conversions."""
+    
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        memory_entries: int = MEMORY_ENTRIES,
+        disk_entries: int = DISK_ENTRIES,
+    ):
+        """
+        Args:
+            directory: Where entries are stored; defaults to $GLASSTAPE_LLM_CACHE_DIR,
+                falling back to a per-user directory under the system temp directory
+            ttl_seconds: Entry lifetime; defaults to $GLASSTAPE_LLM_CACHE_TTL or 7 days
+            memory_entries: Entries kept in memory
+            disk_entries: Entries kept on disk (least recently used are removed)
+        """
+        directory = directory or os.getenv(CACHE_DIR_ENV)
+        self.directory = Path(directory).expanduser() if directory else user_work_dir("llm-cache")
+        if ttl_seconds is None:
+            try:
+                ttl_seconds = float(os.getenv(CACHE_TTL_ENV, DEFAULT_TTL_SECONDS))
+            except ValueError:
+                logger.warning(f"Ignoring invalid {CACHE_TTL_ENV}; using {DEFAULT_TTL_SECONDS}s")
+                ttl_seconds = DEFAULT_TTL_SECONDS
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        
+        self._memory: 'OrderedDict[str, tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'shared': 0}
+        self.validator = ICPValidator()
+    
+    def key(self, nl_requirements: str, model: str, prompt_version: str = PROMPT_VERSION) -> str:
+        """Cache key for a requirement under a model and prompt version."""
+        payload = json.dumps([normalize_requirements(nl_requirements), model, prompt_version])
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached ICP for a key, or None if absent or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    return copy.deepcopy(entry[1])
+                del self._memory[key]
+        
+        stored = self._read_disk(key)
+        if stored is None:
+            return None
+        path = self._path(key)
+        if now - stored['created'] >= self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)  # Disk eviction is by last use
+        except OSError:
+            pass
+        self._remember(key, stored['created'], stored['icp'])
+        return copy.deepcopy(stored['icp'])
+    
+    def put(self, key: str, icp: Dict[str, Any], model: str = '') -> None:
+        """
+        Store an ICP in memory and on disk.
+        
+        Raises:
+            ValueError: If the ICP does not validate; nothing is stored
+        """
+        self.validator.validate(icp)
+        created = time.time()
+        self._remember(key, created, copy.deepcopy(icp))
+        try:
+            ensure_private_dir(self.directory)
+            path = self._path(key)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps({
+                'created': created, 'model': model, 'prompt_version': PROMPT_VERSION, 'icp': icp,
+            }))
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except OSError as e:
+            logger.warning(f"Could not write LLM cache entry: {e}")
+    
+    def clear(self) -> None:
+        """Drop every entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+        for path in self.directory.glob('*.json'):
+            path.unlink(missing_ok=True)
+    
+    async def nl_to_icp(self, adapter: LLMAdapter, nl_requirements: str) -> Dict[str, Any]:
+        """
+        Convert requirements with the adapter, serving repeats from the cache.
+        
+        Concurrent calls with the same key wait for one shared model call.
+        Failures, including ICPs that fail validation, are not cached; every
+        waiter sees the same exception.
+        """
+        model = adapter_model(adapter)
+        key = self.key(nl_requirements, model)
+        
+        cached = self.get(key)
+        if cached is not None:
+            self.stats['hits'] += 1
+            return cached
+        
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.stats['shared'] += 1
+            return copy.deepcopy(await asyncio.shield(pending))
+        
+        self.stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            if inspect.iscoroutinefunction(adapter.nl_to_icp):
+                icp = await adapter.nl_to_icp(nl_requirements)
+            else:
+                # Blocking SDK call; keep the event loop responsive
+                icp = await asyncio.to_thread(adapter.nl_to_icp, nl_requirements)
+            self.put(key, icp, model)
+            future.set_result(icp)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._in_flight[key]
+        return copy.deepcopy(icp)
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+    
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """A disk entry this user wrote whose ICP still validates, else None."""
+        if not is_private_dir(self.directory):
+            return None
+        try:
+            fd = os.open(self._path(key), os.O_RDONLY | os.O_NOFOLLOW)
+        except OSError:
+            return None
+        try:
+            with os.fdopen(fd) as fh:
+                if os.fstat(fh.fileno()).st_uid != os.getuid():
+                    return None
+                stored = json.load(fh)
+            if not isinstance(stored, dict) or not isinstance(stored.get('created'), (int, float)):
+                return None
+            self.validator.validate(stored.get('icp'))
+        except (OSError, ValueError, TypeError, AttributeError):
+            return None
+        return stored
+    
+    def _remember(self, key: str, created: float, icp: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[key] = (created, icp)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+    
+    def _evict_disk(self) -> None:
+        paths = list(self.directory.glob('*.json'))
+        if len(paths) <= self.disk_entries:
+            return
+        by_use = sorted(paths, key=lambda p: p.stat().st_mtime if p.exists() else 0)
+        for path in by_use[:len(paths) - self.disk_entries]:
+            path.unlink(missing_ok=True)
+
+
+# Global cache instance (nothing touches disk until first use)
+icp_cache = ICPCache()
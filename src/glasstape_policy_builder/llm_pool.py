@@ -0,0 +1,203 @@
+"""
+LLM Pool - Route NL→ICP requests across providers.
+
+Every configured provider gets its own adapter (and so its own connection
+pool), a concurrency limit and a window of recent latencies. Requests go
+to the provider expected to answer soonest, and fail over to the next one
+on error. A provider that fails is ranked last for a backoff that doubles
+with each consecutive error (a circuit breaker), then tried again; a
+success closes the circuit. With hedging on, a request still running after
+the provider's p95 latency is sent again (to the next provider, or the same
+one if it is alone) and the first answer wins.
+"""
+
+import asyncio
+import inspect
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from .llm_adapter import DEFAULT_CONCURRENCY, LLMAdapter
+
+
+LATENCY_WINDOW = 256
+# Latency samples needed before a provider's p95 is trusted for hedging
+MIN_HEDGE_SAMPLES = 20
+# Circuit breaker backoff after consecutive errors: 1 s, 2 s, 4 s ... up to 60 s
+BREAKER_BASE_BACKOFF = 1.0
+BREAKER_MAX_BACKOFF = 60.0
+
+_clock = time.monotonic  # Patched in tests
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of some samples (0 if there are none)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class Provider:
+    """One adapter in the pool, with its limit and statistics."""
+    
+    def __init__(self, name: str, adapter: LLMAdapter, max_concurrency: int):
+        self.name = name
+        self.adapter = adapter
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.errors = 0
+        self.hedges = 0
+        self.in_flight = 0
+        self.consecutive_errors = 0
+        self.open_until = 0.0
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limit for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.max_concurrency), loop
+        return self._semaphore
+    
+    @property
+    def circuit_open(self) -> bool:
+        """Whether the provider is backing off after errors."""
+        return _clock() < self.open_until
+    
+    def expected_latency(self) -> float:
+        """Median latency scaled by current load; 0 until measured, so new providers get tried."""
+        return percentile(list(self.latencies), 0.5) * (1 + self.in_flight / self.max_concurrency)
+    
+    def record_success(self, latency: float) -> None:
+        """Record a latency sample and close the circuit."""
+        self.latencies.append(latency)
+        self.consecutive_errors = 0
+        self.open_until = 0.0
+    
+    def record_error(self) -> None:
+        """Count an error and open the circuit for the next backoff period."""
+        self.errors += 1
+        self.consecutive_errors += 1
+        backoff = BREAKER_BASE_BACKOFF * 2 ** min(self.consecutive_errors - 1, 16)
+        self.open_until = _clock() + min(BREAKER_MAX_BACKOFF, backoff)
+    
+    def hedge_after(self) -> Optional[float]:
+        """Seconds after which to hedge a request, or None without enough samples."""
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        return percentile(list(self.latencies), 0.95)
+    
+    def metrics(self) -> Dict[str, Any]:
+        samples = list(self.latencies)
+        return {
+            'model': getattr(self.adapter, 'model', ''),
+            'calls': self.calls,
+            'errors': self.errors,
+            'hedges': self.hedges,
+            'in_flight': self.in_flight,
+            'circuit_open': self.circuit_open,
+            'p50_ms': round(percentile(samples, 0.5) * 1000, 1),
+            'p95_ms': round(percentile(samples, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(samples, 0.99) * 1000, 1),
+        }
+
+
+class AdapterPool(LLMAdapter):
+    """An LLMAdapter that spreads calls over several providers."""
+    
+    def __init__(
+        self,
+        adapters: List[Tuple[str, LLMAdapter]],
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        hedge: bool = False,
+    ):
+        """
+        Args:
+            adapters: (provider name, adapter) pairs, in order of preference
+            max_concurrency: Requests in flight per provider
+            hedge: Re-send requests that run past the provider's p95 latency
+        """
+        if not adapters:
+            raise ValueError("AdapterPool needs at least one adapter")
+        self.providers = [Provider(name, adapter, max(1, max_concurrency)) for name, adapter in adapters]
+        self.hedge = hedge
+        # Cache entries are shared by whichever provider answers
+        self.model = '+'.join(getattr(adapter, 'model', '') or type(adapter).__name__ for _, adapter in adapters)
+        self.batch_size = min(getattr(adapter, 'batch_size', 1) for _, adapter in adapters)
+    
+    async def nl_to_icp(self, nl_requirements: str) -> dict:
+        return await self._call(lambda adapter: _invoke(adapter.nl_to_icp, nl_requirements))
+    
+    async def nl_to_icp_batch(self, requirements: List[str]) -> List[Union[dict, Exception]]:
+        return await self._call(lambda adapter: adapter.nl_to_icp_batch(requirements))
+    
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider call counts and latency percentiles."""
+        return {provider.name: provider.metrics() for provider in self.providers}
+    
+    def _ranked(self) -> List[Provider]:
+        # Providers backing off go last, so they are only tried when every other one failed.
+        # Stable: ties keep preference order
+        return sorted(self.providers, key=lambda provider: (provider.circuit_open, provider.expected_latency()))
+    
+    async def _call(self, invoke: Callable[[LLMAdapter], Awaitable[Any]]) -> Any:
+        ranked = self._ranked()
+        error: Optional[BaseException] = None
+        for i, provider in enumerate(ranked):
+            backup = ranked[i + 1] if i + 1 < len(ranked) else provider
+            try:
+                return await self._attempt(provider, backup, invoke)
+            except Exception as e:
+                error = e  # Fail over to the next provider
+        raise error
+    
+    async def _attempt(self, provider: Provider, backup: Provider, invoke) -> Any:
+        delay = provider.hedge_after() if self.hedge else None
+        if delay is None:
+            return await self._run(provider, invoke)
+        
+        tasks = {asyncio.create_task(self._run(provider, invoke))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                provider.hedges += 1
+                tasks.add(asyncio.create_task(self._run(backup, invoke)))
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _run(self, provider: Provider, invoke) -> Any:
+        async with provider.semaphore:
+            provider.calls += 1
+            provider.in_flight += 1
+            start = time.perf_counter()
+            try:
+                result = await invoke(provider.adapter)
+            except Exception:
+                provider.record_error()
+                raise
+            finally:
+                provider.in_flight -= 1
+            provider.record_success(time.perf_counter() - start)
+            return result
+
+
+async def _invoke(method: Callable[[str], Any], argument: str) -> Any:
+    if inspect.iscoroutinefunction(method):
+        return await method(argument)
+    # Blocking adapter; keep the event loop responsive
+    return await asyncio.to_thread(method, argument)
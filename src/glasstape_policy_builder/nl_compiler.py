@@ -0,0 +1,432 @@
+"""
+Rule-Based NL Compiler - Deterministic NL → ICP for common guardrail shapes.
+
+Recognizes the phrasing used by the policy templates (amount caps, cumulative
+limits, rate limits, sanctions screening, role restrictions and topic
+declarations) and builds a complete ICP with rules and tests, without a model
+call. Requirements containing anything it does not understand are reported
+as not confident so callers can fall back to an LLM.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .icp_validator import ICPValidator
+from .topic_extractor import TopicExtractor, topic_extractor
+
+
+ATTR = "request.resource.attr"
+
+# Verbs understood after "Allow <subject> to ..."; mapped to Cerbos actions
+ACTION_VERBS = {
+    "execute": "execute", "make": "execute", "send": "execute", "process": "execute",
+    "submit": "execute", "initiate": "execute", "read": "read", "view": "read",
+    "access": "read", "query": "read", "download": "read", "export": "export",
+    "invoke": "invoke", "call": "invoke", "modify": "modify", "update": "update",
+    "change": "modify", "create": "create", "delete": "delete", "approve": "approve",
+    "write": "write",
+}
+
+# Subjects that describe every caller and therefore imply no role restriction
+GENERIC_SUBJECTS = {"ai agents", "agents", "ai agent", "agent", "users", "anyone", "everyone", "callers"}
+
+# Words that end the object phrase of an allow clause
+_OBJECT_STOP = {
+    "up", "under", "below", "over", "above", "for", "with", "of", "per", "to", "from",
+    "at", "if", "when", "that", "only", "not", "less", "no", "more", "within", "on",
+    "in", "by", "and", "or", "but", "maximum", "max", "limited", "exceeding",
+}
+
+# Words that carry no policy meaning once the recognizers have run
+_FILLER = {
+    "a", "an", "the", "to", "and", "or", "of", "for", "all", "any", "only", "be", "must",
+    "should", "shall", "can", "may", "will", "is", "are", "with", "that", "this", "their",
+    "its", "per", "each", "every", "please", "also", "always", "content", "topics",
+    "topic", "related", "requests", "about", "discussion", "discussions", "material",
+}
+
+_AMOUNT = r"\$\s?(?P<amount>\d[\d,]*(?:\.\d+)?)"
+
+_AMOUNT_CAP = re.compile(
+    r"(?P<op>up to|at most|no more than|not exceeding|not to exceed|maximum of|max of|"
+    r"maximum|max|limit of|limited to|under|below|less than|over|above|more than|exceeding)"
+    r"\s+" + _AMOUNT
+)
+_INCLUSIVE_OPS = {"up to", "at most", "no more than", "not exceeding", "not to exceed",
+                  "maximum of", "max of", "maximum", "max", "limit of", "limited to"}
+_EXCLUSIVE_OPS = {"under", "below", "less than"}
+# In a blocking sentence only these bound what stays allowed ("block payments over $X");
+# "block payments under $X" sets a lower bound the compiler does not model
+_BLOCK_ABOVE_OPS = {"over", "above", "more than", "exceeding"}
+
+_CUMULATIVE = re.compile(
+    r"(?:limit\s+)?(?:the\s+)?cumulative\s+(?P<period>hourly|daily|weekly|monthly)\s+"
+    r"(?:amount|total|spend|spending|volume)\s+(?:to|at|of|under)\s+" + _AMOUNT
+)
+
+_RATE = re.compile(
+    r"(?:(?:maximum|max|at most|up to|no more than|limit(?:ed)?(?:\s+to)?|only)\s+(?:of\s+)?)?"
+    r"(?P<count>\d+)\s+(?P<noun>transactions?|requests?|calls?|invocations?|payments?|"
+    r"exports?|operations?|queries|query)\s+(?:per|every|each|an?|in|within)\s+"
+    r"(?:(?P<window>\d+)\s+)?(?P<unit>seconds?|minutes?|hours?|days?)"
+)
+
+_SANCTIONS = re.compile(
+    r"(?:block|deny|reject|prohibit|screen(?:\s+out)?)\s+(?:payments?\s+to\s+|transactions?\s+with\s+)?"
+    r"sanction(?:ed|s)?\s+(?:entities|entity|recipients?|parties|party|countries|vendors?)"
+)
+
+_FAILED_ATTEMPTS = re.compile(
+    r"(?:block|lock|deny)\s+(?:access\s+)?after\s+(?P<count>\d+)\s+failed\s+(?:login\s+)?attempts?"
+)
+
+_ROLE_RESTRICTION = re.compile(
+    r"(?:restrict(?:ed)?|limit(?:ed)?)\s+(?:access\s+)?to\s+(?:the\s+)?"
+    r"(?P<roles>[a-z_]+(?:(?:\s*,\s*|\s+(?:and|or)\s+)[a-z_]+)*)\s+roles?"
+)
+
+_TOPIC_DECLARATION = re.compile(r"^(?:block(?:ed)?\s+)?topics\s*:.*$")
+
+_BLOCK_LEAD = re.compile(r"^(?:block|deny|never allow|prohibit|disallow|reject)\b")
+
+_ONLY_SUBJECT = re.compile(r"^only\s+(?P<subject>.+?)\s+(?:can|may|are allowed to|is allowed to)\s+")
+
+_ALLOW_LEAD = re.compile(r"^(?:allow|permit|let|enable)\s+")
+
+_TOKEN = re.compile(r"\$?\d[\d,]*(?:\.\d+)?|[a-z_]+")
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.;!?])\s+|\n+|;\s*")
+
+_UNIT_SUFFIX = {"second": "s", "minute": "m", "hour": "h", "day": "d"}
+
+
+@dataclass
+class CompiledPolicy:
+    """Result of a rule-based compilation attempt."""
+    icp: Optional[Dict[str, Any]] = None
+    confidence: float = 0.0
+    matched: List[str] = field(default_factory=list)
+    unmatched: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def confident(self) -> bool:
+        """True when every clause was understood and the ICP validated."""
+        return self.icp is not None and self.confidence >= 1.0 and not self.unmatched
+
+
+@dataclass
+class _Facts:
+    """Policy facts collected from the recognized clauses."""
+    action: Optional[str] = None
+    resource: Optional[str] = None
+    roles: List[str] = field(default_factory=list)
+    amount_cap: Optional[Tuple[float, bool]] = None  # (limit, inclusive)
+    cumulative: List[Tuple[str, float]] = field(default_factory=list)
+    rates: List[Tuple[str, int]] = field(default_factory=list)
+    sanctions: bool = False
+    failed_attempts: Optional[int] = None
+
+
+class RuleBasedCompiler:
+    """Compile common guardrail phrasing into ICP without an LLM."""
+
+    def __init__(self, extractor: Optional[TopicExtractor] = None):
+        self.extractor = extractor or topic_extractor
+        self.validator = ICPValidator()
+
+    def compile(self, nl_requirements: str) -> CompiledPolicy:
+        """
+        Compile natural-language requirements into an ICP.
+
+        Args:
+            nl_requirements: Plain English guardrail description
+
+        Returns:
+            CompiledPolicy; check ``confident`` before using the ICP
+        """
+        result = CompiledPolicy()
+        facts = _Facts()
+        sentences = [s.strip().rstrip(".") for s in _SENTENCE_SPLIT.split(nl_requirements) if s.strip()]
+
+        for sentence in sentences:
+            if self._compile_sentence(sentence.lower(), facts):
+                result.matched.append(sentence)
+            else:
+                result.unmatched.append(sentence)
+
+        if not sentences:
+            return result
+        result.confidence = len(result.matched) / len(sentences)
+
+        if not facts.resource:
+            result.error = "No 'Allow <who> to <action> <resource>' clause found"
+            return result
+
+        extraction = self.extractor.extract(nl_requirements)
+        icp = _build_icp(nl_requirements, facts, extraction.topics, extraction.blocked_topics,
+                         extraction.safety_category)
+        try:
+            self.validator.validate(icp)
+        except ValueError as e:
+            result.error = str(e)
+            return result
+
+        result.icp = icp
+        return result
+
+    def _compile_sentence(self, sentence: str, facts: _Facts) -> bool:
+        """Run all recognizers over a sentence; True if nothing meaningful is left."""
+        if _TOPIC_DECLARATION.match(sentence):
+            return True  # Handled by the topic extractor
+
+        sentence = _ONLY_SUBJECT.sub(r"allow \g<subject> to ", sentence)
+        consumed: List[Tuple[int, int]] = []
+
+        def claim(match: re.Match) -> bool:
+            span = match.span()
+            if any(start < span[1] and span[0] < end for start, end in consumed):
+                return False
+            consumed.append(span)
+            return True
+
+        for match in _CUMULATIVE.finditer(sentence):
+            if claim(match):
+                facts.cumulative.append((match.group("period"), _number(match.group("amount"))))
+
+        for match in _RATE.finditer(sentence):
+            if claim(match):
+                window = match.group("window") or "1"
+                unit = match.group("unit").rstrip("s")
+                noun = _singular(match.group("noun"))
+                facts.rates.append((f"{noun}_count_{window}{_UNIT_SUFFIX[unit]}", int(match.group("count"))))
+
+        blocking = bool(_BLOCK_LEAD.match(sentence))
+        for match in _AMOUNT_CAP.finditer(sentence):
+            op = match.group("op")
+            if blocking:
+                if op not in _BLOCK_ABOVE_OPS:
+                    continue  # Left unmatched, so the result is not confident
+                inclusive = True
+            elif op in _INCLUSIVE_OPS:
+                inclusive = True
+            elif op in _EXCLUSIVE_OPS:
+                inclusive = False
+            else:
+                continue  # "over $X" without a blocking verb is ambiguous
+            if claim(match):
+                cap = (_number(match.group("amount")), inclusive)
+                # Several caps all apply, so the tightest one wins ($50 before $100, < before <=)
+                if facts.amount_cap is None or cap < facts.amount_cap:
+                    facts.amount_cap = cap
+
+        for match in _SANCTIONS.finditer(sentence):
+            if claim(match):
+                facts.sanctions = True
+
+        for match in _FAILED_ATTEMPTS.finditer(sentence):
+            if claim(match):
+                facts.failed_attempts = int(match.group("count"))
+
+        for match in _ROLE_RESTRICTION.finditer(sentence):
+            if claim(match):
+                roles = re.split(r"\s*,\s*|\s+(?:and|or)\s+", match.group("roles"))
+                facts.roles.extend(_snake(_singular(r)) for r in roles if r)
+
+        allow = _ALLOW_LEAD.match(sentence)
+        if allow:
+            end = self._parse_allow(sentence, allow.end(), facts)
+            consumed.append((0, end))
+        elif blocking:
+            # "Block recipes and adult content" - blocked topics via the extractor
+            mentions = self.extractor.mentions(sentence)
+            if mentions:
+                consumed.append(_BLOCK_LEAD.match(sentence).span())
+                consumed.extend((m.start, m.end) for m in mentions)
+
+        leftover = [
+            token.group(0) for token in _TOKEN.finditer(sentence)
+            if not any(start <= token.start() < end for start, end in consumed)
+            and token.group(0) not in _FILLER
+        ]
+        return bool(consumed) and not leftover
+
+    def _parse_allow(self, sentence: str, offset: int, facts: _Facts) -> int:
+        """Parse '<subject> to <verb> <object>' after an allow word; returns end offset."""
+        words = [(m.group(0), m.start(), m.end()) for m in re.finditer(r"[a-z_]+", sentence[offset:])]
+        words = [(w, offset + s, offset + e) for w, s, e in words]
+
+        verb_index = None
+        for i in range(1, len(words)):
+            if words[i - 1][0] == "to" and words[i][0] in ACTION_VERBS:
+                verb_index = i
+                break
+
+        if verb_index is not None:
+            subject = " ".join(w for w, _, _ in words[:verb_index - 1] if w not in ("the", "a", "an"))
+            if subject and subject not in GENERIC_SUBJECTS:
+                facts.roles.append(_snake(_singular(subject)))
+            facts.action = ACTION_VERBS[words[verb_index][0]]
+            object_start = verb_index + 1
+        else:
+            object_start = 0
+
+        object_words = []
+        end = words[object_start - 1][2] if object_start else offset
+        for word, _, word_end in words[object_start:]:
+            if word in _OBJECT_STOP or len(object_words) == 2:
+                break
+            if word not in ("the", "a", "an"):
+                object_words.append(word)
+            end = word_end
+
+        if object_words:
+            facts.resource = _snake("_".join(object_words[:-1] + [_singular(object_words[-1])]))
+            facts.action = facts.action or "execute"
+        return end
+
+
+def _build_icp(
+    nl_requirements: str,
+    facts: _Facts,
+    topics: List[str],
+    blocked_topics: List[str],
+    safety_category: Optional[str],
+) -> Dict[str, Any]:
+    """Assemble rules and tests from the collected facts."""
+    conditions: List[str] = []
+    ok_attrs: Dict[str, Any] = {}
+    negatives: List[Tuple[str, str, Dict[str, Any]]] = []  # (name, category, attr overrides)
+    boundaries: List[Tuple[str, Dict[str, Any], str]] = []  # (name, attr overrides, expected)
+
+    amount_limits = []
+    if facts.amount_cap:
+        limit, inclusive = facts.amount_cap
+        conditions.append(f"{ATTR}.amount > 0")
+        conditions.append(f"{ATTR}.amount {'<=' if inclusive else '<'} {_format(limit)}")
+        amount_limits.append(limit)
+        negatives.append(("amount_over_limit", "negative", {"amount": _format(limit + 1)}))
+        boundaries.append(("amount_at_limit", {"amount": _format(limit)},
+                           "EFFECT_ALLOW" if inclusive else "EFFECT_DENY"))
+        boundaries.append(("non_positive_amount", {"amount": 0}, "EFFECT_DENY"))
+
+    for period, limit in facts.cumulative:
+        attr = f"cumulative_amount_{period}"
+        conditions.append(f"{ATTR}.{attr} + {ATTR}.amount <= {_format(limit)}")
+        amount_limits.append(limit)
+        ok_attrs[attr] = 0
+        negatives.append((f"cumulative_{period}_limit_exceeded", "negative", {attr: _format(limit)}))
+
+    if amount_limits:
+        ok_attrs["amount"] = _format(min(amount_limits) / 2)
+
+    for attr, limit in facts.rates:
+        conditions.append(f"{ATTR}.{attr} < {limit}")
+        ok_attrs[attr] = 0
+        negatives.append((f"{attr}_exceeded", "negative", {attr: limit}))
+
+    if facts.sanctions:
+        conditions.append(f"!({ATTR}.recipient in {ATTR}.sanctioned_entities)")
+        ok_attrs["recipient"] = "vendor@example.com"
+        ok_attrs["sanctioned_entities"] = ["blocked@example.com"]
+        negatives.append(("sanctioned_recipient_denied", "negative", {"recipient": "blocked@example.com"}))
+
+    if facts.failed_attempts is not None:
+        conditions.append(f"{ATTR}.failed_attempts < {facts.failed_attempts}")
+        ok_attrs["failed_attempts"] = 0
+        negatives.append(("too_many_failed_attempts", "negative", {"failed_attempts": facts.failed_attempts}))
+
+    if topics or blocked_topics:
+        ok_attrs["topics"] = topics[:1]
+    for topic in blocked_topics[:1]:
+        negatives.append((f"blocked_topic_{topic}", "adversarial", {"topics": topics[:1] + [topic]}))
+
+    roles = list(dict.fromkeys(facts.roles))
+    resource = facts.resource
+    action = facts.action
+    principal = {"id": "agent-1", "roles": roles[:1]}
+
+    def test(name: str, category: str, expected: str, attrs: Dict[str, Any],
+             actions: Optional[List[str]] = None, test_principal: Optional[Dict[str, Any]] = None):
+        return {
+            "name": name,
+            "category": category,
+            "input": {
+                "principal": test_principal or principal,
+                "resource": {"id": f"{resource}-1", "attr": {**ok_attrs, **attrs}},
+                "actions": actions or [action],
+            },
+            "expected": expected,
+        }
+
+    tests = [test("allowed_request", "positive", "EFFECT_ALLOW", {})]
+    tests += [test(name, category, "EFFECT_DENY", attrs) for name, category, attrs in negatives]
+    tests += [test(name, "boundary", expected, attrs) for name, attrs, expected in boundaries]
+    if roles:
+        tests.append(test("unauthorized_role_denied", "negative", "EFFECT_DENY", {},
+                          test_principal={"id": "agent-2", "roles": ["guest"]}))
+    other_action = "delete" if action != "delete" else "create"
+    tests.append(test("unlisted_action_denied", "negative", "EFFECT_DENY", {}, actions=[other_action]))
+
+    allow_rule: Dict[str, Any] = {
+        "actions": [action],
+        "effect": "EFFECT_ALLOW",
+        "conditions": conditions,
+        "description": f"Allow {action} on {resource} within the stated limits",
+    }
+    if roles:
+        allow_rule["roles"] = roles
+
+    description = " ".join(nl_requirements.split())
+    metadata: Dict[str, Any] = {
+        "name": f"{resource}_policy",
+        "description": description if len(description) <= 200 else description[:197] + "...",
+        "resource": resource,
+        "topics": topics,
+        "blocked_topics": blocked_topics,
+    }
+    if safety_category:
+        metadata["safety_category"] = safety_category
+
+    return {
+        "version": "1.0.0",
+        "metadata": metadata,
+        "policy": {
+            "resource": resource,
+            "version": "1.0.0",
+            "rules": [
+                allow_rule,
+                {"actions": ["*"], "effect": "EFFECT_DENY", "conditions": [],
+                 "description": "Default deny all other actions"},
+            ],
+        },
+        "tests": tests,
+    }
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _format(value: float) -> Any:
+    """Render whole numbers as ints so CEL comparisons and YAML stay tidy."""
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("sses"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _snake(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+# Global compiler instance
+nl_compiler = RuleBasedCompiler()
@@ -0,0 +1,327 @@
+"""
+Policy Index - Cross-policy conflict detection.
+
+Rules from many policies are indexed by (resource, action, role). Adding a
+policy only compares its own rules against the entries already under the
+same keys, so a repository can be indexed incrementally instead of
+comparing every policy pair.
+
+Policies generated through the MCP tools go into an index per client
+session, so one client never sees another's policy names. Session indexes
+keep only their most recently added policies.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Literal, Optional, Set, Tuple
+
+from . import cel
+from .policy_model import CATCH_ALL, PolicyModel
+from .rule_analysis import ConditionSummary, condition_to_cel, summarize
+
+
+ConflictKind = Literal['conflicting_effect', 'duplicate_rule', 'version_collision']
+
+IndexKey = Tuple[str, str, str]
+
+# Policies a session index keeps; the least recently added are dropped first
+SESSION_POLICIES = 256
+
+
+def rule_entries(policy: PolicyModel) -> List[Dict[str, Any]]:
+    """
+    Describe a policy's rules for indexing.
+    
+    Conditions are rendered as canonical CEL so equal conditions compare
+    equal; the descriptors are plain data and can cross process boundaries.
+    Unconditional catch-all denies are default-deny boilerplate and are
+    left out.
+    """
+    entries = []
+    for position, rule in enumerate(policy.rules):
+        if rule.is_catch_all_deny:
+            continue
+        condition = ''
+        parsed = True
+        if rule.condition is not None:
+            try:
+                condition = cel.to_cel(condition_to_cel(rule.condition))
+            except cel.CELSyntaxError:
+                condition = '\n'.join(rule.expressions)
+                parsed = False
+        entries.append({
+            'rule': position,
+            'actions': rule.actions or [CATCH_ALL],
+            'roles': (rule.roles + [f"derived:{r}" for r in rule.derived_roles]) or [CATCH_ALL],
+            'effect': rule.effect,
+            'condition': condition,
+            'parsed': parsed,
+        })
+    return entries
+
+
+@dataclass
+class IndexedRule:
+    """One (action, role) expansion of a policy rule."""
+    policy_id: str
+    resource: str
+    version: str
+    rule: int
+    action: str
+    role: str
+    effect: str
+    condition: str
+    parsed: bool = True
+    _summary: Optional[ConditionSummary] = field(default=None, repr=False)
+    
+    @property
+    def summary(self) -> Optional[ConditionSummary]:
+        """Constraint summary, computed on first use (None if unparseable)."""
+        if self._summary is None and self.parsed:
+            self._summary = summarize(cel.parse(self.condition) if self.condition else None)
+        return self._summary
+    
+    def overlaps(self, other: 'IndexedRule') -> bool:
+        """False only if the two conditions are provably disjoint."""
+        if self.condition == other.condition:
+            return True
+        if self.summary is None or other.summary is None:
+            return True
+        return not self.summary.disjoint(other.summary)
+
+
+@dataclass(frozen=True)
+class PolicyConflict:
+    """A disagreement or duplication between two policies."""
+    kind: ConflictKind
+    resource: str
+    policies: Tuple[str, str]
+    message: str
+    action: str = ''
+    role: str = ''
+
+
+@dataclass
+class _IndexedPolicy:
+    resource: str
+    version: str
+    digest: str
+    keys: Set[IndexKey]
+
+
+class PolicyIndex:
+    """Incremental (resource, action, role) index over many policies."""
+    
+    def __init__(self, max_policies: Optional[int] = None):
+        """
+        Args:
+            max_policies: Keep at most this many policies, dropping the least
+                recently added (default: unbounded)
+        """
+        self.max_policies = max_policies
+        self._entries: Dict[IndexKey, List[IndexedRule]] = {}
+        self._keys_by_resource: Dict[str, Set[IndexKey]] = {}
+        self._policies: Dict[str, _IndexedPolicy] = {}  # Insertion ordered, oldest first
+        self._versions: Dict[Tuple[str, str], Dict[str, None]] = {}  # Insertion ordered
+        self._conflicts: Dict[str, List[PolicyConflict]] = {}
+        # Policy -> policies whose conflict lists mention it, so removal skips the rest
+        self._mentioned_by: Dict[str, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._policies)
+    
+    def __contains__(self, policy_id: str) -> bool:
+        return policy_id in self._policies
+    
+    def add_policy(self, policy_id: str, policy: PolicyModel, digest: str = '') -> List[PolicyConflict]:
+        """Index a parsed policy; see add()."""
+        return self.add(policy_id, policy.resource or '', policy.version or 'default', rule_entries(policy), digest)
+    
+    def add(
+        self,
+        policy_id: str,
+        resource: str,
+        version: str,
+        rules: List[Dict[str, Any]],
+        digest: str = '',
+    ) -> List[PolicyConflict]:
+        """
+        Index one policy's rules (replacing any previous copy of it).
+        
+        Args:
+            policy_id: Stable identifier, e.g. the file path
+            resource: Resource kind
+            version: Policy version
+            rules: Descriptors from rule_entries()
+            digest: Content hash; identical content under the same
+                resource and version is reported as a duplicate policy
+        
+        Returns:
+            Conflicts between this policy and those already indexed
+        """
+        self.remove(policy_id)
+        digest = digest or hashlib.sha256(repr((resource, version, rules)).encode()).hexdigest()
+        indexed = _IndexedPolicy(resource, version, digest, set())
+        conflicts: List[PolicyConflict] = []
+        
+        # Duplicates are reported against the first policy that had them, so
+        # n copies produce n - 1 reports rather than every pair
+        other_id = next(iter(self._versions.get((resource, version), {})), None)
+        if other_id is not None:
+            identical = self._policies[other_id].digest == digest
+            conflicts.append(PolicyConflict(
+                'version_collision', resource, (other_id, policy_id),
+                f"{policy_id} and {other_id} both define {resource} version {version}"
+                + (" with identical content" if identical else ""),
+            ))
+        
+        new_entries = [
+            IndexedRule(
+                policy_id, resource, version, entry['rule'], action, role,
+                entry['effect'], entry['condition'], entry.get('parsed', True),
+            )
+            for entry in rules
+            for action in entry['actions']
+            for role in entry['roles']
+        ]
+        
+        # Report each pair of rules once, not once per (action, role) expansion
+        reported: Set[Tuple[str, int, int]] = set()
+        duplicated: Set[int] = set()
+        for entry in new_entries:
+            for existing in self._candidates(entry):
+                pair = (existing.policy_id, existing.rule, entry.rule)
+                if pair in reported:
+                    continue
+                conflict = self._compare(existing, entry)
+                if conflict is None or (conflict.kind == 'duplicate_rule' and entry.rule in duplicated):
+                    continue
+                if conflict.kind == 'duplicate_rule':
+                    duplicated.add(entry.rule)
+                reported.add(pair)
+                conflicts.append(conflict)
+        
+        for entry in new_entries:
+            key = (resource, entry.action, entry.role)
+            self._entries.setdefault(key, []).append(entry)
+            self._keys_by_resource.setdefault(resource, set()).add(key)
+            indexed.keys.add(key)
+        
+        self._policies[policy_id] = indexed
+        self._versions.setdefault((resource, version), {})[policy_id] = None
+        self._conflicts[policy_id] = conflicts
+        for conflict in conflicts:
+            for other_id in conflict.policies:
+                if other_id != policy_id:
+                    self._mentioned_by.setdefault(other_id, set()).add(policy_id)
+        
+        if self.max_policies is not None:
+            while len(self._policies) > self.max_policies:
+                self.remove(next(iter(self._policies)))
+        return conflicts
+    
+    def remove(self, policy_id: str) -> None:
+        """Drop a policy and every conflict that involves it."""
+        indexed = self._policies.pop(policy_id, None)
+        if indexed is None:
+            return
+        for key in indexed.keys:
+            remaining = [e for e in self._entries[key] if e.policy_id != policy_id]
+            if remaining:
+                self._entries[key] = remaining
+            else:
+                del self._entries[key]
+                self._keys_by_resource[indexed.resource].discard(key)
+        self._versions[(indexed.resource, indexed.version)].pop(policy_id, None)
+        for conflict in self._conflicts.pop(policy_id, ()):
+            for other_id in conflict.policies:
+                self._mentioned_by.get(other_id, set()).discard(policy_id)
+        for holder_id in self._mentioned_by.pop(policy_id, ()):
+            if holder_id in self._conflicts:
+                self._conflicts[holder_id] = [c for c in self._conflicts[holder_id] if policy_id not in c.policies]
+    
+    def conflicts(self) -> List[PolicyConflict]:
+        """All conflicts currently in the index."""
+        return [c for conflicts in self._conflicts.values() for c in conflicts]
+    
+    def _candidates(self, entry: IndexedRule):
+        """Indexed rules from other policies that apply to some of the same requests."""
+        resource = entry.resource
+        if entry.action != CATCH_ALL and entry.role != CATCH_ALL:
+            keys = [
+                (resource, entry.action, entry.role),
+                (resource, CATCH_ALL, entry.role),
+                (resource, entry.action, CATCH_ALL),
+                (resource, CATCH_ALL, CATCH_ALL),
+            ]
+        else:
+            # Wildcards meet every key of the resource they can match
+            keys = [
+                key for key in self._keys_by_resource.get(resource, ())
+                if entry.action in (CATCH_ALL, key[1]) or key[1] == CATCH_ALL
+                if entry.role in (CATCH_ALL, key[2]) or key[2] == CATCH_ALL
+            ]
+        for key in keys:
+            for existing in self._entries.get(key, ()):
+                if existing.policy_id != entry.policy_id:
+                    yield existing
+    
+    def _compare(self, existing: IndexedRule, entry: IndexedRule) -> Optional[PolicyConflict]:
+        same_scope = existing.action == entry.action and existing.role == entry.role
+        where = f"{entry.resource} {entry.action} for role {entry.role}"
+        if existing.effect == entry.effect:
+            if same_scope and existing.condition == entry.condition:
+                return PolicyConflict(
+                    'duplicate_rule', entry.resource, (existing.policy_id, entry.policy_id),
+                    f"Rule {entry.rule + 1} of {entry.policy_id} (v{entry.version}) duplicates "
+                    f"rule {existing.rule + 1} of {existing.policy_id} (v{existing.version}) on {where}",
+                    entry.action, entry.role,
+                )
+            return None
+        if existing.overlaps(entry):
+            return PolicyConflict(
+                'conflicting_effect', entry.resource, (existing.policy_id, entry.policy_id),
+                f"{existing.policy_id} (v{existing.version}) has {existing.effect} but "
+                f"{entry.policy_id} (v{entry.version}) has {entry.effect} on {where} for overlapping conditions",
+                entry.action, entry.role,
+            )
+        return None
+
+
+# Policies generated outside any client session (direct tool calls)
+policy_index = PolicyIndex(SESSION_POLICIES)
+
+_session_indexes: 'weakref.WeakKeyDictionary[Any, PolicyIndex]' = weakref.WeakKeyDictionary()
+_session_lock = threading.Lock()
+_current: contextvars.ContextVar[Optional[PolicyIndex]] = contextvars.ContextVar(
+    "glasstape_policy_index", default=None
+)
+
+
+def session_index(session: Any) -> PolicyIndex:
+    """The index for a client session, created on first use and dropped with the session."""
+    with _session_lock:
+        index = _session_indexes.get(session)
+        if index is None:
+            index = _session_indexes[session] = PolicyIndex(SESSION_POLICIES)
+        return index
+
+
+@contextlib.contextmanager
+def indexing(index: Optional[PolicyIndex]) -> Iterator[None]:
+    """Make `index` the target of current_index() in this context."""
+    token = _current.set(index)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_index() -> PolicyIndex:
+    """The calling session's index, or the process-wide one outside a session."""
+    index = _current.get()
+    return policy_index if index is None else index
@@ -0,0 +1,179 @@
+"""
+Policy Model - Parse Cerbos policy YAML once into rules and CEL conditions.
+
+Analysis passes share this model instead of re-scanning the raw YAML, so
+descriptions, comments and test names cannot satisfy a security check.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Literal, Optional
+
+import yaml
+
+
+CATCH_ALL = '*'
+
+# libyaml's loader is several times faster on large policies when available
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# CEL string literals, so keyword checks only look at attribute names and calls
+_STRING_LITERAL = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'')
+
+
+@dataclass
+class Condition:
+    """A Cerbos condition node: a CEL expression or an all/any/none combinator."""
+    op: Literal['expr', 'all', 'any', 'none']
+    expr: Optional[str] = None
+    children: List['Condition'] = field(default_factory=list)
+    
+    def expressions(self) -> Iterator[str]:
+        """Yield every CEL expression in the tree, depth first."""
+        if self.expr is not None:
+            yield self.expr
+        for child in self.children:
+            yield from child.expressions()
+
+
+@dataclass
+class PolicyRule:
+    """A resource policy rule."""
+    actions: List[str]
+    effect: str
+    roles: List[str] = field(default_factory=list)
+    derived_roles: List[str] = field(default_factory=list)
+    name: Optional[str] = None
+    condition: Optional[Condition] = None
+    
+    @property
+    def expressions(self) -> List[str]:
+        """CEL expressions guarding this rule."""
+        return list(self.condition.expressions()) if self.condition else []
+    
+    @property
+    def is_conditional(self) -> bool:
+        return self.condition is not None
+    
+    @property
+    def is_catch_all_deny(self) -> bool:
+        """Unconditional deny of every action."""
+        return (
+            self.effect == 'EFFECT_DENY'
+            and CATCH_ALL in self.actions
+            and not self.is_conditional
+        )
+
+
+@dataclass
+class PolicyModel:
+    """Parsed resource policy."""
+    resource: Optional[str] = None
+    version: Optional[str] = None
+    rules: List[PolicyRule] = field(default_factory=list)
+    error: Optional[str] = None
+    
+    @classmethod
+    def parse(cls, policy_yaml: str) -> 'PolicyModel':
+        """
+        Parse Cerbos policy YAML.
+        
+        Malformed documents produce a model with ``error`` set and no rules
+        rather than raising.
+        """
+        try:
+            document = yaml.load(policy_yaml, Loader=YAML_LOADER)
+        except yaml.YAMLError as e:
+            return cls(error=f"Invalid YAML: {e}")
+        return cls.from_document(document)
+    
+    @classmethod
+    def from_document(cls, document: Any) -> 'PolicyModel':
+        """Build the model from an already loaded YAML/JSON document."""
+        if not isinstance(document, dict) or not isinstance(document.get('resourcePolicy'), dict):
+            return cls(error="Not a Cerbos resource policy (missing resourcePolicy)")
+        
+        body = document['resourcePolicy']
+        try:
+            rules = [_parse_rule(rule) for rule in body.get('rules') or []]
+        except ValueError as e:
+            return cls(resource=body.get('resource'), error=str(e))
+        
+        version = body.get('version')
+        return cls(
+            resource=body.get('resource'),
+            version=str(version) if version is not None else None,
+            rules=rules,
+        )
+    
+    @property
+    def expressions(self) -> List[str]:
+        """All CEL expressions in rule order."""
+        return [expr for rule in self.rules for expr in rule.expressions]
+    
+    @cached_property
+    def cel_text(self) -> str:
+        """All CEL expressions joined into one searchable string."""
+        return '\n'.join(self.expressions)
+    
+    @cached_property
+    def cel_identifiers(self) -> str:
+        """
+        CEL text with string literals removed and ``_``/``.`` split into words,
+        so ``attr.agent_txn_count_5m`` reads as ``attr agent txn count 5m``.
+        """
+        return re.sub(r'[_.]', ' ', _STRING_LITERAL.sub(' ', self.cel_text))
+    
+    def roles(self) -> List[str]:
+        """Roles granted by allow rules, in first-seen order."""
+        seen: Dict[str, None] = {}
+        for rule in self.rules:
+            if rule.effect == 'EFFECT_ALLOW':
+                for role in rule.roles + rule.derived_roles:
+                    seen.setdefault(role, None)
+        return list(seen)
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return [str(value)]
+
+
+def _parse_rule(rule: Any) -> PolicyRule:
+    if not isinstance(rule, dict):
+        raise ValueError(f"Rule must be a mapping, got: {rule!r}")
+    
+    condition = None
+    if rule.get('condition') is not None:
+        raw = rule['condition']
+        if not isinstance(raw, dict):
+            raise ValueError(f"Rule condition must be a mapping, got: {raw!r}")
+        if 'match' in raw:
+            condition = _parse_match(raw['match'])
+        elif 'script' in raw:
+            condition = Condition(op='expr', expr=str(raw['script']))
+    
+    return PolicyRule(
+        actions=_as_list(rule.get('actions')),
+        effect=str(rule.get('effect', '')),
+        roles=_as_list(rule.get('roles')),
+        derived_roles=_as_list(rule.get('derivedRoles')),
+        name=rule.get('name'),
+        condition=condition,
+    )
+
+
+def _parse_match(match: Any) -> Condition:
+    if isinstance(match, dict):
+        if 'expr' in match:
+            return Condition(op='expr', expr=str(match['expr']).strip())
+        for op in ('all', 'any', 'none'):
+            if op in match:
+                block = match[op] or {}
+                members = block.get('of') if isinstance(block, dict) else block
+                return Condition(op=op, children=[_parse_match(m) for m in members or []])
+    raise ValueError(f"Unsupported condition match: {match!r}")
@@ -0,0 +1,55 @@
+"""
+Private Dirs - Per-user work directories other local users cannot tamper with.
+
+The system temp directory is shared, so anything the server writes there and
+later trusts (taxonomy snapshots, LLM responses, reports) lives under
+<tmp>/glasstape-<uid>/ instead, created 0700. A directory is only trusted if
+this user owns it, no one else can write it, and no ancestor lets another
+user swap it out.
+"""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+
+def user_work_dir(name: str) -> Path:
+    """Per-user directory `name` under the system temp directory (not created)."""
+    return Path(tempfile.gettempdir()) / f"glasstape-{os.getuid()}" / name
+
+
+def is_private_dir(directory: Path) -> bool:
+    """Whether a directory is owned by this user, writable by no one else, and safely placed."""
+    uid = os.getuid()
+    try:
+        info = os.lstat(directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != uid or info.st_mode & 0o022:
+            return False
+        for parent in Path(directory).absolute().parents:
+            info = os.stat(parent)
+            # Ancestors may be shared only if, like /tmp, entries cannot be renamed by others
+            if info.st_uid not in (uid, 0):
+                return False
+            if info.st_mode & 0o022 and not info.st_mode & stat.S_ISVTX:
+                return False
+    except OSError:
+        return False
+    return True
+
+
+def ensure_private_dir(directory: Path) -> Path:
+    """
+    Create a directory (and missing parents) private to this user.
+    
+    Raises:
+        PermissionError: If the directory exists but is not private to this user
+    """
+    directory = Path(directory)
+    # Missing parents are created 0700 too, rather than with the umask's mode
+    missing = [path for path in (directory, *directory.parents) if not path.exists()]
+    for path in reversed(missing):
+        path.mkdir(mode=0o700, exist_ok=True)
+    if not is_private_dir(directory):
+        raise PermissionError(f"{directory} is not private to this user")
+    return directory
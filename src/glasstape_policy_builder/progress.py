@@ -0,0 +1,85 @@
+"""
+Progress - Stage notifications and partial results for long tool calls.
+
+When a client sends a progress token with a tool call, the tool handler
+binds a ProgressReporter for that request. Tools then call report_progress()
+as each stage finishes: the client gets an MCP progress notification, plus
+a log message carrying any partial content (e.g. the policy YAML while its
+tests still run). Both are tied to the request, so over HTTP they travel on
+the request's own stream. Without a token, report_progress() does nothing.
+"""
+
+import contextlib
+import contextvars
+import logging
+from typing import Any, Iterator, Optional
+
+
+logger = logging.getLogger(__name__)
+
+LOGGER_NAME = "glasstape.progress"
+
+_current: contextvars.ContextVar[Optional["ProgressReporter"]] = contextvars.ContextVar(
+    "glasstape_progress", default=None
+)
+
+
+class ProgressReporter:
+    """Send progress for one tool call over its MCP session."""
+    
+    def __init__(self, session: Any, progress_token: Any, request_id: Any = None):
+        self.session = session
+        self.progress_token = progress_token
+        self.request_id = request_id
+        self.progress = 0
+    
+    async def report(self, message: str, total: Optional[int] = None, partial: Optional[Any] = None) -> None:
+        """Count a completed stage and notify the client."""
+        self.progress += 1
+        await self.session.send_progress_notification(
+            self.progress_token,
+            self.progress,
+            total=total,
+            message=message,
+            related_request_id=self.request_id,
+        )
+        if partial is not None:
+            await self.session.send_log_message(
+                "info",
+                {"stage": message, "progress": self.progress, "content": partial},
+                logger=LOGGER_NAME,
+                related_request_id=self.request_id,
+            )
+
+
+def reporter_for_request(server: Any) -> Optional[ProgressReporter]:
+    """A reporter for the request being handled, if the client asked for progress."""
+    try:
+        context = server.request_context
+    except LookupError:
+        return None
+    token = getattr(context.meta, "progressToken", None) if context.meta else None
+    if token is None:
+        return None
+    return ProgressReporter(context.session, token, context.request_id)
+
+
+@contextlib.contextmanager
+def reporting(reporter: Optional[ProgressReporter]) -> Iterator[None]:
+    """Make `reporter` the target of report_progress() calls in this context."""
+    token = _current.set(reporter)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+async def report_progress(message: str, total: Optional[int] = None, partial: Optional[Any] = None) -> None:
+    """Report a finished stage of the current tool call; never fails the call."""
+    reporter = _current.get()
+    if reporter is None:
+        return
+    try:
+        await reporter.report(message, total, partial)
+    except Exception as e:
+        logger.debug(f"Dropping progress notification: {e}")
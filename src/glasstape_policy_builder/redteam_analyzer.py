@@ -1,12 +1,38 @@
 """
 Simple Red-Team Analyzer
 
-Performs 5 essential security checks on policies.
-Static analysis focused on common security anti-patterns.
+Runs a registry of security checks on policies. Built-in checks cover
+common security anti-patterns; organisation-specific checks register with
+``register_check`` or load from modules listed in $GLASSTAPE_REDTEAM_CHECKS.
 """
 
+import importlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import Literal, Dict, Any
+from typing import Any, Callable, Dict, Literal, Optional
+
+from .keyword_matcher import KeywordMatcher
+from .policy_model import PolicyModel
+from .rule_analysis import analyze_rules
+
+
+logger = logging.getLogger(__name__)
+
+CHECK_MODULES_ENV = 'GLASSTAPE_REDTEAM_CHECKS'
+
+# Inputs a check can declare; each is prepared once per analysis
+CheckInput = Literal['policy_yaml', 'policy', 'icp', 'controls']
+CHECK_INPUTS = ('policy_yaml', 'policy', 'icp', 'controls')
+
+# Findings slower than this are listed with their timing
+SLOW_CHECK_MS = 10.0
+
+# Worker threads shared by all analyzers for concurrent checks
+CHECK_WORKERS = 8
 
 
 @dataclass
@@ -15,44 +41,205 @@ class RedTeamFinding:
     check: str
     status: Literal['pass', 'warn', 'fail']
     message: str
+    duration_ms: float = 0.0
+
+
+@dataclass
+class RedTeamCheck:
+    """A registered security check."""
+    name: str
+    func: Callable[..., RedTeamFinding]
+    inputs: tuple[str, ...]
+    concurrent: bool = False
+
+
+class CheckRegistry:
+    """Ordered collection of red-team checks."""
+    
+    def __init__(self):
+        self._checks: Dict[str, RedTeamCheck] = {}
+        self._loaded_modules: set[str] = set()
+    
+    def register(
+        self,
+        name: str,
+        inputs: tuple[CheckInput, ...] = ('policy',),
+        concurrent: bool = False,
+    ) -> Callable:
+        """
+        Decorator registering a check function.
+        
+        The function receives the declared inputs as keyword arguments and
+        returns a RedTeamFinding. Checks doing I/O or heavy work should set
+        ``concurrent`` so they run in the worker pool under the time budget;
+        other checks run inline, since thread dispatch costs more than they do.
+        Registering an existing name replaces that check in place.
+        """
+        unknown = set(inputs) - set(CHECK_INPUTS)
+        if unknown:
+            raise ValueError(f"Unknown check inputs {sorted(unknown)}; expected {CHECK_INPUTS}")
+        
+        def decorator(func: Callable[..., RedTeamFinding]) -> Callable[..., RedTeamFinding]:
+            self._checks[name] = RedTeamCheck(name, func, tuple(inputs), concurrent)
+            return func
+        
+        return decorator
+    
+    def unregister(self, name: str) -> None:
+        self._checks.pop(name, None)
+    
+    def checks(self) -> list[RedTeamCheck]:
+        return list(self._checks.values())
+    
+    def load_plugins(self, modules: Optional[list[str]] = None) -> None:
+        """Import check modules (default: $GLASSTAPE_REDTEAM_CHECKS, comma separated)"""
+        if modules is None:
+            modules = [m.strip() for m in os.getenv(CHECK_MODULES_ENV, '').split(',') if m.strip()]
+        for module in modules:
+            if module in self._loaded_modules:
+                continue
+            self._loaded_modules.add(module)
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                logger.warning(f"Failed to load red-team checks from {module}: {e}")
+
+
+check_registry = CheckRegistry()
+register_check = check_registry.register
+
+
+# Keywords searched for in CEL identifiers (string literals removed,
+# snake_case split into words), mapped to the check they satisfy
+CONTROL_KEYWORDS = {
+    **{kw: 'rate' for kw in [
+        'cumulative', 'rate', 'frequency', 'velocity',
+        'per hour', 'per minute', 'per day', 'last hour', 'last minute',
+        # Counters of calls over a window; a bare "count" (record_count, item_count) is a size
+        'request count', 'transaction count', 'txn count', 'call count', 'invocation count',
+        'payment count', 'query count', 'operation count', 'export count',
+    ]},
+    **{kw: 'sanctions' for kw in [
+        'sanction', 'sanctions', 'sanctioned', 'blocked', 'blocklist', 'blacklist',
+        'denylist', 'restricted', 'prohibited', 'denied entities',
+    ]},
+    'topics': 'topics',
+}
+
+# Validation operators and functions searched for in raw CEL
+VALIDATION_PATTERNS = [
+    '>', '<', '>=', '<=', '==', '!=', ' in ',
+    'has(', 'size(', 'type(', 'matches(', 'contains(', 'startswith(', 'endswith(',
+]
+
+_control_matcher = KeywordMatcher(CONTROL_KEYWORDS)
+_validation_matcher = KeywordMatcher(VALIDATION_PATTERNS, whole_words=False)
+
+
+def detect_controls(policy: PolicyModel) -> Dict[str, list[str]]:
+    """Group control keywords found in the policy's CEL conditions, in one pass."""
+    controls: Dict[str, list[str]] = {}
+    for match in _control_matcher.find(policy.cel_identifiers):
+        detected = controls.setdefault(match.value, [])
+        if match.pattern not in detected:
+            detected.append(match.pattern)
+    return controls
 
 
 class SimpleRedTeamAnalyzer:
     """Analyze policies for common security issues."""
     
-    def analyze(self, policy_yaml: str, icp: Dict[str, Any] = None) -> list[RedTeamFinding]:
+    def __init__(
+        self,
+        registry: Optional[CheckRegistry] = None,
+        time_budget_ms: float = 2000.0,
+    ):
+        """
+        Args:
+            registry: Checks to run (default: the global check_registry)
+            time_budget_ms: Wall-clock budget for concurrent checks
         """
-        Run 5 essential security checks.
+        self.registry = registry or check_registry
+        self.registry.load_plugins()
+        self.time_budget_ms = time_budget_ms
+    
+    def analyze(
+        self,
+        policy_yaml: str,
+        icp: Dict[str, Any] = None,
+        time_budget_ms: Optional[float] = None,
+        policy: Optional[PolicyModel] = None,
+    ) -> list[RedTeamFinding]:
+        """
+        Run every registered security check.
+        
+        Inputs the checks declare are prepared once up front; concurrent
+        checks still running when the time budget expires are reported as
+        warnings and left to finish in the background, while later analyses
+        move to a fresh worker pool.
         
         Args:
             policy_yaml: Cerbos policy YAML string
             icp: Optional Simple ICP dictionary for deeper analysis
+            time_budget_ms: Override the analyzer's time budget
+            policy: Already parsed policy_yaml, if the caller has one
             
         Returns:
-            List of security findings
+            List of security findings, in registration order
         """
-        findings = []
-        
-        # Check 1: Default-deny principle
-        findings.append(self._check_default_deny(icp or {}, policy_yaml))
-        
-        # Check 2: Rate limiting
-        findings.append(self._check_rate_limiting(policy_yaml))
-        
-        # Check 3: Sanctions screening
-        findings.append(self._check_sanctions_screening(policy_yaml))
-        
-        # Check 4: Input validation
-        findings.append(self._check_input_validation(policy_yaml))
-        
-        # Check 5: Role-based access
-        findings.append(self._check_role_based_access(icp or {}, policy_yaml))
-        
-        # Check 6: Topic-based governance
-        findings.append(self._check_topic_governance(icp or {}, policy_yaml))
+        budget_ms = self.time_budget_ms if time_budget_ms is None else time_budget_ms
+        started = time.perf_counter()
+        checks = self.registry.checks()
+        inputs = self._prepare_inputs(policy_yaml, icp, checks, policy)
+        
+        findings: list[Optional[RedTeamFinding]] = [None] * len(checks)
+        pending = {}
+        check_started: Dict[int, float] = {}
+        executor = _check_executor()
+        for index, check in enumerate(checks):
+            if check.concurrent:
+                future = executor.submit(_run_check, check, inputs, check_started, index)
+                pending[future] = index
+            else:
+                findings[index] = _run_check(check, inputs)
+        
+        if pending:
+            remaining = max(0.0, budget_ms / 1000 - (time.perf_counter() - started))
+            done, not_done = wait(pending, timeout=remaining)
+            for future in done:
+                findings[pending[future]] = future.result()
+            if not_done:
+                # Running threads cannot be stopped, so give later analyses fresh workers
+                _retire_executor(executor)
+            now = time.perf_counter()
+            for future in not_done:
+                future.cancel()
+                index = pending[future]
+                findings[index] = RedTeamFinding(
+                    check=checks[index].name,
+                    status='warn',
+                    message=f'Check did not finish within the {budget_ms:.0f} ms time budget',
+                    duration_ms=round((now - check_started.get(index, now)) * 1000, 3),
+                )
         
         return findings
     
+    def _prepare_inputs(
+        self,
+        policy_yaml: str,
+        icp: Optional[Dict[str, Any]],
+        checks: list[RedTeamCheck],
+        policy: Optional[PolicyModel] = None,
+    ) -> Dict[str, Any]:
+        """Build only the inputs that registered checks declare."""
+        needed = {name for check in checks for name in check.inputs}
+        inputs: Dict[str, Any] = {'policy_yaml': policy_yaml, 'icp': icp or {}}
+        if needed & {'policy', 'controls'}:
+            inputs['policy'] = policy or PolicyModel.parse(policy_yaml)
+        if 'controls' in needed:
+            inputs['controls'] = detect_controls(inputs['policy'])
+        return inputs
+    
     def format_findings(self, findings: list[RedTeamFinding]) -> str:
         """Format findings as readable text."""
         output = "## Security Analysis Results\n\n"
@@ -61,7 +248,7 @@ class SimpleRedTeamAnalyzer:
         warned = sum(1 for f in findings if f.status == 'warn')
         failed = sum(1 for f in findings if f.status == 'fail')
         
-        output += f"**Score**: {passed}/6 checks passed\n\n"
+        output += f"**Score**: {passed}/{len(findings)} checks passed\n\n"
         
         for finding in findings:
             status_emoji = {
@@ -73,6 +260,10 @@ class SimpleRedTeamAnalyzer:
             output += f"### {status_emoji} {finding.check}\n"
             output += f"{finding.message}\n\n"
         
+        slow = sorted((f for f in findings if f.duration_ms >= SLOW_CHECK_MS), key=lambda f: -f.duration_ms)
+        if slow:
+            output += '⏱️ **Slow checks**: ' + ', '.join(f'{f.check} ({f.duration_ms:.0f} ms)' for f in slow) + '\n\n'
+        
         if failed > 0:
             output += '🚨 **Action Required**: Address failed checks before deployment\n'
         elif warned > 0:
@@ -81,169 +272,251 @@ class SimpleRedTeamAnalyzer:
             output += '🎯 **Ready for Deployment**: All security checks passed\n'
         
         return output
-    
-    def _check_default_deny(self, icp: Dict[str, Any], policy_yaml: str) -> RedTeamFinding:
-        """Check for default-deny principle."""
-        # Check ICP structure first (more reliable)
-        if icp and 'policy' in icp and 'rules' in icp['policy']:
-            rules = icp['policy']['rules']
-            if rules:
-                last_rule = rules[-1]
-                if (last_rule.get('effect') == 'EFFECT_DENY' and 
-                    '*' in last_rule.get('actions', [])):
-                    return RedTeamFinding(
-                        check='Default Deny',
-                        status='pass',
-                        message='Policy implements default-deny principle'
-                    )
-        
-        # Fallback to YAML analysis
-        if 'EFFECT_DENY' in policy_yaml and '"*"' in policy_yaml:
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _check_executor() -> ThreadPoolExecutor:
+    """Lazily create the shared worker pool for concurrent checks."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CHECK_WORKERS, thread_name_prefix='redteam-check')
+        return _executor
+
+
+def _retire_executor(executor: ThreadPoolExecutor) -> None:
+    """Stop handing work to a pool whose workers are stuck on timed-out checks."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+    logger.warning("Red-team checks exceeded the time budget; moving to a fresh worker pool")
+
+
+def _run_check(
+    check: RedTeamCheck,
+    inputs: Dict[str, Any],
+    started_at: Optional[Dict[int, float]] = None,
+    index: int = 0,
+) -> RedTeamFinding:
+    """Run one check with its declared inputs and record its duration."""
+    started = time.perf_counter()
+    if started_at is not None:
+        started_at[index] = started
+    try:
+        finding = check.func(**{name: inputs[name] for name in check.inputs})
+    except Exception as e:
+        logger.warning(f"Red-team check '{check.name}' raised: {e}")
+        finding = RedTeamFinding(check=check.name, status='warn', message=f'Check could not run: {e}')
+    finding.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    return finding
+
+
+@register_check('Default Deny', inputs=('icp', 'policy'))
+def _check_default_deny(icp: Dict[str, Any], policy: PolicyModel) -> RedTeamFinding:
+    """Check for default-deny principle."""
+    # Check ICP structure first (topic conditions are only added in YAML)
+    rules = icp.get('policy', {}).get('rules') if icp else None
+    if rules:
+        last_rule = rules[-1]
+        if (last_rule.get('effect') == 'EFFECT_DENY' and 
+            '*' in last_rule.get('actions', []) and
+            not last_rule.get('conditions')):
             return RedTeamFinding(
                 check='Default Deny',
                 status='pass',
                 message='Policy implements default-deny principle'
             )
-        
+    
+    if policy.error:
         return RedTeamFinding(
             check='Default Deny',
             status='fail',
-            message='Missing default-deny rule. Add a final rule with effect: EFFECT_DENY and actions: ["*"]'
+            message=f'Could not parse policy rules: {policy.error}'
         )
     
-    def _check_rate_limiting(self, policy_yaml: str) -> RedTeamFinding:
-        """Check for rate limiting controls."""
-        rate_keywords = [
-            'cumulative', 'count', 'rate', 'frequency', 'limit',
-            'per_hour', 'per_minute', 'txn_count', 'req_count'
-        ]
-        
-        policy_lower = policy_yaml.lower()
-        detected_keywords = [kw for kw in rate_keywords if kw in policy_lower]
-        
-        if detected_keywords:
+    if policy.rules:
+        last_rule = policy.rules[-1]
+        if last_rule.is_catch_all_deny:
             return RedTeamFinding(
-                check='Rate Limiting',
+                check='Default Deny',
                 status='pass',
-                message=f'Rate limiting controls detected: {", ".join(detected_keywords)}'
+                message='Policy implements default-deny principle'
             )
-        
+        if last_rule.effect == 'EFFECT_DENY' and '*' in last_rule.actions:
+            return RedTeamFinding(
+                check='Default Deny',
+                status='warn',
+                message='Final deny rule is conditional, so requests that fail its condition are not denied. Remove the condition from the catch-all rule'
+            )
+    
+    return RedTeamFinding(
+        check='Default Deny',
+        status='fail',
+        message='Missing default-deny rule. Add a final rule with effect: EFFECT_DENY and actions: ["*"]'
+    )
+
+
+@register_check('Rate Limiting', inputs=('controls',))
+def _check_rate_limiting(controls: Dict[str, list[str]]) -> RedTeamFinding:
+    """Check for rate limiting controls."""
+    detected_keywords = controls.get('rate', [])
+    if detected_keywords:
         return RedTeamFinding(
             check='Rate Limiting',
-            status='warn',
-            message='No rate limiting detected. Consider adding transaction frequency or cumulative amount limits'
+            status='pass',
+            message=f'Rate limiting controls detected: {", ".join(detected_keywords)}'
         )
     
-    def _check_sanctions_screening(self, policy_yaml: str) -> RedTeamFinding:
-        """Check for sanctions/blocklist screening."""
-        sanction_keywords = [
-            'sanction', 'blocked', 'blocklist', 'blacklist', 
-            'restricted', 'prohibited', 'denied_entities'
-        ]
-        
-        policy_lower = policy_yaml.lower()
-        detected_keywords = [kw for kw in sanction_keywords if kw in policy_lower]
-        
-        if detected_keywords:
-            return RedTeamFinding(
-                check='Sanctions Screening',
-                status='pass',
-                message=f'Sanctions/blocklist screening detected: {", ".join(detected_keywords)}'
-            )
-        
+    return RedTeamFinding(
+        check='Rate Limiting',
+        status='warn',
+        message='No rate limiting detected. Consider adding transaction frequency or cumulative amount limits'
+    )
+
+
+@register_check('Sanctions Screening', inputs=('controls',))
+def _check_sanctions_screening(controls: Dict[str, list[str]]) -> RedTeamFinding:
+    """Check for sanctions/blocklist screening."""
+    detected_keywords = controls.get('sanctions', [])
+    if detected_keywords:
         return RedTeamFinding(
             check='Sanctions Screening',
-            status='warn',
-            message='No sanctions screening detected. Consider adding entity screening against blocked lists'
+            status='pass',
+            message=f'Sanctions/blocklist screening detected: {", ".join(detected_keywords)}'
         )
     
-    def _check_input_validation(self, policy_yaml: str) -> RedTeamFinding:
-        """Check for input validation."""
-        validation_patterns = [
-            '> 0', '>= 0', '!= null', 'typeof', '== null',
-            '<= ', '>= ', '!= ', ' in ', 'contains', 'matches'
-        ]
-        
-        detected_patterns = [p for p in validation_patterns if p in policy_yaml]
-        
-        if detected_patterns:
-            return RedTeamFinding(
-                check='Input Validation',
-                status='pass',
-                message=f'Input validation checks detected: {", ".join(detected_patterns)}'
-            )
-        
+    return RedTeamFinding(
+        check='Sanctions Screening',
+        status='warn',
+        message='No sanctions screening detected. Consider adding entity screening against blocked lists'
+    )
+
+
+@register_check('Input Validation', inputs=('policy',))
+def _check_input_validation(policy: PolicyModel) -> RedTeamFinding:
+    """Check for input validation."""
+    # Keep the longest match at each position so '>=' is not also reported as '>'
+    longest = {}
+    for match in _validation_matcher.find(policy.cel_text):
+        if match.start not in longest or match.end > longest[match.start].end:
+            longest[match.start] = match
+    
+    detected_patterns = []
+    covered_until = 0
+    for start in sorted(longest):
+        match = longest[start]
+        if start < covered_until:
+            continue
+        covered_until = match.end
+        pattern = match.pattern.strip()
+        if pattern not in detected_patterns:
+            detected_patterns.append(pattern)
+    
+    if detected_patterns:
         return RedTeamFinding(
             check='Input Validation',
-            status='warn',
-            message='Limited input validation. Consider adding type and range checks for all inputs'
+            status='pass',
+            message=f'Input validation checks detected: {", ".join(detected_patterns)}'
         )
     
-    def _check_role_based_access(self, icp: Dict[str, Any], policy_yaml: str) -> RedTeamFinding:
-        """Check for role-based access control."""
-        has_roles = False
-        role_info = []
-        
-        # Check ICP structure first
-        if icp and 'policy' in icp and 'rules' in icp['policy']:
-            rules = icp['policy']['rules']
-            for rule in rules:
-                if rule.get('roles'):
-                    has_roles = True
-                    role_info.extend(rule['roles'])
-        
-        # Fallback to YAML analysis
-        if not has_roles and 'roles:' in policy_yaml:
-            has_roles = True
-            role_info = ['roles detected in YAML']
-        
-        if has_roles:
-            unique_roles = list(set(role_info))
-            return RedTeamFinding(
-                check='Role-Based Access',
-                status='pass',
-                message=f'Role-based access control implemented: {", ".join(unique_roles)}'
-            )
-        
+    return RedTeamFinding(
+        check='Input Validation',
+        status='warn',
+        message='Limited input validation. Consider adding type and range checks for all inputs'
+    )
+
+
+@register_check('Role-Based Access', inputs=('icp', 'policy'))
+def _check_role_based_access(icp: Dict[str, Any], policy: PolicyModel) -> RedTeamFinding:
+    """Check for role-based access control."""
+    role_info = []
+    
+    # Check ICP structure first
+    if icp and 'policy' in icp and 'rules' in icp['policy']:
+        for rule in icp['policy']['rules']:
+            if rule.get('effect') == 'EFFECT_ALLOW':
+                role_info.extend(rule.get('roles') or [])
+    
+    if not role_info:
+        role_info = policy.roles()
+    
+    # A wildcard grants every role, which is not a restriction
+    unique_roles = [r for r in dict.fromkeys(role_info) if r != '*']
+    
+    if unique_roles:
         return RedTeamFinding(
             check='Role-Based Access',
-            status='warn',
-            message='No role restrictions found. Consider adding role-based access control'
+            status='pass',
+            message=f'Role-based access control implemented: {", ".join(unique_roles)}'
         )
     
-    def _check_topic_governance(self, icp: Dict[str, Any], policy_yaml: str) -> RedTeamFinding:
-        """Check for topic-based governance controls."""
-        has_topics = False
-        topic_info = []
-        
-        # Check ICP structure first
-        if icp and 'metadata' in icp:
-            metadata = icp['metadata']
-            if metadata.get('topics'):
-                has_topics = True
-                topic_info.extend(metadata['topics'])
-            if metadata.get('blocked_topics'):
-                has_topics = True
-                topic_info.extend([f"blocked:{t}" for t in metadata['blocked_topics']])
-        
-        # Fallback to YAML analysis
-        if not has_topics and 'topics' in policy_yaml:
-            has_topics = True
-            topic_info = ['topics detected in YAML']
-        
-        if has_topics:
-            return RedTeamFinding(
-                check='Topic Governance',
-                status='pass',
-                message=f'Topic-based governance implemented: {", ".join(topic_info[:5])}'
-            )
-        
+    return RedTeamFinding(
+        check='Role-Based Access',
+        status='warn',
+        message='No role restrictions found. Consider adding role-based access control'
+    )
+
+
+@register_check('Topic Governance', inputs=('icp', 'controls'))
+def _check_topic_governance(icp: Dict[str, Any], controls: Dict[str, list[str]]) -> RedTeamFinding:
+    """Check for topic-based governance controls."""
+    topic_info = []
+    
+    # Check ICP structure first
+    if icp and 'metadata' in icp:
+        metadata = icp['metadata']
+        topic_info.extend(metadata.get('topics') or [])
+        topic_info.extend([f"blocked:{t}" for t in metadata.get('blocked_topics') or []])
+    
+    if not topic_info and controls.get('topics'):
+        topic_info = ['topics checked in conditions']
+    
+    if topic_info:
         return RedTeamFinding(
             check='Topic Governance',
-            status='warn',
-            message='No topic governance found. Consider adding topic-based access control for content filtering'
+            status='pass',
+            message=f'Topic-based governance implemented: {", ".join(topic_info[:5])}'
         )
+    
+    return RedTeamFinding(
+        check='Topic Governance',
+        status='warn',
+        message='No topic governance found. Consider adding topic-based access control for content filtering'
+    )
+
 
+@register_check('Rule Reachability', inputs=('policy',))
+def _check_rule_reachability(policy: PolicyModel) -> RedTeamFinding:
+    """Check that every rule can take effect."""
+    if policy.error or not policy.rules:
+        return RedTeamFinding(
+            check='Rule Reachability',
+            status='warn',
+            message='No rules to analyze'
+        )
+    
+    issues = analyze_rules(policy)
+    if not issues:
+        return RedTeamFinding(
+            check='Rule Reachability',
+            status='pass',
+            message=f'All {len(policy.rules)} rules are reachable'
+        )
+    
+    status = 'fail' if any(issue.severity == 'fail' for issue in issues) else 'warn'
+    listed = '; '.join(issue.message for issue in issues[:5])
+    if len(issues) > 5:
+        listed += f'; and {len(issues) - 5} more'
+    return RedTeamFinding(
+        check='Rule Reachability',
+        status=status,
+        message=f'{len(issues)} rule issue(s): {listed}'
+    )
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,372 @@
+"""
+Rule Analysis - Shadowing and reachability of policy rules.
+
+Rules are considered in evaluation order (first match wins, as in the ICP).
+Each condition is reduced to a conjunction of per-term constraints:
+numeric intervals, allowed value sets and opaque atoms. A later rule is
+shadowed when an earlier rule covers all of its actions and roles and its
+condition is implied by the later one's. Candidate shadowers are found
+through an (action, role) index so large policies stay close to linear.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Literal, Optional, Tuple
+
+from . import cel
+from .policy_model import CATCH_ALL, Condition, PolicyModel, PolicyRule
+
+
+IssueKind = Literal['shadowed', 'unreachable', 'always_true']
+
+
+@dataclass(frozen=True)
+class Interval:
+    """A numeric range; bounds are inclusive when the matching flag is set."""
+    low: float = -math.inf
+    high: float = math.inf
+    low_closed: bool = False
+    high_closed: bool = False
+    
+    @property
+    def empty(self) -> bool:
+        if self.low > self.high:
+            return True
+        return self.low == self.high and not (self.low_closed and self.high_closed)
+    
+    def intersect(self, other: 'Interval') -> 'Interval':
+        if (other.low, not other.low_closed) > (self.low, not self.low_closed):
+            low, low_closed = other.low, other.low_closed
+        else:
+            low, low_closed = self.low, self.low_closed
+        if (other.high, other.high_closed) < (self.high, self.high_closed):
+            high, high_closed = other.high, other.high_closed
+        else:
+            high, high_closed = self.high, self.high_closed
+        return Interval(low, high, low_closed, high_closed)
+    
+    def within(self, other: 'Interval') -> bool:
+        """True if every point of self lies in other."""
+        if self.empty:
+            return True
+        low_ok = self.low > other.low or (self.low == other.low and (other.low_closed or not self.low_closed))
+        high_ok = self.high < other.high or (self.high == other.high and (other.high_closed or not self.high_closed))
+        return low_ok and high_ok
+    
+    def contains(self, value: float) -> bool:
+        return not Interval(value, value, True, True).intersect(self).empty
+
+
+_COMPARISON_INTERVALS = {
+    '<': lambda v: Interval(high=v),
+    '<=': lambda v: Interval(high=v, high_closed=True),
+    '>': lambda v: Interval(low=v),
+    '>=': lambda v: Interval(low=v, low_closed=True),
+    '==': lambda v: Interval(v, v, True, True),
+}
+
+_FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+_NEGATED = {'<': '>=', '<=': '>', '>': '<=', '>=': '<', '==': '!=', '!=': '=='}
+
+
+@dataclass
+class ConditionSummary:
+    """A rule condition as a conjunction of constraints."""
+    intervals: Dict[str, Interval] = field(default_factory=dict)
+    values: Dict[str, FrozenSet[Any]] = field(default_factory=dict)
+    atoms: set = field(default_factory=set)
+    satisfiable: bool = True
+    always_true: bool = False
+    
+    @property
+    def keys(self) -> FrozenSet[str]:
+        """Every term the condition constrains."""
+        return frozenset(self.intervals) | frozenset(self.values) | frozenset(self.atoms)
+    
+    def add_interval(self, key: str, interval: Interval) -> None:
+        merged = self.intervals[key].intersect(interval) if key in self.intervals else interval
+        self.intervals[key] = merged
+        if merged.empty:
+            self.satisfiable = False
+    
+    def add_values(self, key: str, values: FrozenSet[Any]) -> None:
+        merged = self.values[key] & values if key in self.values else values
+        self.values[key] = merged
+        if not merged:
+            self.satisfiable = False
+    
+    def add_atom(self, atom: str) -> None:
+        negation = atom[1:] if atom.startswith('!') else '!' + atom
+        if negation in self.atoms:
+            self.satisfiable = False
+        self.atoms.add(atom)
+    
+    def implies(self, other: 'ConditionSummary') -> bool:
+        """True if every request satisfying self also satisfies other."""
+        if not self.satisfiable:
+            return True
+        for key, interval in other.intervals.items():
+            mine = self.intervals.get(key)
+            if mine is None:
+                values = self.values.get(key)
+                if values is None or not all(
+                    isinstance(v, (int, float)) and interval.contains(v) for v in values
+                ):
+                    return False
+            elif not mine.within(interval):
+                return False
+        for key, values in other.values.items():
+            mine = self.values.get(key)
+            if mine is None or not mine <= values:
+                return False
+        return other.atoms <= self.atoms
+    
+    def disjoint(self, other: 'ConditionSummary') -> bool:
+        """True if no request can satisfy both conditions."""
+        if not self.satisfiable or not other.satisfiable:
+            return True
+        for key, interval in self.intervals.items():
+            if key in other.intervals and interval.intersect(other.intervals[key]).empty:
+                return True
+        for key, values in self.values.items():
+            if key in other.values and not values & other.values[key]:
+                return True
+        return any(
+            (atom[1:] if atom.startswith('!') else '!' + atom) in other.atoms
+            for atom in self.atoms
+        )
+
+
+def summarize(node: Optional[cel.Node]) -> ConditionSummary:
+    """Reduce a parsed CEL condition to a ConditionSummary (None means no condition)."""
+    summary = ConditionSummary()
+    if node is None:
+        return summary
+    conjuncts = _conjuncts(node)
+    for conjunct in conjuncts:
+        _add_conjunct(summary, conjunct)
+    summary.always_true = summary.satisfiable and not summary.keys
+    return summary
+
+
+def _conjuncts(node: cel.Node) -> List[cel.Node]:
+    if isinstance(node, cel.Binary) and node.op == '&&':
+        return _conjuncts(node.left) + _conjuncts(node.right)
+    # !(a || b) is !a && !b
+    if isinstance(node, cel.Unary) and node.op == '!' and isinstance(node.operand, cel.Binary) and node.operand.op == '||':
+        return _conjuncts(cel.Unary('!', node.operand.left)) + _conjuncts(cel.Unary('!', node.operand.right))
+    return [node]
+
+
+def _add_conjunct(summary: ConditionSummary, node: cel.Node) -> None:
+    negated = False
+    while isinstance(node, cel.Unary) and node.op == '!':
+        negated = not negated
+        node = node.operand
+    
+    if cel.is_constant(node):
+        try:
+            value = cel.constant_value(node)
+        except ValueError:
+            summary.add_atom(('!' if negated else '') + cel.to_cel(node))
+            return
+        if bool(value) == negated:
+            summary.satisfiable = False
+        return
+    
+    if isinstance(node, cel.Binary) and node.op in cel.COMPARISONS:
+        op, term, constant = node.op, node.left, node.right
+        if cel.is_constant(term) and not cel.is_constant(constant):
+            op, term, constant = _FLIPPED[op], constant, term
+        if cel.is_constant(constant) and not cel.is_constant(term):
+            try:
+                value = cel.constant_value(constant)
+            except ValueError:
+                value = None
+            if negated:
+                op = _NEGATED[op]
+            key = cel.to_cel(term)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and op in _COMPARISON_INTERVALS:
+                summary.add_interval(key, _COMPARISON_INTERVALS[op](float(value)))
+                return
+            if op == '==' and value is not None or isinstance(value, bool) and op == '!=':
+                summary.add_values(key, frozenset([value if op == '==' else not value]))
+                return
+    
+    if (
+        isinstance(node, cel.Binary) and node.op == 'in' and not negated
+        and isinstance(node.right, cel.ListExpr) and cel.is_constant(node.right)
+        and not cel.is_constant(node.left)
+    ):
+        summary.add_values(cel.to_cel(node.left), frozenset(cel.constant_value(node.right)))
+        return
+    
+    # A bare attribute reference is a boolean test
+    if cel.attribute_path(node) is not None:
+        summary.add_values(cel.to_cel(node), frozenset([not negated]))
+        return
+    
+    summary.add_atom(('!' if negated else '') + cel.to_cel(node))
+
+
+def condition_to_cel(condition: Condition) -> cel.Node:
+    """Combine a Cerbos condition tree into a single CEL AST."""
+    if condition.op == 'expr':
+        return cel.parse(condition.expr)
+    children = [condition_to_cel(child) for child in condition.children]
+    if not children:
+        return cel.Literal(condition.op != 'any')
+    combined = children[0]
+    op = '&&' if condition.op == 'all' else '||'
+    for child in children[1:]:
+        combined = cel.Binary(op, combined, child)
+    return cel.Unary('!', combined) if condition.op == 'none' else combined
+
+
+@dataclass
+class RuleIssue:
+    """A reachability problem with one rule."""
+    kind: IssueKind
+    rule: int
+    message: str
+    shadowed_by: Optional[int] = None
+    effect: str = ''
+    
+    @property
+    def severity(self) -> Literal['warn', 'fail']:
+        """Dead deny rules and unreachable rules are failures; redundancy is a warning."""
+        if self.kind == 'unreachable':
+            return 'fail'
+        if self.kind == 'shadowed' and self.effect == 'EFFECT_DENY':
+            return 'fail'
+        return 'warn'
+
+
+@dataclass
+class _AnalyzedRule:
+    index: int
+    rule: PolicyRule
+    summary: Optional[ConditionSummary]  # None when the condition could not be parsed
+    condition_key: Optional[str]
+    
+    @property
+    def label(self) -> str:
+        name = f" '{self.rule.name}'" if self.rule.name else ''
+        return f"Rule {self.index + 1}{name} ({self.rule.effect or 'no effect'} {', '.join(self.rule.actions)})"
+
+
+def _prepare(index: int, rule: PolicyRule) -> _AnalyzedRule:
+    if rule.condition is None:
+        return _AnalyzedRule(index, rule, ConditionSummary(), condition_key='')
+    try:
+        node = condition_to_cel(rule.condition)
+    except cel.CELSyntaxError:
+        # Unparseable conditions can only match an identical condition
+        return _AnalyzedRule(index, rule, None, condition_key='\n'.join(rule.expressions))
+    return _AnalyzedRule(index, rule, summarize(node), condition_key=cel.to_cel(node))
+
+
+def _roles(rule: PolicyRule) -> List[str]:
+    roles = rule.roles + [f"derived:{r}" for r in rule.derived_roles]
+    return roles or [CATCH_ALL]
+
+
+def analyze_rules(policy: PolicyModel) -> List[RuleIssue]:
+    """
+    Report shadowed, unreachable and always-true rules.
+    
+    Returns:
+        Issues in rule order
+    """
+    issues: List[RuleIssue] = []
+    # (action, role) -> earlier rules, grouped by the set of terms they constrain
+    index: Dict[Tuple[str, str], Dict[FrozenSet[str], List[_AnalyzedRule]]] = {}
+    # (action, role, condition) -> first rule with exactly that scope and condition
+    exact: Dict[Tuple[str, str, str], _AnalyzedRule] = {}
+    
+    for position, rule in enumerate(policy.rules):
+        current = _prepare(position, rule)
+        summary = current.summary
+        actions, roles = rule.actions or [CATCH_ALL], _roles(rule)
+        
+        if summary is not None and not summary.satisfiable:
+            issues.append(RuleIssue(
+                'unreachable', position,
+                f"{current.label} has contradictory conditions and can never match",
+                effect=rule.effect,
+            ))
+        else:
+            if summary is not None and summary.always_true and rule.condition is not None:
+                issues.append(RuleIssue(
+                    'always_true', position,
+                    f"{current.label} has a condition that is always true",
+                    effect=rule.effect,
+                ))
+            shadower = _find_shadower(current, actions, roles, index, exact)
+            if shadower is not None:
+                same = shadower.rule.effect == rule.effect
+                issues.append(RuleIssue(
+                    'shadowed', position,
+                    f"{current.label} is shadowed by {shadower.label}"
+                    + (" and is redundant" if same else " and never takes effect"),
+                    shadowed_by=shadower.index,
+                    effect=rule.effect,
+                ))
+        
+        # Rules that can never match cannot shadow anything either
+        keys = summary.keys if summary is not None and summary.satisfiable else None
+        for action in actions:
+            for role in roles:
+                if summary is None or summary.satisfiable:
+                    exact.setdefault((action, role, current.condition_key), current)
+                if keys is not None:
+                    index.setdefault((action, role), {}).setdefault(keys, []).append(current)
+    
+    return issues
+
+
+def _find_shadower(
+    current: _AnalyzedRule,
+    actions: List[str],
+    roles: List[str],
+    index: Dict[Tuple[str, str], Dict[FrozenSet[str], List[_AnalyzedRule]]],
+    exact: Dict[Tuple[str, str, str], _AnalyzedRule],
+) -> Optional[_AnalyzedRule]:
+    """Find the earliest earlier rule covering every (action, role) of current with a weaker condition."""
+    action_options = {a: (a, CATCH_ALL) if a != CATCH_ALL else (CATCH_ALL,) for a in actions}
+    role_options = {r: (r, CATCH_ALL) if r != CATCH_ALL else (CATCH_ALL,) for r in roles}
+    
+    def covers(candidate: _AnalyzedRule) -> bool:
+        candidate_actions = set(candidate.rule.actions or [CATCH_ALL])
+        candidate_roles = set(_roles(candidate.rule))
+        return (
+            all(candidate_actions.intersection(action_options[a]) for a in actions)
+            and all(candidate_roles.intersection(role_options[r]) for r in roles)
+        )
+    
+    # Identical conditions need no implication check
+    first_action, first_role = actions[0], roles[0]
+    best: Optional[_AnalyzedRule] = None
+    for action in action_options[first_action]:
+        for role in role_options[first_role]:
+            candidate = exact.get((action, role, current.condition_key))
+            if candidate and covers(candidate) and (best is None or candidate.index < best.index):
+                best = candidate
+    
+    if current.summary is None:
+        return best
+    
+    # Only rules constraining a subset of current's terms can be implied by it
+    keys = current.summary.keys
+    for action in action_options[first_action]:
+        for role in role_options[first_role]:
+            for group_keys, candidates in index.get((action, role), {}).items():
+                if not group_keys <= keys:
+                    continue
+                for candidate in candidates:
+                    if best is not None and candidate.index >= best.index:
+                        break
+                    if current.summary.implies(candidate.summary) and covers(candidate):
+                        best = candidate
+                        break
+    return best
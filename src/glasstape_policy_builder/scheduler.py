@@ -0,0 +1,155 @@
+"""
+Scheduler - Keep blocking pipeline work off the MCP event loop.
+
+CPU-bound stages (Pydantic validation, test generation, YAML generation,
+coverage and red-team analysis) run in a process pool; blocking I/O such as
+Cerbos CLI subprocesses runs in a thread pool. Tool calls are also limited
+per tool, so a burst of expensive calls cannot starve the cheap ones and
+the stdio read loop stays responsive.
+
+Functions sent to the process pool must be importable top-level functions
+with picklable arguments and results, and should raise only picklable
+exceptions (e.g. re-raise Pydantic errors as ValueError).
+"""
+
+import asyncio
+import contextlib
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+CPU_WORKERS_ENV = 'GLASSTAPE_CPU_WORKERS'
+IO_WORKERS_ENV = 'GLASSTAPE_IO_WORKERS'
+
+DEFAULT_IO_WORKERS = 16
+
+# Calls in flight per tool; tools not listed are cheap and unlimited
+TOOL_LIMITS = {
+    'generate_policy': 4,
+    'generate_policies_batch': 2,
+    'instantiate_template': 4,
+    'validate_policy': 4,
+    'test_policy': 4,
+    'suggest_improvements': 4,
+    'policy_coverage': 2,
+    'analyze_repository': 1,  # Fans out to its own worker processes
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}; using {default}")
+        return default
+
+
+class Scheduler:
+    """Process and thread pools plus per-tool concurrency limits."""
+    
+    def __init__(
+        self,
+        cpu_workers: Optional[int] = None,
+        io_workers: Optional[int] = None,
+        limits: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Args:
+            cpu_workers: Worker processes; defaults to $GLASSTAPE_CPU_WORKERS or
+                min(4, CPU count). 0 runs CPU-bound stages in the thread pool
+            io_workers: Threads for blocking I/O; defaults to $GLASSTAPE_IO_WORKERS or 16
+            limits: Per-tool concurrency limits (default: TOOL_LIMITS)
+        """
+        self.cpu_workers = _env_int(CPU_WORKERS_ENV, min(4, os.cpu_count() or 1)) if cpu_workers is None else cpu_workers
+        self.io_workers = max(1, _env_int(IO_WORKERS_ENV, DEFAULT_IO_WORKERS) if io_workers is None else io_workers)
+        self.limits = dict(TOOL_LIMITS if limits is None else limits)
+        
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {'cpu': 0, 'io': 0, 'fallback': 0}
+    
+    async def run_cpu(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a CPU-bound top-level function in a worker process."""
+        pool = self._process_pool()
+        if pool is None:
+            return await self.run_io(fn, *args)
+        self.stats['cpu'] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, functools.partial(fn, *args))
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            logger.warning(f"Worker process pool broke ({e}); running {fn.__name__} in a thread")
+            with self._lock:
+                if self._processes is pool:
+                    self._processes = None
+            pool.shutdown(wait=False)
+            self.stats['fallback'] += 1
+            return await self.run_io(fn, *args)
+    
+    async def run_io(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking function in the I/O thread pool."""
+        self.stats['io'] += 1
+        return await asyncio.get_running_loop().run_in_executor(self._thread_pool(), functools.partial(fn, *args))
+    
+    @contextlib.asynccontextmanager
+    async def limit(self, tool: str) -> AsyncIterator[None]:
+        """Hold one of the tool's concurrency slots."""
+        semaphore = self._semaphore(tool)
+        if semaphore is None:
+            yield
+            return
+        async with semaphore:
+            yield
+    
+    def shutdown(self) -> None:
+        """Stop the worker pools; they are recreated on next use."""
+        with self._lock:
+            processes, self._processes = self._processes, None
+            threads, self._threads = self._threads, None
+        if processes is not None:
+            processes.shutdown(wait=False, cancel_futures=True)
+        if threads is not None:
+            threads.shutdown(wait=False, cancel_futures=True)
+    
+    def _process_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.cpu_workers == 0:
+            return None
+        with self._lock:
+            if self._processes is None:
+                # spawn, as in batch_analyzer: forking a threaded server is unsafe
+                self._processes = ProcessPoolExecutor(
+                    self.cpu_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._processes
+    
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(self.io_workers, thread_name_prefix='glasstape-io')
+            return self._threads
+    
+    def _semaphore(self, tool: str) -> Optional[asyncio.Semaphore]:
+        limit = self.limits.get(tool)
+        if not limit:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphores, self._loop = {}, loop
+        if tool not in self._semaphores:
+            self._semaphores[tool] = asyncio.Semaphore(limit)
+        return self._semaphores[tool]
+
+
+# Global scheduler (pools start on first use)
+scheduler = Scheduler()
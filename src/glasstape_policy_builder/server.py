@@ -6,17 +6,22 @@ Transforms natural language into Cerbos policies via MCP protocol.
 Designed for client-LLM mode with optional server-side parsing.
 """
 
+import argparse
 import asyncio
 import logging
 import sys
 from pathlib import Path
+from typing import List, Optional
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 
 from .tools import register_tools
-from .cerbos_cli import CerbosCLI
+from .http_server import DEFAULT_HOST, DEFAULT_PORT, SERVER_NAME, run_http
+from .daemon import proxy_main, serve_daemon
 from .llm_adapter import get_llm_adapter
+from .scheduler import scheduler
+from .services import close_services, get_services
 
 
 # Configure logging
@@ -40,23 +45,9 @@ async def main():
     """
     try:
         # Create server with clear name
-        server = Server("glasstape-policy-builder")
+        server = Server(SERVER_NAME)
         logger.info("🚀 Starting GlassTape Policy Builder MCP Server")
-        
-        # Validate environment and dependencies
-        try:
-            await validate_environment()
-        except Exception as e:
-            logger.error(f"❌ Environment validation failed: {e}")
-            raise
-        
-        # Register all MCP tools
-        try:
-            await register_tools(server)
-            logger.info("✅ All MCP tools registered successfully")
-        except Exception as e:
-            logger.error(f"❌ Tool registration failed: {e}")
-            raise
+        await setup_server(server)
         
         # Run server with stdio transport
         async with stdio_server() as (read_stream, write_stream):
@@ -66,13 +57,34 @@ async def main():
                 write_stream,
                 server.create_initialization_options()
             )
-            
+    
     except KeyboardInterrupt:
         logger.info("🛑 Server shutdown requested")
     except Exception as e:
         logger.error(f"💥 Server failed to start: {e}")
         logger.error("Check logs above for specific error details")
         sys.exit(1)
+    finally:
+        scheduler.shutdown()
+        close_services()
+
+
+async def setup_server(server: Server, local_files: bool = True) -> None:
+    """Validate the environment and register the tools (shared by all transports)."""
+    # Validate environment and dependencies
+    try:
+        await validate_environment()
+    except Exception as e:
+        logger.error(f"❌ Environment validation failed: {e}")
+        raise
+    
+    # Register all MCP tools
+    try:
+        await register_tools(server, local_files)
+        logger.info("✅ All MCP tools registered successfully")
+    except Exception as e:
+        logger.error(f"❌ Tool registration failed: {e}")
+        raise
 
 
 async def validate_environment():
@@ -82,7 +94,7 @@ async def validate_environment():
     Follows design principle: fail fast with clear error messages.
     """
     # Check Cerbos CLI availability
-    cerbos_cli = CerbosCLI()
+    cerbos_cli = get_services().cerbos_cli
     if cerbos_cli.check_installation():
         logger.info("✅ Cerbos CLI detected and ready")
     else:
@@ -107,9 +119,43 @@ async def validate_environment():
         raise
 
 
-def cli_main():
+def cli_main(argv: Optional[List[str]] = None):
     """CLI entry point for the MCP server."""
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(
+        prog="glasstape-policy-builder-mcp",
+        description="GlassTape Agent Policy Builder MCP server",
+    )
+    parser.add_argument("--transport", choices=["stdio", "http", "daemon", "proxy"], default="stdio",
+                        help="stdio for one IDE session (default), http to serve a team, daemon to share "
+                             "one warm server between local sessions, proxy to relay stdio to that daemon")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"HTTP bind address (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"HTTP port (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int, default=1, help="HTTP worker processes (default: 1)")
+    parser.add_argument("--json-response", action="store_true",
+                        help="Answer HTTP requests with plain JSON instead of SSE streams")
+    parser.add_argument("--allowed-host", action="append", dest="allowed_hosts", metavar="HOST",
+                        help="Host name clients use to reach the HTTP server (repeatable)")
+    parser.add_argument("--allowed-origin", action="append", dest="allowed_origins", metavar="ORIGIN",
+                        help="Browser origin allowed to call the HTTP server (repeatable)")
+    parser.add_argument("--socket", type=Path, help="Daemon socket (default: $GLASSTAPE_DAEMON_SOCKET or per-user)")
+    args = parser.parse_args(argv)
+    
+    if args.transport == "http":
+        try:
+            run_http(args.host, args.port, args.workers, args.json_response,
+                     args.allowed_hosts, args.allowed_origins)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.transport == "daemon":
+        try:
+            asyncio.run(serve_daemon(args.socket))
+        except KeyboardInterrupt:
+            logger.info("🛑 Daemon shutdown requested")
+    elif args.transport == "proxy":
+        proxy_main(["--socket", str(args.socket)] if args.socket else [])
+    else:
+        asyncio.run(main())
+
 
 if __name__ == "__main__":
     cli_main()
\ No newline at end of file
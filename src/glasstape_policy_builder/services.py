@@ -0,0 +1,125 @@
+"""
+Services - Long-lived pipeline components shared by every tool call.
+
+One ServiceContainer per process owns the validator, generator, red-team
+analyzer, Cerbos CLI wrapper and template library, so tool calls reuse
+warm instances and their caches instead of building new ones each time.
+Everything in it is safe to share between threads: the components keep no
+per-call state, and CerbosCLI gives each call its own scratch directory.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from .types import SimpleICP
+from .icp_validator import ICPValidator
+from .cerbos_generator import CerbosGenerator
+from .cerbos_cli import CerbosCLI
+from .redteam_analyzer import SimpleRedTeamAnalyzer
+from .policy_model import PolicyModel
+from .policy_index import PolicyIndex, current_index, policy_index
+from .templates import TemplateLibrary, template_library
+
+
+class PolicyPipeline:
+    """Shared policy processing pipeline."""
+    
+    def __init__(
+        self,
+        validator: Optional[ICPValidator] = None,
+        generator: Optional[CerbosGenerator] = None,
+        cerbos_cli: Optional[CerbosCLI] = None,
+        analyzer: Optional[SimpleRedTeamAnalyzer] = None,
+    ):
+        self.validator = validator or ICPValidator()
+        self.generator = generator or CerbosGenerator()
+        self.cerbos_cli = cerbos_cli or CerbosCLI()
+        self.analyzer = analyzer or SimpleRedTeamAnalyzer()
+    
+    def validate_icp(self, icp_data: Dict[str, Any]) -> SimpleICP:
+        """Validate and return ICP object."""
+        icp = SimpleICP.model_validate(icp_data)
+        self.validator.validate(icp.model_dump())
+        return icp
+    
+    def generate_policy_artifacts(self, icp_data: Dict[str, Any]) -> tuple[str, str]:
+        """Generate policy and test YAML from ICP."""
+        policy_yaml = self.generator.generate_policy(icp_data)
+        test_yaml = self.generator.generate_tests(icp_data)
+        return policy_yaml, test_yaml
+    
+    def validate_with_cerbos(self, policy_yaml: str, test_yaml: Optional[str] = None):
+        """Validate policy with Cerbos CLI and optionally run tests."""
+        validation_result = self.compile_policy(policy_yaml)
+        test_result = None
+        
+        if validation_result and validation_result.success and test_yaml:
+            test_result = self.run_tests(policy_yaml, test_yaml)
+        
+        return validation_result, test_result
+    
+    def compile_policy(self, policy_yaml: str):
+        """Compile a policy with Cerbos CLI, or None if the CLI is not installed."""
+        if not self.cerbos_cli.check_installation():
+            return None
+        return self.cerbos_cli.compile(policy_yaml)
+    
+    def run_tests(self, policy_yaml: str, test_yaml: str):
+        """Run a test suite with Cerbos CLI, or None if it could not run."""
+        try:
+            return self.cerbos_cli.test(policy_yaml, test_yaml)
+        except Exception:
+            return None  # Test failure is not critical
+    
+    def index_policy(self, name: str, policy_yaml: str):
+        """Add a generated policy to the calling session's index and return its cross-policy conflicts."""
+        return current_index().add_policy(name, PolicyModel.parse(policy_yaml))
+    
+    def analyze_security(self, policy_yaml: str, icp_data: Optional[Dict[str, Any]] = None):
+        """Run security analysis on policy."""
+        return self.analyzer.analyze(policy_yaml, icp_data)
+
+
+class ServiceContainer:
+    """Warm, shared instances of the pipeline components."""
+    
+    def __init__(self, work_dir: Optional[str] = None, templates: Optional[TemplateLibrary] = None):
+        """
+        Args:
+            work_dir: Base directory for Cerbos CLI scratch files
+            templates: Template library (default: the global one)
+        """
+        self.validator = ICPValidator()
+        self.generator = CerbosGenerator()
+        self.analyzer = SimpleRedTeamAnalyzer()
+        self.cerbos_cli = CerbosCLI(work_dir)
+        self.templates = templates or template_library
+        self.policy_index: PolicyIndex = policy_index
+        self.pipeline = PolicyPipeline(self.validator, self.generator, self.cerbos_cli, self.analyzer)
+    
+    def close(self) -> None:
+        """Release resources held by the services (scratch directories)."""
+        self.cerbos_cli.close()
+
+
+_services: Optional[ServiceContainer] = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> ServiceContainer:
+    """The process-wide service container, built on first use."""
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = ServiceContainer()
+    return _services
+
+
+def close_services() -> None:
+    """Close the process-wide container; the next get_services() builds a new one."""
+    global _services
+    with _services_lock:
+        services, _services = _services, None
+    if services is not None:
+        services.close()
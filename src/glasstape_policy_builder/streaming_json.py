@@ -0,0 +1,192 @@
+"""
+Streaming JSON - Incremental parsing of a JSON object from model output.
+
+Text is fed in chunks as tokens arrive. Prose and code fences before the
+first '{' are skipped; after that a single left-to-right scan tracks
+strings and bracket nesting, so every top-level member is decoded (and can
+be validated) the moment it is complete, and a structural error such as a
+mismatched bracket is raised without waiting for the rest of the response.
+Each character is looked at once, with no regex backtracking.
+"""
+
+import json
+import re
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Characters that matter outside and inside strings
+_STRUCTURAL = re.compile(r'[\[\]{}",]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CLOSERS = {'}': '{', ']': '['}
+
+MemberCallback = Callable[[str, Any], None]
+
+
+class StreamingJSONError(ValueError):
+    """Malformed JSON found while streaming."""
+    
+    def __init__(self, message: str, offset: int):
+        super().__init__(f"{message} (at character {offset})")
+        self.offset = offset
+
+
+class IncrementalJSONParser:
+    """Parse one JSON object from text that arrives in pieces."""
+    
+    def __init__(self, on_member: Optional[MemberCallback] = None):
+        """
+        Args:
+            on_member: Called with (key, value) as each top-level member
+                completes; an exception raised here aborts the parse
+        """
+        self.on_member = on_member
+        self.result: Dict[str, Any] = {}
+        self.done = False
+        
+        self._text = ''  # Unconsumed text from the current top-level member on
+        self._pos = 0  # Scan position within _text
+        self._offset = 0  # Characters dropped from the front of _text
+        self._started = False
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._member_start = 0
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of text.
+        
+        Returns:
+            Top-level members completed by this chunk, in order
+        
+        Raises:
+            StreamingJSONError: On a structural error or an undecodable member
+        """
+        if self.done or not chunk:
+            return []
+        self._text += chunk
+        completed: List[Tuple[str, Any]] = []
+        
+        if not self._started:
+            start = self._text.find('{')
+            if start < 0:
+                self._text = ''  # Still in leading prose
+                return completed
+            self._text = self._text[start:]
+            self._offset += start
+            self._pos = 1
+            self._member_start = 1
+            self._stack.append('{')
+            self._started = True
+        
+        text = self._text
+        pos = self._pos
+        while pos < len(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    pos += 1
+                    continue
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    pos = len(text)
+                    break
+                pos = match.end()
+                if match.group() == '\\':
+                    self._escape = True
+                else:
+                    self._in_string = False
+                continue
+            
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                pos = len(text)
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._stack.append(char)
+            elif char in '}]':
+                if self._stack[-1] != _CLOSERS[char]:
+                    raise StreamingJSONError(f"Unexpected '{char}'", self._offset + pos - 1)
+                self._stack.pop()
+                if not self._stack:
+                    completed.extend(self._complete_member(text, pos - 1, last=True))
+                    self.done = True
+                    break
+            elif len(self._stack) == 1:  # Comma between top-level members
+                completed.extend(self._complete_member(text, pos - 1))
+                self._member_start = pos
+        
+        # Keep only the member still being read
+        self._text = text[self._member_start:]
+        self._offset += self._member_start
+        self._pos = pos - self._member_start
+        self._member_start = 0
+        return completed
+    
+    def close(self) -> Dict[str, Any]:
+        """
+        Finish parsing.
+        
+        Returns:
+            The decoded object
+        
+        Raises:
+            StreamingJSONError: If the text ended before the object was complete
+        """
+        if not self.done:
+            if not self._started:
+                raise StreamingJSONError("No JSON object found", self._offset)
+            raise StreamingJSONError("Response ended before the JSON object was complete", self._offset + len(self._text))
+        return self.result
+    
+    def _complete_member(self, text: str, end: int, last: bool = False) -> List[Tuple[str, Any]]:
+        member = text[self._member_start:end].strip()
+        if not member:
+            if last and not self.result:
+                return []  # Empty object
+            raise StreamingJSONError("Missing object member", self._offset + end)
+        try:
+            decoded = json.loads('{' + member + '}')
+        except json.JSONDecodeError as e:
+            raise StreamingJSONError(f"Invalid JSON member: {e.msg}", self._offset + self._member_start) from None
+        if len(decoded) != 1:
+            raise StreamingJSONError("Expected one key per member", self._offset + self._member_start)
+        
+        (key, value), = decoded.items()
+        self.result[key] = value
+        if self.on_member:
+            self.on_member(key, value)
+        return [(key, value)]
+
+
+def parse_json_object(chunks: Iterable[str], on_member: Optional[MemberCallback] = None) -> Dict[str, Any]:
+    """
+    Parse the first JSON object in some text (a string or an iterable of chunks).
+    
+    Text after the object is ignored.
+    """
+    parser = IncrementalJSONParser(on_member)
+    for chunk in ([chunks] if isinstance(chunks, str) else chunks):
+        parser.feed(chunk)
+        if parser.done:
+            break
+    return parser.close()
+
+
+async def parse_json_stream(chunks: AsyncIterable[str], on_member: Optional[MemberCallback] = None) -> Dict[str, Any]:
+    """
+    Parse the first JSON object from a stream of text chunks.
+    
+    Returns as soon as the object is complete and raises on the first
+    error, so the caller can close the stream without reading the rest.
+    """
+    parser = IncrementalJSONParser(on_member)
+    async for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    return parser.close()
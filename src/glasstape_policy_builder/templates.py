@@ -1,7 +1,36 @@
 """Policy Template Library - Pre-built templates for common policy scenarios."""
 
-from dataclasses import dataclass
-from typing import Literal
+import copy
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal
+
+import yaml
+
+from .icp_validator import ICPValidator
+from .topic_taxonomy import taxonomy
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR_ENV = 'GLASSTAPE_TEMPLATE_DIR'
+TEMPLATE_FILE_SUFFIXES = ('.yaml', '.yml', '.json')
+
+
+@dataclass
+class TemplateParameter:
+    """Typed template parameter"""
+    name: str
+    type: Literal['number', 'string', 'string_list', 'topics']
+    default: Any
+    description: str = ''
+    minimum: float | None = None
 
 
 @dataclass
@@ -12,6 +41,59 @@ class PolicyTemplate:
     category: Literal['finance', 'healthcare', 'ai_safety', 'data_access', 'system']
     description: str
     example: str
+    tags: list[str] = field(default_factory=list)
+    parameters: list[TemplateParameter] = field(default_factory=list)
+    skeleton: dict | None = None
+
+
+def _rule(actions, conditions, roles='${roles}', effect='EFFECT_ALLOW', description=''):
+    rule = {'actions': actions, 'effect': effect, 'conditions': conditions, 'description': description}
+    if roles is not None:
+        rule['roles'] = roles
+    return rule
+
+
+def _test(name, category, expected, attr, actions, principal_id='agent-1', roles='${roles}'):
+    return {
+        'name': name,
+        'category': category,
+        'input': {
+            'principal': {'id': principal_id, 'roles': roles},
+            'resource': {'id': 'resource-1', 'attr': attr},
+            'actions': actions,
+        },
+        'expected': expected,
+    }
+
+
+def _skeleton(description, rules, tests):
+    """ICP skeleton shared by the built-in templates"""
+    return {
+        'version': '1.0.0',
+        'metadata': {
+            'name': '${resource}_policy',
+            'description': description,
+            'resource': '${resource}',
+            'topics': '${topics}',
+            'blocked_topics': '${blocked_topics}',
+        },
+        'policy': {
+            'resource': '${resource}',
+            'version': '1.0.0',
+            'rules': rules + [_rule(['*'], [], roles=None, effect='EFFECT_DENY',
+                                    description='Default deny all other actions')],
+        },
+        'tests': tests,
+    }
+
+
+def _common_parameters(resource, roles, topics, blocked_topics):
+    return [
+        TemplateParameter('resource', 'string', resource, 'Cerbos resource kind (snake_case)'),
+        TemplateParameter('roles', 'string_list', roles, 'Roles allowed by the policy (empty = any)'),
+        TemplateParameter('topics', 'topics', topics, 'Allowed content topics'),
+        TemplateParameter('blocked_topics', 'topics', blocked_topics, 'Blocked content topics'),
+    ]
 
 
 POLICY_TEMPLATES = [
@@ -22,7 +104,40 @@ POLICY_TEMPLATES = [
         description='AI agent payment policy with amount limits, sanctions screening, and rate limiting',
         example="""Allow AI agents to execute payments up to $50. Block sanctioned entities. 
 Limit cumulative hourly amount to $50. Maximum 5 transactions per 5 minutes.
-Topics: payment, transaction. Block topics: recipe, adult."""
+Topics: payment, transaction. Block topics: recipe, adult.""",
+        tags=['payments', 'amount_limits', 'rate_limiting', 'sanctions'],
+        parameters=[
+            TemplateParameter('amount_limit', 'number', 50, 'Maximum amount per payment', minimum=1),
+            TemplateParameter('rate_limit', 'number', 5, 'Maximum transactions per 5 minutes', minimum=1),
+            *_common_parameters('payment', [], ['payment', 'transaction'], ['recipe', 'adult']),
+        ],
+        skeleton=_skeleton(
+            'AI agent payment policy with amount limits, sanctions screening, and rate limiting',
+            [_rule(['execute'], [
+                'request.resource.attr.amount > 0',
+                'request.resource.attr.amount <= ${amount_limit}',
+                'request.resource.attr.transaction_count_5m < ${rate_limit}',
+                '!(request.resource.attr.recipient in request.resource.attr.sanctioned_entities)',
+            ], description='Allow payments within limits to unsanctioned recipients')],
+            [
+                _test('payment_within_limit', 'positive', 'EFFECT_ALLOW', {
+                    'amount': '${amount_limit/2}', 'transaction_count_5m': 0, 'recipient': 'vendor@example.com',
+                    'sanctioned_entities': ['blocked@example.com'], 'topics': '${topics}'}, ['execute']),
+                _test('payment_at_limit', 'boundary', 'EFFECT_ALLOW', {
+                    'amount': '${amount_limit}', 'transaction_count_5m': 0, 'recipient': 'vendor@example.com',
+                    'sanctioned_entities': ['blocked@example.com'], 'topics': '${topics}'}, ['execute']),
+                _test('payment_over_limit', 'negative', 'EFFECT_DENY', {
+                    'amount': '${amount_limit+1}', 'transaction_count_5m': 0, 'recipient': 'vendor@example.com',
+                    'sanctioned_entities': ['blocked@example.com'], 'topics': '${topics}'}, ['execute']),
+                _test('rate_limit_exceeded', 'negative', 'EFFECT_DENY', {
+                    'amount': '${amount_limit/2}', 'transaction_count_5m': '${rate_limit}',
+                    'recipient': 'vendor@example.com', 'sanctioned_entities': ['blocked@example.com'],
+                    'topics': '${topics}'}, ['execute']),
+                _test('sanctioned_recipient', 'negative', 'EFFECT_DENY', {
+                    'amount': '${amount_limit/2}', 'transaction_count_5m': 0, 'recipient': 'blocked@example.com',
+                    'sanctioned_entities': ['blocked@example.com'], 'topics': '${topics}'}, ['execute']),
+            ],
+        ),
     ),
     PolicyTemplate(
         id='phi_access',
@@ -31,7 +146,24 @@ Topics: payment, transaction. Block topics: recipe, adult."""
         description='HIPAA-compliant policy for accessing protected health information',
         example="""Allow healthcare providers to read patient records. Require role verification. 
 Log all access. Block access to records of patients not under their care.
-Topics: phi, medical_record, healthcare. Block topics: payment, recipe."""
+Topics: phi, medical_record, healthcare. Block topics: payment, recipe.""",
+        tags=['hipaa', 'phi', 'rbac'],
+        parameters=_common_parameters(
+            'patient_record', ['healthcare_provider'], ['phi', 'medical_record', 'healthcare'], ['payment', 'recipe']),
+        skeleton=_skeleton(
+            'HIPAA-compliant policy for accessing protected health information',
+            [_rule(['read'], [
+                'request.principal.id in request.resource.attr.care_team',
+            ], description='Providers may read records of patients under their care')],
+            [
+                _test('provider_reads_own_patient', 'positive', 'EFFECT_ALLOW', {
+                    'care_team': ['provider-1'], 'topics': '${topics}'}, ['read'], principal_id='provider-1'),
+                _test('provider_reads_other_patient', 'negative', 'EFFECT_DENY', {
+                    'care_team': ['provider-2'], 'topics': '${topics}'}, ['read'], principal_id='provider-1'),
+                _test('provider_deletes_record', 'negative', 'EFFECT_DENY', {
+                    'care_team': ['provider-1'], 'topics': '${topics}'}, ['delete'], principal_id='provider-1'),
+            ],
+        ),
     ),
     PolicyTemplate(
         id='model_invocation',
@@ -40,7 +172,31 @@ Topics: phi, medical_record, healthcare. Block topics: payment, recipe."""
         description='Policy for controlling AI model invocations with prompt filtering',
         example="""Allow AI agents to invoke models for approved use cases. Block jailbreak attempts. 
 Limit to 100 requests per hour. Require content filtering.
-Topics: api, configuration. Block topics: adult, violence, illegal."""
+Topics: api, configuration. Block topics: adult, violence, illegal.""",
+        tags=['llm', 'jailbreak', 'rate_limiting', 'content_filtering'],
+        parameters=[
+            TemplateParameter('rate_limit', 'number', 100, 'Maximum invocations per hour', minimum=1),
+            *_common_parameters('model', [], ['api', 'configuration'], ['adult', 'violence', 'illegal']),
+        ],
+        skeleton=_skeleton(
+            'Policy for controlling AI model invocations with prompt filtering',
+            [_rule(['invoke'], [
+                'request.resource.attr.request_count_1h < ${rate_limit}',
+                'request.resource.attr.jailbreak_detected == false',
+                'request.resource.attr.content_filtered == true',
+            ], description='Allow filtered invocations within the hourly limit')],
+            [
+                _test('filtered_invocation', 'positive', 'EFFECT_ALLOW', {
+                    'request_count_1h': 0, 'jailbreak_detected': False, 'content_filtered': True,
+                    'topics': '${topics}'}, ['invoke']),
+                _test('hourly_limit_exceeded', 'negative', 'EFFECT_DENY', {
+                    'request_count_1h': '${rate_limit}', 'jailbreak_detected': False, 'content_filtered': True,
+                    'topics': '${topics}'}, ['invoke']),
+                _test('jailbreak_attempt', 'adversarial', 'EFFECT_DENY', {
+                    'request_count_1h': 0, 'jailbreak_detected': True, 'content_filtered': True,
+                    'topics': '${topics}'}, ['invoke']),
+            ],
+        ),
     ),
     PolicyTemplate(
         id='pii_export',
@@ -49,7 +205,27 @@ Topics: api, configuration. Block topics: adult, violence, illegal."""
         description='Policy for controlling export of personally identifiable information',
         example="""Allow data analysts to export anonymized data. Block export of PII fields. 
 Require approval for exports over 10,000 records. Log all export operations.
-Topics: pii, personal_data. Block topics: phi, medical_record."""
+Topics: pii, personal_data. Block topics: phi, medical_record.""",
+        tags=['pii', 'gdpr', 'data_export'],
+        parameters=[
+            TemplateParameter('max_records', 'number', 10000, 'Maximum records per export', minimum=1),
+            *_common_parameters('dataset', ['data_analyst'], ['pii', 'personal_data'], ['phi', 'medical_record']),
+        ],
+        skeleton=_skeleton(
+            'Policy for controlling export of personally identifiable information',
+            [_rule(['export'], [
+                'request.resource.attr.anonymized == true',
+                'request.resource.attr.record_count <= ${max_records}',
+            ], description='Allow exports of anonymized data up to the record limit')],
+            [
+                _test('anonymized_export', 'positive', 'EFFECT_ALLOW', {
+                    'anonymized': True, 'record_count': '${max_records/2}', 'topics': '${topics}'}, ['export']),
+                _test('raw_pii_export', 'negative', 'EFFECT_DENY', {
+                    'anonymized': False, 'record_count': '${max_records/2}', 'topics': '${topics}'}, ['export']),
+                _test('export_over_record_limit', 'boundary', 'EFFECT_DENY', {
+                    'anonymized': True, 'record_count': '${max_records+1}', 'topics': '${topics}'}, ['export']),
+            ],
+        ),
     ),
     PolicyTemplate(
         id='admin_access',
@@ -58,54 +234,456 @@ Topics: pii, personal_data. Block topics: phi, medical_record."""
         description='Policy for administrative system access with MFA requirements',
         example="""Allow system administrators to modify configurations. Require MFA verification. 
 Block after 3 failed attempts. Require approval for production changes.
-Topics: admin, configuration, security. Block topics: recipe, entertainment."""
+Topics: admin, configuration, security. Block topics: recipe, entertainment.""",
+        tags=['mfa', 'rbac', 'lockout'],
+        parameters=[
+            TemplateParameter('max_failed_attempts', 'number', 3, 'Failed attempts before lockout', minimum=1),
+            *_common_parameters('configuration', ['admin'], ['admin', 'configuration', 'security'],
+                                ['recipe', 'entertainment']),
+        ],
+        skeleton=_skeleton(
+            'Policy for administrative system access with MFA requirements',
+            [_rule(['modify'], [
+                'request.resource.attr.mfa_verified == true',
+                'request.resource.attr.failed_attempts < ${max_failed_attempts}',
+            ], description='Allow MFA-verified administrators to modify configuration')],
+            [
+                _test('mfa_verified_admin', 'positive', 'EFFECT_ALLOW', {
+                    'mfa_verified': True, 'failed_attempts': 0, 'topics': '${topics}'}, ['modify']),
+                _test('missing_mfa', 'negative', 'EFFECT_DENY', {
+                    'mfa_verified': False, 'failed_attempts': 0, 'topics': '${topics}'}, ['modify']),
+                _test('locked_out_admin', 'boundary', 'EFFECT_DENY', {
+                    'mfa_verified': True, 'failed_attempts': '${max_failed_attempts}', 'topics': '${topics}'},
+                    ['modify']),
+            ],
+        ),
     ),
 ]
 
 
+_PLACEHOLDER = re.compile(r'\$\{(\w+)(?:\s*([+\-*/])\s*(\d+(?:\.\d+)?))?\}')
+_SNAKE_CASE = re.compile(r'^[a-z][a-z0-9_]*$')
+
+
+@dataclass
+class CompiledTemplate:
+    """Template skeleton with its placeholder slots located ahead of time"""
+    template: PolicyTemplate
+    slots: list[tuple[tuple, str]]
+    
+    def render(self, values: dict[str, Any]) -> dict:
+        """Fill the skeleton with already-validated parameter values"""
+        icp = copy.deepcopy(self.template.skeleton)
+        for path, raw in self.slots:
+            container = icp
+            for key in path[:-1]:
+                container = container[key]
+            container[path[-1]] = _substitute(raw, values)
+        return icp
+
+
+def compile_template(template: PolicyTemplate) -> CompiledTemplate:
+    """Locate every placeholder in a template skeleton"""
+    if template.skeleton is None:
+        raise ValueError(f"Template '{template.id}' has no ICP skeleton")
+    
+    slots = []
+    
+    def walk(node, path):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                walk(value, path + (key,))
+        elif isinstance(node, list):
+            for index, value in enumerate(node):
+                walk(value, path + (index,))
+        elif isinstance(node, str) and '${' in node:
+            slots.append((path, node))
+    
+    walk(template.skeleton, ())
+    
+    known = {p.name for p in template.parameters}
+    for _, raw in slots:
+        for match in _PLACEHOLDER.finditer(raw):
+            if match.group(1) not in known:
+                raise ValueError(f"Template '{template.id}' references unknown parameter '{match.group(1)}'")
+    
+    return CompiledTemplate(template=template, slots=slots)
+
+
+def _substitute(raw: str, values: dict[str, Any]) -> Any:
+    """Resolve placeholders; a whole-string placeholder keeps the value's type"""
+    whole = _PLACEHOLDER.fullmatch(raw)
+    if whole:
+        return _placeholder_value(whole, values)
+    
+    def replace(match):
+        value = _placeholder_value(match, values)
+        if isinstance(value, list):
+            raise ValueError(f"List parameter '{match.group(1)}' cannot be embedded in text")
+        return str(value)
+    
+    return _PLACEHOLDER.sub(replace, raw)
+
+
+def _placeholder_value(match: re.Match, values: dict[str, Any]) -> Any:
+    value = values[match.group(1)]
+    operator, operand = match.group(2), match.group(3)
+    if operator:
+        operand = float(operand)
+        value = {
+            '+': value + operand,
+            '-': value - operand,
+            '*': value * operand,
+            '/': value / operand,
+        }[operator]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _coerce_parameter(template: PolicyTemplate, param: TemplateParameter, value: Any) -> Any:
+    """Type-check a single parameter value"""
+    label = f"Parameter '{param.name}' of template '{template.id}'"
+    
+    if param.type == 'number':
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{label} must be a number")
+        if param.minimum is not None and value < param.minimum:
+            raise ValueError(f"{label} must be at least {param.minimum}")
+        return value
+    
+    if param.type == 'string':
+        if not isinstance(value, str) or not _SNAKE_CASE.match(value):
+            raise ValueError(f"{label} must be a snake_case string")
+        return value
+    
+    if not isinstance(value, list) or not all(isinstance(v, str) and v for v in value):
+        raise ValueError(f"{label} must be a list of strings")
+    
+    if param.type == 'topics':
+        invalid = taxonomy.validate_topics(value)['invalid']
+        if invalid:
+            raise ValueError(f"{label} has invalid topics: {invalid}")
+    return list(value)
+
+
+def parse_template_data(data: dict[str, Any]) -> PolicyTemplate:
+    """
+    Build a PolicyTemplate from a template definition document
+    
+    Raises:
+        ValueError: If required fields are missing or malformed
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Template definition must be a mapping")
+    missing = [f for f in ('id', 'name', 'category', 'description', 'example') if not data.get(f)]
+    if missing:
+        raise ValueError(f"Template definition missing required fields: {missing}")
+    
+    parameters = []
+    for definition in data.get('parameters') or []:
+        if (
+            not isinstance(definition, dict)
+            or not isinstance(definition.get('name'), str)
+            or not definition['name']
+            or definition.get('type') not in ('number', 'string', 'string_list', 'topics')
+        ):
+            raise ValueError(f"Template '{data['id']}' has an invalid parameter definition: {definition}")
+        parameters.append(TemplateParameter(
+            name=definition['name'],
+            type=definition['type'],
+            default=definition.get('default'),
+            description=definition.get('description', ''),
+            minimum=definition.get('minimum'),
+        ))
+    
+    return PolicyTemplate(
+        id=str(data['id']),
+        name=str(data['name']),
+        category=str(data['category']),
+        description=str(data['description']),
+        example=str(data['example']),
+        tags=[str(t) for t in data.get('tags') or []],
+        parameters=parameters,
+        skeleton=data.get('skeleton'),
+    )
+
+
+def load_template_dir(template_dir: Path) -> list[PolicyTemplate]:
+    """Load every template definition file in a directory; bad files are skipped"""
+    templates = []
+    for path in sorted(template_dir.rglob('*')):
+        if not path.is_file() or path.suffix.lower() not in TEMPLATE_FILE_SUFFIXES:
+            continue
+        try:
+            text = path.read_text()
+            data = json.loads(text) if path.suffix.lower() == '.json' else yaml.safe_load(text)
+            templates.append(parse_template_data(data))
+        except (OSError, ValueError, TypeError, KeyError, yaml.YAMLError) as e:
+            logger.warning(f"Skipping template file {path}: {e}")
+    return templates
+
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+# Relative weight of a term depending on the field it appears in
+_FIELD_WEIGHTS = (('name', 3.0), ('tags', 2.5), ('description', 1.5), ('example', 1.0))
+
+
+def _terms(text: str) -> list[str]:
+    """Tokenize and lightly stem text for the search index"""
+    terms = []
+    for word in _WORD.findall(text.lower().replace('_', ' ')):
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+@dataclass
+class TemplateIndex:
+    """Lookup and full-text indexes over one version of the template set"""
+    templates: list[PolicyTemplate]
+    by_id: dict[str, PolicyTemplate]
+    by_category: dict[str, list[PolicyTemplate]]
+    by_tag: dict[str, list[PolicyTemplate]]
+    postings: dict[str, dict[int, float]]
+    
+    @classmethod
+    def build(cls, templates: list[PolicyTemplate]) -> 'TemplateIndex':
+        """Index templates by id, category, tag and weighted terms"""
+        by_id: dict[str, PolicyTemplate] = {}
+        for template in templates:
+            by_id[template.id] = template  # Later definitions override earlier ones
+        templates = list(by_id.values())
+        
+        by_category: dict[str, list[PolicyTemplate]] = {}
+        by_tag: dict[str, list[PolicyTemplate]] = {}
+        postings: dict[str, dict[int, float]] = {}
+        
+        for doc_id, template in enumerate(templates):
+            by_category.setdefault(template.category, []).append(template)
+            for tag in template.tags:
+                by_tag.setdefault(tag.lower(), []).append(template)
+            
+            weights: Counter = Counter()
+            fields = {
+                'name': template.name,
+                'tags': ' '.join(template.tags),
+                'description': template.description,
+                'example': template.example,
+            }
+            for field_name, field_weight in _FIELD_WEIGHTS:
+                terms = _terms(fields[field_name])
+                for term, count in Counter(terms).items():
+                    # Sub-linear term frequency, normalised by field length
+                    weights[term] += field_weight * (1 + math.log(count)) / math.sqrt(len(terms))
+            for term, weight in weights.items():
+                postings.setdefault(term, {})[doc_id] = weight
+        
+        # Fold inverse document frequency into the postings once
+        total = len(templates)
+        for term, docs in postings.items():
+            idf = math.log(1 + total / len(docs))
+            for doc_id in docs:
+                docs[doc_id] *= idf
+        
+        return cls(templates, by_id, by_category, by_tag, postings)
+    
+    def search(self, query: str, limit: int = 10, category: str | None = None) -> list[tuple[PolicyTemplate, float]]:
+        """Rank templates against a free-text query"""
+        scores: dict[int, float] = {}
+        for term in set(_terms(query)):
+            for doc_id, weight in self.postings.get(term, {}).items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        results = []
+        for doc_id, score in ranked:
+            template = self.templates[doc_id]
+            if category and template.category != category:
+                continue
+            results.append((template, round(score, 4)))
+            if len(results) == limit:
+                break
+        return results
+
+
 class TemplateLibrary:
     """Manage policy templates"""
     
-    def list_templates(self, category: str = None) -> list[PolicyTemplate]:
+    # Upper bound on cached listing renderings (search results vary per query)
+    RENDER_CACHE_SIZE = 256
+    
+    def __init__(self, templates: list[PolicyTemplate] | None = None, template_dir: str | None = None):
+        """
+        Args:
+            templates: Explicit template set; defaults to the built-in templates
+            template_dir: Directory of YAML/JSON template files to add; defaults
+                to $GLASSTAPE_TEMPLATE_DIR
+        """
+        template_dir = template_dir or os.getenv(TEMPLATE_DIR_ENV)
+        self.template_dir = Path(template_dir).expanduser() if template_dir else None
+        self._base_templates = templates
+        self.version = -1
+        self.reload()
+    
+    def reload(self, templates: list[PolicyTemplate] | None = None) -> None:
+        """Re-read the template directory, rebuild indexes and invalidate cached renderings"""
+        if templates is not None:
+            self._base_templates = templates
+        loaded = list(POLICY_TEMPLATES if self._base_templates is None else self._base_templates)
+        if self.template_dir:
+            loaded.extend(load_template_dir(self.template_dir))
+        
+        self._index = TemplateIndex.build(loaded)
+        self._templates = self._index.templates
+        self.version += 1
+        self._render_cache: dict[tuple, str] = {}
+        self._compiled: dict[str, CompiledTemplate | ValueError] | None = None
+    
+    def list_templates(self, category: str = None, tag: str = None) -> list[PolicyTemplate]:
         """
         List available templates
         
         Args:
             category: Optional category filter
+            tag: Optional tag filter
             
         Returns:
             List of matching templates
         """
+        templates = self._templates
         if category:
-            return [t for t in POLICY_TEMPLATES if t.category == category]
-        return POLICY_TEMPLATES
+            templates = self._index.by_category.get(category, [])
+        if tag:
+            tagged = {id(t) for t in self._index.by_tag.get(tag.lower(), [])}
+            templates = [t for t in templates if id(t) in tagged]
+        return templates
+    
+    def search(self, query: str, limit: int = 10, category: str | None = None) -> list[tuple[PolicyTemplate, float]]:
+        """
+        Full-text search over template names, tags, descriptions and examples
+        
+        Returns:
+            (template, score) pairs, best match first
+        """
+        return self._index.search(query, limit, category)
     
     def get_template(self, template_id: str) -> PolicyTemplate | None:
         """Get a specific template by ID"""
-        for template in POLICY_TEMPLATES:
-            if template.id == template_id:
-                return template
-        return None
+        return self._index.by_id.get(template_id)
     
     def get_categories(self) -> list[str]:
         """Get list of all categories"""
-        return list(set(t.category for t in POLICY_TEMPLATES))
+        return sorted(self._index.by_category)
+    
+    def get_tags(self) -> list[str]:
+        """Get list of all tags"""
+        return sorted(self._index.by_tag)
+    
+    def prepare(self) -> dict[str, CompiledTemplate | ValueError]:
+        """
+        Compile and validate every template skeleton once per library version.
+        
+        Each skeleton is instantiated with its defaults and run through the full
+        ICP validator, so instantiation only has to check parameter values.
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = {}
+            validator = ICPValidator()
+            for template in self._templates:
+                if template.skeleton is None:
+                    continue
+                try:
+                    entry = compile_template(template)
+                    defaults = {p.name: p.default for p in template.parameters}
+                    validator.validate(entry.render(defaults))
+                    compiled[template.id] = entry
+                except ValueError as e:
+                    compiled[template.id] = ValueError(f"Template '{template.id}' is invalid: {e}")
+            self._compiled = compiled
+        return compiled
+    
+    def instantiate(self, template_id: str, params: dict[str, Any] | None = None) -> dict:
+        """
+        Build an ICP from a template and parameter values
+        
+        Args:
+            template_id: Template ID
+            params: Parameter overrides; omitted parameters use their defaults
+            
+        Returns:
+            ICP dictionary
+            
+        Raises:
+            ValueError: If the template or a parameter is invalid
+        """
+        entry = self.prepare().get(template_id)
+        if entry is None:
+            if self.get_template(template_id) is None:
+                raise ValueError(f"Unknown template: {template_id}")
+            raise ValueError(f"Template '{template_id}' does not support instantiation")
+        if isinstance(entry, ValueError):
+            raise entry
+        
+        template = entry.template
+        params = params or {}
+        parameters = {p.name: p for p in template.parameters}
+        unknown = sorted(set(params) - set(parameters))
+        if unknown:
+            raise ValueError(
+                f"Unknown parameters for template '{template_id}': {unknown}. "
+                f"Available: {', '.join(parameters)}"
+            )
+        
+        values = {
+            name: _coerce_parameter(template, param, params[name]) if name in params else param.default
+            for name, param in parameters.items()
+        }
+        return entry.render(values)
     
     def format_templates(self, templates: list[PolicyTemplate]) -> str:
-        """Format templates as readable text"""
-        output = "# Policy Templates\n\n"
-        output += f"**Categories**: {', '.join(self.get_categories())}\n\n"
+        """Format templates as readable text (cached until the next reload)"""
+        key = tuple(t.id for t in templates)
+        output = self._render_cache.get(key)
+        if output is None:
+            output = self._render_templates(templates)
+            if len(self._render_cache) >= self.RENDER_CACHE_SIZE:
+                self._render_cache.clear()
+            self._render_cache[key] = output
+        return output
+    
+    def _render_templates(self, templates: list[PolicyTemplate]) -> str:
+        """Render a template listing"""
+        parts = [
+            "# Policy Templates\n\n",
+            f"**Categories**: {', '.join(self.get_categories())}\n\n",
+        ]
         
         for template in templates:
-            output += f"## {template.name}\n"
-            output += f"**ID**: `{template.id}`\n"
-            output += f"**Category**: {template.category}\n"
-            output += f"**Description**: {template.description}\n\n"
-            output += "**Example requirement**:\n"
-            output += f"```\n{template.example}\n```\n\n"
-            output += "---\n\n"
+            parts.append(
+                f"## {template.name}\n"
+                f"**ID**: `{template.id}`\n"
+                f"**Category**: {template.category}\n"
+                + (f"**Tags**: {', '.join(template.tags)}\n" if template.tags else "")
+                + f"**Description**: {template.description}\n\n"
+                "**Example requirement**:\n"
+                f"```\n{template.example}\n```\n\n"
+            )
+            if template.skeleton is not None and template.parameters:
+                params = ', '.join(f"`{p.name}` ({p.type}, default {p.default!r})" for p in template.parameters)
+                parts.append(f"**Parameters**: {params}\n\n")
+            parts.append("---\n\n")
         
-        output += "\nUse `generate_policy` with any of these example requirements to create a policy.\n"
+        parts.append(
+            "\nUse `generate_policy` with any of these example requirements to create a policy, "
+            "or `instantiate_template` to build one directly from its parameters.\n"
+        )
         
-        return output
+        return "".join(parts)
+
 
+# Global template library instance
+template_library = TemplateLibrary()
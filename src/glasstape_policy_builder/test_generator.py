@@ -0,0 +1,370 @@
+"""
+Test Generator - Boundary and adversarial tests from rule conditions.
+
+Reads the numeric, string and membership constraints on resource attributes
+in each rule's CEL conditions and builds minimal inputs around them: the
+limit and one step either side, listed and unlisted values, null, a value
+of the wrong type, a missing attribute and blocked topics present. Each
+test starts from a witness that satisfies the rule, changes one attribute,
+and takes its expected effect from in-process evaluation of the policy, so
+the suite pins down the current decision at every edge. Tests with the same
+input are emitted once.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import cel
+from .cerbos_generator import CerbosGenerator
+from .coverage import PolicyEvaluator, plain
+from .policy_model import CATCH_ALL
+from .types import ICPTest, ICPTestInput
+
+
+# Upper bound on generated tests per policy
+MAX_GENERATED_TESTS = 200
+
+# Only resource attributes: generated Cerbos test suites carry no principal attributes
+RESOURCE_ATTR = ('request', 'resource', 'attr')
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class Constraint:
+    """A comparison between one resource attribute and a constant."""
+    attribute: Tuple[str, ...]
+    kind: str  # number | string | bool | member | contains | present
+    op: str
+    value: Any = None
+    negated: bool = False
+    
+    @property
+    def name(self) -> str:
+        return '.'.join(self.attribute)
+    
+    def holds(self, value: Any) -> bool:
+        """Whether the constraint is satisfied by this attribute value (_MISSING if absent)."""
+        if self.kind == 'present':
+            result = value is not _MISSING
+        elif value is _MISSING:
+            return False
+        else:
+            try:
+                result = cel.compile_expression(self._node())({'v': value})
+            except cel.CELEvaluationError:
+                return False
+        return result != self.negated
+    
+    def _node(self) -> cel.Node:
+        subject = cel.Ident('v')
+        if self.kind == 'member':
+            return cel.Binary('in', subject, cel.ListExpr(tuple(cel.Literal(v) for v in self.value)))
+        if self.kind == 'contains':
+            return cel.Binary('in', cel.Literal(self.value), subject)
+        if self.op in cel.COMPARISONS:
+            return cel.Binary(self.op, subject, cel.Literal(self.value))
+        return cel.Call(self.op, (cel.Literal(self.value),), target=subject)
+
+
+def _attribute(node: cel.Node) -> Optional[Tuple[str, ...]]:
+    path = cel.attribute_path(node)
+    if path and len(path) > len(RESOURCE_ATTR) and path[:len(RESOURCE_ATTR)] == RESOURCE_ATTR:
+        return path[len(RESOURCE_ATTR):]
+    return None
+
+
+def _kind(value: Any) -> Optional[str]:
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, (int, float)):
+        return 'number'
+    if isinstance(value, str):
+        return 'string'
+    return None
+
+
+_FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+
+
+def _leaf(node: cel.Node, negated: bool) -> Optional[Constraint]:
+    """The constraint a leaf condition places on one attribute, if it is that simple."""
+    if isinstance(node, cel.Call) and node.function == 'has' and node.target is None and node.args:
+        attribute = _attribute(node.args[0])
+        return Constraint(attribute, 'present', 'has', negated=negated) if attribute else None
+    
+    attribute = _attribute(node)
+    if attribute:
+        return Constraint(attribute, 'bool', '==', True, negated)
+    
+    if isinstance(node, cel.Binary) and node.op in cel.COMPARISONS:
+        op, term, constant = node.op, node.left, node.right
+        if cel.is_constant(term):
+            op, term, constant = _FLIPPED[op], constant, term
+        attribute = _attribute(term)
+        if attribute and cel.is_constant(constant):
+            try:
+                value = cel.constant_value(constant)
+            except ValueError:
+                return None
+            kind = _kind(value)
+            if kind and (kind == 'number' or op in ('==', '!=')):
+                return Constraint(attribute, kind, op, value, negated)
+        return None
+    
+    if isinstance(node, cel.Binary) and node.op == 'in':
+        left, right = _attribute(node.left), _attribute(node.right)
+        if left and isinstance(node.right, cel.ListExpr) and cel.is_constant(node.right):
+            values = tuple(cel.constant_value(node.right))
+            if values and all(_kind(v) for v in values):
+                return Constraint(left, 'member', 'in', values, negated)
+        if right and cel.is_constant(node.left):
+            value = cel.constant_value(node.left)
+            if _kind(value):
+                return Constraint(right, 'contains', 'in', value, negated)
+        return None
+    
+    if (
+        isinstance(node, cel.Call) and node.function in ('startsWith', 'endsWith', 'contains')
+        and node.target is not None and len(node.args) == 1 and isinstance(node.args[0], cel.Literal)
+        and isinstance(node.args[0].value, str)
+    ):
+        attribute = _attribute(node.target)
+        if attribute:
+            return Constraint(attribute, 'string', node.function, node.args[0].value, negated)
+    return None
+
+
+def constraints(node: cel.Node, negated: bool = False) -> List[Constraint]:
+    """Every attribute constraint in a condition, with the polarity it appears under."""
+    if isinstance(node, cel.Binary) and node.op in ('&&', '||'):
+        return constraints(node.left, negated) + constraints(node.right, negated)
+    if isinstance(node, cel.Unary) and node.op == '!':
+        return constraints(node.operand, not negated)
+    constraint = _leaf(node, negated)
+    return [constraint] if constraint else []
+
+
+def _required(node: cel.Node, negated: bool = False) -> List[Constraint]:
+    """Constraints that together satisfy the condition, taking the first alternative of each disjunction."""
+    if isinstance(node, cel.Binary) and node.op in ('&&', '||'):
+        # Under negation && behaves as || and vice versa (De Morgan)
+        conjunction = (node.op == '&&') != negated
+        if conjunction:
+            return _required(node.left, negated) + _required(node.right, negated)
+        return _required(node.left, negated)
+    if isinstance(node, cel.Unary) and node.op == '!':
+        return _required(node.operand, not negated)
+    constraint = _leaf(node, negated)
+    return [constraint] if constraint else []
+
+
+def _step(value: Any) -> Any:
+    return 1 if isinstance(value, int) else 0.01
+
+
+def _unlisted(values: Tuple[Any, ...]) -> Any:
+    if all(_kind(v) == 'number' for v in values):
+        return max(values) + 1
+    candidate = 'unlisted'
+    while candidate in values:
+        candidate += '_'
+    return candidate
+
+
+def _wrong_type(constraint: Constraint) -> Any:
+    sample = constraint.value[0] if constraint.kind == 'member' else constraint.value
+    if constraint.kind == 'contains':
+        return str(sample)  # A scalar where a list is expected
+    if constraint.kind == 'bool':
+        return 'true'
+    if _kind(sample) == 'number':
+        return str(sample)
+    return 0
+
+
+def variants(constraint: Constraint) -> List[Tuple[str, str, Any]]:
+    """(category, label, attribute value) cases around a constraint; _MISSING removes the attribute."""
+    value = constraint.value
+    cases: List[Tuple[str, str, Any]] = []
+    if constraint.kind == 'number':
+        step = _step(value)
+        cases += [
+            ('boundary', f"at_{value}", value),
+            ('boundary', f"below_{value}", round(value - step, 10)),
+            ('boundary', f"above_{value}", round(value + step, 10)),
+        ]
+    elif constraint.kind == 'string':
+        matching = {'startsWith': value + '_x', 'endsWith': 'x_' + value, 'contains': 'x_' + value + '_x'}
+        cases += [
+            ('boundary', 'matching', matching.get(constraint.op, value)),
+            ('boundary', 'different', 'x' if value == '' else ''),
+        ]
+    elif constraint.kind == 'bool':
+        cases += [('boundary', 'true', True), ('boundary', 'false', False)]
+    elif constraint.kind == 'member':
+        cases += [('boundary', f"listed_{listed}", listed) for listed in value]
+        cases.append(('boundary', 'unlisted', _unlisted(value)))
+    elif constraint.kind == 'contains':
+        if constraint.negated:
+            # A blocked value being present is an attack, not an edge case
+            cases += [('adversarial', f"{value}_present", [value]), ('boundary', f"{value}_absent", [])]
+        else:
+            cases += [('boundary', f"{value}_present", [value]), ('boundary', f"{value}_absent", [])]
+    
+    cases.append(('adversarial', 'missing', _MISSING))
+    if constraint.kind != 'present':
+        cases += [('adversarial', 'null', None), ('adversarial', 'wrong_type', _wrong_type(constraint))]
+    return cases
+
+
+# Request fields the generated tests always send
+_REQUEST_VALUES = {
+    ('request', 'principal', 'id'): 'test-principal',
+    ('request', 'resource', 'id'): 'test-resource',
+}
+
+
+def _defaults(node: cel.Node, defaults: Dict[Tuple[str, ...], Any], negated: bool = False) -> None:
+    """Placeholder values for attributes compared with other request fields (e.g. P.id in R.attr.team)."""
+    if isinstance(node, cel.Unary) and node.op == '!':
+        _defaults(node.operand, defaults, not negated)
+        return
+    if not isinstance(node, cel.Binary):
+        return
+    if node.op in ('&&', '||'):
+        _defaults(node.left, defaults, negated)
+        _defaults(node.right, defaults, negated)
+        return
+    
+    left, right = _attribute(node.left), _attribute(node.right)
+    known = _REQUEST_VALUES.get(cel.attribute_path(node.left) or ())
+    if node.op == 'in' and right:
+        # Membership holds only if the list has the value; blocklists stay empty
+        value = known or defaults.get(left, 'test-value')
+        defaults.setdefault(right, [] if negated else [value])
+        if left:
+            defaults.setdefault(left, value)
+    elif node.op in ('==', '!=') and (left or right):
+        known = known or _REQUEST_VALUES.get(cel.attribute_path(node.right) or ())
+        if known or (left and right):
+            equal = (node.op == '==') != negated
+            for attribute in (left, right):
+                if attribute:
+                    defaults.setdefault(attribute, (known or 'test-value') if equal else 'other-value')
+
+
+def _witness(node: cel.Node) -> Dict[Tuple[str, ...], Any]:
+    """Attribute values that satisfy the condition's simple constraints where one value can."""
+    by_attribute: Dict[Tuple[str, ...], List[Constraint]] = {}
+    for constraint in _required(node):
+        by_attribute.setdefault(constraint.attribute, []).append(constraint)
+    
+    witness: Dict[Tuple[str, ...], Any] = {}
+    _defaults(node, witness)
+    for attribute, group in by_attribute.items():
+        if any(c.kind == 'contains' for c in group):
+            witness[attribute] = list(dict.fromkeys(
+                c.value for c in group if c.kind == 'contains' and not c.negated
+            ))
+            continue
+        candidates = [value for c in group for _, _, value in variants(c)]
+        chosen = next((v for v in candidates if all(c.holds(v) for c in group)), _MISSING)
+        if chosen is not _MISSING:
+            witness[attribute] = chosen
+    return witness
+
+
+def _set(attr: Dict[str, Any], attribute: Tuple[str, ...], value: Any) -> None:
+    for name in attribute[:-1]:
+        child = attr.get(name)
+        if not isinstance(child, dict):
+            child = attr[name] = {}
+        attr = child
+    if value is _MISSING:
+        attr.pop(attribute[-1], None)
+    else:
+        attr[attribute[-1]] = value
+
+
+def _build_attr(values: Dict[Tuple[str, ...], Any]) -> Dict[str, Any]:
+    attr: Dict[str, Any] = {}
+    for attribute, value in values.items():
+        _set(attr, attribute, value)
+    return attr
+
+
+def _input_key(test_input: Dict[str, Any]) -> str:
+    return json.dumps(
+        [sorted(test_input['principal'].get('roles', [])), test_input['resource'].get('attr', {}), test_input['actions']],
+        sort_keys=True, default=str,
+    )
+
+
+def generate_boundary_tests(icp: Dict[str, Any], max_tests: int = MAX_GENERATED_TESTS) -> List[ICPTest]:
+    """
+    Generate boundary and adversarial tests for an ICP's rule conditions.
+    
+    Args:
+        icp: Simple ICP dictionary or SimpleICP
+        max_tests: Stop after this many tests
+    
+    Returns:
+        New ICPTest objects (inputs already covered by the ICP's tests are skipped)
+    """
+    icp = plain(icp)
+    evaluator = PolicyEvaluator(icp)
+    generator = CerbosGenerator()
+    rules = icp['policy']['rules']
+    
+    concrete_actions = [a for rule in rules for a in rule['actions'] if a != CATCH_ALL]
+    seen = {_input_key(test['input']) for test in icp.get('tests', [])}
+    names = set()
+    tests: List[ICPTest] = []
+    
+    for index, rule in enumerate(rules):
+        conditions = generator.rule_conditions(rule, icp)
+        if not conditions:
+            continue
+        try:
+            node = cel.parse(' && '.join(f'({c})' for c in conditions))
+        except cel.CELSyntaxError:
+            continue
+        
+        actions = [a for a in rule['actions'] if a != CATCH_ALL] or concrete_actions[:1] or ['test_action']
+        roles = [r for r in rule.get('roles') or [] if r != CATCH_ALL][:1]
+        witness = _witness(node)
+        
+        for constraint in dict.fromkeys(constraints(node)):
+            for category, label, value in variants(constraint):
+                values = dict(witness)
+                values[constraint.attribute] = value
+                test_input = {
+                    'principal': {'id': 'test-principal', 'roles': roles},
+                    'resource': {'id': 'test-resource', 'attr': _build_attr(values)},
+                    'actions': actions[:1],
+                }
+                key = _input_key(test_input)
+                if key in seen:
+                    continue
+                seen.add(key)
+                
+                effect, _ = evaluator.decide(*evaluator.prepare(test_input), actions[0])
+                name = re.sub(r'[^a-z0-9_]+', '_', f"{category}_rule{index + 1}_{constraint.name}_{label}".lower())
+                unique, suffix = name, 2
+                while unique in names:
+                    unique, suffix = f"{name}_{suffix}", suffix + 1
+                names.add(unique)
+                
+                tests.append(ICPTest(
+                    name=unique,
+                    category=category,
+                    input=ICPTestInput(**test_input),
+                    expected=effect,
+                    description=f"Rule {index + 1}: {constraint.name} {label.replace('_', ' ')}",
+                ))
+                if len(tests) >= max_tests:
+                    return tests
+    return tests
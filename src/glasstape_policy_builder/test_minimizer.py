@@ -0,0 +1,105 @@
+"""
+Test Minimizer - The smallest test subset that keeps coverage.
+
+Each test is evaluated in-process and summarised as a coverage signature:
+the rules that decided it, the branch outcomes it exercised, the (action,
+effect) decisions it produced and its category. A greedy set cover then
+picks tests until everything the full suite covers is covered again, so the
+minimal suite keeps the same rule coverage, branch coverage and decision
+diversity. Tests whose result differs from the expected effect are always
+kept, since they are the ones reporting a problem.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from .coverage import PolicyEvaluator, effect_value, plain
+
+
+# fast: run the minimal covering subset (CI); full: run every test
+TEST_MODES = ('full', 'fast')
+
+
+@dataclass
+class CoverageSignature:
+    """What one test exercises."""
+    test: Dict[str, Any]
+    items: FrozenSet[tuple]
+    failing: bool = False
+
+
+@dataclass
+class MinimizedSuite:
+    """A covering subset of a test suite."""
+    tests: List[Dict[str, Any]]
+    total: int
+    items: int = 0
+    failing: List[str] = field(default_factory=list)
+    
+    @property
+    def dropped(self) -> int:
+        return self.total - len(self.tests)
+
+
+def coverage_signatures(icp: Dict[str, Any], tests: Optional[Iterable[Any]] = None) -> List[CoverageSignature]:
+    """
+    Evaluate each test and collect its coverage signature.
+    
+    Args:
+        icp: Simple ICP dictionary or SimpleICP
+        tests: Tests to sign (ICPTest objects or dicts); defaults to the ICP's own
+    """
+    icp = plain(icp)
+    evaluator = PolicyEvaluator(icp)
+    signatures = []
+    for test in (icp.get('tests', []) if tests is None else tests):
+        test = plain(test)
+        expected = effect_value(test['expected'])
+        roles, activation = evaluator.prepare(test['input'])
+        items = {('category', test.get('category', ''))}
+        failing = False
+        for action in test['input']['actions']:
+            effect, _, exercised = evaluator.trace(roles, activation, action)
+            items |= exercised
+            failing = failing or effect != expected
+        signatures.append(CoverageSignature(test, frozenset(items), failing))
+    return signatures
+
+
+def minimize_tests(icp: Dict[str, Any], tests: Optional[Iterable[Any]] = None) -> MinimizedSuite:
+    """
+    Pick a small subset of tests with the same coverage as the whole suite.
+    
+    Greedy set cover: repeatedly take the test that adds the most uncovered
+    items, breaking ties by original order so hand-written tests win over
+    generated duplicates. Gains are re-checked lazily from a heap, which
+    keeps large suites fast.
+    
+    Returns:
+        Selected tests in their original order
+    """
+    signatures = coverage_signatures(icp, tests)
+    chosen = {i for i, signature in enumerate(signatures) if signature.failing}
+    covered = set().union(*(signatures[i].items for i in chosen))
+    universe = set().union(*(signature.items for signature in signatures))
+    
+    heap = [(-len(s.items - covered), i) for i, s in enumerate(signatures) if i not in chosen]
+    heapq.heapify(heap)
+    while heap and len(covered) < len(universe):
+        negative_gain, i = heapq.heappop(heap)
+        gain = len(signatures[i].items - covered)
+        if gain == 0:
+            continue
+        if gain != -negative_gain:
+            heapq.heappush(heap, (-gain, i))  # Stale estimate; re-queue at its true gain
+            continue
+        chosen.add(i)
+        covered |= signatures[i].items
+    
+    return MinimizedSuite(
+        tests=[signatures[i].test for i in sorted(chosen)],
+        total=len(signatures),
+        items=len(universe),
+        failing=[s.test['name'] for s in signatures if s.failing],
+    )
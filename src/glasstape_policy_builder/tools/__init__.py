@@ -1,23 +1,50 @@
 """MCP tools for policy generation and analysis."""
 
+import contextlib
+import json
+
 from mcp.server import Server
 from mcp import types
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
 
 from .generate_policy import generate_policy_tool
+from .generate_policies_batch import generate_policies_batch_tool
 from .validate_policy import validate_policy_tool
 from .suggest_improvements import suggest_improvements_tool
 from .list_templates import list_templates_tool
 from .test_policy import test_policy_tool
+from .instantiate_template import instantiate_template_tool
+from .search_templates import search_templates_tool
+from .analyze_repository import analyze_repository_tool
+from .policy_coverage import policy_coverage_tool
+from .llm_metrics import llm_metrics_tool
+from .shared_utils import RESPONSE_FORMAT_PROPERTY
+from ..policy_index import indexing, session_index
+from ..progress import reporter_for_request, reporting
+from ..scheduler import scheduler
+from ..services import get_services
+
+
+# Tools that read or write paths on the server's own filesystem
+LOCAL_FILE_TOOLS = frozenset({"analyze_repository"})
 
 
-async def register_tools(server: Server):
-    """Register consolidated MCP tools with the server."""
+async def register_tools(server: Server, local_files: bool = True):
+    """
+    Register consolidated MCP tools with the server.
+    
+    Args:
+        server: Server to register the tools on
+        local_files: Offer tools that access the server's filesystem; off for
+            transports whose clients are not the machine's user
+    """
+    get_services()  # Warm the shared pipeline before the first call
+    disabled = frozenset() if local_files else LOCAL_FILE_TOOLS
     
     @server.list_tools()
     async def handle_list_tools() -> List[types.Tool]:
         """List available MCP tools."""
-        return [
+        tools = [
             types.Tool(
                 name="generate_policy",
                 description="Convert natural language guardrails into enterprise-grade Cerbos YAML policies",
@@ -31,16 +58,52 @@ async def register_tools(server: Server):
                         "icp": {
                             "type": "object",
                             "description": "Structured policy JSON (for automation workflows)"
-                        }
+                        },
+                        "boundary_tests": {
+                            "type": "boolean",
+                            "description": "Add boundary and adversarial tests generated from the rule conditions"
+                        },
+                        "test_mode": {
+                            "type": "string",
+                            "enum": ["full", "fast"],
+                            "description": "full (default) returns and runs every test; fast keeps only a minimal subset with the same coverage"
+                        },
+                        "response_format": RESPONSE_FORMAT_PROPERTY
                     }
                 }
             ),
+            types.Tool(
+                name="generate_policies_batch",
+                description="Convert many natural language guardrails to structured policy JSON in one call",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "requirements": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "maxItems": 200,
+                            "description": "Plain English requirements, one policy each"
+                        },
+                        "concurrency": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 16,
+                            "description": "Server-side LLM requests in flight at once (default: 4)"
+                        },
+                        "response_format": RESPONSE_FORMAT_PROPERTY
+                    },
+                    "required": ["requirements"]
+                }
+            ),
             types.Tool(
                 name="validate_policy",
                 description="Validate policy syntax using cerbos compile",
                 inputSchema={
                     "type": "object",
-                    "properties": {"policy_yaml": {"type": "string"}},
+                    "properties": {
+                        "policy_yaml": {"type": "string"},
+                        "response_format": RESPONSE_FORMAT_PROPERTY
+                    },
                     "required": ["policy_yaml"]
                 }
             ),
@@ -51,17 +114,90 @@ async def register_tools(server: Server):
                     "type": "object",
                     "properties": {
                         "policy_yaml": {"type": "string"},
-                        "icp": {"type": "object", "description": "Optional ICP for enhanced analysis"}
+                        "icp": {"type": "object", "description": "Optional ICP for enhanced analysis"},
+                        "response_format": RESPONSE_FORMAT_PROPERTY
                     },
                     "required": ["policy_yaml"]
                 }
             ),
+            types.Tool(
+                name="analyze_repository",
+                description="Run security analysis on every Cerbos policy in a directory and summarize the findings",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "path": {
+                            "type": "string",
+                            "description": "Policy repository directory"
+                        },
+                        "output_path": {
+                            "type": "string",
+                            "description": "Report file name for the per-file JSONL report, inside the report directory (default: timestamped)"
+                        },
+                        "workers": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 64,
+                            "description": "Worker processes (default: CPU count; never more than the CPU count)"
+                        },
+                        "top": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "Number of worst offenders to list"
+                        }
+                    },
+                    "required": ["path"]
+                }
+            ),
+            types.Tool(
+                name="policy_coverage",
+                description="Evaluate ICP tests against the policy rules and report rule and condition-branch coverage",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "icp": {
+                            "type": "object",
+                            "description": "Structured policy JSON including its tests"
+                        },
+                        "tests": {
+                            "type": "array",
+                            "items": {"type": "object"},
+                            "description": "Tests to run instead of the ICP's own"
+                        }
+                    },
+                    "required": ["icp"]
+                }
+            ),
+            types.Tool(
+                name="llm_metrics",
+                description="Show server-side LLM provider latency percentiles, errors, hedged requests and cache use",
+                inputSchema={"type": "object", "properties": {}}
+            ),
             types.Tool(
                 name="list_templates",
                 description="List available policy templates",
                 inputSchema={
                     "type": "object",
-                    "properties": {"category": {"type": "string"}}
+                    "properties": {
+                        "category": {"type": "string"},
+                        "tag": {"type": "string"}
+                    }
+                }
+            ),
+            types.Tool(
+                name="search_templates",
+                description="Search policy templates by keyword, ranked by relevance",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Free-text query, e.g. 'rate limit payments'"
+                        },
+                        "category": {"type": "string"},
+                        "limit": {"type": "integer", "minimum": 1}
+                    },
+                    "required": ["query"]
                 }
             ),
             types.Tool(
@@ -77,36 +213,99 @@ async def register_tools(server: Server):
                         "test_yaml": {
                             "type": "string", 
                             "description": "Cerbos test suite YAML content"
-                        }
+                        },
+                        "response_format": RESPONSE_FORMAT_PROPERTY
                     },
                     "required": ["policy_yaml", "test_yaml"]
                 }
+            ),
+            types.Tool(
+                name="instantiate_template",
+                description="Build a Cerbos policy and tests directly from a template and typed parameters",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "template_id": {
+                            "type": "string",
+                            "description": "Template ID from list_templates"
+                        },
+                        "params": {
+                            "type": "object",
+                            "description": "Parameter values, e.g. {\"amount_limit\": 100, \"roles\": [\"agent\"]}"
+                        },
+                        "response_format": RESPONSE_FORMAT_PROPERTY
+                    },
+                    "required": ["template_id"]
+                }
             )
         ]
+        return [tool for tool in tools if tool.name not in disabled]
     
     @server.call_tool()
     async def handle_call_tool(
         name: str, arguments: Optional[Dict[str, Any]]
-    ) -> List[types.TextContent]:
+    ) -> Union[List[types.TextContent], types.CallToolResult]:
         """Handle MCP tool calls."""
         try:
             if not arguments:
                 arguments = {}
+            if name in disabled:
+                return [types.TextContent(type="text", text=f"Error: {name} is not available on this transport")]
             
-            if name == "generate_policy":
-                result = await generate_policy_tool(arguments)
-            elif name == "validate_policy":
-                result = await validate_policy_tool(arguments)
-            elif name == "suggest_improvements":
-                result = await suggest_improvements_tool(arguments)
-            elif name == "list_templates":
-                result = await list_templates_tool(arguments)
-            elif name == "test_policy":
-                result = await test_policy_tool(arguments)
-            else:
-                return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
+            # Expensive tools have concurrency limits so cheap ones stay responsive
+            async with scheduler.limit(name), _progress_for(server), _session_scope(server):
+                if name == "generate_policy":
+                    result = await generate_policy_tool(arguments)
+                elif name == "generate_policies_batch":
+                    result = await generate_policies_batch_tool(arguments)
+                elif name == "validate_policy":
+                    result = await validate_policy_tool(arguments)
+                elif name == "suggest_improvements":
+                    result = await suggest_improvements_tool(arguments)
+                elif name == "analyze_repository":
+                    result = await analyze_repository_tool(arguments)
+                elif name == "policy_coverage":
+                    result = await policy_coverage_tool(arguments)
+                elif name == "llm_metrics":
+                    result = await llm_metrics_tool(arguments)
+                elif name == "list_templates":
+                    result = await list_templates_tool(arguments)
+                elif name == "test_policy":
+                    result = await test_policy_tool(arguments)
+                elif name == "instantiate_template":
+                    result = await instantiate_template_tool(arguments)
+                elif name == "search_templates":
+                    result = await search_templates_tool(arguments)
+                else:
+                    return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
             
+            if isinstance(result, dict):
+                # response_format="json": fields go in structuredContent, with one compact
+                # serialized copy for clients that only read text content
+                return types.CallToolResult(
+                    content=[types.TextContent(type="text", text=json.dumps(result, separators=(",", ":")))],
+                    structuredContent=result,
+                    isError=result.get("status") == "error",
+                )
             return [types.TextContent(type="text", text=result)]
-            
+        
         except Exception as e:
-            return [types.TextContent(type="text", text=f"Error: {str(e)}")]
\ No newline at end of file
+            return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+
+
+@contextlib.asynccontextmanager
+async def _session_scope(server: Server):
+    """Index the current tool call's policies in its client session's own index."""
+    try:
+        session = server.request_context.session
+    except LookupError:
+        session = None
+    with indexing(session_index(session) if session is not None else None):
+        yield
+
+
+@contextlib.asynccontextmanager
+async def _progress_for(server: Server):
+    """Send the current tool call's progress to its client, if it asked for it."""
+    with reporting(reporter_for_request(server)):
+        yield
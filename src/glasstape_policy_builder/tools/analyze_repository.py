@@ -0,0 +1,37 @@
+"""Repository analysis tool - batch red-team analysis of a policy directory."""
+
+import functools
+from typing import Dict, Any
+
+from .shared_utils import sanitize_user_input
+from ..batch_analyzer import analyze_repository, default_report_path, resolve_report_path
+from ..daemon import client_path
+from ..scheduler import scheduler
+
+
+async def analyze_repository_tool(args: Dict[str, Any]) -> str:
+    """Analyze every policy file under a directory and summarize the findings."""
+    path = args.get("path")
+    workers = args.get("workers")
+    top = args.get("top", 10)
+    
+    if not path:
+        return "Error: 'path' parameter required."
+    if workers is not None and (not isinstance(workers, int) or workers < 1):
+        return "Error: 'workers' must be a positive integer."
+    if not isinstance(top, int) or top < 1:
+        return "Error: 'top' must be a positive integer."
+    
+    try:
+        output_path = resolve_report_path(args["output_path"]) if args.get("output_path") else default_report_path()
+    except ValueError as e:
+        return f"Error: {sanitize_user_input(str(e))}"
+    
+    try:
+        # Keep the event loop responsive while worker processes run
+        summary = await scheduler.run_io(
+            functools.partial(analyze_repository, client_path(path), output=output_path, workers=workers, top=top)
+        )
+        return summary.format()
+    except Exception as e:
+        return f"❌ **Error analyzing repository**: {sanitize_user_input(str(e))}"
@@ -0,0 +1,78 @@
+"""Batch generation tool - convert many natural-language requirements to ICP JSON."""
+
+import json
+from typing import Dict, Any, Union
+
+from .shared_utils import error_data, sanitize_user_input, wants_json
+from ..llm_adapter import get_llm_adapter
+from ..llm_batch import BATCH_CONCURRENCY, MAX_BATCH, convert_batch
+
+
+SOURCES = {
+    'local': "⚡ compiled locally",
+    'cache': "♻️ cached",
+    'llm': "🤖 server-side LLM",
+}
+
+
+async def generate_policies_batch_tool(args: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+    """Convert a list of requirements to ICPs, one result or error per requirement."""
+    requirements = args.get("requirements")
+    concurrency = args.get("concurrency", BATCH_CONCURRENCY)
+    as_json = wants_json(args)
+    
+    error = None
+    if not isinstance(requirements, list) or not requirements:
+        error = "'requirements' must be a non-empty list of strings."
+    elif not all(isinstance(text, str) and text.strip() for text in requirements):
+        error = "every requirement must be a non-empty string."
+    elif len(requirements) > MAX_BATCH:
+        error = f"at most {MAX_BATCH} requirements per batch."
+    elif not isinstance(concurrency, int) or isinstance(concurrency, bool) or not 1 <= concurrency <= 16:
+        error = "'concurrency' must be an integer from 1 to 16."
+    if error:
+        return error_data(error) if as_json else f"Error: {error}"
+    
+    try:
+        adapter = get_llm_adapter()
+    except ValueError as e:
+        if as_json:
+            return error_data(f"LLM adapter misconfigured: {e}")
+        return f"❌ **LLM adapter misconfigured**: {sanitize_user_input(str(e))}"
+    
+    results = await convert_batch(requirements, adapter, concurrency=concurrency)
+    converted = sum(1 for result in results if result.ok)
+    counts = {source: sum(1 for r in results if r.source == source) for source in SOURCES}
+    
+    if as_json:
+        return {
+            "status": "ok",
+            "summary": {"total": len(results), "converted": converted, "errors": len(results) - converted, **counts},
+            "results": [
+                {"ok": r.ok, "source": r.source or None, "icp": r.icp, "error": r.error}
+                for r in results
+            ],
+        }
+    
+    lines = [
+        f"📦 **Batch conversion**: {len(results)} requirements → {converted} ICPs, "
+        f"{len(results) - converted} errors",
+        "Sources: " + ", ".join(f"{counts[s]} {label.split(' ', 1)[1]}" for s, label in SOURCES.items()),
+        "",
+    ]
+    for number, result in enumerate(results, 1):
+        summary = sanitize_user_input(" ".join(result.requirements.split()))
+        if len(summary) > 80:
+            summary = summary[:77] + "..."
+        lines.append(f"### {number}. {summary}")
+        if result.ok:
+            lines.append(SOURCES[result.source])
+            lines.append(f"```json\n{json.dumps(result.icp, indent=2)}\n```")
+        else:
+            lines.append(f"❌ {sanitize_user_input(result.error or 'Conversion failed')}")
+        lines.append("")
+    
+    lines.append("**Next step**: Review each ICP and call `generate_policy(icp=...)` to produce the Cerbos YAML.")
+    if adapter is None and converted < len(results):
+        lines.append("💡 Convert the failed requirements with your IDE's LLM, or use `generate_policy` one at a time.")
+    return "\n".join(lines)
@@ -1,55 +1,116 @@
 """Generate policy tool - primary policy generation workflow."""
 
-from typing import Dict, Any
+import json
+from typing import Dict, Any, List, Tuple, Union
 
-from .shared_utils import PolicyPipeline, sanitize_user_input, format_validation_results, format_policy_metadata
+from .shared_utils import (
+    error_data, format_generated_policy, generated_policy_data, sanitize_user_input, wants_json,
+)
 from ..llm_adapter import get_llm_adapter
+from ..llm_cache import icp_cache
+from ..nl_compiler import nl_compiler
+from ..progress import report_progress
+from ..scheduler import scheduler
+from ..services import get_services
 from ..topic_taxonomy import taxonomy
+from ..topic_extractor import topic_extractor
+from ..test_generator import generate_boundary_tests
+from ..test_minimizer import TEST_MODES, minimize_tests
+from ..types import ICPTest
 
 
-async def generate_policy_tool(args: Dict[str, Any]) -> str:
+# Policy and tests generated, compile done, tests done
+PROGRESS_STAGES = 3
+
+
+async def generate_policy_tool(args: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
     """
     Convert natural language guardrails into validated Cerbos YAML policies.
     
-    Primary workflow: Natural language → ICP → Cerbos YAML
+    Primary workflow: Natural language → ICP → Cerbos YAML. Returns markdown,
+    or a dict of separate fields with response_format="json".
     """
     nl_requirements = args.get("nl_requirements")  
     icp_data = args.get("icp")
+    boundary_tests = bool(args.get("boundary_tests", False))
+    test_mode = args.get("test_mode") or 'full'  # Tests are only dropped when the caller asks
+    as_json = wants_json(args)
+    
+    if test_mode not in TEST_MODES:
+        message = f"'test_mode' must be one of: {', '.join(TEST_MODES)}."
+        return error_data(message) if as_json else f"Error: {message}"
     
     # Primary workflow: Natural language → Cerbos YAML
     if nl_requirements:
-        return await _handle_natural_language(nl_requirements)
+        return await _handle_natural_language(nl_requirements, boundary_tests, test_mode, as_json)
     
     # Advanced workflow: ICP JSON → Cerbos YAML  
     elif icp_data:
-        return await _generate_from_icp(icp_data)
+        return await _generate_from_icp(icp_data, boundary_tests, test_mode, as_json)
     
     # Usage guidance
+    elif as_json:
+        return error_data("Provide 'nl_requirements' or 'icp'.")
     else:
         return _get_usage_guidance()
 
 
-async def _handle_natural_language(nl_requirements: str) -> str:
+async def _handle_natural_language(
+    nl_requirements: str, boundary_tests: bool = False, test_mode: str = 'full', as_json: bool = False
+) -> Union[str, Dict[str, Any]]:
     """Handle natural language guardrail requirements."""
+    # Deterministic local compilation for common guardrail shapes
+    compiled = nl_compiler.compile(nl_requirements)
+    if compiled.confident:
+        result = await _generate_from_icp(compiled.icp, boundary_tests, test_mode, as_json)
+        if as_json:
+            return {**result, "source": "local"}
+        return f"""⚡ **Compiled locally** (deterministic pattern match, no LLM call)
+
+{result}"""
+
     llm_adapter = get_llm_adapter()
     
     if llm_adapter:
         try:
-            # Server-side LLM fallback
-            icp_data = llm_adapter.nl_to_icp(nl_requirements)
-            result = await _generate_from_icp(icp_data)
+            # Server-side LLM fallback; repeated requirements are served from the cache
+            icp_data = await icp_cache.nl_to_icp(llm_adapter, nl_requirements)
+            result = await _generate_from_icp(icp_data, boundary_tests, test_mode, as_json)
+            if as_json:
+                return {**result, "source": "llm", "icp": icp_data}
             
             return f"""⚠️ **Server-side processing used** (client-LLM preferred)
 
 {result}
 
 💡 **Recommendation**: Use client-LLM mode for better security posture."""
-            
+
         except Exception:
             pass
     
     # Primary guidance: client-LLM workflow
+    extraction = topic_extractor.extract(nl_requirements)
+    if as_json:
+        return {
+            "status": "needs_icp",
+            "requirements": nl_requirements,
+            "detected": {
+                "topics": extraction.topics,
+                "blocked_topics": extraction.blocked_topics,
+                "safety_category": extraction.safety_category,
+            },
+            "next_step": "Convert the requirements to ICP JSON and call generate_policy(icp=...)",
+        }
+    
     safe_requirements = sanitize_user_input(nl_requirements)
+    detected = ""
+    if extraction.topics or extraction.blocked_topics:
+        detected = (
+            "**Detected topics** (local keyword index, review before use): "
+            f"topics={json.dumps(extraction.topics)}, "
+            f"blocked_topics={json.dumps(extraction.blocked_topics)}, "
+            f"safety_category={json.dumps(extraction.safety_category)}\n\n"
+        )
     
     return f"""🤖 **Enhanced Policy Generation**
 
@@ -58,7 +119,7 @@ Your request:
 {safe_requirements}
 ```
 
-**Next step**: Have your IDE's LLM convert this to structured format:
+{detected}**Next step**: Have your IDE's LLM convert this to structured format:
 
 ```
 generate_policy(icp={{
@@ -67,9 +128,9 @@ generate_policy(icp={{
     "name": "policy_name",
     "description": "...",
     "resource": "...",
-    "topics": ["payment", "pii"],
-    "blocked_topics": ["adult"],
-    "safety_category": "PG_13"
+    "topics": {json.dumps(extraction.topics)},
+    "blocked_topics": {json.dumps(extraction.blocked_topics)},
+    "safety_category": {json.dumps(extraction.safety_category or "G")}
   }},
   "policy": {{"resource": "...", "rules": [...]}},
   "tests": [...]
@@ -79,42 +140,101 @@ generate_policy(icp={{
 {taxonomy.get_topic_guidance()}"""
 
 
-async def _generate_from_icp(icp_data: Dict[str, Any]) -> str:
-    """Generate policy from ICP JSON."""
+async def _generate_from_icp(
+    icp_data: Dict[str, Any], boundary_tests: bool = False, test_mode: str = 'full', as_json: bool = False
+) -> Union[str, Dict[str, Any]]:
+    """
+    Generate policy from ICP JSON.
+    
+    boundary_tests adds generated boundary/adversarial tests; test_mode 'fast'
+    keeps only a minimal subset of tests with the same coverage.
+    """
     try:
-        pipeline = PolicyPipeline()
-        
-        # Validate ICP and generate policy
-        icp = pipeline.validate_icp(icp_data)
-        policy_yaml, test_yaml = pipeline.generate_policy_artifacts(icp.model_dump())
-        
-        # Validate with Cerbos CLI
-        validation_result, test_result = pipeline.validate_with_cerbos(policy_yaml, test_yaml)
-        
-        # Format response
-        response = f"# 🎯 Policy Generated: {icp.metadata.name}\n\n"
-        response += f"{icp.metadata.description}\n\n"
-        response += format_policy_metadata(icp)
+        pipeline = get_services().pipeline
         
-        response += "## 📜 Cerbos Policy\n\n"
-        response += f"```yaml\n{policy_yaml}\n```\n\n"
+        # CPU-bound validation and generation in a worker process, Cerbos CLI in a thread
+        metadata, policy_yaml, test_yaml, notes = await scheduler.run_cpu(
+            build_policy_artifacts, icp_data, boundary_tests, test_mode
+        )
+        # Validation and generation share one worker round trip, so they are one stage;
+        # clients can read the policy while Cerbos runs its tests
+        await report_progress(
+            f"Policy and tests generated: {metadata['name']}",
+            PROGRESS_STAGES,
+            partial={"policy_yaml": policy_yaml, "test_yaml": test_yaml},
+        )
         
-        response += "## 🧪 Test Suite\n\n"
-        response += f"```yaml\n{test_yaml}\n```\n\n"
+        validation_result = await scheduler.run_io(pipeline.compile_policy, policy_yaml)
+        await report_progress(_compile_summary(validation_result), PROGRESS_STAGES)
         
-        response += format_validation_results(validation_result, test_result)
+        test_result = None
+        if validation_result and validation_result.success and test_yaml:
+            test_result = await scheduler.run_io(pipeline.run_tests, policy_yaml, test_yaml)
+        await report_progress(_test_summary(test_result), PROGRESS_STAGES)
         
-        response += "💡 **Next steps**:\n"
-        response += "- Use `suggest_improvements` to analyze security gaps\n"
-        response += "- Use `validate_policy` to re-check after changes\n"
-        
-        return response
+        conflicts = pipeline.index_policy(metadata['name'], policy_yaml)
         
+        if as_json:
+            return {
+                **generated_policy_data(
+                    metadata, policy_yaml, test_yaml, validation_result, test_result, conflicts, notes
+                ),
+                "source": "icp",
+            }
+        result = format_generated_policy(
+            metadata, policy_yaml, test_yaml, validation_result, test_result, conflicts
+        )
+        return "\n\n".join(notes + [result])
+    
     except Exception as e:
+        if as_json:
+            return error_data(str(e))
         error_msg = sanitize_user_input(str(e))
         return f"❌ **Error generating policy**: {error_msg}"
 
 
+def _compile_summary(validation_result) -> str:
+    if validation_result is None:
+        return "Compile skipped (Cerbos CLI not installed)"
+    if validation_result.success:
+        return "Compile passed"
+    return f"Compile failed with {len(validation_result.errors)} error(s)"
+
+
+def _test_summary(test_result) -> str:
+    if test_result is None:
+        return "Tests skipped"
+    return f"Tests done: {test_result.passed}/{test_result.total} passed"
+
+
+def build_policy_artifacts(
+    icp_data: Dict[str, Any], boundary_tests: bool = False, test_mode: str = 'full'
+) -> Tuple[Dict[str, Any], str, str, List[str]]:
+    """
+    Validate an ICP and generate its policy and test YAML (runs in a worker process).
+    
+    Returns:
+        (metadata, policy YAML, test YAML, notes for the response)
+    """
+    try:
+        pipeline = get_services().pipeline  # One per worker process
+        icp = pipeline.validate_icp(icp_data)
+        generated = generate_boundary_tests(icp) if boundary_tests else []
+        icp.tests.extend(generated)
+        notes = []
+        if boundary_tests:
+            notes.append(f"🧪 **Added {len(generated)} generated boundary/adversarial tests** (expected effects from in-process evaluation)")
+        if test_mode == 'fast':
+            suite = minimize_tests(icp)
+            icp.tests = [ICPTest.model_validate(test) for test in suite.tests]
+            notes.append(f"⚡ **Fast test mode**: running {len(suite.tests)} of {suite.total} tests with the same rule, branch and decision coverage")
+        
+        policy_yaml, test_yaml = pipeline.generate_policy_artifacts(icp.model_dump())
+        return icp.metadata.model_dump(), policy_yaml, test_yaml, notes
+    except Exception as e:
+        raise ValueError(str(e)) from None  # Pydantic errors don't survive pickling
+
+
 def _get_usage_guidance() -> str:
     """Return usage guidance."""
     return """# 🎯 Generate Policy
@@ -0,0 +1,57 @@
+"""Instantiate template tool - build a policy directly from template parameters."""
+
+from typing import Dict, Any, Tuple, Union
+
+from .shared_utils import (
+    error_data, format_generated_policy, generated_policy_data, sanitize_user_input, wants_json,
+)
+from ..scheduler import scheduler
+from ..services import get_services
+
+
+async def instantiate_template_tool(args: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+    """
+    Build ICP, Cerbos policy and tests from a parameterised template.
+    
+    Templates are validated once when the library loads, so only the
+    parameter values are checked here.
+    """
+    template_id = args.get("template_id")
+    params = args.get("params") or {}
+    as_json = wants_json(args)
+    
+    if not template_id:
+        return error_data("'template_id' parameter required.") if as_json else "Error: 'template_id' parameter required."
+    if not isinstance(params, dict):
+        return error_data("'params' must be an object.") if as_json else "Error: 'params' must be an object."
+    
+    try:
+        services = get_services()
+        icp = services.templates.instantiate(template_id, params)
+        
+        pipeline = services.pipeline
+        policy_yaml, test_yaml = await scheduler.run_cpu(_generate_artifacts, icp)
+        validation_result, test_result = await scheduler.run_io(pipeline.validate_with_cerbos, policy_yaml, test_yaml)
+        conflicts = pipeline.index_policy(icp["metadata"]["name"], policy_yaml)
+        
+        if as_json:
+            return {
+                **generated_policy_data(
+                    icp["metadata"], policy_yaml, test_yaml, validation_result, test_result, conflicts
+                ),
+                "icp": icp,
+            }
+        return format_generated_policy(
+            icp["metadata"], policy_yaml, test_yaml, validation_result, test_result, conflicts
+        )
+    
+    except Exception as e:
+        if as_json:
+            return error_data(str(e))
+        error_msg = sanitize_user_input(str(e))
+        return f"❌ **Error instantiating template**: {error_msg}"
+
+
+def _generate_artifacts(icp: Dict[str, Any]) -> Tuple[str, str]:
+    """Policy and test YAML for an ICP (runs in a worker process)."""
+    return get_services().pipeline.generate_policy_artifacts(icp)
@@ -2,14 +2,15 @@
 
 from typing import Dict, Any
 
-from ..templates import TemplateLibrary
+from ..services import get_services
 
 
 async def list_templates_tool(args: Dict[str, Any]) -> str:
     """List available policy templates."""
     category = args.get("category")
+    tag = args.get("tag")
     
-    library = TemplateLibrary()
-    templates = library.list_templates(category)
+    library = get_services().templates
+    templates = library.list_templates(category, tag)
     
     return library.format_templates(templates)
\ No newline at end of file
@@ -0,0 +1,40 @@
+"""LLM metrics tool - per-provider latency and call counts for server-side LLM mode."""
+
+from typing import Dict, Any
+
+from .shared_utils import sanitize_user_input
+from ..llm_adapter import get_llm_adapter
+from ..llm_cache import icp_cache
+
+
+async def llm_metrics_tool(args: Dict[str, Any]) -> str:
+    """Report server-side LLM provider latency percentiles, errors, hedges and cache use."""
+    try:
+        adapter = get_llm_adapter()
+    except ValueError as e:
+        return f"❌ **LLM adapter misconfigured**: {sanitize_user_input(str(e))}"
+    
+    if adapter is None:
+        return "🎯 **Client-LLM mode**: no server-side LLM configured, so there are no provider metrics."
+    
+    metrics = adapter.metrics() if hasattr(adapter, 'metrics') else {}
+    lines = [
+        "## 📈 Server-side LLM Metrics",
+        "",
+        f"**Hedging**: {'on (p95)' if getattr(adapter, 'hedge', False) else 'off'}",
+        "",
+        "| Provider | Model | Calls | Errors | Hedged | In flight | p50 ms | p95 ms | p99 ms | Circuit |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for name, m in metrics.items():
+        lines.append(
+            f"| {name} | {m['model']} | {m['calls']} | {m['errors']} | {m['hedges']} | "
+            f"{m['in_flight']} | {m['p50_ms']} | {m['p95_ms']} | {m['p99_ms']} | "
+            f"{'open (backing off)' if m['circuit_open'] else 'closed'} |"
+        )
+    stats = icp_cache.stats
+    lines += [
+        "",
+        f"**Cache**: {stats['hits']} hits, {stats['misses']} misses, {stats['shared']} shared in-flight calls",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,42 @@
+"""Policy coverage tool - which rules and branches the ICP tests exercise."""
+
+from typing import Dict, Any, List, Optional
+
+from pydantic import ValidationError
+
+from .shared_utils import sanitize_user_input
+from ..coverage import analyze_coverage
+from ..scheduler import scheduler
+from ..types import SimpleICP, ICPTest
+
+
+async def policy_coverage_tool(args: Dict[str, Any]) -> str:
+    """Evaluate the ICP's tests in-process and report rule and branch coverage."""
+    icp_data = args.get("icp")
+    tests = args.get("tests")
+    
+    if not icp_data:
+        return "Error: 'icp' parameter required."
+    if tests is not None and not isinstance(tests, list):
+        return "Error: 'tests' must be a list of ICP tests."
+    
+    try:
+        icp = SimpleICP.model_validate(icp_data)
+        if tests is not None:
+            tests = [ICPTest.model_validate(test) for test in tests]
+    except ValidationError as e:
+        return f"❌ **Invalid ICP**: {sanitize_user_input(str(e))}"
+    
+    try:
+        # Large suites take a while; evaluate them in a worker process
+        return await scheduler.run_cpu(_coverage_report, icp, tests)
+    except Exception as e:
+        return f"❌ **Error measuring coverage**: {sanitize_user_input(str(e))}"
+
+
+def _coverage_report(icp: SimpleICP, tests: Optional[List[ICPTest]]) -> str:
+    """Formatted coverage report (runs in a worker process)."""
+    try:
+        return analyze_coverage(icp, tests).format()
+    except Exception as e:
+        raise ValueError(str(e)) from None
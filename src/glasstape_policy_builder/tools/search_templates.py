@@ -0,0 +1,31 @@
+"""Search templates tool - ranked full-text template lookup."""
+
+from typing import Dict, Any
+
+from ..services import get_services
+
+
+async def search_templates_tool(args: Dict[str, Any]) -> str:
+    """Search policy templates by name, tags, description and example."""
+    query = (args.get("query") or "").strip()
+    category = args.get("category")
+    limit = args.get("limit", 10)
+    
+    if not query:
+        return "Error: 'query' parameter required."
+    if not isinstance(limit, int) or limit < 1:
+        return "Error: 'limit' must be a positive integer."
+    
+    results = get_services().templates.search(query, limit=limit, category=category)
+    if not results:
+        return f"No templates match '{query}'. Use list_templates to browse all templates."
+    
+    output = [f"# Template Search: {query}\n\n"]
+    for rank, (template, score) in enumerate(results, 1):
+        tags = f" — tags: {', '.join(template.tags)}" if template.tags else ""
+        output.append(
+            f"{rank}. **{template.name}** (`{template.id}`, {template.category}, score {score:.2f}){tags}\n"
+            f"   {template.description}\n"
+        )
+    output.append("\nUse `instantiate_template` with a template ID to build a policy.\n")
+    return "".join(output)
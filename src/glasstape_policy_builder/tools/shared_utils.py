@@ -1,53 +1,22 @@
 """Shared utilities for MCP tools to eliminate code duplication."""
 
-from typing import Dict, Any, Optional
+import dataclasses
+from typing import Dict, Any, List, Optional
 from ..types import SimpleICP
-from ..icp_validator import ICPValidator
-from ..cerbos_generator import CerbosGenerator
-from ..cerbos_cli import CerbosCLI
-from ..redteam_analyzer import SimpleRedTeamAnalyzer
+from ..services import PolicyPipeline  # Re-exported for existing imports
 
 
-class PolicyPipeline:
-    """Shared policy processing pipeline."""
-    
-    def __init__(self):
-        self.validator = ICPValidator()
-        self.generator = CerbosGenerator()
-        self.cerbos_cli = CerbosCLI()
-        self.analyzer = SimpleRedTeamAnalyzer()
-    
-    def validate_icp(self, icp_data: Dict[str, Any]) -> SimpleICP:
-        """Validate and return ICP object."""
-        icp = SimpleICP.model_validate(icp_data)
-        self.validator.validate(icp.model_dump())
-        return icp
-    
-    def generate_policy_artifacts(self, icp_data: Dict[str, Any]) -> tuple[str, str]:
-        """Generate policy and test YAML from ICP."""
-        policy_yaml = self.generator.generate_policy(icp_data)
-        test_yaml = self.generator.generate_tests(icp_data)
-        return policy_yaml, test_yaml
-    
-    def validate_with_cerbos(self, policy_yaml: str, test_yaml: Optional[str] = None):
-        """Validate policy with Cerbos CLI and optionally run tests."""
-        validation_result = None
-        test_result = None
-        
-        if self.cerbos_cli.check_installation():
-            validation_result = self.cerbos_cli.compile(policy_yaml)
-            
-            if validation_result.success and test_yaml:
-                try:
-                    test_result = self.cerbos_cli.test(policy_yaml, test_yaml)
-                except Exception:
-                    pass  # Test failure is not critical
-        
-        return validation_result, test_result
-    
-    def analyze_security(self, policy_yaml: str, icp_data: Optional[Dict[str, Any]] = None):
-        """Run security analysis on policy."""
-        return self.analyzer.analyze(policy_yaml, icp_data)
+# Opt-in structured output: tools return a dict instead of markdown
+RESPONSE_FORMAT_PROPERTY = {
+    "type": "string",
+    "enum": ["markdown", "json"],
+    "description": "markdown (default) for reading; json returns policy YAML, test YAML, validation and findings as separate fields"
+}
+
+
+def wants_json(args: Dict[str, Any]) -> bool:
+    """Whether the caller asked for structured JSON output."""
+    return args.get("response_format") == "json"
 
 
 def sanitize_user_input(text: str) -> str:
@@ -90,18 +59,91 @@ def format_validation_results(validation_result, test_result=None) -> str:
 
 def format_policy_metadata(icp: SimpleICP) -> str:
     """Format policy metadata consistently."""
+    return _format_metadata_fields(icp.metadata.model_dump())
+
+
+def _format_metadata_fields(metadata: Dict[str, Any]) -> str:
+    """Format topic, safety and compliance metadata from a metadata dict."""
     response = ""
     
-    if icp.metadata.topics:
-        response += f"**Topics**: {', '.join(icp.metadata.topics)}\n"
-    if icp.metadata.safety_category:
-        response += f"**Safety Level**: {icp.metadata.safety_category}\n"
-    if icp.metadata.compliance:
-        response += f"**Compliance**: {', '.join(icp.metadata.compliance)}\n"
+    if metadata.get("topics"):
+        response += f"**Topics**: {', '.join(metadata['topics'])}\n"
+    if metadata.get("safety_category"):
+        response += f"**Safety Level**: {metadata['safety_category']}\n"
+    if metadata.get("compliance"):
+        response += f"**Compliance**: {', '.join(metadata['compliance'])}\n"
     
     return response + "\n" if response else ""
 
 
+def format_generated_policy(
+    metadata: Dict[str, Any],
+    policy_yaml: str,
+    test_yaml: str,
+    validation_result=None,
+    test_result=None,
+    conflicts=None,
+) -> str:
+    """Format a generated policy, its tests, validation results and index conflicts."""
+    response = f"# 🎯 Policy Generated: {metadata['name']}\n\n"
+    response += f"{metadata['description']}\n\n"
+    response += _format_metadata_fields(metadata)
+    
+    response += "## 📜 Cerbos Policy\n\n"
+    response += f"```yaml\n{policy_yaml}\n```\n\n"
+    
+    response += "## 🧪 Test Suite\n\n"
+    response += f"```yaml\n{test_yaml}\n```\n\n"
+    
+    response += format_validation_results(validation_result, test_result)
+    
+    if conflicts:
+        response += "## ⚠️ Conflicts with Other Generated Policies\n\n"
+        for conflict in conflicts:
+            response += f"- {conflict.message}\n"
+        response += "\n"
+    
+    response += "💡 **Next steps**:\n"
+    response += "- Use `suggest_improvements` to analyze security gaps\n"
+    response += "- Use `validate_policy` to re-check after changes\n"
+    
+    return response
+
+
 def format_error(message: str) -> str:
     """Format error message consistently."""
-    return f"❌ **Error**: {message}"
\ No newline at end of file
+    return f"❌ **Error**: {message}"
+
+
+def error_data(message: str) -> Dict[str, Any]:
+    """Structured form of an error response."""
+    return {"status": "error", "error": message}
+
+
+def validation_data(validation_result=None, test_result=None) -> Dict[str, Any]:
+    """Structured validation and test results; None where a step did not run."""
+    return {
+        "validation": validation_result.model_dump() if validation_result else None,
+        "tests": test_result.model_dump(exclude={"details"}) if test_result else None,
+    }
+
+
+def generated_policy_data(
+    metadata: Dict[str, Any],
+    policy_yaml: str,
+    test_yaml: str,
+    validation_result=None,
+    test_result=None,
+    conflicts=None,
+    notes: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Structured form of format_generated_policy()."""
+    return {
+        "status": "ok",
+        "metadata": metadata,
+        "policy_yaml": policy_yaml,
+        "test_yaml": test_yaml,
+        **validation_data(validation_result, test_result),
+        "conflicts": [dataclasses.asdict(conflict) for conflict in conflicts or []],
+        "notes": notes or [],
+    }
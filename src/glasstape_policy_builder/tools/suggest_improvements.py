@@ -1,26 +1,47 @@
 """Security analysis tool - red team analysis and improvements."""
 
-from typing import Dict, Any, Optional
+import dataclasses
+from typing import Dict, Any, List, Optional, Union
 
-from .shared_utils import PolicyPipeline
+from .shared_utils import error_data, wants_json
+from ..scheduler import scheduler
+from ..services import get_services
 
 
-async def suggest_improvements_tool(args: Dict[str, Any]) -> str:
-    """Analyze policy for security issues using 6 essential checks."""
+async def suggest_improvements_tool(args: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+    """Analyze policy for security issues using the registered red-team checks."""
     policy_yaml = args.get("policy_yaml", "")
     icp_data = args.get("icp")
+    as_json = wants_json(args)
     
     if not policy_yaml:
-        return "Error: 'policy_yaml' parameter required."
+        return error_data("'policy_yaml' parameter required.") if as_json else "Error: 'policy_yaml' parameter required."
     
     try:
-        pipeline = PolicyPipeline()
-        findings = pipeline.analyze_security(policy_yaml, icp_data)
+        findings = await scheduler.run_cpu(_analyze, policy_yaml, icp_data)
+        
+        if as_json:
+            return {
+                "status": "ok",
+                "summary": {status: sum(1 for f in findings if f.status == status) for status in ('pass', 'warn', 'fail')},
+                "findings": [dataclasses.asdict(finding) for finding in findings],
+            }
         
         response = "# 🔒 Security Analysis\n\n"
-        response += pipeline.analyzer.format_findings(findings)
+        response += get_services().analyzer.format_findings(findings)
         
         return response
-        
+    
+    except Exception as e:
+        if as_json:
+            return error_data(f"Error analyzing policy: {e}")
+        return f"Error analyzing policy: {str(e)}"
+
+
+def _analyze(policy_yaml: str, icp_data: Optional[Dict[str, Any]]) -> List[Any]:
+    """Red-team findings (runs in a worker process)."""
+    try:
+        pipeline = get_services().pipeline  # One per worker process
+        return pipeline.analyze_security(policy_yaml, icp_data)
     except Exception as e:
-        return f"Error analyzing policy: {str(e)}"
\ No newline at end of file
+        raise ValueError(str(e)) from None
@@ -1,45 +1,47 @@
 """Test policy tool - Run cerbos test on policy and test suite."""
 
 import json
-from typing import Dict, Any
+from typing import Dict, Any, Union
 
-from ..cerbos_cli import CerbosCLI
-from .shared_utils import format_error
+from ..scheduler import scheduler
+from ..services import get_services
+from .shared_utils import error_data, format_error, wants_json
 
 
-async def test_policy_tool(args: Dict[str, Any]) -> str:
+async def test_policy_tool(args: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
     """
     Run cerbos test on provided policy and test suite.
     
     Args:
         policy_yaml: Cerbos policy YAML content
         test_yaml: Test suite YAML content
-        
+    
     Returns:
-        JSON string with test results
+        JSON string with test results (a dict with response_format="json")
     """
+    as_json = wants_json(args)
+    fail = error_data if as_json else format_error
     try:
         policy_yaml = args.get("policy_yaml")
         test_yaml = args.get("test_yaml")
         
         if not policy_yaml:
-            return format_error("policy_yaml is required")
+            return fail("policy_yaml is required")
         
         if not test_yaml:
-            return format_error("test_yaml is required")
+            return fail("test_yaml is required")
         
-        # Initialize Cerbos CLI
-        cerbos_cli = CerbosCLI()
-        if not cerbos_cli.check_installation():
-            return format_error("Cerbos CLI not installed. Install with: brew install cerbos/tap/cerbos")
+        cerbos_cli = get_services().cerbos_cli
+        if not await scheduler.run_io(cerbos_cli.check_installation):
+            return fail("Cerbos CLI not installed. Install with: brew install cerbos/tap/cerbos")
         
         # Run cerbos test
-        result = cerbos_cli.test(policy_yaml, test_yaml)
+        result = await scheduler.run_io(cerbos_cli.test, policy_yaml, test_yaml)
         
         # Format results
         status = "passed" if result.failed == 0 else "failed"
         
-        return json.dumps({
+        data = {
             "status": status,
             "summary": {
                 "passed": result.passed,
@@ -47,7 +49,8 @@ async def test_policy_tool(args: Dict[str, Any]) -> str:
                 "total": result.total
             },
             "details": result.details
-        }, indent=2)
-                
+        }
+        return data if as_json else json.dumps(data, indent=2)
+    
     except Exception as e:
-        return format_error(f"Test execution failed: {str(e)}")
\ No newline at end of file
+        return fail(f"Test execution failed: {str(e)}")
\ No newline at end of file
@@ -1,29 +1,42 @@
 """Validate policy tool - Cerbos CLI validation."""
 
-from typing import Dict, Any
+from typing import Dict, Any, Union
 
-from .shared_utils import PolicyPipeline, format_validation_results
+from .shared_utils import error_data, format_validation_results, validation_data, wants_json
+from ..scheduler import scheduler
+from ..services import get_services
 
 
-async def validate_policy_tool(args: Dict[str, Any]) -> str:
+async def validate_policy_tool(args: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
     """Validate policy using cerbos compile."""
     policy_yaml = args.get("policy_yaml", "")
+    as_json = wants_json(args)
     
     if not policy_yaml:
-        return "Error: 'policy_yaml' parameter required."
+        return error_data("'policy_yaml' parameter required.") if as_json else "Error: 'policy_yaml' parameter required."
     
     try:
-        pipeline = PolicyPipeline()
+        pipeline = get_services().pipeline
         
-        if not pipeline.cerbos_cli.check_installation():
+        if not await scheduler.run_io(pipeline.cerbos_cli.check_installation):
+            if as_json:
+                return error_data("Cerbos CLI not found. Install with: brew install cerbos/tap/cerbos")
             return "❌ Cerbos CLI not found. Install with: brew install cerbos/tap/cerbos"
         
-        validation_result, _ = pipeline.validate_with_cerbos(policy_yaml)
+        validation_result, _ = await scheduler.run_io(pipeline.validate_with_cerbos, policy_yaml)
+        
+        if as_json:
+            return {
+                "status": "valid" if validation_result.success else "invalid",
+                "validation": validation_data(validation_result)["validation"],
+            }
         
         response = "# 🔍 Policy Validation\n\n"
         response += format_validation_results(validation_result)
         
         return response
-        
+    
     except Exception as e:
+        if as_json:
+            return error_data(f"Error validating policy: {e}")
         return f"Error validating policy: {str(e)}"
\ No newline at end of file
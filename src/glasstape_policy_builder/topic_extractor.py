@@ -0,0 +1,186 @@
+"""Topic Extractor - Local keyword-index topic detection for natural language."""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .keyword_matcher import KeywordMatcher, KeywordMatch
+from .templates import TemplateLibrary, template_library
+from .topic_taxonomy import TopicTaxonomy, taxonomy
+
+
+# Phrases that block content outright when they precede a topic in the same
+# clause ("Block topics: recipe", "never discuss violence")
+CONTENT_BLOCK_CUES = [
+    "block topic", "block topics", "blocked topic", "blocked topics",
+    "block content about", "block discussion of", "block discussions of",
+    "never discuss", "do not discuss", "don't discuss", "must not discuss",
+    "never talk about", "do not talk about", "don't talk about", "never mention",
+    "refuse to discuss", "no discussion of", "avoid discussing",
+]
+
+# Blocking verbs; they mark a topic as blocked unless they govern an amount or
+# condition ("Block payments over $100" restricts payments, it does not block them)
+BLOCK_CUES = [
+    "block", "blocks", "blocked", "blocking",
+    "prohibit", "prohibits", "prohibited", "forbid", "forbids", "forbidden",
+    "disallow", "disallowed", "exclude", "excludes", "never",
+]
+
+# Amounts and conditions that make a blocking verb a rule about the action
+_GOVERNED_CLAUSE = re.compile(
+    r"[$€£]\s?\d|\d\s*(?:usd|eur|gbp|dollars?|%)"
+    r"|\b(?:over|above|under|below|exceeding|exceeds|more than|less than|up to|at most|at least)\s+[$€£]?\d"
+    r"|\b(?:unless|if|when|whenever|while|without|except|until|outside)\b"
+    r"|\bfor\s+non-",
+    re.IGNORECASE,
+)
+
+# Clause separators; block cues never reach across them
+_CLAUSE_BREAK = re.compile(r"[.;!?\n]|,\s*(?:but|and)\b|\bbut\b")
+
+# Explicit declarations as used in template examples: "Topics: a, b. Block topics: c."
+_TOPIC_DECLARATION = re.compile(
+    r"\b(block(?:ed)?\s+)?topics\s*:\s*([\w\s,]+?)\s*(?:\.|\n|$)", re.IGNORECASE
+)
+
+
+@dataclass
+class TopicExtraction:
+    """Candidate topic metadata for a natural-language requirement."""
+    topics: List[str] = field(default_factory=list)
+    blocked_topics: List[str] = field(default_factory=list)
+    safety_category: Optional[str] = None
+    matches: List[Tuple[str, str]] = field(default_factory=list)
+
+
+class TopicExtractor:
+    """
+    Extract candidate topics without a model call.
+    
+    The index covers topic names, taxonomy synonyms and template names, and is
+    rebuilt only when the taxonomy or template library version changes.
+    """
+    
+    def __init__(
+        self,
+        topic_taxonomy: Optional[TopicTaxonomy] = None,
+        templates: Optional[TemplateLibrary] = None,
+    ):
+        self.taxonomy = topic_taxonomy or taxonomy
+        self.templates = templates or template_library
+        self._index_key = None
+        self._topic_matcher: Optional[KeywordMatcher] = None
+        self._cue_matcher = KeywordMatcher(
+            {**{cue: False for cue in BLOCK_CUES}, **{cue: True for cue in CONTENT_BLOCK_CUES}}
+        )
+    
+    def _matcher(self) -> KeywordMatcher:
+        """Get the topic matcher for the current taxonomy/template versions."""
+        key = (self.taxonomy.version, self.templates.version)
+        if key != self._index_key or self._topic_matcher is None:
+            self._topic_matcher = KeywordMatcher(self._build_patterns())
+            self._index_key = key
+        return self._topic_matcher
+    
+    def _build_patterns(self) -> Dict[str, Tuple[str, ...]]:
+        """Map every searchable phrase to the topics it implies."""
+        snapshot = self.taxonomy.snapshot()
+        patterns: Dict[str, Tuple[str, ...]] = {}
+        
+        for category in snapshot.categories.values():
+            for topic in category.topics:
+                for phrase in (topic, topic.replace("_", " "), topic.replace("_", "-"), f"{topic}s"):
+                    patterns.setdefault(phrase, (topic,))
+            for topic, synonyms in category.synonyms.items():
+                for phrase in synonyms:
+                    patterns.setdefault(phrase.lower(), (topic,))
+        
+        # Template names imply the topics their examples declare
+        for template in self.templates.list_templates():
+            declared = _template_topics(template.example, snapshot.topic_to_category)
+            if declared:
+                for phrase in (template.name.lower(), template.id.replace("_", " ")):
+                    patterns.setdefault(phrase, declared)
+        
+        return patterns
+    
+    def mentions(self, text: str) -> List[KeywordMatch]:
+        """Find non-overlapping topic mentions; match values are topic tuples."""
+        return _longest_matches(self._matcher().find(text))
+    
+    def extract(self, text: str) -> TopicExtraction:
+        """
+        Extract candidate topics, blocked topics and a safety category.
+        
+        Args:
+            text: Natural-language requirements
+            
+        Returns:
+            TopicExtraction with topics in order of first mention
+        """
+        topic_map = self.taxonomy.snapshot().topic_to_category
+        result = TopicExtraction()
+        
+        # Explicit declarations are authoritative
+        for declaration in _TOPIC_DECLARATION.finditer(text):
+            target = result.blocked_topics if declaration.group(1) else result.topics
+            for topic in (t.strip().lower() for t in declaration.group(2).split(",")):
+                if topic in topic_map and topic not in result.topics and topic not in result.blocked_topics:
+                    target.append(topic)
+                    result.matches.append((topic, "blocked" if declaration.group(1) else "topic"))
+        
+        matches = self.mentions(text)
+        clause_starts = [0] + [m.end() for m in _CLAUSE_BREAK.finditer(text)]
+        clause_ends = [m.start() for m in _CLAUSE_BREAK.finditer(text)] + [len(text)]
+        cues = sorted(self._cue_matcher.find(text), key=lambda m: m.start)
+        cue_positions = [cue.start for cue in cues]
+        
+        for match in matches:
+            clause = bisect_right(clause_starts, match.start) - 1
+            # Cues between the clause start and the match apply to it
+            first = bisect_right(cue_positions, clause_starts[clause] - 1)
+            last = bisect_right(cue_positions, match.start - 1)
+            clause_cues = cues[first:last]
+            if any(cue.value for cue in clause_cues):
+                blocked = True
+            elif clause_cues:
+                blocked = not _GOVERNED_CLAUSE.search(text, clause_cues[-1].end, clause_ends[clause])
+            else:
+                blocked = False
+            target = result.blocked_topics if blocked else result.topics
+            for topic in match.value:
+                if topic not in result.topics and topic not in result.blocked_topics:
+                    target.append(topic)
+                    result.matches.append((match.pattern, "blocked" if blocked else "topic"))
+        
+        if result.topics:
+            result.safety_category = self.taxonomy.get_safety_level(result.topics).value
+        return result
+
+
+def _template_topics(example: str, topic_map: Dict[str, str]) -> Tuple[str, ...]:
+    """Read the 'Topics:' declaration from a template example."""
+    for declaration in _TOPIC_DECLARATION.finditer(example):
+        if not declaration.group(1):
+            topics = [t.strip().lower() for t in declaration.group(2).split(",")]
+            return tuple(t for t in topics if t in topic_map)
+    return ()
+
+
+def _longest_matches(matches: List[KeywordMatch]) -> List[KeywordMatch]:
+    """Drop matches nested inside a longer overlapping match."""
+    ordered = sorted(matches, key=lambda m: (m.start, -(m.end - m.start)))
+    kept = []
+    covered_until = -1
+    for match in ordered:
+        if match.end <= covered_until:
+            continue
+        kept.append(match)
+        covered_until = max(covered_until, match.end)
+    return kept
+
+
+# Global extractor instance
+topic_extractor = TopicExtractor()
@@ -1,9 +1,31 @@
-"""Topic Taxonomy - Hierarchical content categorization system."""
+"""Topic Taxonomy - Hierarchical content categorization system.
 
-from dataclasses import dataclass
-from typing import Dict, List, Set
+The built-in ``TOPIC_CATEGORIES`` are used unless ``GLASSTAPE_TAXONOMY_PATH``
+points at a YAML/JSON file (or a directory of them). External definitions are
+compiled once into a binary snapshot that later processes memory-map instead
+of re-parsing, and are hot-reloaded when the source files change.
+"""
+
+import hashlib
+import json
+import logging
+import marshal
+import mmap
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from enum import Enum
 
+import yaml
+
+from .private_dirs import ensure_private_dir, is_private_dir, user_work_dir
+
+
+logger = logging.getLogger(__name__)
+
 
 class SafetyCategory(str, Enum):
     """Content safety ratings."""
@@ -21,6 +43,7 @@ class TopicCategory:
     topics: List[str]
     description: str
     safety_level: SafetyCategory = SafetyCategory.G
+    synonyms: Dict[str, List[str]] = field(default_factory=dict)
 
 
 # Core topic taxonomy
@@ -29,80 +52,374 @@ TOPIC_CATEGORIES = {
         name="financial",
         topics=["payment", "transaction", "billing", "refund", "invoice", "banking", "credit", "loan"],
         description="Financial transactions and monetary operations",
-        safety_level=SafetyCategory.PG
+        safety_level=SafetyCategory.PG,
+        synonyms={
+            "payment": ["pay", "payments", "paying", "payout", "transfer", "wire"],
+            "transaction": ["transactions", "txn", "purchase"],
+            "refund": ["refunds", "chargeback"],
+            "banking": ["bank", "bank account"],
+            "loan": ["loans", "lending", "mortgage"],
+        }
     ),
     
     "privacy": TopicCategory(
         name="privacy", 
         topics=["pii", "phi", "personal_data", "medical_record", "ssn", "credit_card", "address", "phone"],
         description="Personal and private information",
-        safety_level=SafetyCategory.PG_13
+        safety_level=SafetyCategory.PG_13,
+        synonyms={
+            "pii": ["personal information", "personally identifiable information", "personal details"],
+            "phi": ["protected health information", "health information"],
+            "personal_data": ["personal data", "customer data", "user data"],
+            "medical_record": ["medical records", "patient records", "health records"],
+            "ssn": ["social security number", "social security"],
+            "credit_card": ["credit cards", "card number", "card numbers"],
+            "address": ["home address", "mailing address"],
+            "phone": ["phone number", "telephone"],
+        }
     ),
     
     "healthcare": TopicCategory(
         name="healthcare",
         topics=["medical", "healthcare", "patient", "diagnosis", "treatment", "prescription", "hospital"],
         description="Medical and healthcare related content",
-        safety_level=SafetyCategory.PG
+        safety_level=SafetyCategory.PG,
+        synonyms={
+            "healthcare": ["health care", "clinical"],
+            "patient": ["patients"],
+            "prescription": ["prescriptions", "medication"],
+            "hospital": ["hospitals", "clinic"],
+        }
     ),
     
     "content_safety": TopicCategory(
         name="content_safety",
         topics=["adult", "violence", "illegal", "hate_speech", "harassment", "discrimination"],
         description="Potentially harmful or inappropriate content",
-        safety_level=SafetyCategory.R
+        safety_level=SafetyCategory.R,
+        synonyms={
+            "adult": ["adult content", "explicit", "nsfw", "sexual"],
+            "violence": ["violent", "weapons"],
+            "illegal": ["illicit", "criminal"],
+            "hate_speech": ["hate speech", "slurs"],
+            "harassment": ["bullying", "harass"],
+        }
     ),
     
     "business": TopicCategory(
         name="business",
         topics=["recipe", "cooking", "automotive", "legal", "education", "travel", "entertainment"],
         description="General business and informational content",
-        safety_level=SafetyCategory.G
+        safety_level=SafetyCategory.G,
+        synonyms={
+            "recipe": ["recipes"],
+            "cooking": ["cook", "food"],
+            "automotive": ["car", "cars", "vehicle"],
+            "travel": ["flight", "flights", "hotel"],
+            "entertainment": ["movies", "games", "music"],
+        }
     ),
     
     "system": TopicCategory(
         name="system",
         topics=["admin", "configuration", "deployment", "security", "database", "api", "infrastructure"],
         description="System administration and technical operations",
-        safety_level=SafetyCategory.PG_13
+        safety_level=SafetyCategory.PG_13,
+        synonyms={
+            "admin": ["administrator", "administrators", "administrative"],
+            "configuration": ["configurations", "config", "settings"],
+            "deployment": ["deploy", "deployments", "production changes"],
+            "security": ["mfa", "authentication"],
+            "database": ["databases", "db"],
+            "api": ["apis", "endpoint", "endpoints"],
+            "infrastructure": ["servers", "cloud resources"],
+        }
     )
 }
 
 
+TAXONOMY_PATH_ENV = "GLASSTAPE_TAXONOMY_PATH"
+TAXONOMY_FILE_SUFFIXES = (".yaml", ".yml", ".json")
+
+_SNAPSHOT_MAGIC = b"GTTAXSNAP2\n"
+
+
+@dataclass(frozen=True)
+class TaxonomySnapshot:
+    """Immutable, compiled view of the taxonomy at a single version.
+
+    Readers hold on to a snapshot for the duration of an operation, so a
+    concurrent reload never changes the data underneath them.
+    """
+    version: str
+    categories: Dict[str, TopicCategory]
+    topic_to_category: Dict[str, str]
+    all_topics: Tuple[str, ...]
+    renderings: Dict[str, str] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def compile(cls, version: str, categories: Dict[str, TopicCategory]) -> "TaxonomySnapshot":
+        """Build lookup tables for a set of categories."""
+        topic_map = {}
+        for category_name, category in categories.items():
+            for topic in category.topics:
+                topic_map[topic] = category_name
+        return cls(
+            version=version,
+            categories=categories,
+            topic_to_category=topic_map,
+            all_topics=tuple(sorted(topic_map)),
+        )
+
+
+def parse_taxonomy_data(data: Dict[str, Any]) -> Dict[str, TopicCategory]:
+    """
+    Parse a taxonomy definition document.
+
+    Expected shape::
+
+        categories:
+          financial:
+            description: Financial transactions
+            safety_level: PG
+            topics: [payment, transaction]
+            synonyms:
+              payment: [pay, payout]
+
+    Raises:
+        ValueError: If the document is malformed
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("categories"), dict):
+        raise ValueError("Taxonomy definition must have a 'categories' mapping")
+
+    categories = {}
+    for name, definition in data["categories"].items():
+        if not isinstance(definition, dict):
+            raise ValueError(f"Taxonomy category '{name}' must be a mapping")
+        topics = definition.get("topics")
+        if not isinstance(topics, list) or not all(isinstance(t, str) for t in topics):
+            raise ValueError(f"Taxonomy category '{name}' must list its topics as strings")
+        try:
+            safety_level = SafetyCategory(definition.get("safety_level", SafetyCategory.G.value))
+        except ValueError:
+            raise ValueError(f"Taxonomy category '{name}' has an invalid safety_level")
+        synonyms = definition.get("synonyms") or {}
+        if not isinstance(synonyms, dict) or not all(isinstance(v, list) for v in synonyms.values()):
+            raise ValueError(f"Taxonomy category '{name}' synonyms must map topics to lists")
+        categories[name] = TopicCategory(
+            name=name,
+            topics=list(topics),
+            description=definition.get("description", ""),
+            safety_level=safety_level,
+            synonyms={topic: [str(s) for s in values] for topic, values in synonyms.items()},
+        )
+    return categories
+
+
+def _taxonomy_files(source: Path) -> List[Path]:
+    """List definition files for a taxonomy source (file or directory)."""
+    if source.is_dir():
+        return sorted(
+            p for p in source.iterdir()
+            if p.is_file() and p.suffix.lower() in TAXONOMY_FILE_SUFFIXES
+        )
+    return [source]
+
+
+def _fingerprint(files: List[Path]) -> str:
+    """Cheap change detector based on file paths, sizes and mtimes."""
+    digest = hashlib.sha256()
+    for path in files:
+        stat = path.stat()
+        digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def load_taxonomy_source(source: Path) -> Dict[str, TopicCategory]:
+    """Parse and merge all taxonomy definition files under ``source``."""
+    categories: Dict[str, TopicCategory] = {}
+    for path in _taxonomy_files(source):
+        text = path.read_text()
+        data = json.loads(text) if path.suffix.lower() == ".json" else yaml.safe_load(text)
+        categories.update(parse_taxonomy_data(data))
+    return categories
+
+
+def default_snapshot_dir() -> Path:
+    """Per-user snapshot directory, so other users cannot plant snapshots."""
+    return user_work_dir("taxonomy")
+
+
+def write_snapshot(path: Path, snapshot: TaxonomySnapshot) -> None:
+    """
+    Write a compiled snapshot atomically.
+    
+    Raises:
+        PermissionError: If the snapshot directory is not private to this user
+    """
+    payload = {
+        "version": snapshot.version,
+        "categories": [
+            (c.name, c.description, c.safety_level.value, list(c.topics), c.synonyms)
+            for c in snapshot.categories.values()
+        ],
+    }
+    ensure_private_dir(path.parent)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_bytes(_SNAPSHOT_MAGIC + marshal.dumps(payload))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: Path) -> Optional[TaxonomySnapshot]:
+    """
+    Memory-map a compiled snapshot; returns None if missing or unreadable.
+    
+    Snapshots are unmarshalled, so only files this user owns in a directory
+    no one else can write are trusted.
+    """
+    if not is_private_dir(path.parent):
+        return None
+    try:
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if os.fstat(fh.fileno()).st_uid != os.getuid():
+                return None
+            if mm[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                return None
+            with memoryview(mm) as view:
+                payload = marshal.loads(view[len(_SNAPSHOT_MAGIC):])
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+
+    categories = {
+        name: TopicCategory(
+            name=name,
+            topics=topics,
+            description=description,
+            safety_level=SafetyCategory(safety_level),
+            synonyms=synonyms,
+        )
+        for name, description, safety_level, topics, synonyms in payload["categories"]
+    }
+    return TaxonomySnapshot.compile(payload["version"], categories)
+
+
 class TopicTaxonomy:
     """Manage topic categorization and validation."""
     
-    def __init__(self):
-        self.categories = TOPIC_CATEGORIES
-        self._topic_to_category = self._build_topic_map()
+    def __init__(
+        self,
+        source: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        reload_interval: float = 1.0,
+    ):
+        """
+        Args:
+            source: Taxonomy file or directory; defaults to $GLASSTAPE_TAXONOMY_PATH,
+                falling back to the built-in categories
+            cache_dir: Base directory for compiled snapshots (default: a per-user
+                directory under the system temp directory)
+            reload_interval: Minimum seconds between source change checks
+        """
+        source = source or os.getenv(TAXONOMY_PATH_ENV)
+        self.source = Path(source).expanduser().resolve() if source else None
+        self.cache_dir = (
+            Path(cache_dir) / "glasstape-policies" / "taxonomy" if cache_dir else default_snapshot_dir()
+        )
+        self.reload_interval = reload_interval
+        
+        self._snapshot: Optional[TaxonomySnapshot] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
     
-    def _build_topic_map(self) -> Dict[str, str]:
-        """Build reverse mapping from topic to category."""
-        topic_map = {}
-        for category_name, category in self.categories.items():
-            for topic in category.topics:
-                topic_map[topic] = category_name
-        return topic_map
+    @property
+    def categories(self) -> Dict[str, TopicCategory]:
+        """Categories of the current taxonomy version."""
+        return self.snapshot().categories
+    
+    @property
+    def version(self) -> str:
+        """Identifier of the current taxonomy version."""
+        return self.snapshot().version
+    
+    def snapshot(self) -> TaxonomySnapshot:
+        """
+        Get the current compiled taxonomy, loading or reloading it if needed.
+        
+        The snapshot is built lazily on first use. For file-backed taxonomies the
+        source is re-checked at most every ``reload_interval`` seconds.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self._refresh()
+        if self.source and time.monotonic() - self._last_check >= self.reload_interval:
+            return self._refresh()
+        return snapshot
+    
+    def reload(self) -> TaxonomySnapshot:
+        """Force a check of the taxonomy source."""
+        return self._refresh(force=True)
+    
+    def _refresh(self, force: bool = False) -> TaxonomySnapshot:
+        """Swap in a new snapshot if the source changed."""
+        with self._lock:
+            current = self._snapshot
+            if not force and current is not None and (
+                not self.source or time.monotonic() - self._last_check < self.reload_interval
+            ):
+                return current  # Another thread refreshed while we waited
+            
+            try:
+                snapshot = self._load(current)
+            except Exception as e:
+                if current is None:
+                    raise ValueError(f"Failed to load taxonomy from {self.source}: {e}")
+                logger.warning(f"Taxonomy reload failed, keeping version {current.version}: {e}")
+                snapshot = current
+            
+            self._last_check = time.monotonic()
+            self._snapshot = snapshot
+            return snapshot
+    
+    def _load(self, current: Optional[TaxonomySnapshot]) -> TaxonomySnapshot:
+        """Load the snapshot for the source's current version."""
+        if not self.source:
+            return current or TaxonomySnapshot.compile("builtin", TOPIC_CATEGORIES)
+        
+        version = _fingerprint(_taxonomy_files(self.source))
+        if current is not None and current.version == version:
+            return current
+        
+        snapshot_path = self.cache_dir / f"taxonomy-{version}.snap"
+        snapshot = read_snapshot(snapshot_path)
+        if snapshot is None or snapshot.version != version:
+            snapshot = TaxonomySnapshot.compile(version, load_taxonomy_source(self.source))
+            try:
+                write_snapshot(snapshot_path, snapshot)
+            except OSError as e:
+                logger.warning(f"Could not write taxonomy snapshot: {e}")
+        
+        if current is not None:
+            logger.info(f"Taxonomy reloaded: {current.version} -> {version}")
+        return snapshot
     
     def get_all_topics(self) -> List[str]:
         """Get all available topics."""
-        topics = []
-        for category in self.categories.values():
-            topics.extend(category.topics)
-        return sorted(topics)
+        return list(self.snapshot().all_topics)
     
     def get_category_topics(self, category: str) -> List[str]:
         """Get topics for a specific category."""
-        if category in self.categories:
-            return self.categories[category].topics
+        categories = self.snapshot().categories
+        if category in categories:
+            return categories[category].topics
         return []
     
     def get_topic_category(self, topic: str) -> str:
         """Get category for a specific topic."""
-        return self._topic_to_category.get(topic, "unknown")
+        return self.snapshot().topic_to_category.get(topic, "unknown")
     
     def validate_topics(self, topics: List[str]) -> Dict[str, List[str]]:
         """Validate topics and return categorized results."""
+        topic_map = self.snapshot().topic_to_category
         result = {
             "valid": [],
             "invalid": [],
@@ -110,9 +427,9 @@ class TopicTaxonomy:
         }
         
         for topic in topics:
-            if topic in self._topic_to_category:
+            if topic in topic_map:
                 result["valid"].append(topic)
-                category = self._topic_to_category[topic]
+                category = topic_map[topic]
                 if category not in result["categories"]:
                     result["categories"].append(category)
             else:
@@ -122,37 +439,58 @@ class TopicTaxonomy:
     
     def get_safety_level(self, topics: List[str]) -> SafetyCategory:
         """Determine overall safety level for a list of topics."""
+        snapshot = self.snapshot()
         max_level = SafetyCategory.G
         
         for topic in topics:
-            category_name = self.get_topic_category(topic)
-            if category_name in self.categories:
-                category_level = self.categories[category_name].safety_level
+            category_name = snapshot.topic_to_category.get(topic)
+            if category_name in snapshot.categories:
+                category_level = snapshot.categories[category_name].safety_level
                 if category_level.value > max_level.value:
                     max_level = category_level
         
         return max_level
     
     def format_taxonomy(self) -> str:
-        """Format taxonomy as readable text for LLM guidance."""
-        output = "# Available Topic Categories\n\n"
-        
-        for category_name, category in self.categories.items():
-            output += f"## {category_name.title()}\n"
-            output += f"**Description**: {category.description}\n"
-            output += f"**Safety Level**: {category.safety_level.value}\n"
-            output += f"**Topics**: {', '.join(category.topics)}\n\n"
-        
+        """Format taxonomy as readable text for LLM guidance (cached per version)."""
+        snapshot = self.snapshot()
+        output = snapshot.renderings.get("taxonomy")
+        if output is None:
+            output = self._render_taxonomy(snapshot)
+            snapshot.renderings["taxonomy"] = output
         return output
     
     def get_topic_guidance(self) -> str:
-        """Get guidance text for client LLM topic extraction."""
+        """Get guidance text for client LLM topic extraction (cached per version)."""
+        snapshot = self.snapshot()
+        guidance = snapshot.renderings.get("guidance")
+        if guidance is None:
+            guidance = self._render_guidance(snapshot)
+            snapshot.renderings["guidance"] = guidance
+        return guidance
+    
+    def _render_taxonomy(self, snapshot: TaxonomySnapshot) -> str:
+        """Render the category listing for one taxonomy version."""
+        parts = ["# Available Topic Categories\n\n"]
+        
+        for category_name, category in snapshot.categories.items():
+            parts.append(
+                f"## {category_name.title()}\n"
+                f"**Description**: {category.description}\n"
+                f"**Safety Level**: {category.safety_level.value}\n"
+                f"**Topics**: {', '.join(category.topics)}\n\n"
+            )
+        
+        return "".join(parts)
+    
+    def _render_guidance(self, snapshot: TaxonomySnapshot) -> str:
+        """Render the topic selection guidance for one taxonomy version."""
         return f"""
 **Topic Selection Guidelines:**
 
 When converting natural language to ICP, analyze the request and select relevant topics from these categories:
 
-{self.format_taxonomy()}
+{self._render_taxonomy(snapshot)}
 
 **Selection Rules:**
 1. **Be Comprehensive**: Include ALL relevant topics from the request
@@ -175,5 +513,5 @@ When converting natural language to ICP, analyze the request and select relevant
 """
 
 
-# Global taxonomy instance
+# Global taxonomy instance (compiled lazily on first use)
 taxonomy = TopicTaxonomy()
\ No newline at end of file
@@ -23,4 +23,5 @@ class RedTeamFinding(BaseModel):
     """Security analysis finding."""
     check: str = Field(..., description="Security check name")
     status: str = Field(..., description="Status: pass, warn, or fail")
-    message: str = Field(..., description="Finding description")
\ No newline at end of file
+    message: str = Field(..., description="Finding description")
+    duration_ms: float = Field(default=0.0, ge=0, description="Check execution time in milliseconds")
\ No newline at end of file
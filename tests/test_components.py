@@ -1,9 +1,47 @@
 """Test core components."""
 
+import asyncio
+import json
+import os
+import subprocess
+import threading
+import time
+
 import pytest
 from glasstape_policy_builder.icp_validator import ICPValidator
 from glasstape_policy_builder.cerbos_generator import CerbosGenerator
-from glasstape_policy_builder.templates import TemplateLibrary
+from glasstape_policy_builder import templates as templates_module
+from glasstape_policy_builder.templates import TemplateLibrary, PolicyTemplate, POLICY_TEMPLATES, template_library
+from glasstape_policy_builder.nl_compiler import RuleBasedCompiler
+from glasstape_policy_builder.policy_model import PolicyModel
+from glasstape_policy_builder.batch_analyzer import analyze_repository
+from glasstape_policy_builder import cel
+from glasstape_policy_builder.rule_analysis import ConditionSummary, analyze_rules
+from glasstape_policy_builder.policy_index import PolicyIndex
+from glasstape_policy_builder.coverage import PolicyEvaluator, analyze_coverage
+from glasstape_policy_builder.test_generator import generate_boundary_tests
+from glasstape_policy_builder.test_minimizer import coverage_signatures, minimize_tests
+from glasstape_policy_builder import llm_adapter
+from glasstape_policy_builder.llm_adapter import (
+    AnthropicAdapter, LLMAdapter, OpenAIAdapter, get_llm_adapter, register_provider, reset_llm_adapter,
+)
+from glasstape_policy_builder.llm_cache import ICPCache
+from glasstape_policy_builder.llm_batch import convert_batch, pack_requirements
+from glasstape_policy_builder import llm_pool
+from glasstape_policy_builder.llm_pool import AdapterPool, percentile
+from glasstape_policy_builder.scheduler import Scheduler
+from glasstape_policy_builder import cerbos_cli
+from glasstape_policy_builder.cerbos_cli import CerbosCLI
+from glasstape_policy_builder.services import ServiceContainer, close_services, get_services
+from glasstape_policy_builder.tools.generate_policy import build_policy_artifacts
+from glasstape_policy_builder.streaming_json import IncrementalJSONParser, StreamingJSONError, parse_json_object
+from glasstape_policy_builder import redteam_analyzer
+from glasstape_policy_builder.redteam_analyzer import (
+    CheckRegistry,
+    RedTeamFinding,
+    SimpleRedTeamAnalyzer,
+    check_registry,
+)
 
 
 def test_icp_validator():
@@ -143,4 +181,1447 @@ def test_template_library():
     
     # Test non-existent template
     template = library.get_template("non_existent")
-    assert template is None
\ No newline at end of file
+    assert template is None
+
+def test_template_rendering_cache():
+    """Test that template renderings are cached until reload."""
+    library = TemplateLibrary()
+    templates = library.list_templates()
+    
+    first = library.format_templates(templates)
+    assert library.format_templates(templates) is first
+    
+    library.reload(templates[:1])
+    assert library.version == 1
+    assert "Payment Execution" in library.format_templates(library.list_templates())
+    assert "PHI Access" not in library.format_templates(library.list_templates())
+
+
+
+def test_rule_based_compiler():
+    """Test deterministic NL to ICP compilation."""
+    compiler = RuleBasedCompiler()
+    
+    result = compiler.compile(POLICY_TEMPLATES[0].example)
+    assert result.confident
+    icp = result.icp
+    assert icp["metadata"]["resource"] == "payment"
+    assert icp["metadata"]["blocked_topics"] == ["recipe", "adult"]
+    conditions = icp["policy"]["rules"][0]["conditions"]
+    assert "request.resource.attr.amount <= 50" in conditions
+    assert "request.resource.attr.transaction_count_5m < 5" in conditions
+    assert icp["policy"]["rules"][-1]["effect"] == "EFFECT_DENY"
+    assert {t["category"] for t in icp["tests"]} >= {"positive", "negative", "boundary"}
+    
+    result = compiler.compile("Only healthcare providers can read patient records. Maximum 100 requests per hour.")
+    assert result.confident
+    assert result.icp["policy"]["rules"][0]["roles"] == ["healthcare_provider"]
+    assert "request.resource.attr.request_count_1h < 100" in result.icp["policy"]["rules"][0]["conditions"]
+    
+    # Anything not understood falls back to the LLM
+    result = compiler.compile("Allow healthcare providers to read patient records. Log all access.")
+    assert not result.confident
+    assert result.unmatched == ["Log all access"]
+    
+    # Every cap applies, so the tightest one is compiled
+    for text in ("Allow agents to execute payments up to $50. Block payments over $100.",
+                 "Allow agents to execute payments under $100. Block payments over $100."):
+        result = compiler.compile(text)
+        assert result.confident
+        conditions = result.icp["policy"]["rules"][0]["conditions"]
+        assert [c for c in conditions if "amount" in c and "> 0" not in c] == [
+            "request.resource.attr.amount <= 50" if "$50" in text else "request.resource.attr.amount < 100"
+        ]
+    
+    # "Block ... below $X" is a lower bound, not a cap: never compiled into the allow rule
+    result = compiler.compile("Allow AI agents to execute payments up to $50. Block payments below $1.")
+    assert not result.confident
+    assert result.unmatched == ["Block payments below $1"]
+    assert [c for c in result.icp["policy"]["rules"][0]["conditions"] if "amount" in c] == [
+        "request.resource.attr.amount > 0", "request.resource.attr.amount <= 50"
+    ]
+    result = compiler.compile("Deny payments under $5")
+    assert not result.confident
+    assert result.icp is None
+
+
+
+def test_template_instantiation():
+    """Test that skeletons are pre-validated and filled with typed parameters."""
+    library = TemplateLibrary()
+    compiled = library.prepare()
+    assert set(compiled) == {t.id for t in POLICY_TEMPLATES}
+    assert not any(isinstance(entry, ValueError) for entry in compiled.values())
+    
+    icp = library.instantiate("pii_export", {"max_records": 500, "resource": "warehouse_export"})
+    assert icp["metadata"]["name"] == "warehouse_export_policy"
+    assert "request.resource.attr.record_count <= 500" in icp["policy"]["rules"][0]["conditions"]
+    record_counts = {t["name"]: t["input"]["resource"]["attr"]["record_count"] for t in icp["tests"]}
+    assert record_counts == {"anonymized_export": 250, "raw_pii_export": 250, "export_over_record_limit": 501}
+    assert icp["policy"]["rules"][0]["roles"] == ["data_analyst"]
+    
+    # Instances never share state with the skeleton
+    icp["policy"]["rules"][0]["conditions"].clear()
+    assert library.instantiate("pii_export")["policy"]["rules"][0]["conditions"]
+    
+    with pytest.raises(ValueError, match="Unknown parameters"):
+        library.instantiate("pii_export", {"amount_limit": 5})
+    with pytest.raises(ValueError, match="Unknown template"):
+        library.instantiate("missing")
+
+
+def test_template_directory_loading(tmp_path):
+    """Test that directory templates are indexed and override built-ins."""
+    (tmp_path / "vendor_payouts.yaml").write_text(
+        "id: vendor_payouts\n"
+        "name: Vendor Payouts\n"
+        "category: finance\n"
+        "description: Weekly payouts to approved vendors\n"
+        "example: Allow agents to pay approved vendors up to $500.\n"
+        "tags: [payments, vendors]\n"
+    )
+    (tmp_path / "payment.json").write_text(
+        '{"id": "payment_execution", "name": "Payment Execution v2", "category": "finance",'
+        ' "description": "Overridden", "example": "Allow payments up to $10."}'
+    )
+    (tmp_path / "broken.yaml").write_text("name: missing id\n")
+    (tmp_path / "unnamed_param.yaml").write_text(
+        "id: unnamed\nname: Unnamed\ncategory: finance\ndescription: d\nexample: e\n"
+        "parameters: [{type: number}]\n"
+    )
+    (tmp_path / "bad_tags.yaml").write_text(
+        "id: bad_tags\nname: Bad Tags\ncategory: finance\ndescription: d\nexample: e\ntags: 5\n"
+    )
+    
+    library = TemplateLibrary(template_dir=str(tmp_path))
+    assert len(library.list_templates()) == 6
+    assert library.get_template("payment_execution").name == "Payment Execution v2"
+    assert [t.id for t in library.list_templates(tag="vendors")] == ["vendor_payouts"]
+    assert len(library.list_templates("finance", tag="payments")) == 1
+    
+    results = library.search("vendor payouts")
+    assert results[0][0].id == "vendor_payouts"
+    assert library.search("vendor", category="healthcare") == []
+
+
+def test_template_search_ranking(monkeypatch):
+    """Test search ranking over a large template set, answered from the index."""
+    library = TemplateLibrary()
+    assert library.search("hipaa patient records")[0][0].id == "phi_access"
+    assert library.search("jailbreak")[0][0].id == "model_invocation"
+    assert library.search("zzz-unknown") == []
+    
+    synthetic = [
+        PolicyTemplate(
+            id=f"internal_{i}",
+            name=f"Internal Policy {i}",
+            category=["finance", "healthcare", "system"][i % 3],
+            description=f"Internal control {i} for service {i % 50} with audit logging",
+            example=f"Allow service {i % 50} agents to read records in region {i % 7}.",
+            tags=[f"team{i % 20}", "internal"],
+        )
+        for i in range(2000)
+    ]
+    library.reload(POLICY_TEMPLATES + synthetic)
+    assert library.search("payments sanctions")[0][0].id == "payment_execution"
+    
+    
+    # A query only tokenizes itself and only scores templates sharing a term
+    index = library._index
+    tokenized = []
+    terms = templates_module._terms
+    monkeypatch.setattr(templates_module, "_terms", lambda text: tokenized.append(text) or terms(text))
+    scored = set().union(*(index.postings.get(term, {}) for term in terms("rate limit payments")))
+    assert len(scored) < len(index.templates) / 100
+    assert [t.id for t, _ in library.search("rate limit payments", limit=10)] == [
+        t.id for t, _ in index.search("rate limit payments", limit=10)
+    ]
+    assert tokenized == ["rate limit payments"] * 2
+    assert library._index is index
+
+
+def test_policy_model_parsing():
+    """Test parsing policy YAML into rules and CEL conditions."""
+    model = PolicyModel.parse("""
+resourcePolicy:
+  resource: report
+  version: default
+  rules:
+    - actions: ["read"]
+      effect: EFFECT_ALLOW
+      roles: ["analyst"]
+      condition:
+        match:
+          all:
+            of:
+              - expr: request.resource.attr.pages > 0
+              - any:
+                  of:
+                    - expr: request.resource.attr.region == "eu"
+                    - expr: request.resource.attr.region == "us"
+    - actions: ["*"]
+      effect: EFFECT_DENY
+      roles: ["*"]
+""")
+    assert model.error is None
+    assert model.resource == "report"
+    assert len(model.rules) == 2
+    assert model.rules[0].expressions == [
+        "request.resource.attr.pages > 0",
+        'request.resource.attr.region == "eu"',
+        'request.resource.attr.region == "us"',
+    ]
+    assert model.rules[1].is_catch_all_deny
+    assert model.roles() == ["analyst"]
+    assert "region" in model.cel_identifiers and '"eu"' not in model.cel_identifiers
+    
+    assert PolicyModel.parse("rules: [").error.startswith("Invalid YAML")
+    assert PolicyModel.parse("principalPolicy: {}").error is not None
+
+
+def test_redteam_checks_only_cel_conditions():
+    """Test that descriptions and wildcard allows no longer pass checks."""
+    analyzer = SimpleRedTeamAnalyzer()
+    policy_yaml = """
+apiVersion: api.cerbos.dev/v1
+description: Limit exports and screen sanctioned or blocked recipients by topics
+resourcePolicy:
+  resource: export
+  rules:
+    - actions: ["*"]
+      effect: EFFECT_ALLOW
+      roles: ["*"]
+    - actions: ["delete"]
+      effect: EFFECT_DENY
+      roles: ["*"]
+"""
+    findings = {f.check: f.status for f in analyzer.analyze(policy_yaml)}
+    assert findings == {
+        "Default Deny": "fail",
+        "Rate Limiting": "warn",
+        "Sanctions Screening": "warn",
+        "Input Validation": "warn",
+        "Role-Based Access": "warn",
+        "Topic Governance": "warn",
+        "Rule Reachability": "fail",
+    }
+    
+    policy_yaml = """
+resourcePolicy:
+  resource: payment
+  rules:
+    - actions: ["execute"]
+      effect: EFFECT_ALLOW
+      roles: ["agent"]
+      condition:
+        match:
+          expr: >
+            request.resource.attr.amount <= 50 &&
+            request.resource.attr.agent_txn_count_5m < 5 &&
+            !(request.resource.attr.recipient in request.resource.attr.sanctioned_entities)
+    - actions: ["*"]
+      effect: EFFECT_DENY
+      roles: ["*"]
+      condition:
+        match:
+          expr: request.resource.attr.amount > 1000
+"""
+    findings = {f.check: f for f in analyzer.analyze(policy_yaml)}
+    assert findings["Default Deny"].status == "warn"
+    assert findings["Rate Limiting"].message.endswith("txn count")
+    assert findings["Sanctions Screening"].message.endswith("sanctioned")
+    assert findings["Input Validation"].message.endswith("<=, <, in, >")
+    assert findings["Role-Based Access"].message.endswith("agent")
+    
+    # Sizes such as record_count or item_count are not rate limits
+    for attr in ("record_count", "item_count"):
+        policy_yaml = (
+            "resourcePolicy:\n  resource: export\n  rules:\n"
+            "    - actions: [\"export\"]\n      effect: EFFECT_ALLOW\n      roles: [\"analyst\"]\n"
+            f"      condition:\n        match:\n          expr: request.resource.attr.{attr} <= 500\n"
+        )
+        findings = {f.check: f.status for f in analyzer.analyze(policy_yaml)}
+        assert findings["Rate Limiting"] == "warn", attr
+
+
+def test_redteam_check_registry():
+    """Test custom checks, declared inputs, time budget and timings."""
+    assert len(check_registry.checks()) == 7
+    
+    registry = CheckRegistry()
+    
+    @registry.register("Resource Named", inputs=("policy",))
+    def resource_named(policy):
+        status = "pass" if policy.resource else "fail"
+        return RedTeamFinding(check="Resource Named", status=status, message=policy.resource or "")
+    
+    @registry.register("Has Description", inputs=("policy_yaml", "icp"), concurrent=True)
+    def has_description(policy_yaml, icp):
+        status = "pass" if "description:" in policy_yaml else "warn"
+        return RedTeamFinding(check="Has Description", status=status, message="")
+    
+    @registry.register("Slow Lookup", inputs=(), concurrent=True)
+    def slow_lookup():
+        time.sleep(0.5)
+        return RedTeamFinding(check="Slow Lookup", status="pass", message="")
+    
+    @registry.register("Broken", inputs=("controls",))
+    def broken(controls):
+        raise RuntimeError("boom")
+    
+    with pytest.raises(ValueError):
+        registry.register("Bad", inputs=("database",))
+    
+    analyzer = SimpleRedTeamAnalyzer(registry=registry, time_budget_ms=50)
+    findings = analyzer.analyze("resourcePolicy:\n  resource: doc\n  rules: []\n")
+    
+    assert [f.check for f in findings] == ["Resource Named", "Has Description", "Slow Lookup", "Broken"]
+    assert [f.status for f in findings] == ["pass", "warn", "warn", "warn"]
+    assert "time budget" in findings[2].message
+    assert findings[2].duration_ms > 0
+    assert "boom" in findings[3].message
+    assert all(f.duration_ms >= 0 for f in findings)
+    assert "1/4 checks passed" in analyzer.format_findings(findings)
+    assert "Slow Lookup" in analyzer.format_findings(findings).split("**Slow checks**")[1]
+
+
+
+def test_redteam_timeouts_release_workers(monkeypatch):
+    """Test that timed-out checks do not hold the workers of later analyses."""
+    monkeypatch.setattr(redteam_analyzer, "CHECK_WORKERS", 1)
+    monkeypatch.setattr(redteam_analyzer, "_executor", None)
+    release = threading.Event()
+    registry = CheckRegistry()
+    
+    @registry.register("Fast", inputs=(), concurrent=True)
+    def fast():
+        return RedTeamFinding(check="Fast", status="pass", message="")
+    
+    @registry.register("Hung", inputs=(), concurrent=True)
+    def hung():
+        release.wait(30)
+        return RedTeamFinding(check="Hung", status="pass", message="")
+    
+    @registry.register("Queued", inputs=(), concurrent=True)
+    def queued():
+        return RedTeamFinding(check="Queued", status="pass", message="")
+    
+    analyzer = SimpleRedTeamAnalyzer(registry=registry, time_budget_ms=200)
+    try:
+        for _ in range(3):
+            executor = redteam_analyzer._check_executor()
+            findings = analyzer.analyze("resourcePolicy:\n  resource: doc\n  rules: []\n")
+            # Each analysis gets a worker; before, the first hung check held the only one
+            assert [f.status for f in findings] == ["pass", "warn", "warn"]
+            assert redteam_analyzer._check_executor() is not executor
+            # Durations are per check: the queued check never started
+            assert findings[2].duration_ms == 0
+            assert 0 < findings[1].duration_ms
+    finally:
+        release.set()
+
+
+SAFE_POLICY = """
+resourcePolicy:
+  resource: {resource}
+  version: v{version}
+  rules:
+    - actions: ["read"]
+      effect: EFFECT_ALLOW
+      roles: ["analyst"]
+      condition:
+        match:
+          expr: request.resource.attr.txn_count_1h < 10
+    - actions: ["*"]
+      effect: EFFECT_DENY
+      roles: ["*"]
+"""
+
+OPEN_POLICY = """
+resourcePolicy:
+  resource: {resource}
+  version: v{version}
+  rules:
+    - actions: ["*"]
+      effect: EFFECT_ALLOW
+      roles: ["*"]
+"""
+
+
+def test_analyze_repository(tmp_path):
+    """Test batch analysis across worker processes with JSONL output."""
+    repo = tmp_path / "policies"
+    (repo / "finance").mkdir(parents=True)
+    (repo / "tests").mkdir()
+    for i in range(36):
+        template = OPEN_POLICY if i % 9 == 0 else SAFE_POLICY
+        (repo / "finance" / f"policy_{i:02d}.yaml").write_text(template.format(resource=f"ledger{i % 3}", version=i))
+    (repo / "tests" / "ledger_test.yaml").write_text("name: suite\ntests: []\n")
+    (repo / "derived_roles.yaml").write_text("derivedRoles:\n  name: common\n  definitions: []\n")
+    (repo / "broken.yaml").write_text("resourcePolicy: [\n")
+    (repo / "notes.txt").write_text("not a policy")
+    
+    report = tmp_path / "report.jsonl"
+    summary = analyze_repository(repo, output=report, workers=2, top=3)
+    
+    assert summary.files == 38
+    assert summary.analyzed == 36
+    assert summary.skipped == 1
+    assert [e["path"] for e in summary.errors] == ["broken.yaml"]
+    assert summary.failing_checks == {"Default Deny": 4}
+    assert summary.failing_by_resource == {"ledger0": {"Default Deny": 4}}
+    assert len(summary.worst_offenders) == 3
+    assert all(o["failed"] == 1 for o in summary.worst_offenders)
+    
+    # Identical rules in other versions are reported once, against the first copy
+    assert summary.conflict_counts == {"duplicate_rule": 32}
+    
+    records = [json.loads(line) for line in report.read_text().splitlines()]
+    assert len(records) == 39 + 32
+    assert records[-1]["type"] == "summary"
+    assert {r["type"] for r in records[:-1]} == {"file", "skipped", "error", "conflict"}
+    assert all("rules" not in r for r in records)
+    
+    text = summary.format()
+    assert "`ledger0`: Default Deny (4)" in text
+    assert "finance/policy_" in text
+    
+    # A report path replaces only an earlier report, never a symlink or another file
+    assert analyze_repository(repo, output=report, workers=1).analyzed == 36
+    (tmp_path / "notes.jsonl").write_text("keep me\n")
+    (tmp_path / "link.jsonl").symlink_to(tmp_path / "target.jsonl")
+    for output in ("notes.jsonl", "link.jsonl"):
+        with pytest.raises(FileExistsError):
+            analyze_repository(repo, output=tmp_path / output, workers=1)
+    assert (tmp_path / "notes.jsonl").read_text() == "keep me\n"
+    assert not (tmp_path / "target.jsonl").exists()
+
+
+def test_analyze_repository_workers_capped(tmp_path, monkeypatch):
+    """Test that a client cannot start more worker processes than CPUs."""
+    from glasstape_policy_builder import batch_analyzer
+    
+    repo = tmp_path / "policies"
+    repo.mkdir()
+    for i in range(100):
+        (repo / f"policy_{i:03d}.yaml").write_text(SAFE_POLICY.format(resource=f"doc{i}", version=i))
+    
+    pools = []
+    
+    class InlinePool:
+        def __init__(self, processes):
+            pools.append(processes)
+        
+        def __enter__(self):
+            return self
+        
+        def __exit__(self, *exc):
+            return False
+        
+        def imap_unordered(self, func, jobs, chunksize=1):
+            return map(func, jobs)
+    
+    monkeypatch.setattr(batch_analyzer.os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(batch_analyzer.multiprocessing, "get_context", lambda method: type("Ctx", (), {"Pool": InlinePool}))
+    assert analyze_repository(repo, workers=5000).analyzed == 100
+    assert pools == [2]
+
+
+def test_cel_parser():
+    """Test CEL parsing and canonical rendering."""
+    node = cel.parse('R.attr.amount > 0 && !(R.attr.recipient in R.attr.sanctioned) || size(P.attr.roles) == 0')
+    assert cel.to_cel(node) == (
+        "(((request.resource.attr.amount > 0) && !(request.resource.attr.recipient in "
+        "request.resource.attr.sanctioned)) || (size(request.principal.attr.roles) == 0))"
+    )
+    assert cel.parse('"a\\"b" in R.attr.tags.filter(t, t != \'x\')') == cel.parse("'a\"b' in R.attr.tags.filter(t, t != 'x')")
+    assert cel.constant_value(cel.parse("2 * (3 + 4) >= 14 && -1.5 < 0")) is True
+    with pytest.raises(cel.CELSyntaxError):
+        cel.parse("R.attr.amount >")
+
+
+def _rules_policy(rules):
+    body = "".join(rules)
+    return PolicyModel.parse(f"resourcePolicy:\n  resource: doc\n  rules:\n{body}")
+
+
+def _rule(actions, effect, expr=None, roles='["agent"]'):
+    rule = f"    - actions: {actions}\n      effect: {effect}\n      roles: {roles}\n"
+    if expr:
+        rule += f"      condition:\n        match:\n          expr: \"{expr}\"\n"
+    return rule
+
+
+def test_rule_reachability():
+    """Test shadowed, unreachable and always-true rule detection."""
+    policy = _rules_policy([
+        _rule('["read", "write"]', "EFFECT_ALLOW", "R.attr.amount > 0 && R.attr.amount <= 100"),
+        _rule('["read"]', "EFFECT_DENY", "R.attr.amount > 10 && R.attr.amount < 50 && R.attr.region == 'eu'"),
+        _rule('["read"]', "EFFECT_DENY", "R.attr.amount > 50 && R.attr.amount < 10"),
+        _rule('["write"]', "EFFECT_ALLOW", "R.attr.amount <= 100 && R.attr.amount > 0"),
+        _rule('["write"]', "EFFECT_DENY", "R.attr.amount > 100"),
+        _rule('["share"]', "EFFECT_ALLOW", "true"),
+        _rule('["share"]', "EFFECT_DENY", "!(R.attr.owner == P.id)"),
+        _rule('["*"]', "EFFECT_DENY", roles='["*"]'),
+    ])
+    issues = {(issue.rule, issue.kind): issue for issue in analyze_rules(policy)}
+    assert set(issues) == {(1, "shadowed"), (2, "unreachable"), (3, "shadowed"), (5, "always_true"), (6, "shadowed")}
+    assert issues[(1, "shadowed")].shadowed_by == 0
+    assert issues[(1, "shadowed")].severity == "fail"
+    assert issues[(3, "shadowed")].severity == "warn"
+    assert "never takes effect" in issues[(6, "shadowed")].message
+    
+    # Different roles, disjoint ranges and OR conditions are not shadowing
+    policy = _rules_policy([
+        _rule('["read"]', "EFFECT_ALLOW", "R.attr.amount < 10"),
+        _rule('["read"]', "EFFECT_DENY", "R.attr.amount >= 10"),
+        _rule('["read"]', "EFFECT_DENY", "R.attr.amount < 5", roles='["auditor"]'),
+        _rule('["read"]', "EFFECT_DENY", "R.attr.amount < 5 || R.attr.vip"),
+    ])
+    assert analyze_rules(policy) == []
+
+
+def test_rule_reachability_scales(monkeypatch):
+    """Test that thousands of rules are compared through the index, not pairwise."""
+    rules = []
+    for i in range(3000):
+        action = f'["op{i % 500}"]'
+        rules.append(_rule(action, "EFFECT_ALLOW", f"R.attr.amount > {i} && R.attr.amount <= {i + 1}", roles=f'["role{i % 7}"]'))
+    rules.append(_rule('["op1"]', "EFFECT_DENY", "R.attr.amount > 1.2 && R.attr.amount < 1.5", roles='["role1"]'))
+    policy = _rules_policy(rules)
+    
+    implications = []
+    implies = ConditionSummary.implies
+    monkeypatch.setattr(ConditionSummary, "implies", lambda self, other: implications.append(1) or implies(self, other))
+    issues = analyze_rules(policy)
+    assert [(issue.rule, issue.shadowed_by) for issue in issues] == [(3000, 1)]
+    # Only rules sharing an (action, role) bucket are compared
+    assert len(implications) <= len(rules)
+
+
+def test_policy_index_conflicts():
+    """Test cross-policy conflicts, duplicates, collisions and incremental updates."""
+    def policy(version, *rules):
+        return PolicyModel.parse(
+            f"resourcePolicy:\n  resource: doc\n  version: '{version}'\n  rules:\n" + "".join(rules)
+        )
+    
+    index = PolicyIndex()
+    assert index.add_policy("a.yaml", policy("1", _rule('["read"]', "EFFECT_ALLOW", "R.attr.size < 10"))) == []
+    
+    # Overlapping conditions with the opposite effect conflict; disjoint ones
+    # and default-deny rules do not
+    conflicts = index.add_policy("b.yaml", policy(
+        "2",
+        _rule('["read"]', "EFFECT_DENY", "R.attr.size > 5"),
+        _rule('["read"]', "EFFECT_DENY", "R.attr.size >= 10"),
+        _rule('["*"]', "EFFECT_DENY", roles='["*"]'),
+    ))
+    assert [(c.kind, c.policies) for c in conflicts] == [("conflicting_effect", ("a.yaml", "b.yaml"))]
+    
+    # A wildcard rule meets every action of the resource
+    conflicts = index.add_policy("c.yaml", policy("3", _rule('["*"]', "EFFECT_DENY", "R.attr.size == 3", roles='["*"]')))
+    assert [(c.kind, c.policies) for c in conflicts] == [("conflicting_effect", ("a.yaml", "c.yaml"))]
+    
+    conflicts = index.add_policy("d.yaml", policy("1", _rule('["write"]', "EFFECT_ALLOW", "R.attr.size < 10")))
+    assert [(c.kind, c.policies) for c in conflicts] == [
+        ("version_collision", ("a.yaml", "d.yaml")),
+        ("conflicting_effect", ("c.yaml", "d.yaml")),
+    ]
+    
+    conflicts = index.add_policy("e.yaml", policy("4", _rule('["read"]', "EFFECT_ALLOW", "R.attr.size < 10")))
+    assert sorted(c.kind for c in conflicts) == ["conflicting_effect", "conflicting_effect", "duplicate_rule"]
+    assert len(index.conflicts()) == 7
+    
+    # Replacing or removing a policy only touches the conflicts it was part of
+    index.add_policy("c.yaml", policy("3", _rule('["write"]', "EFFECT_DENY", "R.attr.size > 20", roles='["*"]')))
+    assert len(index.conflicts()) == 4
+    index.remove("a.yaml")
+    assert sorted(c.policies for c in index.conflicts()) == [("b.yaml", "e.yaml")]
+    
+    # Removal rewrites only the conflict lists that mention the removed policy
+    untouched = index._conflicts["e.yaml"]
+    index.add_policy("f.yaml", policy("5", _rule('["write"]', "EFFECT_DENY", roles='["admin"]')))
+    index.remove("f.yaml")
+    assert index._conflicts["e.yaml"] is untouched
+    
+    # A bounded index drops its least recently added policies with their conflicts
+    bounded = PolicyIndex(max_policies=2)
+    bounded.add_policy("a.yaml", policy("1", _rule('["read"]', "EFFECT_ALLOW", "R.attr.size < 10")))
+    bounded.add_policy("b.yaml", policy("2", _rule('["read"]', "EFFECT_DENY", "R.attr.size > 5")))
+    assert len(bounded.conflicts()) == 1
+    bounded.add_policy("c.yaml", policy("3", _rule('["write"]', "EFFECT_ALLOW")))
+    assert "a.yaml" not in bounded and len(bounded) == 2
+    assert bounded.conflicts() == []
+
+
+def test_policy_index_per_session():
+    """Test that tool calls in different client sessions never see each other's policies."""
+    from glasstape_policy_builder.policy_index import current_index, indexing, session_index
+    from glasstape_policy_builder.services import PolicyPipeline
+    
+    class Session:
+        pass
+    
+    first, second = Session(), Session()
+    assert session_index(first) is session_index(first)
+    assert session_index(first) is not session_index(second)
+    
+    pipeline = PolicyPipeline()
+    allow = "resourcePolicy:\n  resource: doc\n  version: '1'\n  rules:\n" + _rule('["read"]', "EFFECT_ALLOW")
+    deny = "resourcePolicy:\n  resource: doc\n  version: '2'\n  rules:\n" + _rule('["read"]', "EFFECT_DENY")
+    with indexing(session_index(first)):
+        assert pipeline.index_policy("mine", allow) == []
+        assert current_index() is session_index(first)
+    with indexing(session_index(second)):
+        assert pipeline.index_policy("theirs", deny) == []
+    with indexing(session_index(first)):
+        assert [c.policies for c in pipeline.index_policy("mine_too", deny)] == [("mine", "mine_too")]
+
+
+def test_cel_evaluation():
+    """Test CEL evaluation against a request, including error semantics."""
+    activation = cel.request_activation(
+        {"id": "u1", "roles": ["agent"]},
+        {"id": "r1", "attr": {"amount": 50, "topics": ["payments"], "tags": [1, 2, 3], "owner": "u1"}},
+    )
+    
+    def run(expr):
+        return cel.compile_expression(cel.parse(expr))(activation)
+    
+    assert run("R.attr.amount > 10 && 'payments' in request.resource.attr.topics") is True
+    assert run("R.attr.owner == P.id && 'agent' in P.roles") is True
+    assert run("R.attr.tags.all(t, t > 0) && R.attr.tags.exists_one(t, t == 2)") is True
+    assert run("R.attr.tags.filter(t, t > 1).map(t, t * 2)") == [4, 6]
+    assert run("size(R.attr.tags) == 3 && has(R.attr.amount) && !has(R.attr.missing)") is True
+    assert run("-7 / 2 == -3 && -7 % 3 == -1 && 'abc'.startsWith('a')") is True
+    assert run("R.attr.amount == true") is False
+    # Errors are absorbed by a decisive operand on either side
+    assert run("R.attr.missing > 1 || true") is True
+    assert run("R.attr.missing > 1 && false") is False
+    for expr in ("R.attr.missing > 1 && true", "R.attr.amount > 'x'", "unknown(1)"):
+        with pytest.raises(cel.CELEvaluationError):
+            run(expr)
+
+
+def _coverage_icp(tests):
+    return {
+        "version": "1.0.0",
+        "metadata": {
+            "name": "payments",
+            "description": "Payment limits",
+            "resource": "payment",
+            "blocked_topics": ["gambling"],
+        },
+        "policy": {
+            "resource": "payment",
+            "version": "1.0.0",
+            "rules": [
+                {
+                    "actions": ["execute"],
+                    "effect": "EFFECT_ALLOW",
+                    "roles": ["agent"],
+                    "conditions": ["request.resource.attr.amount > 0", "request.resource.attr.amount <= 100"],
+                },
+                {
+                    "actions": ["execute"],
+                    "effect": "EFFECT_ALLOW",
+                    "roles": ["manager"],
+                    "conditions": ["request.resource.attr.amount <= 1000 || request.resource.attr.approved == true"],
+                },
+                {"actions": ["refund"], "effect": "EFFECT_ALLOW", "roles": ["manager"]},
+                {"actions": ["*"], "effect": "EFFECT_DENY", "roles": ["*"]},
+            ],
+        },
+        "tests": tests,
+    }
+
+
+def _coverage_test(name, roles, attr, expected, actions=("execute",)):
+    return {
+        "name": name,
+        "category": "positive" if expected == "EFFECT_ALLOW" else "negative",
+        "input": {
+            "principal": {"id": "p", "roles": roles},
+            "resource": {"id": "r", "attr": attr},
+            "actions": list(actions),
+        },
+        "expected": expected,
+    }
+
+
+def test_policy_coverage():
+    """Test rule firing, branch outcomes and mismatches from in-process evaluation."""
+    icp = _coverage_icp([
+        _coverage_test("small", ["agent"], {"amount": 50, "topics": []}, "EFFECT_ALLOW"),
+        _coverage_test("large", ["agent"], {"amount": 500, "topics": []}, "EFFECT_DENY"),
+        _coverage_test("gambling", ["agent"], {"amount": 5, "topics": ["gambling"]}, "EFFECT_DENY"),
+        _coverage_test("no_topics", ["agent"], {"amount": 5}, "EFFECT_ALLOW"),
+    ])
+    report = analyze_coverage(icp)
+    
+    assert (report.tests, report.decisions) == (4, 4)
+    # Topic conditions are appended to every generated rule, the catch-all
+    # deny included, so blocked or missing topics fall through to the default
+    assert [rule.fired for rule in report.rules] == [1, 0, 0, 1]
+    assert (report.rules_fired, report.default_decisions) == (2, 2)
+    
+    branches = {branch.expression: branch for branch in report.rules[0].branches}
+    amount = branches["(request.resource.attr.amount <= 100)"]
+    assert (amount.true, amount.false) == (3, 1)
+    blocked = branches['!("gambling" in request.resource.attr.topics)']
+    assert (blocked.true, blocked.false, blocked.errors) == (1, 1, 1)
+    assert not report.rules[1].evaluated
+    
+    # A missing attribute errors, so the allow rule does not match
+    assert [(m.test, m.actual, m.rule) for m in report.mismatches] == [("no_topics", "EFFECT_DENY", None)]
+    
+    output = report.format()
+    assert "2/4 rules fired" in output
+    assert "never evaluated" in output and "no_topics" in output
+
+
+def test_policy_coverage_scales(monkeypatch):
+    """Test that tens of thousands of tests reuse conditions compiled once per policy."""
+    tests = [
+        _coverage_test(
+            f"t{i}", ["agent", "manager"][i % 2:i % 2 + 1],
+            {"amount": i % 1500, "approved": i % 3 == 0, "topics": ["gambling"] if i % 11 == 0 else []},
+            "EFFECT_ALLOW", actions=("execute", "refund"),
+        )
+        for i in range(20000)
+    ]
+    parses = []
+    parse = cel.parse
+    monkeypatch.setattr(cel, "parse", lambda text: parses.append(text) or parse(text))
+    analyze_coverage(_coverage_icp([]), tests[:10])
+    compiled_per_policy = len(parses)
+    assert compiled_per_policy > 0
+    
+    report = analyze_coverage(_coverage_icp([]), tests)
+    assert report.decisions == 40000
+    assert report.rules_fired == 4
+    assert report.branch_coverage == 1.0
+    assert len(parses) == 2 * compiled_per_policy
+
+
+def test_boundary_test_generation():
+    """Test boundary and adversarial tests generated from rule conditions."""
+    icp = _coverage_icp([_coverage_test("small", ["agent"], {"amount": 50, "currency": "USD", "topics": []}, "EFFECT_ALLOW")])
+    icp["policy"]["rules"][0]["conditions"].append("request.resource.attr.currency in ['USD', 'EUR']")
+    tests = generate_boundary_tests(icp)
+    by_name = {test.name: test for test in tests}
+    
+    # Limits and one step either side, decided by the policy itself
+    assert by_name["boundary_rule1_amount_at_100"].expected.value == "EFFECT_ALLOW"
+    assert by_name["boundary_rule1_amount_above_100"].expected.value == "EFFECT_DENY"
+    assert by_name["boundary_rule1_amount_above_100"].input.resource["attr"]["amount"] == 101
+    assert by_name["boundary_rule1_amount_at_0"].expected.value == "EFFECT_DENY"
+    assert by_name["boundary_rule1_currency_listed_eur"].expected.value == "EFFECT_ALLOW"
+    assert by_name["boundary_rule1_currency_unlisted"].expected.value == "EFFECT_DENY"
+    for name in ("adversarial_rule1_amount_null", "adversarial_rule1_amount_wrong_type", "adversarial_rule1_currency_missing"):
+        assert by_name[name].expected.value == "EFFECT_DENY"
+    blocked = by_name["adversarial_rule1_topics_gambling_present"]
+    assert blocked.input.resource["attr"]["topics"] == ["gambling"]
+    assert blocked.input.principal["roles"] == ["agent"]
+    
+    # Every input is distinct and none repeats the ICP's own tests
+    inputs = [json.dumps(test.input.model_dump(), sort_keys=True) for test in tests]
+    assert len(set(inputs)) == len(inputs)
+    assert not any(test.input.resource["attr"] == {"amount": 50, "currency": "USD", "topics": []} for test in tests)
+    assert {test.category for test in tests} == {"boundary", "adversarial"}
+    assert len(generate_boundary_tests(icp, max_tests=5)) == 5
+    
+    # The tests feed the Cerbos test suite and agree with in-process evaluation
+    icp["tests"] += [test.model_dump(mode="json") for test in tests]
+    assert "boundary_rule1_amount_above_100" in CerbosGenerator().generate_tests(icp)
+    report = analyze_coverage(icp)
+    assert report.mismatches == []
+    assert report.branch_coverage > analyze_coverage(icp, icp["tests"][:1]).branch_coverage
+
+
+def test_test_suite_minimization(monkeypatch):
+    """Test that the minimal suite keeps coverage, decisions and failing tests."""
+    icp = _coverage_icp([
+        _coverage_test(f"small_{i}", ["agent"], {"amount": 10 + i % 50, "topics": []}, "EFFECT_ALLOW")
+        for i in range(300)
+    ])
+    icp["tests"] += [test.model_dump(mode="json") for test in generate_boundary_tests(icp)]
+    icp["tests"].append(_coverage_test("wrong", ["agent"], {"amount": 5000, "topics": []}, "EFFECT_ALLOW"))
+    
+    suite = minimize_tests(icp)
+    assert suite.total == len(icp["tests"])
+    assert len(suite.tests) < suite.total / 10
+    assert suite.failing == ["wrong"] and suite.tests[-1]["name"] == "wrong"
+    # Of tests with the same signature only the earliest can be kept
+    assert [t["name"] for t in suite.tests if t["name"].startswith("small_")] in ([], ["small_0"])
+    
+    full, minimal = analyze_coverage(icp), analyze_coverage(icp, suite.tests)
+    assert minimal.rules_fired == full.rules_fired
+    assert minimal.branch_outcomes == full.branch_outcomes
+    assert set().union(*(s.items for s in coverage_signatures(icp, suite.tests))) == set().union(
+        *(s.items for s in coverage_signatures(icp))
+    )
+    assert {t["category"] for t in suite.tests} == {t["category"] for t in icp["tests"]}
+    
+    
+    # Each test is evaluated once per action, and duplicates never displace originals
+    traces = []
+    trace = PolicyEvaluator.trace
+    monkeypatch.setattr(PolicyEvaluator, "trace", lambda self, *args: traces.append(1) or trace(self, *args))
+    repeated = minimize_tests(icp, icp["tests"] * 20)
+    assert len(traces) == 20 * sum(len(t["input"]["actions"]) for t in icp["tests"])
+    assert [t["name"] for t in repeated.tests] == [t["name"] for t in suite.tests][:-1] + ["wrong"] * 20
+
+
+class FakeAdapter(LLMAdapter):
+    """Local stand-in for a model: slow, counts calls, can fail."""
+    
+    model = "fake-model"
+    
+    def __init__(self, delay=0.05, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def nl_to_icp(self, nl_requirements):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError("model unavailable")
+        return _fake_icp(nl_requirements)
+
+
+def _fake_icp(description):
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"].update(name="fake", description=description, safety_category="G")
+    return icp
+
+
+def test_llm_cache(tmp_path):
+    """Test cache hits, persistence, normalisation, TTL and LRU eviction."""
+    adapter = FakeAdapter()
+    cache = ICPCache(directory=str(tmp_path), ttl_seconds=60)
+    
+    first = asyncio.run(cache.nl_to_icp(adapter, "Allow payments up to $50."))
+    first["metadata"]["name"] = "mutated"
+    again = asyncio.run(cache.nl_to_icp(adapter, "  allow PAYMENTS\n up to $50. "))
+    assert again["metadata"]["name"] == "fake"
+    assert adapter.calls == 1 and cache.stats["hits"] == 1
+    
+    # Entries survive a restart, but not a model or prompt change
+    restarted = ICPCache(directory=str(tmp_path), ttl_seconds=60)
+    asyncio.run(restarted.nl_to_icp(adapter, "Allow payments up to $50."))
+    assert adapter.calls == 1
+    assert cache.key("x", "fake-model") != cache.key("x", "other-model")
+    assert cache.key("x", "fake-model") != cache.key("x", "fake-model", prompt_version="0")
+    
+    expired = ICPCache(directory=str(tmp_path), ttl_seconds=0)
+    asyncio.run(expired.nl_to_icp(adapter, "Allow payments up to $50."))
+    assert adapter.calls == 2
+    
+    small = ICPCache(directory=str(tmp_path / "small"), memory_entries=1, disk_entries=2)
+    for text in ("a", "b", "c"):
+        asyncio.run(small.nl_to_icp(adapter, text))
+    assert len(list((tmp_path / "small").glob("*.json"))) == 2
+    assert small.get(small.key("a", "fake-model")) is None
+    assert small.get(small.key("c", "fake-model"))["metadata"]["description"] == "c"
+
+
+def test_llm_cache_trusts_only_private_valid_entries(tmp_path):
+    """Test that planted, tampered or exposed disk entries are misses."""
+    adapter = FakeAdapter()
+    directory = tmp_path / "cache"
+    asyncio.run(ICPCache(directory=str(directory)).nl_to_icp(adapter, "Allow payments up to $50."))
+    key = ICPCache(directory=str(directory)).key("Allow payments up to $50.", "fake-model")
+    path = directory / f"{key}.json"
+    assert oct(directory.stat().st_mode & 0o777) == oct(0o700)
+    assert ICPCache(directory=str(directory)).get(key) is not None
+    
+    directory.chmod(0o777)
+    assert ICPCache(directory=str(directory)).get(key) is None
+    directory.chmod(0o700)
+    
+    stored = json.loads(path.read_text())
+    stored["icp"]["policy"]["rules"] = []
+    path.write_text(json.dumps(stored))
+    assert ICPCache(directory=str(directory)).get(key) is None
+    
+    path.unlink()
+    planted = tmp_path / "planted.json"
+    planted.write_text(json.dumps({"created": time.time(), "icp": _fake_icp("planted")}))
+    path.symlink_to(planted)
+    assert ICPCache(directory=str(directory)).get(key) is None
+    
+    if os.getuid() == 0:
+        path.unlink()
+        path.write_text(planted.read_text())
+        os.chown(path, 12345, 12345)
+        assert ICPCache(directory=str(directory)).get(key) is None
+    
+    assert str(os.getuid()) in str(ICPCache().directory)
+
+
+def test_llm_cache_single_flight(tmp_path):
+    """Test that concurrent identical requests share one model call."""
+    adapter = FakeAdapter(delay=0.2)
+    cache = ICPCache(directory=str(tmp_path))
+    
+    async def burst():
+        return await asyncio.gather(*(cache.nl_to_icp(adapter, "Block gambling topics") for _ in range(10)))
+    
+    results = asyncio.run(burst())
+    assert adapter.calls == 1
+    assert cache.stats == {"hits": 0, "misses": 1, "shared": 9}
+    assert all(result == results[0] for result in results)
+    
+    # Failures reach every waiter and are not cached
+    failing = FakeAdapter(delay=0.1, fail=True)
+    
+    async def failing_burst():
+        return await asyncio.gather(
+            *(cache.nl_to_icp(failing, "Deny all") for _ in range(3)), return_exceptions=True
+        )
+    
+    assert all(isinstance(r, ValueError) for r in asyncio.run(failing_burst()))
+    assert failing.calls == 1
+    asyncio.run(failing_burst())
+    assert failing.calls == 2
+    
+    # So are ICPs the model returns that do not validate
+    invalid = FakeAdapter(delay=0)
+    invalid.nl_to_icp = lambda text: {"metadata": {"name": "fake", "description": text}}
+    for _ in range(2):
+        with pytest.raises(ValueError, match="version"):
+            asyncio.run(cache.nl_to_icp(invalid, "Allow everything"))
+    assert cache.get(cache.key("Allow everything", invalid.model)) is None
+    assert cache.stats["misses"] == 5
+
+
+def test_llm_adapter_singleton(monkeypatch, capsys, tmp_path):
+    """Test that the adapter is built once, lazily, and never writes to stdout."""
+    monkeypatch.setattr(llm_adapter.importlib.util, "find_spec", lambda name: object())
+    monkeypatch.setenv("LLM_PROVIDER", "anthropic")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("LLM_STREAMING", "0")
+    reset_llm_adapter()
+    try:
+        adapter = get_llm_adapter()
+        anthropic = adapter.providers[0].adapter
+        assert isinstance(anthropic, AnthropicAdapter) and not anthropic.stream
+        assert anthropic._client is None  # SDK untouched until the first call
+        
+        monkeypatch.delenv("LLM_PROVIDER")
+        assert get_llm_adapter() is adapter
+        assert capsys.readouterr().out == ""
+        
+        icp = _fake_icp("anything")
+        
+        class FakeMessages:
+            calls = 0
+            
+            async def create(self, **kwargs):
+                FakeMessages.calls += 1
+                text = f"```json\n{json.dumps(icp)}\n```"
+                return type("Response", (), {"content": [type("Block", (), {"text": text})()]})()
+        
+        anthropic._client = type("Client", (), {"messages": FakeMessages()})()
+        assert asyncio.run(adapter.nl_to_icp("anything")) == icp
+        assert asyncio.run(ICPCache(directory=str(tmp_path)).nl_to_icp(adapter, "anything else")) is not None
+        assert FakeMessages.calls == 2
+        
+        reset_llm_adapter()
+        assert get_llm_adapter() is None
+        
+        monkeypatch.setenv("LLM_PROVIDER", "anthropic")
+        monkeypatch.delenv("ANTHROPIC_API_KEY")
+        reset_llm_adapter()
+        with pytest.raises(ValueError, match="ANTHROPIC_API_KEY"):
+            get_llm_adapter()
+    finally:
+        reset_llm_adapter()
+
+
+def _streaming_icp():
+    return {
+        "version": "1.0.0",
+        "metadata": {"name": "payments", "description": "Quote \\\" and } inside", "resource": "payment"},
+        "policy": {
+            "resource": "payment", "version": "1.0.0",
+            "rules": [
+                {"actions": ["execute"], "effect": "EFFECT_ALLOW", "conditions": ["request.resource.attr.amount <= 50"]},
+                {"actions": ["*"], "effect": "EFFECT_DENY", "conditions": []},
+            ],
+        },
+        "tests": [{"name": "t", "category": "positive", "input": {}, "expected": "EFFECT_ALLOW"}] * 50,
+    }
+
+
+def test_streaming_json_parser():
+    """Test incremental parsing across arbitrary chunk boundaries."""
+    icp = _streaming_icp()
+    text = "Here is the policy:\n```json\n" + json.dumps(icp, indent=2) + "\n```\nLet me know {if} you need more."
+    for size in (1, 3, 64, len(text)):
+        parser = IncrementalJSONParser()
+        members = []
+        for i in range(0, len(text), size):
+            members.extend(key for key, _ in parser.feed(text[i:i + size]))
+        assert members == ["version", "metadata", "policy", "tests"]
+        assert parser.close() == icp
+    
+    assert parse_json_object("{}") == {}
+    assert parse_json_object(' {"a": [1, {"b": "]"}]} trailing') == {"a": [1, {"b": "]"}]}
+    for bad, message in (
+        ('{"a": [1, 2}', "Unexpected"),
+        ('{"a": 1,, "b": 2}', "Missing object member"),
+        ('{"a": tru, "b": 2}', "Invalid JSON member"),
+        ('{"a": 1', "ended before"),
+        ("no json here", "No JSON object"),
+    ):
+        with pytest.raises(StreamingJSONError, match=message):
+            parse_json_object(bad)
+
+
+def test_streaming_json_early_abort():
+    """Test that structural and validation errors stop reading the stream."""
+    text = json.dumps(_streaming_icp())
+    chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+    
+    def read(stream_chunks, on_member=None):
+        consumed = []
+        
+        def source():
+            for chunk in stream_chunks:
+                consumed.append(chunk)
+                yield chunk
+        
+        with pytest.raises(ValueError) as error:
+            parse_json_object(source(), on_member)
+        return len(consumed), str(error.value)
+    
+    broken = text.replace('"rules": [', '"rules": {', 1)
+    consumed, message = read([broken[i:i + 16] for i in range(0, len(broken), 16)])
+    assert "Unexpected ']'" in message
+    assert consumed < len(chunks) / 2
+    
+    invalid = text.replace('"name": "payments"', '"name": "Payments Policy"', 1)
+    consumed, message = read(
+        [invalid[i:i + 16] for i in range(0, len(invalid), 16)],
+        ICPValidator().validate_section,
+    )
+    assert "snake_case" in message
+    assert consumed < len(chunks) / 4
+
+
+def test_llm_adapter_streaming(monkeypatch):
+    """Test the streaming adapter mode against a fake streaming endpoint."""
+    monkeypatch.setattr(llm_adapter.importlib.util, "find_spec", lambda name: object())
+    icp = _streaming_icp()
+    
+    class FakeStreamingEndpoint:
+        """Serves a canned completion as server-sent text deltas."""
+        
+        def __init__(self, text):
+            self.text = text
+            self.sent = 0
+            self.closed = False
+        
+        def stream(self, **request):
+            endpoint = self
+            
+            class Stream:
+                async def __aenter__(self):
+                    return self
+                
+                async def __aexit__(self, *exc):
+                    endpoint.closed = True
+                
+                @property
+                async def text_stream(self):
+                    for i in range(0, len(endpoint.text), 8):
+                        endpoint.sent += 1
+                        await asyncio.sleep(0)
+                        yield endpoint.text[i:i + 8]
+            
+            return Stream()
+    
+    adapter = AnthropicAdapter("test-key")
+    good = FakeStreamingEndpoint("```json\n" + json.dumps(icp) + "\n```\n" + "trailing " * 500)
+    adapter._client = type("Client", (), {"messages": good})()
+    assert asyncio.run(adapter.nl_to_icp("Allow payments up to $50")) == icp
+    assert good.closed and good.sent * 8 < len(good.text) / 2  # Stopped at the closing brace
+    
+    bad_icp = dict(icp, policy=dict(icp["policy"], rules=icp["policy"]["rules"][:1]))
+    bad = FakeStreamingEndpoint(json.dumps(bad_icp))
+    adapter._client = type("Client", (), {"messages": bad})()
+    with pytest.raises(ValueError, match="default deny"):
+        asyncio.run(adapter.nl_to_icp("Allow payments up to $50"))
+    assert bad.closed and bad.sent * 8 < len(bad.text) - 200  # Tests section never read
+
+
+class FakeBatchAdapter(FakeAdapter):
+    """Fake model that packs requirements and tracks concurrent requests."""
+    
+    batch_size = 3
+    
+    def __init__(self, fail_packed=False):
+        super().__init__(delay=0.02)
+        self.fail_packed = fail_packed
+        self.packed = []
+        self.in_flight = 0
+        self.peak = 0
+    
+    async def nl_to_icp_batch(self, requirements):
+        self.packed.append(list(requirements))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if self.fail_packed:
+            raise ValueError("response truncated")
+        return [
+            ValueError("bad ICP") if "invalid" in text
+            else {"metadata": {"name": "fake"}} if "incomplete" in text
+            else _fake_icp(text)
+            for text in requirements
+        ]
+
+
+def test_llm_batch_conversion(tmp_path):
+    """Test local/cache short-cuts, deduplication, packing and bounded fan-out."""
+    assert pack_requirements(["a", "b", "c", "d"], 3) == [[0, 1, 2], [3]]
+    assert pack_requirements(["a" * 10, "b" * 10, "c"], 3, max_chars=15) == [[0], [1, 2]]
+    
+    cache = ICPCache(directory=str(tmp_path))
+    adapter = FakeBatchAdapter()
+    asyncio.run(cache.nl_to_icp(adapter, "already cached"))
+    requirements = [POLICY_TEMPLATES[0].example, "already cached", "invalid one", "Repeat me", "repeat  ME"]
+    requirements += [f"requirement {i}" for i in range(11)] + ["incomplete"]
+    
+    results = asyncio.run(convert_batch(requirements, adapter, cache=cache, concurrency=2))
+    assert [r.source for r in results[:2]] == ["local", "cache"]
+    assert not results[2].ok and results[2].error == "bad ICP"
+    assert results[3].icp == results[4].icp and results[3].icp is not results[4].icp
+    assert all(r.ok and r.source == "llm" for r in results[5:-1])
+    assert sum(len(p) for p in adapter.packed) == 14  # Duplicate sent once
+    assert all(len(p) <= 3 for p in adapter.packed) and adapter.peak <= 2
+    # ICPs failing validation are reported and never cached
+    assert not results[-1].ok and "version" in results[-1].error
+    assert cache.get(cache.key("incomplete", adapter.model)) is None
+    
+    # Packed results are cached individually
+    again = asyncio.run(convert_batch(requirements[5:-1], adapter, cache=cache))
+    assert all(r.source == "cache" for r in again)
+    
+    # A failed packed request is retried one requirement at a time
+    failing = FakeBatchAdapter(fail_packed=True)
+    results = asyncio.run(convert_batch(["x1", "x2", "x3", "x4"], failing, cache=ICPCache(directory=str(tmp_path / "f"))))
+    assert all(r.ok for r in results) and failing.calls == 4
+    
+    results = asyncio.run(convert_batch([POLICY_TEMPLATES[0].example, "something vague"], None, cache=cache))
+    assert results[0].ok and "no server-side LLM" in results[1].error
+
+
+def test_anthropic_batch_request(monkeypatch):
+    """Test the packed request: cached system prompt and per-requirement results."""
+    monkeypatch.setattr(llm_adapter.importlib.util, "find_spec", lambda name: object())
+    icp = _streaming_icp()
+    bad = dict(icp, metadata=dict(icp["metadata"], name="Not Snake"))
+    requests = []
+    
+    class FakeMessages:
+        async def create(self, **request):
+            requests.append(request)
+            text = json.dumps({"1": icp, "2": bad})
+            return type("Response", (), {"content": [type("Block", (), {"text": text})()]})()
+    
+    adapter = AnthropicAdapter("test-key", stream=False)
+    adapter._client = type("Client", (), {"messages": FakeMessages()})()
+    results = asyncio.run(adapter.nl_to_icp_batch(["first", "second", "third"]))
+    assert results[0] == icp
+    assert isinstance(results[1], ValueError) and "snake_case" in str(results[1])
+    assert isinstance(results[2], ValueError) and "No ICP returned" in str(results[2])
+    
+    system = requests[0]["system"]
+    assert system[0]["text"] == llm_adapter.ICP_SYSTEM_PROMPT
+    assert system[-1]["cache_control"] == {"type": "ephemeral"}
+    assert "Requirement 3:\nthird" in requests[0]["messages"][0]["content"]
+
+
+class TimedAdapter(LLMAdapter):
+    """Async fake provider with scripted latencies."""
+    
+    def __init__(self, model, delays, fail=False):
+        self.model = model
+        self.delays = list(delays)
+        self.fail = fail
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+        self.cancelled = 0
+    
+    async def nl_to_icp(self, nl_requirements):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        if self.fail:
+            raise ValueError(f"{self.model} unavailable")
+        return {"model": self.model}
+
+
+def test_adapter_pool_routing():
+    """Test latency-based routing, failover and per-provider concurrency limits."""
+    assert percentile([], 0.95) == 0.0
+    assert percentile(list(range(1, 101)), 0.95) == 95
+    
+    slow = TimedAdapter("slow", [0.03])
+    fast = TimedAdapter("fast", [0.005])
+    pool = AdapterPool([("slow", slow), ("fast", fast)], max_concurrency=2)
+    
+    async def run(n):
+        return await asyncio.gather(*(pool.nl_to_icp(f"r{i}") for i in range(n)))
+    
+    for _ in range(5):
+        asyncio.run(pool.nl_to_icp("warm up"))  # Unmeasured providers are tried first
+    results = asyncio.run(run(10))
+    assert sum(r["model"] == "fast" for r in results) > sum(r["model"] == "slow" for r in results)
+    assert slow.peak <= 2 and fast.peak <= 2
+    
+    metrics = pool.metrics()
+    assert metrics["fast"]["p50_ms"] < metrics["slow"]["p50_ms"]
+    assert metrics["fast"]["calls"] + metrics["slow"]["calls"] == 15
+    assert pool.model == "slow+fast"
+    
+    broken = AdapterPool([("down", TimedAdapter("down", [0.0], fail=True)), ("up", TimedAdapter("up", [0.0]))])
+    assert asyncio.run(broken.nl_to_icp("x")) == {"model": "up"}
+    assert broken.metrics()["down"]["errors"] == 1
+    
+    dead = AdapterPool([("down", TimedAdapter("down", [0.0], fail=True))])
+    with pytest.raises(ValueError, match="unavailable"):
+        asyncio.run(dead.nl_to_icp("x"))
+
+
+
+def test_adapter_pool_circuit_breaker(monkeypatch):
+    """Test that a failing provider backs off instead of staying ranked first."""
+    clock = [1000.0]
+    monkeypatch.setattr(llm_pool, "_clock", lambda: clock[0])
+    down, up = TimedAdapter("down", [0.0], fail=True), TimedAdapter("up", [0.01])
+    pool = AdapterPool([("down", down), ("up", up)])
+    
+    # Without latency samples the failing provider would always rank first
+    for _ in range(3):
+        assert asyncio.run(pool.nl_to_icp("x")) == {"model": "up"}
+    assert down.calls == 1 and up.calls == 3
+    assert pool.metrics()["down"]["circuit_open"]
+    
+    # After the backoff one request probes it; another error doubles the backoff
+    clock[0] += llm_pool.BREAKER_BASE_BACKOFF
+    assert asyncio.run(pool.nl_to_icp("x")) == {"model": "up"}
+    assert down.calls == 2
+    assert pool.providers[0].open_until == clock[0] + 2 * llm_pool.BREAKER_BASE_BACKOFF
+    
+    # A success closes the circuit
+    clock[0] += 2 * llm_pool.BREAKER_BASE_BACKOFF
+    down.fail = False
+    assert asyncio.run(pool.nl_to_icp("x")) == {"model": "down"}
+    assert not pool.metrics()["down"]["circuit_open"] and pool.providers[0].consecutive_errors == 0
+    
+    # A provider backing off is still the last resort
+    dead = AdapterPool([("down", TimedAdapter("down", [0.0], fail=True))])
+    for _ in range(2):
+        with pytest.raises(ValueError, match="unavailable"):
+            asyncio.run(dead.nl_to_icp("x"))
+    assert dead.metrics()["down"]["errors"] == 2
+
+
+def test_adapter_pool_hedging():
+    """Test that a request past the p95 latency is hedged and the first answer wins."""
+    primary = TimedAdapter("primary", [0.005] * 20 + [1.0])
+    backup = TimedAdapter("backup", [0.02])
+    pool = AdapterPool([("primary", primary), ("backup", backup)], hedge=True)
+    
+    async def scenario():
+        for provider in pool.providers:
+            for _ in range(20):
+                await pool._run(provider, lambda adapter: adapter.nl_to_icp("seed"))
+        return await pool.nl_to_icp("slow one")
+    
+    assert asyncio.run(scenario()) == {"model": "backup"}
+    assert pool.metrics()["primary"]["hedges"] == 1
+    # The answer did not wait for the slow request, which was cancelled
+    assert primary.cancelled == 1 and primary.in_flight == 0
+
+
+def test_provider_registry(monkeypatch):
+    """Test provider selection from the environment, including custom providers."""
+    monkeypatch.setattr(llm_adapter.importlib.util, "find_spec", lambda name: object())
+    register_provider("fake", lambda: TimedAdapter("fake-local", [0.0]))
+    monkeypatch.setenv("LLM_PROVIDER", "openai, fake")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://127.0.0.1:8000/v1")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "8")
+    monkeypatch.setenv("LLM_HEDGE", "1")
+    reset_llm_adapter()
+    try:
+        pool = get_llm_adapter()
+        assert [p.name for p in pool.providers] == ["openai", "fake"]
+        assert pool.hedge and pool.providers[0].max_concurrency == 8
+        local = pool.providers[0].adapter
+        assert isinstance(local, OpenAIAdapter) and local.base_url == "http://127.0.0.1:8000/v1"
+        
+        requests = []
+        
+        class FakeCompletions:
+            async def create(self, **request):
+                requests.append(request)
+                message = type("Message", (), {"content": json.dumps({"version": "1.0.0"})})()
+                return type("Response", (), {"choices": [type("Choice", (), {"message": message})()]})()
+        
+        local.stream = False
+        local._client = type("Client", (), {"chat": type("Chat", (), {"completions": FakeCompletions()})()})()
+        assert asyncio.run(local.nl_to_icp("Allow reads")) == {"version": "1.0.0"}
+        assert requests[0]["messages"][0]["role"] == "system"
+        
+        monkeypatch.setenv("LLM_PROVIDER", "nope")
+        reset_llm_adapter()
+        with pytest.raises(ValueError, match="Unsupported LLM_PROVIDER: nope"):
+            get_llm_adapter()
+    finally:
+        llm_adapter.PROVIDERS.pop("fake", None)
+        reset_llm_adapter()
+
+
+def test_scheduler_offloads_blocking_work():
+    """Test that CPU and blocking stages leave the event loop free, within per-tool limits."""
+    scheduler = Scheduler(cpu_workers=1, io_workers=4, limits={"slow_tool": 2})
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    
+    async def scenario():
+        running = peak = 0
+        
+        async def slow_call():
+            nonlocal running, peak
+            async with scheduler.limit("slow_tool"):
+                running += 1
+                peak = max(peak, running)
+                await scheduler.run_io(time.sleep, 0.1)  # e.g. a Cerbos subprocess
+                running -= 1
+        
+        async def heartbeat():
+            # Ticks only see blocking calls in progress if they run off the event loop
+            busy_ticks = 0
+            for _ in range(20):
+                await asyncio.sleep(0.01)
+                busy_ticks += running > 0
+            return busy_ticks
+        
+        pid = await scheduler.run_cpu(os.getpid)
+        artifacts = scheduler.run_cpu(build_policy_artifacts, icp, True, "fast")
+        *_, busy_ticks, (metadata, policy_yaml, _, notes) = await asyncio.gather(
+            *(slow_call() for _ in range(4)), heartbeat(), artifacts
+        )
+        return pid, peak, busy_ticks, metadata, policy_yaml, notes
+    
+    try:
+        pid, peak, busy_ticks, metadata, policy_yaml, notes = asyncio.run(scenario())
+        assert pid != os.getpid()
+        assert peak == 2
+        assert busy_ticks > 0
+        assert scheduler.stats["cpu"] == 2 and scheduler.stats["io"] == 4
+        assert metadata["name"] and "resourcePolicy" in policy_yaml and len(notes) == 2
+        
+        # Worker errors come back as ValueError with their message
+        with pytest.raises(ValueError, match="validation error"):
+            asyncio.run(scheduler.run_cpu(build_policy_artifacts, {"version": "1.0.0"}))
+    finally:
+        scheduler.shutdown()
+    
+    inline = Scheduler(cpu_workers=0)
+    try:
+        assert asyncio.run(inline.run_cpu(os.getpid)) == os.getpid()
+        assert inline.stats["cpu"] == 0 and inline.stats["io"] == 1
+    finally:
+        inline.shutdown()
+
+
+def test_cerbos_cli_shared_between_threads(monkeypatch, tmp_path):
+    """Test that concurrent calls on one CerbosCLI use isolated directories and a cached probe."""
+    probes = []
+    seen = {}  # Call directory -> (files, policy) it contained
+    
+    def fake_run(command, **kwargs):
+        if command[1] == "--version":
+            probes.append(command)
+            return subprocess.CompletedProcess(command, 0, "cerbos 0.34.0", "")
+        call_dir = command[2]
+        seen[call_dir] = (sorted(os.listdir(call_dir)), open(os.path.join(call_dir, "policy.yaml")).read())
+        time.sleep(0.01)  # Let the calls overlap
+        return subprocess.CompletedProcess(command, 0, "1 tests executed [1 OK]", "")
+    
+    monkeypatch.setattr(cerbos_cli.subprocess, "run", fake_run)
+    cli = CerbosCLI(str(tmp_path))
+    
+    assert cli.check_installation() and cli.check_installation()
+    assert len(probes) == 1
+    
+    results = {}
+    threads = [
+        threading.Thread(target=lambda n=n: results.__setitem__(n, cli.compile(f"policy-{n}")))
+        for n in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert all(result.success for result in results.values()) and len(results) == 8
+    assert sorted(policy for _, policy in seen.values()) == [f"policy-{n}" for n in range(8)]
+    assert all(files == ["policy.yaml"] for files, _ in seen.values())
+    
+    # Test files are named after the resource, without path components
+    result = cli.test("resourcePolicy:\n  resource: ../../evil\n", "suite")
+    assert result.passed == 1
+    assert ["evil_test.yaml", "policy.yaml"] in [files for files, _ in seen.values()]
+    assert not any(os.path.exists(call_dir) for call_dir in seen)
+    
+    scratch = cli._scratch
+    assert scratch is not None and scratch.exists()
+    cli.close()
+    assert not scratch.exists()
+
+
+def test_service_container():
+    """Test that tools share one warm service container until it is closed."""
+    close_services()
+    services = get_services()
+    try:
+        assert get_services() is services
+        assert services.pipeline.cerbos_cli is services.cerbos_cli
+        assert services.pipeline.validator is services.validator
+        assert services.templates is template_library
+        
+        icp_data = services.templates.instantiate("payment_execution")
+        icp_data["metadata"]["safety_category"] = "G"
+        icp = services.pipeline.validate_icp(icp_data)
+        policy_yaml, test_yaml = services.pipeline.generate_policy_artifacts(icp.model_dump())
+        assert "resourcePolicy" in policy_yaml and test_yaml
+    finally:
+        close_services()
+    assert get_services() is not services
+    close_services()
+    
+    own = ServiceContainer(templates=TemplateLibrary())
+    assert own.templates is not template_library
+    own.close()
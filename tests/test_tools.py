@@ -1,11 +1,32 @@
 """Test MCP tools."""
 
+import io
+import json
+import os
+import re
+import threading
+import time
+
 import pytest
 from glasstape_policy_builder.tools.generate_policy import generate_policy_tool
 from glasstape_policy_builder.tools.list_templates import list_templates_tool
 from glasstape_policy_builder.tools.validate_policy import validate_policy_tool
 from glasstape_policy_builder.tools.suggest_improvements import suggest_improvements_tool
+from glasstape_policy_builder.tools.instantiate_template import instantiate_template_tool
+from glasstape_policy_builder.tools.search_templates import search_templates_tool
+from glasstape_policy_builder.tools.analyze_repository import analyze_repository_tool
+from glasstape_policy_builder.tools.policy_coverage import policy_coverage_tool
+from glasstape_policy_builder.tools.generate_policies_batch import generate_policies_batch_tool
+from glasstape_policy_builder.tools.llm_metrics import llm_metrics_tool
+from glasstape_policy_builder.llm_adapter import reset_llm_adapter
+from glasstape_policy_builder.topic_taxonomy import taxonomy
+from glasstape_policy_builder.templates import template_library
+from glasstape_policy_builder.http_server import create_app
+from glasstape_policy_builder.server import cli_main
+from glasstape_policy_builder import daemon
+
 
+LOCAL_URL = "http://localhost:8000"
 
 @pytest.mark.asyncio
 async def test_generate_policy():
@@ -137,4 +158,501 @@ async def test_error_handling():
     
     # Test missing policy_yaml for suggestions
     result = await suggest_improvements_tool({})
-    assert "Error: 'policy_yaml' parameter required" in result
\ No newline at end of file
+    assert "Error: 'policy_yaml' parameter required" in result
+
+
+@pytest.mark.asyncio
+async def test_guidance_renderings_cached(monkeypatch):
+    """Guidance-only calls render taxonomy guidance and template listings once."""
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    
+    renders = {"guidance": 0, "templates": 0}
+    render_guidance = taxonomy._render_guidance
+    render_templates = template_library._render_templates
+    
+    def counting_guidance(snapshot):
+        renders["guidance"] += 1
+        return render_guidance(snapshot)
+    
+    def counting_templates(templates):
+        renders["templates"] += 1
+        return render_templates(templates)
+    
+    monkeypatch.setattr(taxonomy, "_render_guidance", counting_guidance)
+    monkeypatch.setattr(template_library, "_render_templates", counting_templates)
+    taxonomy.snapshot().renderings.pop("guidance", None)
+    template_library._render_cache.clear()
+    
+    responses = set()
+    for _ in range(20):
+        responses.add(await generate_policy_tool({"nl_requirements": "Summarize quarterly reports for finance"}))
+        responses.add(await list_templates_tool({}))
+    
+    assert len(responses) == 2
+    assert renders == {"guidance": 1, "templates": 1}
+
+
+@pytest.mark.asyncio
+async def test_generate_policy_compiles_locally(monkeypatch):
+    """Common guardrail phrasing is compiled without an LLM."""
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    result = await generate_policy_tool({
+        "nl_requirements": "Allow AI agents to execute payments up to $50. Block sanctioned entities."
+    })
+    assert "Compiled locally" in result
+    assert "request.resource.attr.amount > 0" in result
+    assert "sanctioned_entities" in result
+
+
+
+@pytest.mark.asyncio
+async def test_instantiate_template():
+    """Test building a policy straight from template parameters."""
+    result = await instantiate_template_tool({
+        "template_id": "payment_execution",
+        "params": {"amount_limit": 100, "roles": ["agent"]}
+    })
+    assert "Policy Generated: payment_policy" in result
+    assert "amount: 101" in result
+    assert "payment_over_limit" in result
+    
+    result = await instantiate_template_tool({"template_id": "payment_execution", "params": {"amount_limit": "lots"}})
+    assert "must be a number" in result
+    
+    result = await instantiate_template_tool({"template_id": "payment_execution", "params": {"topics": ["bogus"]}})
+    assert "invalid topics" in result
+
+
+@pytest.mark.asyncio
+async def test_search_templates():
+    """Test search_templates tool."""
+    result = await search_templates_tool({"query": "admin mfa"})
+    assert result.startswith("# Template Search")
+    assert "1. **Admin Access Policy**" in result
+    
+    result = await search_templates_tool({"query": "nothing-matches-this"})
+    assert "No templates match" in result
+    
+    result = await search_templates_tool({})
+    assert "Error: 'query' parameter required" in result
+
+
+@pytest.mark.asyncio
+async def test_analyze_repository_tool(tmp_path, monkeypatch):
+    """Test analyze_repository tool."""
+    reports = tmp_path / "reports"
+    monkeypatch.setenv("GLASSTAPE_REPORT_DIR", str(reports))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "doc.yaml").write_text(
+        "resourcePolicy:\n  resource: doc\n  rules:\n"
+        "    - actions: ['*']\n      effect: EFFECT_ALLOW\n      roles: ['*']\n"
+    )
+    result = await analyze_repository_tool({"path": str(repo), "output_path": "out/report.jsonl"})
+    assert "Repository Security Analysis" in result
+    assert "1 analyzed" in result
+    assert "`doc`: Default Deny (1)" in result
+    assert (reports / "out" / "report.jsonl").exists()
+    
+    # Re-running may replace its own report
+    result = await analyze_repository_tool({"path": str(repo), "output_path": str(reports / "out" / "report.jsonl")})
+    assert "1 analyzed" in result
+    
+    # Reports stay inside the report directory and never replace other files
+    (reports / "notes.jsonl").write_text("keep me\n")
+    (reports / "escape.jsonl").symlink_to(tmp_path / "escaped.jsonl")
+    for output_path in (str(tmp_path / "report.jsonl"), "../report.jsonl", "notes.jsonl", "report.txt", "escape.jsonl"):
+        result = await analyze_repository_tool({"path": str(repo), "output_path": output_path})
+        assert result.startswith("Error:"), output_path
+    assert (reports / "notes.jsonl").read_text() == "keep me\n"
+    assert not (tmp_path / "report.jsonl").exists() and not (tmp_path / "escaped.jsonl").exists()
+    
+    # A report directory other users can write is not used
+    reports.chmod(0o777)
+    result = await analyze_repository_tool({"path": str(repo)})
+    assert result.startswith("Error:") and "report directory" in result
+    reports.chmod(0o700)
+    
+    result = await analyze_repository_tool({"path": str(tmp_path / "missing")})
+    assert "Error analyzing repository" in result
+    
+    result = await analyze_repository_tool({})
+    assert "Error: 'path' parameter required" in result
+
+
+@pytest.mark.asyncio
+async def test_policy_coverage_tool():
+    """Test the coverage report for an ICP's own tests."""
+    icp = template_library.instantiate("payment_execution")
+    
+    result = await policy_coverage_tool({"icp": icp})
+    assert "Policy Test Coverage" in result
+    assert "Rule Coverage" in result and "Branch Coverage" in result
+    
+    assert "Error" in await policy_coverage_tool({})
+    assert "Invalid ICP" in await policy_coverage_tool({"icp": {"policy": {}}})
+
+
+@pytest.mark.asyncio
+async def test_generate_policy_boundary_tests():
+    """Test that generated boundary tests are added to the test suite on request."""
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    
+    result = await generate_policy_tool({"icp": icp, "boundary_tests": True})
+    assert "generated boundary/adversarial tests" in result
+    assert "boundary_rule1_amount_above_50" in result
+    
+    result = await generate_policy_tool({"icp": icp})
+    assert "boundary_rule1" not in result
+
+
+@pytest.mark.asyncio
+async def test_generate_policy_fast_test_mode(monkeypatch):
+    """Test that fast mode keeps a covering subset of the tests, only when asked."""
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    icp["tests"] = icp["tests"] * 3
+    
+    # The environment no longer switches the default; every test is returned
+    monkeypatch.setenv("GLASSTAPE_TEST_MODE", "fast")
+    result = await generate_policy_tool({"icp": icp})
+    assert "Fast test mode" not in result
+    assert result.count("- name: ") == len(icp["tests"])
+    
+    result = await generate_policy_tool({"icp": icp, "boundary_tests": True, "test_mode": "fast"})
+    kept, total = map(int, re.search(r"running (\d+) of (\d+) tests", result).groups())
+    assert total == len(icp["tests"]) + 36 and kept < total / 3
+    assert result.count("- name: ") == kept
+    
+    assert "Error" in await generate_policy_tool({"icp": icp, "test_mode": "quick"})
+
+
+@pytest.mark.asyncio
+async def test_generate_policies_batch(monkeypatch):
+    """Test batch conversion without a server-side LLM."""
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    reset_llm_adapter()
+    result = await generate_policies_batch_tool({"requirements": [
+        "Allow AI agents to execute payments up to $50. Block sanctioned entities.",
+        "Make everything more secure somehow",
+    ]})
+    assert "2 requirements → 1 ICPs, 1 errors" in result
+    assert "⚡ compiled locally" in result
+    assert "no server-side LLM is configured" in result
+    assert '"resource": "payment"' in result
+    
+    assert "Error" in await generate_policies_batch_tool({"requirements": []})
+    assert "Error" in await generate_policies_batch_tool({"requirements": ["ok"], "concurrency": 0})
+    assert "Error" in await generate_policies_batch_tool({"requirements": ["x"] * 201})
+
+
+@pytest.mark.asyncio
+async def test_llm_metrics(monkeypatch):
+    """Test the metrics report in client-LLM mode."""
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    reset_llm_adapter()
+    assert "Client-LLM mode" in await llm_metrics_tool({})
+
+
+def test_http_transport():
+    """Test that tools are served statelessly over streamable HTTP."""
+    from starlette.testclient import TestClient
+    
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    call = {
+        "jsonrpc": "2.0",
+        "id": 7,
+        "method": "tools/call",
+        "params": {"name": "generate_policy", "arguments": {"icp": icp}},
+    }
+    headers = {"Accept": "application/json, text/event-stream"}
+    
+    with TestClient(create_app(json_response=True), base_url=LOCAL_URL) as client:
+        assert client.get("/healthz").json()["status"] == "ok"
+        
+        # No initialize handshake or session: any worker can answer any request
+        response = client.post("/mcp", json=call, headers=headers)
+        assert response.status_code == 200
+        assert "mcp-session-id" not in response.headers
+        result = response.json()
+        assert result["id"] == 7
+        assert "resourcePolicy" in result["result"]["content"][0]["text"]
+    
+    with TestClient(create_app(json_response=False), base_url=LOCAL_URL) as client:
+        response = client.post("/mcp", json=call, headers=headers)
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "resourcePolicy" in response.text
+
+
+def test_http_transport_security(monkeypatch):
+    """Test that the HTTP transport checks Host/Origin, requires its token and hides filesystem tools."""
+    from starlette.testclient import TestClient
+    from glasstape_policy_builder import http_server
+    
+    headers = {"Accept": "application/json, text/event-stream"}
+    list_tools = {"jsonrpc": "2.0", "id": 1, "method": "tools/list"}
+    analyze = {"jsonrpc": "2.0", "id": 2, "method": "tools/call",
+               "params": {"name": "analyze_repository", "arguments": {"repo_path": "/"}}}
+    
+    with TestClient(create_app(json_response=True), base_url=LOCAL_URL) as client:
+        names = [tool["name"] for tool in client.post("/mcp", json=list_tools, headers=headers).json()["result"]["tools"]]
+        assert "generate_policy" in names and "analyze_repository" not in names
+        result = client.post("/mcp", json=analyze, headers=headers).json()["result"]
+        assert "not available" in result["content"][0]["text"]
+        
+        # DNS rebinding: a foreign Host or Origin is refused
+        assert client.post("/mcp", json=list_tools, headers={**headers, "Host": "attacker.example"}).status_code == 421
+        assert client.post("/mcp", json=list_tools, headers={**headers, "Origin": "http://attacker.example"}).status_code == 403
+        assert client.post("/mcp", json=list_tools, headers={**headers, "Origin": "http://localhost:3000"}).status_code == 200
+    
+    app = create_app(json_response=True, allowed_hosts=["policies.internal"], token="s3cret")
+    with TestClient(app, base_url="http://policies.internal") as client:
+        assert client.get("/healthz").status_code == 200
+        assert client.post("/mcp", json=list_tools, headers=headers).status_code == 401
+        wrong = {**headers, "Authorization": "Bearer guess"}
+        assert client.post("/mcp", json=list_tools, headers=wrong).status_code == 401
+        authorized = {**headers, "Authorization": "Bearer s3cret"}
+        assert client.post("/mcp", json=list_tools, headers=authorized).status_code == 200
+    
+    # Non-loopback binds need a token, and wildcard binds need the names clients use
+    monkeypatch.setattr("uvicorn.run", lambda *args, **kwargs: None)
+    monkeypatch.delenv(http_server.TOKEN_ENV, raising=False)
+    for name in (http_server.JSON_RESPONSE_ENV, http_server.ALLOWED_HOSTS_ENV, http_server.ALLOWED_ORIGINS_ENV):
+        monkeypatch.setenv(name, "")  # Restored after the test; run_http sets them for its workers
+    with pytest.raises(ValueError, match=http_server.TOKEN_ENV):
+        http_server.run_http("0.0.0.0")
+    monkeypatch.setenv(http_server.TOKEN_ENV, "s3cret")
+    with pytest.raises(ValueError, match="--allowed-host"):
+        http_server.run_http("0.0.0.0")
+    http_server.run_http("10.0.0.5")
+    assert os.environ[http_server.ALLOWED_HOSTS_ENV] == "10.0.0.5"
+    monkeypatch.setenv(http_server.ALLOWED_HOSTS_ENV, "")
+    http_server.run_http("0.0.0.0", allowed_hosts=["policies.internal"])
+    assert os.environ[http_server.ALLOWED_HOSTS_ENV] == "policies.internal"
+
+
+def test_generate_policy_progress():
+    """Test that generate_policy streams stage progress and partial YAML before its result."""
+    from starlette.testclient import TestClient
+    
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    call = {
+        "jsonrpc": "2.0",
+        "id": 3,
+        "method": "tools/call",
+        "params": {"name": "generate_policy", "arguments": {"icp": icp}, "_meta": {"progressToken": "gen-1"}},
+    }
+    headers = {"Accept": "application/json, text/event-stream"}
+    
+    with TestClient(create_app(json_response=False), base_url=LOCAL_URL) as client:
+        response = client.post("/mcp", json=call, headers=headers)
+        events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+        
+        progress = [e["params"] for e in events if e.get("method") == "notifications/progress"]
+        assert [p["progress"] for p in progress] == [1, 2, 3]
+        assert all(p["progressToken"] == "gen-1" and p["total"] == 3 for p in progress)
+        assert progress[0]["message"].startswith("Policy and tests generated")
+        assert progress[1]["message"].startswith("Compile")
+        
+        partials = [e["params"]["data"] for e in events if e.get("method") == "notifications/message"]
+        assert [p["stage"] for p in partials] == [progress[0]["message"]]
+        assert "resourcePolicy" in partials[0]["content"]["policy_yaml"]
+        assert "tests:" in partials[0]["content"]["test_yaml"]
+        
+        # Partial content arrives before the final result
+        assert events[-1]["id"] == 3 and "resourcePolicy" in events[-1]["result"]["content"][0]["text"]
+        
+        # Without a progress token nothing extra is sent
+        del call["params"]["_meta"]
+        response = client.post("/mcp", json=call, headers=headers)
+        assert response.text.count("data: ") == 1
+
+
+@pytest.mark.asyncio
+async def test_structured_json_responses():
+    """Test that response_format json returns separate fields instead of markdown."""
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    
+    result = await generate_policy_tool({"icp": icp, "response_format": "json"})
+    assert result["status"] == "ok" and result["source"] == "icp"
+    assert result["metadata"]["name"] == "payment_policy"
+    assert result["policy_yaml"].startswith("apiVersion") and "resourcePolicy" in result["policy_yaml"]
+    assert "resourcePolicy" not in result["test_yaml"] and "tests:" in result["test_yaml"]
+    assert set(result) >= {"validation", "tests", "conflicts", "notes"}
+    assert "#" not in json.dumps(result["metadata"])
+    
+    guidance = await generate_policy_tool({"nl_requirements": "Keep medical records private", "response_format": "json"})
+    assert guidance["status"] == "needs_icp"
+    assert set(guidance["detected"]) == {"topics", "blocked_topics", "safety_category"}
+    
+    assert (await generate_policy_tool({"response_format": "json"}))["status"] == "error"
+    error = await generate_policy_tool({"icp": {"version": "1.0.0"}, "response_format": "json"})
+    assert error["status"] == "error" and "validation error" in error["error"]
+    
+    templated = await instantiate_template_tool({
+        "template_id": "payment_execution", "params": {"amount_limit": 100}, "response_format": "json",
+    })
+    assert templated["icp"]["metadata"]["name"] == "payment_policy" and "amount: 101" in templated["test_yaml"]
+    
+    analysis = await suggest_improvements_tool({"policy_yaml": result["policy_yaml"], "icp": icp, "response_format": "json"})
+    assert sum(analysis["summary"].values()) == len(analysis["findings"]) > 0
+    assert {"check", "status", "message"} <= set(analysis["findings"][0])
+    
+    # Markdown stays the default
+    assert isinstance(await generate_policy_tool({"icp": icp}), str)
+
+
+def test_structured_json_over_mcp():
+    """Test that JSON results are sent as structuredContent with one compact text copy."""
+    from starlette.testclient import TestClient
+    
+    icp = template_library.instantiate("payment_execution")
+    icp["metadata"]["safety_category"] = "G"
+    headers = {"Accept": "application/json, text/event-stream"}
+    
+    def call(arguments):
+        return client.post("/mcp", headers=headers, json={
+            "jsonrpc": "2.0", "id": 1, "method": "tools/call",
+            "params": {"name": "generate_policy", "arguments": arguments},
+        }).json()["result"]
+    
+    with TestClient(create_app(json_response=True), base_url=LOCAL_URL) as client:
+        result = call({"icp": icp, "response_format": "json"})
+        assert not result["isError"]
+        assert "resourcePolicy" in result["structuredContent"]["policy_yaml"]
+        assert json.loads(result["content"][0]["text"]) == result["structuredContent"]
+        assert "\n  " not in result["content"][0]["text"]
+        
+        assert call({"response_format": "json"})["isError"]
+        assert "structuredContent" not in call({"icp": icp})
+        assert "Input validation error" in call({"icp": icp, "response_format": "xml"})["content"][0]["text"]
+
+
+@pytest.mark.asyncio
+async def test_structured_json_through_server_dispatch():
+    """Test that the low-level server passes returned CallToolResults through unchanged."""
+    from mcp import types
+    from mcp.server import Server
+    from glasstape_policy_builder.tools import register_tools
+    
+    server = Server("test")
+    await register_tools(server)
+    handler = server.request_handlers[types.CallToolRequest]
+    
+    async def call(arguments):
+        request = types.CallToolRequest(
+            method="tools/call",
+            params=types.CallToolRequestParams(name="instantiate_template", arguments=arguments),
+        )
+        return (await handler(request)).root
+    
+    result = await call({"template_id": "payment_execution", "response_format": "json"})
+    assert not result.isError
+    assert "resourcePolicy" in result.structuredContent["policy_yaml"]
+    assert json.loads(result.content[0].text) == result.structuredContent
+    
+    result = await call({"template_id": "missing", "response_format": "json"})
+    assert result.isError and result.structuredContent["status"] == "error"
+
+
+def test_cli_transport_selection(monkeypatch):
+    """Test that the CLI starts the selected transport."""
+    from glasstape_policy_builder import server
+    
+    started = []
+    monkeypatch.setattr(server, "run_http", lambda *args: started.append(("http", args)))
+    monkeypatch.setattr(server.asyncio, "run", lambda coroutine: (coroutine.close(), started.append(("stdio",))))
+    
+    cli_main([])
+    cli_main(["--transport", "http", "--port", "9000", "--workers", "4", "--json-response"])
+    assert started == [("stdio",), ("http", ("127.0.0.1", 9000, 4, True, None, None))]
+
+
+def test_daemon_socket_per_configuration(monkeypatch, tmp_path):
+    """Test that sessions with different LLM settings get different default daemons."""
+    monkeypatch.delenv(daemon.SOCKET_ENV, raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_PROVIDER", "anthropic")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key-a")
+    socket_a = daemon.default_socket_path()
+    
+    monkeypatch.setenv("PATH", os.environ.get("PATH", "") + os.pathsep + str(tmp_path))
+    assert daemon.default_socket_path() == socket_a
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "key-b")
+    socket_b = daemon.default_socket_path()
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    socket_c = daemon.default_socket_path()
+    
+    assert len({socket_a, socket_b, socket_c}) == 3
+    assert all(path.parent == tmp_path for path in (socket_a, socket_b, socket_c))
+    
+    # An explicit socket is used as given
+    monkeypatch.setenv(daemon.SOCKET_ENV, str(tmp_path / "team.sock"))
+    assert daemon.default_socket_path() == tmp_path / "team.sock"
+
+
+def test_daemon_shared_by_proxies(monkeypatch, tmp_path):
+    """Test that stdio proxies autostart one shared daemon that exits when idle."""
+    socket_path = tmp_path / "daemon.sock"
+    monkeypatch.setenv("GLASSTAPE_DAEMON_IDLE_TIMEOUT", "2")
+    spawned = []
+    spawn = daemon._spawn_daemon
+    monkeypatch.setattr(daemon, "_spawn_daemon", lambda path: (spawned.append(path), spawn(path)))
+    
+    messages = [
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "test", "version": "1"},
+        }},
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/call", "params": {"name": "list_templates", "arguments": {}}},
+        {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {
+            "name": "analyze_repository", "arguments": {"path": "missing-dir"},
+        }},
+    ]
+    
+    def session():
+        """One IDE session: keep stdin open until the tool result arrives, like a real client."""
+        read_fd, write_fd = os.pipe()
+        stdout = io.BytesIO()
+        proxy = threading.Thread(target=daemon.run_proxy, args=(socket_path, os.fdopen(read_fd, "rb"), stdout))
+        proxy.start()
+        with os.fdopen(write_fd, "wb") as stdin:
+            stdin.write(b"".join(json.dumps(message).encode() + b"\n" for message in messages))
+            stdin.flush()
+            deadline = time.monotonic() + 30
+            while b'"id":3' not in stdout.getvalue() and time.monotonic() < deadline:
+                time.sleep(0.02)
+        proxy.join(timeout=10)
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+    
+    start_dir = os.getcwd()
+    first = session()
+    (tmp_path / "other").mkdir()
+    # Later sessions run elsewhere; their relative paths must not resolve against the daemon's cwd
+    monkeypatch.chdir(tmp_path / "other")
+    results = []
+    others = [threading.Thread(target=lambda: results.append(session())) for _ in range(3)]
+    for thread in others:
+        thread.start()
+    for thread in others:
+        thread.join()
+    
+    assert len(spawned) == 1
+    for replies in [first, *results]:
+        assert [reply["id"] for reply in replies] == [1, 2, 3]
+        assert "Policy Templates" in replies[1]["result"]["content"][0]["text"]
+    assert os.path.join(start_dir, "missing-dir") in first[2]["result"]["content"][0]["text"]
+    for replies in results:
+        assert str(tmp_path / "other" / "missing-dir") in replies[2]["result"]["content"][0]["text"]
+    
+    # The daemon removes its socket once no session has been connected for a while
+    deadline = time.monotonic() + 30
+    while socket_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.2)
+    assert not socket_path.exists()
+    with pytest.raises(ConnectionError):
+        daemon.connect(socket_path, autostart=False)
@@ -1,9 +1,16 @@
 """Test topic-aware features."""
 
+import os
+
 import pytest
+import yaml
+from glasstape_policy_builder import topic_taxonomy
 from glasstape_policy_builder.topic_taxonomy import taxonomy, TopicTaxonomy, SafetyCategory
 from glasstape_policy_builder.icp_validator import ICPValidator
 from glasstape_policy_builder.cerbos_generator import CerbosGenerator
+from glasstape_policy_builder.keyword_matcher import KeywordMatcher
+from glasstape_policy_builder.topic_extractor import topic_extractor
+from glasstape_policy_builder.tools.generate_policy import generate_policy_tool
 
 
 def test_topic_taxonomy():
@@ -250,5 +257,143 @@ def test_topic_taxonomy_guidance():
     assert "Safety Categories:" in guidance
 
 
+
+def _write_taxonomy(path, topics):
+    path.write_text(yaml.safe_dump({
+        "categories": {
+            "retail": {
+                "description": "Retail operations",
+                "safety_level": "PG",
+                "topics": topics,
+            }
+        }
+    }))
+
+
+def test_external_taxonomy_snapshot(tmp_path, monkeypatch):
+    """Test loading a taxonomy file and reusing its compiled snapshot."""
+    source = tmp_path / "taxonomy.yaml"
+    _write_taxonomy(source, ["checkout", "returns"])
+    
+    external = TopicTaxonomy(source=str(source), cache_dir=str(tmp_path))
+    assert external.get_all_topics() == ["checkout", "returns"]
+    assert external.get_topic_category("checkout") == "retail"
+    assert external.get_safety_level(["returns"]) == SafetyCategory.PG
+    
+    snapshots = list((tmp_path / "glasstape-policies" / "taxonomy").glob("*.snap"))
+    assert len(snapshots) == 1
+    
+    # A second instance loads the memory-mapped snapshot instead of re-parsing
+    def fail_parse(source):
+        raise AssertionError("taxonomy source should not be re-parsed")
+    
+    monkeypatch.setattr(topic_taxonomy, "load_taxonomy_source", fail_parse)
+    restarted = TopicTaxonomy(source=str(source), cache_dir=str(tmp_path))
+    assert restarted.get_all_topics() == ["checkout", "returns"]
+    assert restarted.version == external.version
+
+
+def test_taxonomy_snapshot_requires_private_dir(tmp_path):
+    """Test that snapshots in directories other users can write are ignored."""
+    source = tmp_path / "taxonomy.yaml"
+    _write_taxonomy(source, ["checkout"])
+    TopicTaxonomy(source=str(source), cache_dir=str(tmp_path)).get_all_topics()
+    
+    snapshot_dir = tmp_path / "glasstape-policies" / "taxonomy"
+    snapshot_path = next(snapshot_dir.glob("*.snap"))
+    assert oct(snapshot_dir.stat().st_mode & 0o777) == oct(0o700)
+    snapshot = topic_taxonomy.read_snapshot(snapshot_path)
+    assert snapshot is not None
+    
+    snapshot_dir.chmod(0o777)
+    assert topic_taxonomy.read_snapshot(snapshot_path) is None
+    with pytest.raises(PermissionError):
+        topic_taxonomy.write_snapshot(snapshot_path, snapshot)
+    
+    assert str(os.getuid()) in str(TopicTaxonomy().cache_dir)
+
+
+def test_external_taxonomy_hot_reload(tmp_path):
+    """Test that file changes are picked up without disturbing in-flight readers."""
+    source = tmp_path / "taxonomy.json"
+    source.write_text('{"categories": {"retail": {"topics": ["checkout"]}}}')
+    
+    external = TopicTaxonomy(source=str(source), cache_dir=str(tmp_path), reload_interval=0)
+    in_flight = external.snapshot()
+    
+    source.write_text('{"categories": {"retail": {"topics": ["checkout", "returns"]}}}')
+    assert "returns" in external.get_all_topics()
+    assert external.version != in_flight.version
+    assert in_flight.all_topics == ("checkout",)
+    
+    # A broken edit keeps the last good version
+    source.write_text('{"categories": "oops"}')
+    assert "returns" in external.get_all_topics()
+
+
+def test_builtin_taxonomy_is_lazy():
+    """Test that the built-in taxonomy compiles on first use."""
+    fresh = TopicTaxonomy(source=None)
+    assert fresh._snapshot is None
+    assert fresh.version == "builtin"
+    assert "payment" in fresh.get_all_topics()
+
+
+
+def test_keyword_matcher():
+    """Test single-pass multi-pattern matching."""
+    matcher = KeywordMatcher({"he": 1, "she": 2, "hers": 3, "api": 4}, whole_words=False)
+    found = [(m.pattern, m.value) for m in matcher.find("USHERS")]
+    assert found == [("she", 2), ("he", 1), ("hers", 3)]
+    
+    words = KeywordMatcher(["api", "credit card"])
+    assert [m.pattern for m in words.find("rapid api calls")] == ["api"]
+    assert words.find("Credit Card numbers")[0].start == 0
+
+
+def test_topic_extractor():
+    """Test local topic extraction from natural language."""
+    result = topic_extractor.extract("Allow payments up to $50. Never share medical records or adult content.")
+    assert result.topics == ["payment"]
+    assert result.blocked_topics == ["medical_record", "adult"]
+    assert result.safety_category == "PG"
+    
+    # Explicit declarations from template examples are authoritative
+    result = topic_extractor.extract("Topics: pii, personal_data. Block topics: phi, medical_record.")
+    assert result.topics == ["pii", "personal_data"]
+    assert result.blocked_topics == ["phi", "medical_record"]
+    
+    assert topic_extractor.extract("hello world").topics == []
+
+
+@pytest.mark.parametrize("text, topics", [
+    ("Deny payments above $100 for non-managers", ["payment"]),
+    ("Do not allow refunds over $500", ["refund"]),
+    ("Only admins can change configuration without MFA", ["admin", "configuration", "security"]),
+    ("Block payments over $100", ["payment"]),
+])
+def test_topic_extractor_keeps_restricted_subjects(text, topics):
+    """Test that negations and amount/condition rules do not block the policy's own subject."""
+    result = topic_extractor.extract(text)
+    assert result.topics == topics
+    assert result.blocked_topics == []
+
+
+def test_topic_extractor_content_block_phrases():
+    """Test that explicit content-blocking phrases block topics even with conditions."""
+    result = topic_extractor.extract("Make payments for customers, but never discuss violence unless asked")
+    assert result.topics == ["payment"]
+    assert result.blocked_topics == ["violence"]
+
+
+@pytest.mark.asyncio
+async def test_guidance_prefills_topics(monkeypatch):
+    """Test that client-LLM guidance carries pre-filled topic metadata."""
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    result = await generate_policy_tool({"nl_requirements": "Make a payment to Robert. Block recipes."})
+    assert '"topics": ["payment"]' in result
+    assert '"blocked_topics": ["recipe"]' in result
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file